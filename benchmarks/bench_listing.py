@@ -0,0 +1,85 @@
+"""Time GET /feedback/ serialization: per-row models and FastAPI's encoder against rows_to_json.
+
+Run from the repository root:
+
+    PYTHONPATH=vesta_backend python benchmarks/bench_listing.py --rows 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import List
+
+os.environ.setdefault("MOCK_MODE", "true")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import backend.db as db_module  # noqa: E402
+import backend.serialization as serialization  # noqa: E402
+from backend.datagen import FeedbackGenerator, seed_db  # noqa: E402
+from backend.models.schemas import FeedbackResponse  # noqa: E402
+
+
+def model_path() -> bytes:
+    """What list_feedback did before: a model per row, then FastAPI's generic encoder."""
+    models = [FeedbackResponse(**item) for item in db_module.get_all_feedback()]
+    return json.dumps(jsonable_encoder(models), separators=(",", ":")).encode("utf-8")
+
+
+def type_adapter_path() -> bytes:
+    adapter = TypeAdapter(List[FeedbackResponse])
+    return adapter.dump_json(adapter.validate_python(db_module.get_all_feedback()))
+
+
+def rows_path() -> bytes:
+    return serialization.rows_to_json(
+        FeedbackResponse, db_module.FEEDBACK_LISTING_COLUMNS, db_module.iter_feedback_listing()
+    )
+
+
+def measure(name, fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name:<24} best {min(times) * 1000:8.1f} ms   peak {peak / 2**20:7.1f} MiB   {len(body) / 2**20:6.1f} MiB body")
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--scored", type=float, default=0.5, help="Fraction of rows with a score")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    db_module.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_listing.db")
+    db_module.init_db()
+    seed_db(FeedbackGenerator().rows(args.rows), with_labels=True, batch_size=10000)
+    repository = db_module.get_repository()
+    with repository.connection() as conn:
+        conn.execute(
+            "INSERT INTO scores (feedback_id, urgency, impact, justification, priority_score) "
+            "SELECT id, 7, 6, 'Affects several teams', 6.6 FROM feedback WHERE id % 100 < ?",
+            (int(args.scored * 100),),
+        )
+
+    expected = json.loads(measure("models + jsonable_encoder", model_path, args.repeat))
+    assert json.loads(measure("TypeAdapter (bulk)", type_adapter_path, args.repeat)) == expected
+    if serialization.orjson is not None:
+        assert json.loads(measure("rows_to_json (orjson)", rows_path, args.repeat)) == expected
+    orjson, serialization.orjson = serialization.orjson, None
+    assert json.loads(measure("rows_to_json (fallback)", rows_path, args.repeat)) == expected
+    serialization.orjson = orjson
+
+
+if __name__ == "__main__":
+    main()
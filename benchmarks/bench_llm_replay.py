@@ -0,0 +1,78 @@
+"""Run the full classify + evaluate path over a synthetic corpus against a recorded LLM cassette.
+
+Record once with a real model, then replay offline as often as needed:
+
+    LLM_CASSETTE=benchmarks/pipeline.jsonl LLM_CASSETTE_MODE=record OPENAI_API_KEY=... \\
+        PYTHONPATH=vesta_backend python benchmarks/bench_llm_replay.py --items 100 --threads 1
+    LLM_CASSETTE=benchmarks/pipeline.jsonl \\
+        PYTHONPATH=vesta_backend python benchmarks/bench_llm_replay.py --items 100 --threads 8 --error-rate 0.05
+
+The corpus is seeded, so a replay asks exactly the recorded questions.
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ["MOCK_MODE"] = "false"
+
+import backend.db as db_module  # noqa: E402
+import backend.llm_cassette as llm_cassette  # noqa: E402
+from backend.crew_pipeline import get_llm, process_single_feedback  # noqa: E402
+from backend.datagen import FeedbackGenerator  # noqa: E402
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed; replay with the one recorded")
+    parser.add_argument("--latency", default=None, help='"recorded" or seconds per call (LLM_REPLAY_LATENCY)')
+    parser.add_argument("--latency-scale", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=None)
+    parser.add_argument("--truncate-rate", type=float, default=None)
+    args = parser.parse_args()
+
+    if not os.getenv("LLM_CASSETTE"):
+        parser.error("set LLM_CASSETTE to the cassette file")
+    for name, value in (("LLM_REPLAY_LATENCY", args.latency), ("LLM_REPLAY_LATENCY_SCALE", args.latency_scale),
+                        ("LLM_REPLAY_ERROR_RATE", args.error_rate), ("LLM_REPLAY_TRUNCATE_RATE", args.truncate_rate)):
+        if value is not None:
+            setattr(llm_cassette, name, value)
+    if get_llm() is None:
+        parser.error("no LLM: recording needs OPENAI_API_KEY")
+
+    db_module.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_replay.db")
+    db_module.init_db()
+    rows = list(FeedbackGenerator(seed=args.seed).rows(args.items))
+    db_module.insert_feedback_bulk(rows)
+
+    def run(item):
+        feedback_id, row = item
+        start = time.perf_counter()
+        process_single_feedback(feedback_id, row["text"], row["source"])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        latencies = list(pool.map(run, enumerate(rows, 1)))
+    elapsed = time.perf_counter() - start
+    db_module.flush_usage()
+
+    cassette = llm_cassette.get_cassette()
+    print(f"{args.items} items in {elapsed:.2f}s ({args.items / elapsed:.1f} items/s) on {args.threads} threads")
+    print(f"per item: p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p95 {percentile(latencies, 0.95) * 1000:.0f} ms")
+    print(f"cassette: {cassette.snapshot()}")
+    for row in db_module.get_llm_usage_summary(["stage", "outcome"]):
+        print(f"  {row['stage']:<15} {row['outcome']:<12} {row['calls']:>6} calls")
+    db_module.close_repositories()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Time nearest-neighbour queries on the IVF similarity index and measure recall against brute force.
+
+Vectors are embedded from synthetic feedback text and indexed in memory; no database is involved.
+Run from the repository root:
+
+    PYTHONPATH=vesta_backend python benchmarks/bench_similarity.py --vectors 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.datagen import FeedbackGenerator
+from backend.embeddings import embed_texts
+from backend.similarity import SimilarityIndex, default_lists
+from backend.themes import minibatch_kmeans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    texts = [row["text"] for row in FeedbackGenerator().rows(args.vectors)]
+    vectors = embed_texts(texts).astype(np.float16)
+    print(f"embedded {args.vectors} texts in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    index = SimilarityIndex(repository=None, path="")
+    sample = vectors[np.random.default_rng(0).choice(len(vectors), min(len(vectors), 100_000), replace=False)]
+    centroids, _ = minibatch_kmeans(sample.astype(np.float32), default_lists(len(vectors)))
+    index.scale = 127.0 / float(np.abs(vectors).max())
+    index._set_main(centroids, np.arange(1, len(vectors) + 1, dtype=np.int64), index._quantize(vectors))
+    print(f"indexed into {len(centroids)} lists in {time.perf_counter() - start:.1f}s, "
+          f"{index.memory_bytes() / 2**20:.0f} MiB")
+
+    rng = np.random.default_rng(1)
+    queries = rng.choice(len(vectors), args.queries, replace=False)
+    full = vectors.astype(np.float32)
+    for probes in (4, 8, 16):
+        index.probes = probes
+        latencies, hits = [], 0
+        for row in queries:
+            query = full[row]
+            begin = time.perf_counter()
+            found = index.search(query, args.k, exclude=int(row) + 1)
+            latencies.append(time.perf_counter() - begin)
+            scores = full @ query
+            scores[row] = -np.inf
+            # A hit is any result whose exact score reaches the true k-th best, so ties are not misses.
+            kth = np.partition(scores, len(scores) - args.k)[len(scores) - args.k]
+            hits += sum(1 for feedback_id, _ in found if scores[feedback_id - 1] >= kth - 1e-3)
+        latencies_ms = np.array(latencies) * 1000
+        print(f"probes {probes:>2}: p50 {np.percentile(latencies_ms, 50):.1f} ms, "
+              f"p99 {np.percentile(latencies_ms, 99):.1f} ms, recall@{args.k} {hits / (args.k * len(queries)):.3f}")
+
+
+if __name__ == "__main__":
+    main()
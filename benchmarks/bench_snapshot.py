@@ -0,0 +1,92 @@
+"""Compare dashboard queries on the columnar snapshot with the dict-based get_all_feedback() path.
+
+Run from the repository root:
+
+    PYTHONPATH=vesta_backend python benchmarks/bench_snapshot.py --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("MOCK_MODE", "true")
+
+import backend.db as db_module  # noqa: E402
+from backend.datagen import FeedbackGenerator, seed_db  # noqa: E402
+from backend.snapshot import FeedbackSnapshot  # noqa: E402
+
+
+def dict_path_stats(theme=None):
+    """What the dashboard does today: load every row as a dict, then aggregate and sort in Python."""
+    rows = db_module.get_all_feedback()
+    if theme is not None:
+        rows = [row for row in rows if row["theme"] == theme]
+    by_theme = {}
+    for row in rows:
+        entry = by_theme.setdefault(row["theme"], [0, 0.0])
+        entry[0] += 1
+        entry[1] += row["priority_score"] or 0
+    top = sorted((row for row in rows if row["priority_score"] is not None),
+                 key=lambda row: (-row["priority_score"], row["id"]))[:10]
+    return by_theme, [row["id"] for row in top]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def seed(rows: int):
+    db_module.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_snapshot.db")
+    db_module.init_db()
+    seed_db(FeedbackGenerator().rows(rows), with_labels=True, batch_size=10000)
+    with db_module.get_db() as conn:
+        conn.execute("""
+            INSERT INTO scores (feedback_id, urgency, impact, justification, priority_score)
+            SELECT id, abs(random()) % 10 + 1, abs(random()) % 10 + 1, 'bench', (abs(random()) % 1000) / 100.0
+            FROM feedback
+        """)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    seed(args.rows)
+    repository = db_module.get_repository()
+
+    tracemalloc.start()
+    rows = db_module.get_all_feedback()
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    del rows
+    tracemalloc.stop()
+
+    snapshot = FeedbackSnapshot(repository, max_staleness=0)
+    load_seconds, _ = timed(snapshot.load, 1)
+
+    print(f"rows: {args.rows}")
+    print(f"memory  get_all_feedback() dicts {dict_bytes / 2**20:>8.1f} MiB")
+    print(f"memory  snapshot columns         {snapshot.memory_bytes() / 2**20:>8.1f} MiB")
+    print(f"load    snapshot                 {load_seconds * 1000:>8.1f} ms (once per process)")
+
+    for label, theme in (("all", None), ("theme", "Performance")):
+        dict_seconds, _ = timed(lambda: dict_path_stats(theme), args.repeat)
+        snap_seconds, _ = timed(lambda: (snapshot.stats(theme=theme), snapshot.top_k(10, theme=theme)), args.repeat)
+        sql_seconds, _ = timed(lambda: (repository.feedback_stats(theme=theme),
+                                        repository.get_top_feedback(10, theme=theme)), args.repeat)
+        print(f"stats+top10 [{label:>5}]  dicts {dict_seconds * 1000:>8.1f} ms  "
+              f"sql {sql_seconds * 1000:>8.1f} ms  snapshot {snap_seconds * 1000:>7.1f} ms")
+
+    db_module.insert_feedback_bulk(FeedbackGenerator(seed=1).rows(100))
+    refresh_seconds, changed = timed(lambda: snapshot.refresh(force=True), 1)
+    print(f"refresh after 100 inserts        {refresh_seconds * 1000:>8.1f} ms ({changed} rows re-read)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Time theme discovery: a first full run, then an incremental run over newly added feedback.
+
+Run from the repository root:
+
+    PYTHONPATH=vesta_backend python benchmarks/bench_themes.py --rows 200000 --new 10000
+"""
+import argparse
+import json
+import os
+import tempfile
+
+os.environ.setdefault("MOCK_MODE", "true")
+
+import backend.db as db_module  # noqa: E402
+from backend.datagen import FeedbackGenerator, seed_db  # noqa: E402
+from backend.themes import discover_themes  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--new", type=int, default=10_000)
+    parser.add_argument("--clusters", type=int, default=24)
+    args = parser.parse_args()
+
+    db_module.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_themes.db")
+    db_module.init_db()
+    generator = FeedbackGenerator()
+    seed_db(generator.rows(args.rows), with_labels=True, batch_size=10000)
+
+    print("first run  ", json.dumps(discover_themes(args.clusters)))
+    seed_db(generator.rows(args.new), with_labels=True, batch_size=10000)
+    print("incremental", json.dumps(discover_themes(args.clusters)))
+    print("no changes ", json.dumps(discover_themes(args.clusters)))
+    for cluster in db_module.get_clusters()[:10]:
+        print(f"{cluster['items']:>8}  {cluster['label']}")
+
+
+if __name__ == "__main__":
+    main()
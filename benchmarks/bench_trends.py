@@ -0,0 +1,71 @@
+"""Time trend detection over a large synthetic feedback history.
+
+Run from the repository root:
+
+    PYTHONPATH=vesta_backend python benchmarks/bench_trends.py --rows 1000000
+    PYTHONPATH=vesta_backend python benchmarks/bench_trends.py --rows 1000000 --db   # also time the SQLite load
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("MOCK_MODE", "true")
+
+import numpy as np  # noqa: E402
+
+import backend.db as db_module  # noqa: E402
+from backend.datagen import FeedbackGenerator, seed_db  # noqa: E402
+from backend.trends import DAY, SENTIMENTS, TrendColumns, compute_trends, load_trend_columns  # noqa: E402
+
+THEME_LABELS = ["Performance", "Product/Features", "UX/UI", "Pricing", "Service", "Other"]
+
+
+def synthetic_columns(rows: int, days: int, end: float, seed: int = 0) -> TrendColumns:
+    """Random columns with a Performance spike in the last week, built directly in NumPy."""
+    rng = np.random.default_rng(seed)
+    timestamps = (end - rng.random(rows) * days * DAY).astype(np.int64)
+    themes = rng.integers(0, len(THEME_LABELS), rows, dtype=np.int32)
+    recent = timestamps > end - 7 * DAY
+    themes[recent & (rng.random(rows) < 0.2)] = 0
+    sentiments = rng.integers(-1, len(SENTIMENTS), rows).astype(np.int8)
+    priorities = np.where(rng.random(rows) < 0.9, rng.random(rows) * 10, np.nan)
+    return TrendColumns(timestamps, themes, THEME_LABELS, sentiments, priorities)
+
+
+def best_of(repeat: int, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=35)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", action="store_true", help="Seed a SQLite file and time loading the columns too")
+    args = parser.parse_args()
+    end = time.time()
+
+    columns = synthetic_columns(args.rows, args.days, end)
+    elapsed, trends = best_of(args.repeat, lambda: compute_trends(columns, end=end))
+    print(f"compute   {args.rows:>9} rows {elapsed * 1000:>8.1f} ms  spikes={trends['spikes']}")
+
+    if args.db:
+        db_module.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_trends.db")
+        db_module.init_db()
+        start = time.perf_counter()
+        seed_db(FeedbackGenerator(days=args.days).rows(args.rows), with_labels=True, batch_size=10000)
+        print(f"seed      {args.rows:>9} rows {(time.perf_counter() - start):>8.1f} s")
+        elapsed, columns = best_of(args.repeat, lambda: load_trend_columns(end - args.days * DAY))
+        print(f"load      {len(columns):>9} rows {elapsed * 1000:>8.1f} ms")
+        elapsed, _ = best_of(args.repeat, lambda: compute_trends(columns, end=end))
+        print(f"compute   {len(columns):>9} rows {elapsed * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Measure queue worker throughput as the fleet grows, against a stub LLM.
+
+Run from the repository root:
+
+    PYTHONPATH=vesta_backend python benchmarks/bench_worker_scaling.py --items 400 --latency 0.05
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("MOCK_MODE", "true")
+
+import backend.db as db_module  # noqa: E402
+from backend.datagen import FeedbackGenerator  # noqa: E402
+from backend.worker import run_fleet  # noqa: E402
+
+STUB_LATENCY = float(os.getenv("BENCH_STUB_LATENCY", "0.05"))
+
+
+def stub_llm_process(feedback_id: int, text: str, source: str):
+    # Two LLM round trips (classify + evaluate) followed by the real DB writes.
+    from backend.crew_pipeline import process_single_feedback
+    start = time.time()
+    time.sleep(2 * STUB_LATENCY)
+    process_single_feedback(feedback_id, text, source)
+    with open(os.path.join(os.environ["BENCH_TIMING_DIR"], f"{os.getpid()}.log"), "a") as f:
+        f.write(f"{start} {time.time()}\n")
+
+
+def run(items: int, processes: int, batch_size: int) -> float:
+    """Return steady-state seconds from the first item started to the last one finished.
+
+    Process start-up (interpreter spawn and imports) is excluded because it is
+    paid once per worker, not per item.
+    """
+    workdir = tempfile.mkdtemp()
+    os.environ["BENCH_TIMING_DIR"] = workdir
+    db_path = os.path.join(workdir, "bench_queue.db")
+    db_module.DB_PATH = db_path
+    db_module.init_db()
+    db_module.insert_feedback_bulk(FeedbackGenerator(seed=processes).rows(items))
+    db_module.enqueue_feedback(range(1, items + 1))
+
+    options = {"batch_size": batch_size, "lease_seconds": 60, "poll_interval": 0.05,
+               "max_attempts": 3, "db_path": db_path, "drain": True}
+    run_fleet(processes, options, process_fn=stub_llm_process)
+    assert db_module.get_queue_stats() == {"pending": 0, "leased": 0, "failed": 0}
+
+    spans = []
+    for name in os.listdir(workdir):
+        if name.endswith(".log"):
+            with open(os.path.join(workdir, name)) as f:
+                spans.extend(tuple(map(float, line.split())) for line in f)
+    assert len(spans) == items
+    return max(end for _, end in spans) - min(start for start, _ in spans)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=400)
+    parser.add_argument("--processes", default="1,2,4,8")
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=STUB_LATENCY, help="Seconds per stub LLM call")
+    args = parser.parse_args()
+    os.environ["BENCH_STUB_LATENCY"] = str(args.latency)
+
+    baseline = None
+    print(f"{'workers':>8} {'seconds':>8} {'items/s':>8} {'speedup':>8}")
+    for processes in (int(p) for p in args.processes.split(",")):
+        elapsed = run(args.items, processes, args.batch_size)
+        throughput = args.items / elapsed
+        baseline = baseline or throughput
+        print(f"{processes:>8} {elapsed:>8.2f} {throughput:>8.1f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
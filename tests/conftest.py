@@ -0,0 +1,56 @@
+import os
+import pytest
+
+
+@pytest.fixture(scope="session")
+def postgres_url(tmp_path_factory):
+    """A PostgreSQL URL from TEST_DATABASE_URL, or an embedded server when pgserver is installed."""
+    url = os.getenv("TEST_DATABASE_URL")
+    if url:
+        yield url
+        return
+    try:
+        import pgserver
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        pytest.skip("PostgreSQL not available: set TEST_DATABASE_URL or install pgserver and psycopg[pool]")
+    server = pgserver.get_server(str(tmp_path_factory.mktemp("pgdata")), cleanup_mode="stop")
+    yield server.get_uri()
+    server.cleanup()
+
+
+def reset_postgres(url: str):
+    import psycopg
+    with psycopg.connect(url, autocommit=True) as conn:
+        conn.execute("DROP SCHEMA public CASCADE")
+        conn.execute("CREATE SCHEMA public")
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def storage_backend(request, tmp_path, monkeypatch):
+    """Point the db helpers at a fresh SQLite file or PostgreSQL schema."""
+    import backend.db as db_module
+
+    if request.param == "postgres":
+        url = request.getfixturevalue("postgres_url")
+        reset_postgres(url)
+        monkeypatch.setenv("DATABASE_URL", url)
+    else:
+        monkeypatch.delenv("DATABASE_URL", raising=False)
+        monkeypatch.setattr(db_module, "DB_PATH", str(tmp_path / "test_storage.db"))
+
+    db_module.init_db()
+    yield request.param
+    db_module.close_repositories()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """A fresh SQLite database, for tests whose LLM calls are written to the usage ledger."""
+    import backend.db as db_module
+
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr(db_module, "DB_PATH", str(tmp_path / "test.db"))
+    db_module.init_db()
+    yield db_module.DB_PATH
+    db_module.close_repositories()
@@ -0,0 +1,53 @@
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+from crewai.llms.base_llm import BaseLLM
+
+
+class ScriptedLLM(BaseLLM):
+    """Offline stand-in for the chat model that answers each agent with a canned response."""
+
+    classification: Dict[str, Any] = {
+        "sentiment": "negative", "theme": "Performance", "summary": "App is slow", "confidence": 0.9,
+    }
+    evaluation: Dict[str, Any] = {"urgency": 8, "impact": 7, "justification": "Slowness blocks users"}
+    report: str = "# Weekly Feedback Priority Report\n\nAll good."
+    group_summary: str = "Users report slowness."
+    raw_classification: str = ""
+    calls: List[str] = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        prompt = messages if isinstance(messages, str) else " ".join(str(m.get("content", "")) for m in messages)
+        if "classify it" in prompt:
+            self.calls.append("classify")
+            answer = self.raw_classification or f"```json\n{json.dumps(self.classification)}\n```"
+        elif "Evaluate this classified" in prompt:
+            self.calls.append("evaluate")
+            answer = json.dumps(self.evaluation)
+        elif "Summarize this group" in prompt:
+            self.calls.append("summarize")
+            answer = self.group_summary
+        else:
+            self.calls.append("report")
+            answer = self.report
+        return f"Thought: I can answer.\nFinal Answer: {answer}"
+
+
+class StreamingStubLLM:
+    """Chat-model stand-in whose ``stream`` yields tokens with a fixed delay, like a local server."""
+
+    def __init__(self, tokens: List[str], delay: float = 0.0, fail_after: int = -1):
+        self.tokens = tokens
+        self.delay = delay
+        self.fail_after = fail_after
+        self.prompts: List[str] = []
+
+    def stream(self, messages):
+        self.prompts.append(messages[-1][1])
+        for i, token in enumerate(self.tokens):
+            if i == self.fail_after:
+                raise RuntimeError("stream interrupted")
+            time.sleep(self.delay)
+            yield SimpleNamespace(content=token)
@@ -82,3 +82,215 @@ def test_get_latest_report(client):
     assert response.status_code == 200
     data = response.json()
     assert "markdown_report" in data
+
+
+def test_latest_report_is_cached_with_etag(client):
+    client.post("/report/generate")
+
+    response = client.get("/report/latest")
+    etag = response.headers["etag"]
+    assert client.get("/report/latest", headers={"If-None-Match": etag}).status_code == 304
+
+    html = client.get("/report/latest/html", headers={"If-None-Match": '"stale"'})
+    assert html.status_code == 200
+    assert html.headers["content-type"].startswith("text/html")
+    assert "<h1>" in html.text
+    assert client.get("/report/latest/html", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/report/generate")
+    response = client.get("/report/latest", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_read_endpoints_are_cached_and_compressed(client):
+    for i in range(30):
+        client.post("/feedback/", json={"text": f"Export to CSV times out for large workspaces ({i})"})
+
+    response = client.get("/feedback/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 30
+    etag = response.headers["etag"]
+    assert client.get("/feedback/", headers={"If-None-Match": etag}).status_code == 304
+
+    feedback_id = response.json()[0]["id"]
+    item = client.get(f"/feedback/{feedback_id}").json()
+    assert item == response.json()[0]
+    assert item["created_at"][10] == "T"
+    assert client.get("/feedback/999999").status_code == 404
+
+    client.delete(f"/feedback/{feedback_id}")
+    response = client.get("/feedback/", headers={"If-None-Match": etag})
+    assert response.status_code == 200, "writes through backend.db invalidate the cache"
+    assert len(response.json()) == 29
+    assert client.get(f"/feedback/{feedback_id}").status_code == 404
+
+
+def test_response_cache_rechecks_version_after_ttl():
+    from backend.response_cache import ResponseCache
+
+    version = [1]
+    cache = ResponseCache(lambda: version[0], ttl=60)
+    assert cache.get("/feedback/", lambda: b"old").body == b"old"
+    version[0] = 2  # a write from another process
+    assert cache.get("/feedback/", lambda: b"new").body == b"old"
+    cache.ttl = 0
+    assert cache.get("/feedback/", lambda: b"new").body == b"new"
+
+
+def test_archive_endpoints(client, tmp_path, monkeypatch):
+    monkeypatch.setenv("ARCHIVE_DIR", str(tmp_path / "archive"))
+    from backend.db import insert_feedback_bulk
+    from backend.archive import archive_old_feedback
+    insert_feedback_bulk([{"text": "Old SSO complaint", "source": "support", "created_at": "2022-03-01 08:00:00"}])
+    archive_old_feedback(days=365)
+
+    results = client.get("/archive/search", params={"q": "sso", "from": "2022-01"}).json()
+    assert [(item["text"], item["month"]) for item in results] == [("Old SSO complaint", "2022-03")]
+    assert client.get("/archive/stats").json()["total"] == 1
+    assert client.get("/archive/partitions").json()[0]["month"] == "2022-03"
+    assert client.get("/archive/search", params={"q": "sso", "from": "March"}).status_code == 422
+
+
+def test_routing_metrics(client):
+    response = client.get("/metrics/routing")
+    assert response.status_code == 200
+    assert "tiers" in response.json()
+
+
+def test_score_history_endpoint(client):
+    feedback_id = client.post("/feedback/", json={"text": "App crashes on login", "source": "test"}).json()["id"]
+
+    response = client.get(f"/feedback/{feedback_id}/scores")
+    assert response.status_code == 200
+    assert [entry["version"] for entry in response.json()] == [1]
+
+    assert client.get("/feedback/999999/scores").status_code == 404
+    assert client.get("/feedback/drift").status_code == 200
+
+
+def test_report_trends(client):
+    client.post("/feedback/", json={"text": "Checkout is slow", "source": "test"})
+
+    response = client.get("/report/trends", params={"window_days": 7, "windows": 4})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_volume"] == 1
+    assert data["themes"][0]["series"][-1] == 1
+
+    assert client.get("/report/trends", params={"windows": 1}).status_code == 422
+
+
+def test_feedback_stats_and_top(client):
+    for text in ["App crashes on login", "Love the new design", "Too expensive"]:
+        client.post("/feedback/", json={"text": text, "source": "test"})
+
+    stats = client.get("/feedback/stats").json()
+    assert stats["total"] == 3
+    assert stats["scored"] == 3
+    assert sum(item["count"] for item in stats["by_theme"]) == 3
+    assert client.get("/feedback/stats", params={"source": "nowhere"}).json()["total"] == 0
+
+    top = client.get("/feedback/top", params={"k": 2}).json()
+    assert len(top) == 2
+    assert top[0]["priority_score"] >= top[1]["priority_score"]
+
+
+def test_theme_clusters(client):
+    from backend.themes import discover_themes
+
+    for text in ["App crashes on login", "Login crashes the app", "Too expensive", "Price is too expensive"]:
+        client.post("/feedback/", json={"text": text, "source": "test"})
+    assert client.get("/feedback/clusters").json() == []
+
+    discover_themes(n_clusters=2)
+    clusters = client.get("/feedback/clusters").json()
+    assert sum(cluster["items"] for cluster in clusters) == 4
+
+    detail = client.get(f"/feedback/clusters/{clusters[0]['id']}", params={"limit": 1}).json()
+    assert detail["label"] == clusters[0]["label"]
+    assert len(detail["members"]) == 1
+    assert client.get("/feedback/clusters/999999").status_code == 404
+
+
+def test_similar_feedback(client, tmp_path, monkeypatch):
+    monkeypatch.setenv("SIMILARITY_INDEX_PATH", str(tmp_path / "similar.npz"))
+    ids = [
+        client.post("/feedback/", json={"text": text, "source": "test"}).json()["id"]
+        for text in ["Checkout page is slow", "The checkout page is very slow", "Love the new colours"]
+    ]
+
+    response = client.get(f"/feedback/{ids[0]}/similar", params={"k": 1})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [ids[1]]
+    assert 0 < response.json()[0]["similarity"] <= 1
+    assert client.get("/feedback/999999/similar").status_code == 404
+
+
+def test_llm_parsing_metrics(client):
+    response = client.get("/metrics/llm-parsing")
+    assert response.status_code == 200
+    assert "schemas" in response.json()
+
+
+def test_idempotent_submission(client, monkeypatch):
+    import backend.routes.feedback as feedback_routes
+
+    calls = []
+    original = feedback_routes.process_single_feedback
+    monkeypatch.setattr(feedback_routes, "process_single_feedback",
+                        lambda *args: calls.append(args[0]) or original(*args))
+    body = {"text": "Checkout times out", "source": "test"}
+
+    first = client.post("/feedback/", json=body, headers={"Idempotency-Key": "abc"})
+    retry = client.post("/feedback/", json=body, headers={"Idempotency-Key": "abc"})
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert calls == [first.json()["id"]]
+
+    conflict = client.post("/feedback/", json={**body, "text": "Something else"}, headers={"Idempotency-Key": "abc"})
+    assert conflict.status_code == 409
+
+    # An item whose first attempt never got scored is processed by the retry.
+    from backend.db import insert_feedback_once
+    pending_id, _ = insert_feedback_once("Login loops", "test", idempotency_key="stuck")
+    response = client.post("/feedback/", json={"text": "Login loops", "source": "test", "idempotency_key": "stuck"})
+    assert response.json()["id"] == pending_id
+    assert response.json()["priority_score"] is not None
+    assert calls[-1] == pending_id
+
+
+def test_csv_reupload_skips_known_rows(client):
+    export = "external_id,text,source\nZ-1,Search is slow,zendesk\nZ-2,Love the app,zendesk\n,No id here,zendesk\n"
+
+    first = client.post("/feedback/upload-csv", files={"file": ("export.csv", export, "text/csv")}).json()
+    assert (first["count"], first["duplicates"]) == (3, 0)
+
+    again = client.post("/feedback/upload-csv", files={"file": ("export.csv", export, "text/csv")}).json()
+    assert (again["count"], again["duplicates"]) == (1, 2)
+    assert len(client.get("/feedback/").json()) == 4
+
+
+def test_csv_upload_does_not_block_other_requests(client, monkeypatch):
+    import threading
+    import time
+    import backend.routes.feedback as feedback_routes
+
+    started, release = threading.Event(), threading.Event()
+    monkeypatch.setattr(feedback_routes, "process_single_feedback",
+                        lambda *args: (started.set(), release.wait(5)))
+    with TestClient(app) as shared:
+        upload = threading.Thread(target=shared.post, args=("/feedback/upload-csv",),
+                                  kwargs={"files": {"file": ("slow.csv", "text\nSlow item\n", "text/csv")}})
+        upload.start()
+        try:
+            assert started.wait(5)
+            start = time.perf_counter()
+            assert shared.get("/health").status_code == 200
+            assert time.perf_counter() - start < 2
+        finally:
+            release.set()
+            upload.join(5)
@@ -0,0 +1,106 @@
+import gzip
+import json
+import os
+
+import pytest
+
+import backend.db as db_module
+from backend.archive import archive_old_feedback, get_archive_stats, list_partitions, run_maintenance, search_archive
+from backend.db import (
+    archive_feedback,
+    enqueue_feedback,
+    get_all_feedback,
+    get_changes,
+    get_change_watermark,
+    get_score_history,
+    insert_feedback_bulk,
+    insert_score,
+)
+
+
+@pytest.fixture
+def archive(storage_backend, tmp_path, monkeypatch):
+    directory = str(tmp_path / "archive")
+    monkeypatch.setenv("ARCHIVE_DIR", directory)
+    insert_feedback_bulk([
+        {"text": "SSO login loops back to the start page", "source": "support", "theme": "Bug",
+         "sentiment": "negative", "created_at": "2023-01-15 09:00:00"},
+        {"text": "Invoices show the wrong VAT rate", "source": "email", "theme": "Billing",
+         "sentiment": "negative", "created_at": "2023-01-20 10:00:00"},
+        {"text": "Please add SSO for Okta", "source": "email", "theme": "Feature Request",
+         "sentiment": "neutral", "created_at": "2023-02-03 11:00:00"},
+        {"text": "Still waiting on the SSO fix", "source": "support", "theme": "Bug",
+         "sentiment": "negative", "created_at": "2023-02-10 12:00:00"},
+        {"text": "SSO works great now", "source": "support", "theme": "Bug", "sentiment": "positive"},
+    ])
+    ids = {item["text"]: item["id"] for item in get_all_feedback()}
+    insert_score(ids["SSO login loops back to the start page"], 8, 7, "Locks users out", 7.6)
+    insert_score(ids["SSO login loops back to the start page"], 9, 7, "Locks users out", 8.2)
+    insert_score(ids["Invoices show the wrong VAT rate"], 6, 5, "Finance confusion", 5.4)
+    enqueue_feedback([ids["Still waiting on the SSO fix"]])
+    return directory, ids
+
+
+def test_old_feedback_moves_to_monthly_partitions(archive):
+    directory, ids = archive
+    seq = get_change_watermark()
+    result = archive_old_feedback(days=365)
+
+    assert result["archived"] == 3
+    assert result["months"] == ["2023-01", "2023-02"]
+    live = {item["text"] for item in get_all_feedback()}
+    assert live == {"SSO works great now", "Still waiting on the SSO fix"}, "queued items wait for their worker"
+    assert get_score_history(ids["SSO login loops back to the start page"]) == []
+    deleted = {change["entity_id"] for change in get_changes(seq) if change["op"] == "delete"}
+    assert deleted == {ids["SSO login loops back to the start page"], ids["Invoices show the wrong VAT rate"],
+                       ids["Please add SSO for Okta"]}
+
+    [path] = os.listdir(os.path.join(directory, "2023-01"))
+    with gzip.open(os.path.join(directory, "2023-01", path), "rt") as lines:
+        records = [json.loads(line) for line in lines]
+    assert [record["score"]["priority_score"] if record["score"] else None for record in records] == \
+        pytest.approx([8.2, 5.4])
+    assert [entry["version"] for entry in records[0]["score_history"]] == [1, 2]
+
+    assert [(p["month"], p["items"], p["files"]) for p in list_partitions()] == [("2023-01", 2, 1), ("2023-02", 1, 1)]
+    assert archive_old_feedback(days=365)["archived"] == 0
+
+
+def test_archived_aggregates_and_search(archive):
+    archive_old_feedback(days=365)
+
+    stats = get_archive_stats()
+    assert (stats["total"], stats["scored"]) == (3, 2)
+    assert stats["avg_priority"] == pytest.approx(6.8)
+    assert get_archive_stats(start_month="2023-02")["total"] == 1
+    assert get_archive_stats(theme="Billing")["by_theme"] == [
+        {"theme": "Billing", "count": 1, "scored": 1, "avg_priority": pytest.approx(5.4)},
+    ]
+
+    assert [record["text"] for record in search_archive("sso")] == [
+        "Please add SSO for Okta", "SSO login loops back to the start page",
+    ]
+    assert [record["text"] for record in search_archive("sso", end_month="2023-01")] == [
+        "SSO login loops back to the start page",
+    ]
+    assert search_archive("sso", source="email", limit=1)[0]["text"] == "Please add SSO for Okta"
+    assert search_archive("start page", theme="Billing") == []
+
+
+def test_failed_write_leaves_feedback_in_place(archive):
+    def failing_write(items):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        archive_feedback("2024-01-01 00:00:00", failing_write)
+    assert len(get_all_feedback()) == 5
+    assert get_archive_stats()["total"] == 0
+
+
+def test_maintenance_archives_and_vacuums(archive, monkeypatch):
+    import backend.archive as archive_module
+    monkeypatch.setattr(archive_module, "ARCHIVE_AFTER_DAYS", 365)
+    result = run_maintenance()
+    assert result["archived"] == 3
+    assert result["vacuum_seconds"] >= 0
+    assert db_module.get_feedback_stats()["total"] == 2
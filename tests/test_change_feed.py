@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ["MOCK_MODE"] = "true"
+
+import backend.db as db_module
+from backend.app import app
+from backend.change_feed import ChangeFeed, FeedBatch, Subscription
+from backend.tenancy import tenant_scope
+from backend.db import (
+    delete_feedback,
+    get_change_watermark,
+    get_changes,
+    get_repository,
+    insert_feedback,
+    insert_feedback_bulk,
+    insert_report,
+    insert_score,
+    update_feedback_classification,
+)
+
+
+def _events(batch: FeedBatch):
+    return [json.loads(text) for _, text in batch.events]
+
+
+def test_build_events_collapses_changes(storage_backend):
+    feed = ChangeFeed(get_repository())
+    after = get_change_watermark()
+    created = insert_feedback("Exports time out", "support")
+    update_feedback_classification(created, "negative", "Performance", "Slow exports")
+    insert_score(created, 8, 6, "Blocks finance teams", 7.2)
+    removed = insert_feedback("Typo on the pricing page", "email")
+    delete_feedback(removed)
+    report_id = insert_report("# Report")
+
+    events = [json.loads(text) for _, text in feed.build_events(get_repository().get_changes(after))]
+    assert [(e["entity"], e["id"], e["op"]) for e in events] == [
+        ("feedback", created, "insert"), ("feedback", removed, "delete"), ("report", report_id, "insert"),
+    ]
+    assert events[0]["data"]["theme"] == "Performance"
+    assert events[0]["data"]["priority_score"] == pytest.approx(7.2)
+    assert "data" not in events[1]
+
+
+def test_concurrent_bulk_inserts_log_each_row_once(storage_backend):
+    from collections import Counter
+    from concurrent.futures import ThreadPoolExecutor
+
+    after = get_change_watermark()
+
+    def load(batch):
+        rows = [{"text": f"Imported {batch}-{i}", "source": "import"} for i in range(600)]
+        insert_feedback_bulk(rows)
+        insert_feedback(f"Submitted during import {batch}", "api")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(load, range(4)))
+
+    logged = Counter(change["entity_id"] for change in get_changes(after)
+                     if change["entity"] == "feedback" and change["op"] == "insert")
+    assert len(logged) == 4 * 601
+    assert set(logged.values()) == {1}
+
+
+def test_subscribers_share_polls_and_catch_up(storage_backend):
+    async def scenario():
+        feed = ChangeFeed(get_repository(), interval=3600)
+        first, _ = await feed.subscribe()
+        second, _ = await feed.subscribe()
+        seen = get_change_watermark()
+
+        feedback_id = insert_feedback("Dashboard is slow", "support")
+        assert await feed.poll_once() == 1
+        batch = await first.next(1)
+        assert batch is await second.next(1), "one serialized batch is shared by every subscriber"
+        assert _events(batch)[0]["id"] == feedback_id
+        assert f"id: {batch.events[0][0]}\nevent: change\n" in batch.sse
+
+        update_feedback_classification(feedback_id, "negative", "Performance", "Slow dashboard")
+        await feed.poll_once()
+        _, catchup = await feed.subscribe(after=seen)
+        assert [(e["op"], e["data"]["theme"]) for e in _events(catchup[0])] == [("insert", "Performance")]
+
+        _, catchup = await feed.subscribe(after=10**9)
+        assert catchup[0].reset
+        for subscription in list(feed.subscribers):
+            feed.unsubscribe(subscription)
+
+    asyncio.run(scenario())
+
+
+def test_subscribers_only_see_their_tenant(storage_backend):
+    async def scenario():
+        feed = ChangeFeed(get_repository(), interval=3600)
+        acme, _ = await feed.subscribe(tenant="acme")
+        globex, _ = await feed.subscribe(tenant="globex")
+        seen = get_change_watermark()
+
+        with tenant_scope("acme"):
+            acme_id = insert_feedback("Checkout fails", "support")
+        with tenant_scope("globex"):
+            insert_report("# Globex report")
+        assert await feed.poll_once() == 2
+        assert [e["id"] for e in _events(await acme.next(1))] == [acme_id]
+        assert [e["entity"] for e in _events(await globex.next(1))] == ["report"]
+        assert await acme.next(0.01) is None
+
+        _, catchup = await feed.subscribe(after=seen, tenant="acme")
+        assert [e["id"] for e in _events(catchup[0])] == [acme_id]
+        for subscription in list(feed.subscribers):
+            feed.unsubscribe(subscription)
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_reset():
+    async def scenario():
+        subscription = Subscription(queue_size=2)
+        for seq in range(3):
+            subscription.push(FeedBatch([(seq, "{}")]))
+        assert (await subscription.next(1)).reset
+        assert await subscription.next(0.01) is None
+
+    asyncio.run(scenario())
+
+
+def test_websocket_receives_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_module, "DB_PATH", str(tmp_path / "test_changes.db"))
+    db_module.init_db()
+    db_module.get_change_feed().interval = 0.02
+    before = insert_feedback("Already there", "support")
+
+    with TestClient(app) as client:
+        with client.websocket_connect(f"/changes/ws?after={get_change_watermark() - 1}") as websocket:
+            assert json.loads(websocket.receive_text())["events"][0]["id"] == before
+            feedback_id = insert_feedback("Login fails on Safari", "support")
+            message = json.loads(websocket.receive_text())
+    assert message["type"] == "changes"
+    assert message["events"][0]["id"] == feedback_id
+    assert message["events"][0]["data"]["text"] == "Login fails on Safari"
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+import pytest
+from backend.datagen import FeedbackGenerator, parse_mix, write_csv, write_ndjson, seed_db, THEMES
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    import backend.db as db_module
+    original_db_path = db_module.DB_PATH
+    db_module.DB_PATH = str(tmp_path / "test_datagen.db")
+
+    yield db_module
+
+    db_module.DB_PATH = original_db_path
+
+
+def test_generator_is_deterministic():
+    first = list(FeedbackGenerator(seed=7).rows(50))
+    second = list(FeedbackGenerator(seed=7).rows(50))
+    assert first == second
+
+
+def test_theme_mix_is_respected():
+    mix = parse_mix("Performance=1,Product/Features=0,UX/UI=0,Pricing=0,Service=0,Other=0", THEMES)
+    rows = list(FeedbackGenerator(theme_mix=mix, duplicate_rate=0).rows(200))
+    assert {row["theme"] for row in rows} == {"Performance"}
+
+
+def test_parse_mix_rejects_unknown_label():
+    with pytest.raises(ValueError):
+        parse_mix("Bugs=2", THEMES)
+
+
+def test_duplicate_rate():
+    rows = list(FeedbackGenerator(duplicate_rate=0.5).rows(2000))
+    unique = {row["text"] for row in rows}
+    assert len(unique) < len(rows) * 0.8
+
+
+def test_csv_and_ndjson_writers():
+    generator = FeedbackGenerator()
+
+    out = io.StringIO()
+    assert write_csv(generator.rows(10), out) == 10
+    parsed = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert len(parsed) == 10
+    assert set(parsed[0]) == {"text", "source", "created_at"}
+
+    out = io.StringIO()
+    assert write_ndjson(generator.rows(10), out, with_labels=True) == 10
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 10
+    assert "theme" in json.loads(lines[0])
+
+
+def test_seed_db(test_db):
+    count = seed_db(FeedbackGenerator().rows(250), with_labels=True, batch_size=100)
+    assert count == 250
+
+    all_feedback = test_db.get_all_feedback()
+    assert len(all_feedback) == 250
+    assert all(item["theme"] in THEMES for item in all_feedback)
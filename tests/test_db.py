@@ -9,25 +9,23 @@ from backend.db import (
     get_all_feedback,
     get_feedback_by_id,
     insert_report,
-    get_latest_report
+    get_latest_report,
+    get_all_reports,
+    insert_feedback_bulk,
+    delete_feedback,
+    get_score_history,
+    get_priority_drift,
+    get_top_feedback,
+    insert_feedback_once,
+    iter_feedback_listing,
+    FEEDBACK_LISTING_COLUMNS,
+    get_repository,
 )
 
 
 @pytest.fixture
-def test_db():
-    test_db_path = "test_feedback.db"
-    
-    import backend.db as db_module
-    original_db_path = db_module.DB_PATH
-    db_module.DB_PATH = test_db_path
-    
-    init_db()
-    
-    yield
-    
-    db_module.DB_PATH = original_db_path
-    if os.path.exists(test_db_path):
-        os.remove(test_db_path)
+def test_db(storage_backend):
+    yield storage_backend
 
 
 def test_insert_and_get_feedback(test_db):
@@ -68,10 +66,158 @@ def test_get_all_feedback(test_db):
     assert len(all_feedback) >= 2
 
 
+@pytest.mark.parametrize("fast", [True, False])
+def test_feedback_listing_json_matches_models(test_db, monkeypatch, fast):
+    import json
+    from typing import List
+    from pydantic import TypeAdapter
+    import backend.serialization as serialization
+    from backend.models.schemas import FeedbackResponse
+
+    if not fast:
+        monkeypatch.setattr(serialization, "orjson", None)
+    insert_feedback_bulk([
+        {"text": "Export is \"broken\" \u2013 again", "source": "support", "created_at": "2024-05-01 10:00:00"},
+        {"text": "Love the new dashboard", "source": "email", "created_at": "2024-05-02 11:30:00.250"},
+    ])
+    scored = insert_feedback("Login fails", "test")
+    update_feedback_classification(scored, "negative", "Bug", "Cannot log in")
+    insert_score(scored, 9, 8, "Blocks everyone", 8.6)
+    rounded = insert_feedback("Search is slow", "test")
+    insert_score(rounded, 5, 5, "Average", 5)
+    # Written outside the API, with no source.
+    with get_repository().connection() as conn:
+        conn.cursor().execute(get_repository()._sql("UPDATE feedback SET source = NULL WHERE id = ?"), (rounded,))
+
+    body = serialization.rows_to_json(FeedbackResponse, FEEDBACK_LISTING_COLUMNS, iter_feedback_listing(batch_size=2))
+    adapter = TypeAdapter(List[FeedbackResponse])
+    expected = adapter.dump_json(adapter.validate_python(get_all_feedback()))
+    assert body == expected
+    assert list(json.loads(body)[0]) == list(FeedbackResponse.model_fields)
+    assert [item["source"] for item in json.loads(body) if item["id"] == rounded] == ["manual"]
+
+
 def test_insert_and_get_report(test_db):
     report_text = "# Test Report\n\nThis is a test report."
     report_id = insert_report(report_text)
     
     latest = get_latest_report()
     assert latest is not None
+    assert latest["id"] == report_id
     assert latest["markdown_report"] == report_text
+
+
+def test_bulk_insert_and_delete(test_db):
+    count = insert_feedback_bulk([
+        {"text": "Bulk 1", "source": "csv"},
+        {"text": "Bulk 2", "created_at": "2024-01-02 03:04:05"},
+    ])
+    assert count == 2
+    assert insert_feedback_bulk([]) == 0
+
+    all_feedback = get_all_feedback()
+    assert {item["text"] for item in all_feedback} == {"Bulk 1", "Bulk 2"}
+
+    feedback_id = all_feedback[0]["id"]
+    insert_score(feedback_id, 5, 5, "Average", 5.0)
+    assert delete_feedback(feedback_id) is True
+    assert get_feedback_by_id(feedback_id) is None
+    assert delete_feedback(feedback_id) is False
+
+
+def test_all_reports_newest_first(test_db):
+    first = insert_report("# First")
+    second = insert_report("# Second")
+    assert [r["id"] for r in get_all_reports()] == [second, first]
+
+
+def test_rescoring_keeps_one_current_score(test_db):
+    feedback_id = insert_feedback("Checkout keeps failing", "test")
+    other_id = insert_feedback("Nice colours", "test")
+    assert insert_score(feedback_id, 4, 4, "first pass", 4.0) == 1
+    assert insert_score(feedback_id, 9, 8, "second pass", 8.6) == 2
+    insert_score(other_id, 2, 2, "minor", 2.0)
+
+    listed = [item for item in get_all_feedback() if item["id"] == feedback_id]
+    assert len(listed) == 1
+    assert listed[0]["priority_score"] == 8.6
+
+    history = get_score_history(feedback_id)
+    assert [entry["version"] for entry in history] == [1, 2]
+    assert [entry["priority_score"] for entry in history] == [4.0, 8.6]
+
+    assert [item["id"] for item in get_top_feedback(5)] == [feedback_id, other_id]
+
+    drift = get_priority_drift()
+    assert len(drift) == 1
+    assert drift[0]["feedback_id"] == feedback_id
+    assert drift[0]["drift"] == pytest.approx(4.6)
+
+    assert delete_feedback(feedback_id)
+    assert get_score_history(feedback_id) == []
+
+
+def test_insert_feedback_once(test_db):
+    first, created = insert_feedback_once("Checkout fails", "api", idempotency_key="req-1")
+    assert created
+    assert insert_feedback_once("Checkout fails", "api", idempotency_key="req-1") == (first, False)
+
+    exported, created = insert_feedback_once("Slow export", "zendesk", external_id="T-9")
+    assert created
+    assert insert_feedback_once("Slow export (edited)", "zendesk", external_id="T-9") == (exported, False)
+    # External ids are only unique within a source.
+    assert insert_feedback_once("Slow export", "intercom", external_id="T-9")[1]
+    assert len(get_all_feedback()) == 3
+
+
+def test_concurrent_inserts_with_one_key_create_one_row(test_db):
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: insert_feedback_once("Retry storm", "api", idempotency_key="same"), range(16)))
+    assert len({feedback_id for feedback_id, _ in results}) == 1
+    assert sum(created for _, created in results) == 1
+    assert len(get_all_feedback()) == 1
+
+
+def test_concurrent_rescoring_takes_versions_in_turn(test_db):
+    from concurrent.futures import ThreadPoolExecutor
+
+    feedback_id = insert_feedback("Checkout keeps failing", "test")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        versions = list(pool.map(lambda i: insert_score(feedback_id, 5, 5, f"pass {i}", float(i)), range(16)))
+    assert sorted(versions) == list(range(1, 17))
+    assert [entry["version"] for entry in get_score_history(feedback_id)] == list(range(1, 17))
+    assert get_feedback_by_id(feedback_id)["priority_score"] == float(versions.index(16))
+
+
+def test_migration_collapses_duplicate_scores(tmp_path):
+    import backend.db as db_module
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE feedback (id INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT NOT NULL, source TEXT DEFAULT 'manual',
+            sentiment TEXT, theme TEXT, summary TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+        CREATE TABLE scores (id INTEGER PRIMARY KEY AUTOINCREMENT, feedback_id INTEGER NOT NULL, urgency INTEGER NOT NULL,
+            impact INTEGER NOT NULL, justification TEXT NOT NULL, priority_score REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+        INSERT INTO feedback (text) VALUES ('legacy item');
+        INSERT INTO scores (feedback_id, urgency, impact, justification, priority_score) VALUES (1, 3, 3, 'old', 3.0);
+        INSERT INTO scores (feedback_id, urgency, impact, justification, priority_score) VALUES (1, 7, 7, 'new', 7.0);
+    """)
+    conn.commit()
+    conn.close()
+
+    original_db_path = db_module.DB_PATH
+    db_module.DB_PATH = str(path)
+    try:
+        init_db()
+        init_db()
+        assert len(get_all_feedback()) == 1
+        assert get_feedback_by_id(1)["priority_score"] == 7.0
+        assert [entry["justification"] for entry in get_score_history(1)] == ["old", "new"]
+        assert insert_score(1, 8, 8, "rescored", 8.0) == 3
+        assert insert_feedback_once("legacy item", "csv", external_id="A-1") == (2, True)
+    finally:
+        db_module.close_repositories()
+        db_module.DB_PATH = original_db_path
@@ -0,0 +1,105 @@
+import json
+import time
+
+import pytest
+
+import backend.crew_pipeline as pipeline
+from backend.db import get_llm_usage_summary, get_usage_ledger, insert_feedback
+from backend.llm_cassette import Cassette, CassetteLLM, CassetteMiss, InjectedLLMError
+from tests.llm_stubs import ScriptedLLM, StreamingStubLLM
+
+
+@pytest.fixture
+def cassette_path(tmp_path, monkeypatch, sqlite_db):
+    monkeypatch.setattr(pipeline, "MOCK_MODE", False)
+    for name in ("LLM_CHEAP_MODEL", "LOCAL_PREFILTER_THRESHOLD", "LLM_ROUTING_BY_SOURCE", "LLM_ROUTING_TIERS"):
+        monkeypatch.delenv(name, raising=False)
+    return str(tmp_path / "cassettes" / "pipeline.jsonl")
+
+
+def use(monkeypatch, llm):
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: llm)
+
+
+def record_feedback(monkeypatch, path: str) -> ScriptedLLM:
+    inner = ScriptedLLM(model="stub", calls=[])
+    use(monkeypatch, CassetteLLM(model="stub", cassette=Cassette(path, mode="record"), inner=inner))
+    feedback_id = insert_feedback("The app is slow", "email")
+    pipeline.process_single_feedback(feedback_id, "The app is slow", "email")
+    return inner
+
+
+def test_recorded_pipeline_replays_without_the_model(cassette_path, monkeypatch):
+    recorded_by = record_feedback(monkeypatch, cassette_path)
+    assert recorded_by.calls == ["classify", "evaluate"]
+    with open(cassette_path) as f:
+        assert [json.loads(line)["kind"] for line in f] == ["call", "call"]
+
+    replay = Cassette(cassette_path, mode="replay", latency="0")
+    use(monkeypatch, CassetteLLM(model="stub", cassette=replay))
+    result = pipeline.process_single_feedback(1, "The app is slow", "email")
+
+    assert (result["theme"], result["summary"], result["urgency"]) == ("Performance", "App is slow", 8)
+    assert replay.snapshot()["replayed"] == 2
+    assert recorded_by.calls == ["classify", "evaluate"], "the recorded model is not called again"
+
+
+def test_unrecorded_request_is_a_miss(cassette_path, monkeypatch):
+    record_feedback(monkeypatch, cassette_path)
+    llm = CassetteLLM(model="stub", cassette=Cassette(cassette_path, mode="replay", latency="0"))
+    with pytest.raises(CassetteMiss):
+        llm.call("Something never recorded")
+
+
+def test_injected_errors_go_through_the_retry_path(cassette_path, monkeypatch):
+    record_feedback(monkeypatch, cassette_path)
+    replay = Cassette(cassette_path, mode="replay", latency="0", error_rate=1.0)
+    use(monkeypatch, CassetteLLM(model="stub", cassette=replay))
+    pipeline.process_single_feedback(1, "The app is slow", "email")
+
+    # crewai retries a failing call itself before each of the pipeline's 3 attempts gives up.
+    assert replay.snapshot()["injected_errors"] >= 3
+    get_usage_ledger().flush()
+    rows = get_llm_usage_summary(["stage", "outcome"])
+    failed = [(row["stage"], row["calls"]) for row in rows if row["outcome"] == "error"]
+    assert failed == [("classification", 3)]
+
+
+def test_injected_failures_are_the_same_every_run(cassette_path, monkeypatch):
+    record_feedback(monkeypatch, cassette_path)
+    runs = []
+    for _ in range(2):
+        cassette = Cassette(cassette_path, mode="replay", latency="0", error_rate=0.3, truncate_rate=0.3, seed=7)
+        messages = next(iter(cassette.entries.values()))[0]["messages"]
+        outcomes = []
+        for _ in range(20):
+            try:
+                outcomes.append(len(cassette.play("call", "stub", messages)["content"]))
+            except InjectedLLMError:
+                outcomes.append("error")
+        runs.append(outcomes)
+    assert runs[0] == runs[1]
+    assert "error" in runs[0] and len(set(runs[0])) == 3, "failures, truncated and whole answers"
+
+
+def test_streams_replay_with_the_configured_latency(cassette_path):
+    tokens = ["# Report", "\n\n", "All ", "good."]
+    recorder = CassetteLLM(model="stub", cassette=Cassette(cassette_path, mode="record"),
+                           inner=StreamingStubLLM(tokens, delay=0.01))
+    assert [chunk.content for chunk in recorder.stream([("human", "Report")])] == tokens
+
+    llm = CassetteLLM(model="stub", cassette=Cassette(cassette_path, mode="replay", latency="0.2"))
+    start = time.perf_counter()
+    assert [chunk.content for chunk in llm.stream([("human", "Report")])] == tokens
+    assert 0.18 <= time.perf_counter() - start < 1
+
+
+def test_get_llm_replays_without_an_api_key(cassette_path, monkeypatch):
+    monkeypatch.setenv("LLM_CASSETTE", cassette_path)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    pipeline.get_llm.cache_clear()
+    try:
+        llm = pipeline.get_llm()
+        assert isinstance(llm, CassetteLLM) and llm.inner is None
+    finally:
+        pipeline.get_llm.cache_clear()
@@ -0,0 +1,125 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import backend.crew_pipeline as pipeline
+import backend.llm_parsing as parsing
+from backend.llm_parsing import LLMOutputError, invoke_structured, parse_output, parse_stats, repair_json
+from backend.models.schemas import ClassificationOutput, EvaluationOutput
+from tests.llm_stubs import ScriptedLLM
+
+CLASSIFICATION = {"sentiment": "negative", "theme": "Performance", "summary": "App is slow", "confidence": 0.9}
+
+
+@pytest.fixture(autouse=True)
+def reset_stats(sqlite_db):
+    parse_stats.reset()
+    parsing._unsupported_models.clear()
+
+
+@pytest.mark.parametrize("text, expected, repairs", [
+    ('Sure! ```json\n{"a": 1, "b": [1, 2]}\n``` Hope that helps', {"a": 1, "b": [1, 2]}, []),
+    ('{"a": "x}", "b": "say \\"hi\\""} trailing prose {"c": 3}', {"a": "x}", "b": 'say "hi"'}, []),
+    ('{"a": 1, "b": [1, 2,],}', {"a": 1, "b": [1, 2]}, ["trailing_comma", "trailing_comma"]),
+    ('{"a": "line one\nline two"}', {"a": "line one\nline two"}, ["control_character"]),
+    ('{"a": 1, "summary": "App is sl', {"a": 1, "summary": "App is sl"}, ["truncated"]),
+    ('{"a": 1, "summ', {"a": 1}, ["truncated"]),
+    ('{"a": 1, "b":', {"a": 1}, ["truncated"]),
+    ('{"a": {"b": [1, 2', {"a": {"b": [1, 2]}}, ["truncated"]),
+    ('{"a": 1, "b": tru', {"a": 1}, ["truncated"]),
+])
+def test_repair_json(text, expected, repairs):
+    repaired, applied = repair_json(text)
+    assert json.loads(repaired) == expected
+    assert applied == repairs
+
+
+def test_repair_json_without_object():
+    assert repair_json("I think this is negative feedback.") == (None, [])
+
+
+def test_parse_output_records_outcomes():
+    assert parse_output(json.dumps(CLASSIFICATION), ClassificationOutput, "classification").theme == "Performance"
+    fenced = f"```json\n{json.dumps({**CLASSIFICATION, 'sentiment': 'Negative '})}\n```"
+    assert parse_output(fenced, ClassificationOutput, "classification").sentiment == "negative"
+    truncated = json.dumps(CLASSIFICATION)[:-12]
+    assert parse_output(truncated, ClassificationOutput, "classification").confidence == 1.0
+
+    with pytest.raises(LLMOutputError):
+        parse_output("no json here", ClassificationOutput, "classification")
+    with pytest.raises(LLMOutputError):
+        parse_output('{"urgency": 12, "impact": 3, "justification": "x"}', EvaluationOutput, "evaluation")
+
+    stats = parsing.get_parse_stats()["schemas"]
+    assert stats["classification"] == {
+        "attempts": 4, "structured": 0, "clean": 1, "extracted": 1, "repaired": 1, "failed": 1,
+        "failure_rate": 0.25, "repair_rate": 0.25, "repairs": {"truncated": 1}, "failures": {"no_json": 1},
+    }
+    assert stats["evaluation"]["failures"] == {"schema": 1}
+
+
+class StructuredStub:
+    """Chat client stand-in with LangChain's ``with_structured_output`` interface."""
+
+    def __init__(self, content=None, parsed=None, error=None):
+        self.model_name = "stub-structured"
+        self.content, self.parsed, self.error = content, parsed, error
+        self.calls = 0
+
+    def with_structured_output(self, schema, method, include_raw):
+        assert method == "json_schema" and include_raw
+        return self
+
+    def invoke(self, messages):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        raw = SimpleNamespace(content=self.content, usage_metadata={"total_tokens": 42})
+        return {"raw": raw, "parsed": self.parsed, "parsing_error": None if self.parsed else ValueError("bad")}
+
+
+def test_structured_output_path():
+    llm = StructuredStub(parsed=ClassificationOutput(**CLASSIFICATION))
+    classified = pipeline._run_classification(1, "The app is slow", llm)
+    assert classified["theme"] == "Performance"
+    assert classified["tokens"] == 42
+    assert parsing.get_parse_stats()["schemas"]["classification"]["structured"] == 1
+
+
+def test_structured_output_is_repaired_locally():
+    llm = StructuredStub(content='{"urgency": 8, "impact": 6, "justification": "Blocks check')
+    output, usage = invoke_structured(llm, "prompt", EvaluationOutput, "evaluation")
+    assert (output.urgency, output.justification) == (8, "Blocks check")
+    assert usage["prompt_tokens"] + usage["completion_tokens"] == 42
+    assert llm.calls == 1
+
+
+def test_unsupported_structured_output_falls_back_once():
+    class BadRequestError(Exception):
+        pass
+
+    llm = StructuredStub(error=BadRequestError("response_format json_schema is not supported"))
+    assert invoke_structured(llm, "prompt", EvaluationOutput, "evaluation") is None
+    assert invoke_structured(llm, "prompt", EvaluationOutput, "evaluation") is None
+    assert llm.calls == 1
+
+    llm = StructuredStub(error=ConnectionError("timeout"))
+    llm.model_name = "stub-flaky"
+    with pytest.raises(ConnectionError):
+        invoke_structured(llm, "prompt", EvaluationOutput, "evaluation")
+
+
+def test_truncated_agent_answer_is_accepted_without_escalating(monkeypatch):
+    cheap = ScriptedLLM(model="stub-cheap", calls=[])
+    cheap.raw_classification = json.dumps(CLASSIFICATION)[:-2]
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: cheap)
+    monkeypatch.setenv("LLM_CHEAP_MODEL", "stub-cheap")
+    monkeypatch.setenv("LLM_ROUTING_TIERS", "cheap,primary")
+    monkeypatch.delenv("LOCAL_PREFILTER_THRESHOLD", raising=False)
+    monkeypatch.delenv("LLM_ROUTING_BY_SOURCE", raising=False)
+
+    classified, _, tier = pipeline.route_feedback(1, "The app is slow", "email")
+    assert tier == "cheap"
+    assert classified["summary"] == "App is slow"
+    assert parsing.get_parse_stats()["schemas"]["classification"]["repaired"] == 1
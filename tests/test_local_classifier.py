@@ -0,0 +1,100 @@
+import pytest
+from backend.local_classifier import (
+    LocalClassifier,
+    classify_batch,
+    evaluate_against_labels,
+    summarize_text,
+)
+from backend.crew_pipeline import classify_feedback_mock, evaluate_feedback_mock
+
+
+@pytest.fixture
+def classifier():
+    return LocalClassifier()
+
+
+def test_predicts_sentiment_and_theme(classifier):
+    crash = classifier.predict("App crashes when I try to export large datasets. Very frustrating.")
+    assert crash["sentiment"] == "negative"
+    assert crash["theme"] == "Performance"
+
+    support = classifier.predict("Customer support responded within minutes. Great experience!")
+    assert support["sentiment"] == "positive"
+    assert support["theme"] == "Service"
+
+    pricing = classifier.predict("Pricing seems too expensive compared to competitors.")
+    assert pricing["theme"] == "Pricing"
+
+
+def test_negation_flips_sentiment(classifier):
+    assert classifier.predict("The new layout is great")["sentiment"] == "positive"
+    assert classifier.predict("The new layout is not great")["sentiment"] == "negative"
+
+
+def test_urgent_items_score_higher(classifier):
+    urgent = classifier.predict("Website is down and payments are broken, this is hurting our business")
+    minor = classifier.predict("Would be nice to have more colors")
+    assert urgent["priority_score"] > minor["priority_score"]
+    assert 1 <= urgent["urgency"] <= 10
+    assert 1 <= minor["impact"] <= 10
+
+
+def test_unknown_text_is_other_and_unconfident(classifier):
+    result = classifier.predict("asdf qwerty")
+    assert result["theme"] == "Other"
+    assert result["confidence"] < 0.6
+
+
+def test_batch_matches_single(classifier):
+    texts = ["Love it!", "", "Billing charged me twice"]
+    batch = classifier.predict_batch(texts)
+    assert [classifier.predict(t) for t in texts] == batch
+    assert classify_batch([]) == []
+
+
+def test_summarize_text():
+    assert summarize_text("First sentence. Second one.") == "First sentence."
+    assert summarize_text("   ") == "Empty feedback"
+    assert len(summarize_text("word " * 200)) <= 203
+
+
+def test_mock_functions_use_local_model():
+    classified = classify_feedback_mock(1, "The mobile app is too slow. Takes forever to load.")
+    assert classified["theme"] == "Performance"
+    assert classified["sentiment"] == "negative"
+
+    score = evaluate_feedback_mock(1, classified)
+    assert score["priority_score"] == round((score["urgency"] + score["impact"]) / 2, 2)
+
+
+def test_evaluate_against_labels():
+    records = [
+        {"text": "App crashes constantly", "sentiment": "negative", "theme": "Performance", "urgency": 8},
+        {"text": "Love the new UI design", "sentiment": "positive", "theme": "UX/UI"},
+        {"text": "Pricing is great value", "sentiment": "positive", "theme": "Service"},
+        {"text": ""},
+    ]
+    result = evaluate_against_labels(records, thresholds=(0.0, 0.99))
+    assert result["items"] == 3
+    assert result["sentiment_accuracy"] == 1.0
+    assert result["theme_accuracy"] == pytest.approx(2 / 3, abs=1e-3)
+    assert result["urgency_mae"] is not None
+    assert result["prefilter"][0]["coverage"] == 1.0
+
+
+def test_db_records_are_only_llm_labelled(storage_backend):
+    from backend.db import insert_feedback, insert_score, update_feedback_classification
+    from backend.local_classifier import _db_records
+
+    llm_id = insert_feedback("App crashes constantly", "support")
+    update_feedback_classification(llm_id, "negative", "Performance", "Crashes", "llm")
+    insert_score(llm_id, 8, 7, "Blocks work", 7.5)
+    local_id = insert_feedback("Love the new UI design", "survey")
+    update_feedback_classification(local_id, "positive", "UX/UI", "Likes the UI", "local")
+    legacy_id = insert_feedback("Pricing is great value", "email")
+    update_feedback_classification(legacy_id, "positive", "Pricing", "Good value")
+    insert_feedback("Not classified yet", "email")
+
+    records = list(_db_records())
+    assert [record["id"] for record in records] == [llm_id]
+    assert records[0]["urgency"] == 8
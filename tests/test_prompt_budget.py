@@ -0,0 +1,96 @@
+import pytest
+
+import backend.crew_pipeline as pipeline
+import backend.prompt_budget as prompt_budget
+from backend.db import get_feedback_by_id, get_llm_usage_summary, get_usage_ledger, insert_feedback
+from backend.prompt_budget import GAP, clean_text, compact_text, count_tokens, prompt_stats
+from tests.llm_stubs import ScriptedLLM
+
+EMAIL = """The export button does nothing since the last update. I need the CSV every Monday.
+
+Thanks,
+Dana
+Sent from my iPhone
+
+This email and any attachments are confidential and intended solely for the addressee.
+
+On Mon, Jun 3, 2024 at 9:12 AM Support <support@example.com> wrote:
+> Hi Dana, could you describe the problem?
+> Best, Support
+"""
+
+
+def test_clean_text_strips_reply_signature_and_boilerplate():
+    text, steps = clean_text(EMAIL)
+    assert text == "The export button does nothing since the last update. I need the CSV every Monday."
+    assert set(steps) >= {"quoted_reply", "signature"}
+
+
+def test_clean_text_collapses_repeated_log_lines():
+    text, steps = clean_text("Sync keeps failing:\n" + "ERROR sync timeout after 30s\n" * 50 + "Please fix")
+    assert text == "Sync keeps failing:\nERROR sync timeout after 30s (repeated 50 times)\nPlease fix"
+    assert steps == ["repeated_lines"]
+
+
+def test_clean_text_keeps_text_that_is_all_quote():
+    assert clean_text("> the app is slow") == ("> the app is slow", [])
+
+
+def test_long_feedback_keeps_first_and_signal_sentences():
+    filler = " ".join(f"We use the dashboard with team number {i} most mornings." for i in range(40))
+    text = f"Reporting from the mobile app. {filler} The app crashed with an error when I tapped export. {filler}"
+    compacted, saved = compact_text(text, 60)
+
+    assert count_tokens(compacted) <= 60
+    assert compacted.startswith("Reporting from the mobile app.")
+    assert "The app crashed with an error when I tapped export." in compacted
+    assert GAP in compacted
+    assert saved == count_tokens(text) - count_tokens(compacted)
+
+
+def test_short_feedback_is_untouched():
+    prompt_stats.reset()
+    assert compact_text("The app is slow", 400) == ("The app is slow", 0)
+    assert prompt_stats.snapshot()["compacted"] == 0
+
+
+def test_saved_tokens_are_recorded_in_the_ledger(monkeypatch, sqlite_db):
+    llm = ScriptedLLM(model="stub-primary", calls=[])
+    monkeypatch.setattr(pipeline, "MOCK_MODE", False)
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: llm)
+    monkeypatch.setattr(prompt_budget, "PROMPT_FEEDBACK_TOKENS", 30)
+    for name in ("LLM_CHEAP_MODEL", "LOCAL_PREFILTER_THRESHOLD", "LLM_ROUTING_BY_SOURCE", "LLM_ROUTING_TIERS"):
+        monkeypatch.delenv(name, raising=False)
+
+    feedback_id = insert_feedback(EMAIL, "email")
+    pipeline.process_single_feedback(feedback_id, EMAIL, "email")
+    assert get_feedback_by_id(feedback_id)["text"] == EMAIL, "only the prompt is compacted"
+    get_usage_ledger().flush()
+
+    rows = get_llm_usage_summary(["stage"])
+    assert [row["stage"] for row in rows] == ["classification", "evaluation"]
+    assert all(row["saved_tokens"] > 0 for row in rows)
+
+
+def test_tokenizer_is_loaded_at_startup_not_on_first_use(monkeypatch, sqlite_db):
+    import tiktoken
+    from fastapi.testclient import TestClient
+    from backend.app import app
+
+    monkeypatch.setitem(prompt_budget._tokenizer, "encoding", None)
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: pytest.fail("encoding loaded while counting"))
+    assert count_tokens("a" * 40) == 10, "estimated from characters until loaded"
+
+    encoding = tiktoken.Encoding("stub", pat_str=r"\S+|\s+", mergeable_ranks={bytes([b]): b for b in range(256)},
+                                 special_tokens={})
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: encoding)
+    with TestClient(app):
+        assert prompt_budget._encoding() is encoding
+    assert count_tokens("ab") == 2
+
+    def offline(name):
+        raise OSError("download failed")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", offline)
+    assert prompt_budget.load_tokenizer() is None
+    assert count_tokens("a" * 40) == 10
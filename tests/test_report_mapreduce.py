@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+import backend.crew_pipeline as pipeline
+import backend.report_mapreduce as mapreduce
+from backend.db import get_llm_usage_summary, get_report_summaries, get_usage_ledger, insert_feedback, insert_score
+from backend.db import update_feedback_classification
+from backend.routes.reports import build_priority_report
+from backend.tenancy import tenant_scope
+from tests.llm_stubs import ScriptedLLM
+
+THEMES = ["Performance", "Pricing", "UX/UI"]
+
+
+def add_feedback(theme: str, summary: str, priority: float) -> int:
+    feedback_id = insert_feedback(summary, "support")
+    update_feedback_classification(feedback_id, "negative", theme, summary)
+    insert_score(feedback_id, 7, 7, "Affects many users", priority)
+    return feedback_id
+
+
+@pytest.fixture
+def llm(monkeypatch, storage_backend):
+    primary = ScriptedLLM(model="stub-primary", calls=[])
+    monkeypatch.setattr(pipeline, "MOCK_MODE", False)
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: primary)
+    monkeypatch.setattr(mapreduce, "REPORT_MODE", "map_reduce")
+    monkeypatch.delenv("LLM_CHEAP_MODEL", raising=False)
+    for i, theme in enumerate(THEMES):
+        for j in range(3):
+            add_feedback(theme, f"{theme} complaint {j}", 5.0 + i + j / 10)
+    return primary
+
+
+def test_one_summary_per_theme_then_one_reduce(llm):
+    build_priority_report()
+
+    assert sorted(llm.calls) == ["report", "summarize", "summarize", "summarize"]
+    assert set(get_report_summaries()) == {f"theme:{theme}" for theme in THEMES}
+    get_usage_ledger().flush()
+    stages = {row["stage"]: row["calls"] for row in get_llm_usage_summary(["stage"])}
+    assert stages == {"report": 1, "report_map": 3}
+
+
+def test_unchanged_themes_reuse_their_cached_summary(llm):
+    build_priority_report()
+    llm.calls.clear()
+    add_feedback("Pricing", "Renewal price doubled", 9.5)
+
+    summaries = mapreduce.get_theme_summaries()
+    assert llm.calls == ["summarize"], "only the theme whose top items changed is summarized again"
+    assert {s["label"]: s["cached"] for s in summaries} == {"Performance": True, "Pricing": False, "UX/UI": True}
+    assert {s["label"]: s["items"] for s in summaries}["Pricing"] == 4
+
+
+def test_summaries_run_concurrently_within_the_cap(llm, monkeypatch):
+    monkeypatch.setattr(mapreduce, "REPORT_MAP_CONCURRENCY", 2)
+    running, peak, lock = [0], [0], threading.Lock()
+    two_running = threading.Barrier(2, timeout=5)
+    summarize = pipeline.summarize_feedback_group
+
+    def tracked(group, model, tier):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        try:
+            if group["label"] != "Performance":
+                two_running.wait()
+            return summarize(group, model, tier)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(pipeline, "summarize_feedback_group", tracked)
+    with tenant_scope("acme"):
+        add_feedback("Performance", "Dashboard is slow", 6.0)
+        summaries = mapreduce.get_theme_summaries()
+        assert list(get_report_summaries()) == ["theme:Performance"], "cached for the tenant that asked"
+    assert [s["label"] for s in summaries] == ["Performance"]
+    assert peak[0] == 1
+
+    mapreduce.get_theme_summaries()
+    assert peak[0] == 2
+
+
+def test_failed_summary_falls_back_to_template_and_is_not_cached(llm, monkeypatch):
+    def fail(group, model, tier):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(pipeline, "summarize_feedback_group", fail)
+    summaries = mapreduce.get_theme_summaries()
+    assert summaries[0]["summary"].startswith("Top items: ")
+    assert get_report_summaries() == {}
+
+
+def test_mock_report_lists_every_theme(storage_backend, monkeypatch):
+    monkeypatch.setattr(mapreduce, "REPORT_MODE", "map_reduce")
+    add_feedback("Performance", "Export is slow", 7.0)
+    add_feedback("Pricing", "Too expensive for small teams", 5.0)
+
+    report = build_priority_report()
+    assert "## Themes" in report
+    assert "### Performance (1 items, avg priority 7.00)" in report
+    assert "Top items: Too expensive for small teams." in report
@@ -0,0 +1,111 @@
+import json
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ["MOCK_MODE"] = "true"
+
+import backend.crew_pipeline as pipeline
+from backend.app import app
+from backend.db import init_db, insert_feedback, insert_score, get_all_reports
+from backend.routes.reports import _stream_report_events
+from tests.llm_stubs import StreamingStubLLM
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    import backend.db as db_module
+    monkeypatch.setattr(db_module, "DB_PATH", str(tmp_path / "test_stream.db"))
+    monkeypatch.chdir(tmp_path)
+    init_db()
+    feedback_id = insert_feedback("The app crashes on export", "support")
+    insert_score(feedback_id, 8, 7, "Blocks exports", 7.6)
+    return TestClient(app)
+
+
+def _events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_mock_report(client):
+    response = client.get("/report/generate/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = _events(response.text)
+    assert events[-1][0] == "done"
+    streamed = "".join(data["text"] for event, data in events if event == "token")
+    assert streamed.startswith("# Weekly Feedback Priority Report")
+
+    reports = get_all_reports()
+    assert len(reports) == 1
+    assert reports[0]["markdown_report"] == streamed
+
+
+def test_stream_from_llm_first_token_fast(client, monkeypatch):
+    tokens = ["# Report\n\n"] + [f"token{i} " for i in range(20)]
+    monkeypatch.setattr(pipeline, "MOCK_MODE", False)
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: StreamingStubLLM(tokens, delay=0.05))
+
+    # TestClient buffers whole responses, so time the event generator the endpoint streams from.
+    state = {"chunks": [], "complete": False}
+    start = time.perf_counter()
+    events = _stream_report_events(state)
+    first = next(events)
+    first_token_at = time.perf_counter() - start
+    assert first.startswith("event: token")
+    assert first_token_at < 1.0
+    list(events)
+    assert state["complete"]
+
+    response = client.post("/report/generate/stream")
+    assert _events(response.text)[-1][0] == "done"
+    assert get_all_reports()[0]["markdown_report"] == "".join(tokens)
+
+
+def test_report_covers_report_top_k_items(client, monkeypatch):
+    import backend.routes.reports as reports
+    monkeypatch.setattr(reports, "REPORT_TOP_K", 7)
+    for i in range(7):
+        insert_score(insert_feedback(f"Minor issue {i}", "support"), 3, 3, "Minor", 3.0 - i / 10)
+
+    response = client.post("/report/generate/stream")
+    assert "## Top 7 Action Items" in response.text
+    assert "### 7. " in response.text and "### 8. " not in response.text
+
+    llm = StreamingStubLLM(["# Report"])
+    monkeypatch.setattr(pipeline, "MOCK_MODE", False)
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: llm)
+    client.post("/report/generate/stream")
+    assert "based on these top 7 feedback items:" in llm.prompts[0]
+    assert "7. [None] (Priority: 2.50" in llm.prompts[0] and "8. [None]" not in llm.prompts[0]
+
+
+def test_disconnected_stream_is_recorded_as_cancelled(client, monkeypatch):
+    from backend.db import get_llm_usage_summary, get_usage_ledger
+    tokens = ["# Report\n\n"] + [f"token{i} " for i in range(20)]
+    monkeypatch.setattr(pipeline, "MOCK_MODE", False)
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: StreamingStubLLM(tokens))
+
+    stream = pipeline.stream_priority_report([{"id": 1, "theme": "Performance", "priority_score": 7.6}])
+    assert next(stream) == "# Report\n\n"
+    stream.close()
+
+    get_usage_ledger().flush()
+    (row,) = get_llm_usage_summary(["stage", "outcome"])
+    assert (row["stage"], row["outcome"], row["calls"]) == ("report", "cancelled", 1)
+    assert row["completion_tokens"] > 0
+
+
+def test_interrupted_stream_is_not_persisted(client, monkeypatch):
+    monkeypatch.setattr(pipeline, "MOCK_MODE", False)
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: StreamingStubLLM(["a", "b", "c"], fail_after=2))
+
+    events = _events(client.get("/report/generate/stream").text)
+    assert events[-1][0] == "error"
+    assert get_all_reports() == []
@@ -0,0 +1,90 @@
+import json
+import pytest
+import backend.crew_pipeline as pipeline
+from tests.llm_stubs import ScriptedLLM
+
+
+@pytest.fixture
+def llms(monkeypatch, sqlite_db):
+    cheap = ScriptedLLM(model="stub-cheap", calls=[])
+    primary = ScriptedLLM(model="stub-primary", calls=[], classification={
+        "sentiment": "negative", "theme": "Service", "summary": "Support is slow", "confidence": 0.95,
+    })
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: cheap if model_name == "stub-cheap" else primary)
+    monkeypatch.setenv("LLM_CHEAP_MODEL", "stub-cheap")
+    monkeypatch.delenv("LOCAL_PREFILTER_THRESHOLD", raising=False)
+    monkeypatch.delenv("LLM_ROUTING_BY_SOURCE", raising=False)
+    monkeypatch.delenv("LLM_ROUTING_TIERS", raising=False)
+    pipeline.routing_stats.reset()
+    return cheap, primary
+
+
+def test_default_config_uses_primary_only(monkeypatch):
+    monkeypatch.delenv("LLM_CHEAP_MODEL", raising=False)
+    monkeypatch.delenv("LOCAL_PREFILTER_THRESHOLD", raising=False)
+    monkeypatch.delenv("LLM_ROUTING_BY_SOURCE", raising=False)
+    monkeypatch.delenv("LLM_ROUTING_TIERS", raising=False)
+    assert pipeline.get_routing_config("email")["tiers"] == ["primary"]
+
+
+def test_per_source_config(monkeypatch):
+    monkeypatch.setenv("LLM_CHEAP_MODEL", "stub-cheap")
+    monkeypatch.setenv("LOCAL_PREFILTER_THRESHOLD", "0.8")
+    monkeypatch.setenv("LLM_ROUTING_BY_SOURCE", json.dumps({
+        "support": "primary",
+        "survey": {"tiers": "local,primary", "local_threshold": 0.5},
+    }))
+    assert pipeline.get_routing_config("email")["tiers"] == ["local", "cheap", "primary"]
+    assert pipeline.get_routing_config("support")["tiers"] == ["primary"]
+    survey = pipeline.get_routing_config("survey")
+    assert survey["tiers"] == ["local", "primary"]
+    assert survey["local_threshold"] == 0.5
+
+
+def test_confident_cheap_tier_is_accepted(llms):
+    cheap, primary = llms
+    classified, score, tier = pipeline.route_feedback(1, "The app is slow", "email")
+    assert tier == "cheap"
+    assert classified["theme"] == "Performance"
+    assert score["priority_score"] == 7.5
+    assert primary.calls == []
+
+    stats = pipeline.get_routing_stats()
+    assert stats["tiers"]["cheap"]["accepted"] == 1
+    assert stats["tiers"]["cheap"]["tokens"] > 0
+
+
+def test_low_confidence_escalates(llms):
+    cheap, primary = llms
+    cheap.classification = {**cheap.classification, "confidence": 0.2}
+    classified, _, tier = pipeline.route_feedback(2, "Support never answers", "email")
+    assert tier == "primary"
+    assert classified["theme"] == "Service"
+
+    stats = pipeline.get_routing_stats()
+    assert stats["tiers"]["cheap"]["escalation_rate"] == 1.0
+    assert stats["sources"]["email"]["primary_accepted"] == 1
+
+
+def test_invalid_json_escalates(llms):
+    cheap, _ = llms
+    cheap.raw_classification = "I think this is negative feedback about speed."
+    _, _, tier = pipeline.route_feedback(3, "The app is slow", "email")
+    assert tier == "primary"
+    assert pipeline.get_routing_stats()["tiers"]["cheap"]["failed"] == 1
+
+
+def test_local_tier_short_circuits(llms, monkeypatch):
+    cheap, primary = llms
+    monkeypatch.setenv("LOCAL_PREFILTER_THRESHOLD", "0.5")
+    _, _, tier = pipeline.route_feedback(4, "Customer support responded within minutes. Great experience!", "email")
+    assert tier == "local"
+    assert cheap.calls == [] and primary.calls == []
+
+
+def test_last_tier_failure_raises(llms, monkeypatch):
+    _, primary = llms
+    monkeypatch.setenv("LLM_ROUTING_TIERS", "primary")
+    primary.raw_classification = "not json"
+    with pytest.raises(pipeline.LLMOutputError):
+        pipeline.route_feedback(5, "Broken", "email")
@@ -0,0 +1,140 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("apscheduler")
+pytest.importorskip("slack_sdk")
+
+import backend.scheduler as scheduler
+from apscheduler.triggers.cron import CronTrigger
+from backend.db import get_all_reports, get_latest_report_cache, init_db, insert_feedback, insert_score
+from backend.tenancy import tenant_scope
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    import backend.db as db_module
+    monkeypatch.setenv("MOCK_MODE", "true")
+    monkeypatch.setattr(db_module, "DB_PATH", str(tmp_path / "test_scheduler.db"))
+    monkeypatch.chdir(tmp_path)
+    scheduler._precomputed.clear()
+    init_db()
+    feedback_id = insert_feedback("The app crashes on export", "support")
+    insert_score(feedback_id, 8, 7, "Blocks exports", 7.6)
+
+
+def test_lead_trigger_fires_before_each_deadline():
+    cron = CronTrigger.from_crontab("0 9 * * mon", timezone="UTC")
+    trigger = scheduler.LeadTrigger(cron, timedelta(minutes=30))
+    now = datetime(2026, 10, 19, 8, 45, tzinfo=cron.timezone)  # a Monday, inside the lead window
+
+    first = trigger.get_next_fire_time(None, now)
+    assert first == datetime(2026, 10, 26, 8, 30, tzinfo=cron.timezone)
+    assert trigger.get_next_fire_time(first, first) == datetime(2026, 11, 2, 8, 30, tzinfo=cron.timezone)
+
+
+def test_precomputed_report_is_published_at_the_deadline(db, monkeypatch):
+    scheduler.precompute_report()
+    monkeypatch.setattr(scheduler, "build_priority_report", lambda top_feedback=None: pytest.fail("report regenerated"))
+
+    scheduler.generate_and_distribute_report()
+    reports = get_all_reports()
+    assert len(reports) == 1
+    cached = get_latest_report_cache().get()
+    assert cached.report["id"] == reports[0]["id"]
+    assert cached._html is not None, "HTML is rendered before the first request"
+
+
+def test_deadline_generates_when_nothing_was_precomputed(db):
+    scheduler.generate_and_distribute_report()
+    assert len(get_all_reports()) == 1
+
+
+def test_every_tenant_gets_its_own_report(db, monkeypatch):
+    with tenant_scope("acme"):
+        feedback_id = insert_feedback("Checkout fails on Safari", "support")
+        insert_score(feedback_id, 9, 8, "Blocks purchases", 8.5)
+    both_running = threading.Barrier(2, timeout=5)
+    build = scheduler.build_priority_report
+
+    def build_report(top_feedback=None):
+        both_running.wait()
+        return build(top_feedback)
+
+    monkeypatch.setattr(scheduler, "build_priority_report", build_report)
+    scheduler.precompute_all_reports()
+    assert sorted(scheduler._precomputed) == ["acme", "default"], "tenants are generated concurrently"
+    monkeypatch.setattr(scheduler, "build_priority_report", lambda top_feedback=None: pytest.fail("report regenerated"))
+    scheduler.generate_all_reports()
+
+    assert "app crashes" in get_all_reports()[0]["markdown_report"]
+    with tenant_scope("acme"):
+        reports = get_all_reports()
+        assert len(reports) == 1 and "Checkout fails" in reports[0]["markdown_report"]
+        assert get_latest_report_cache().get().report["id"] == reports[0]["id"]
+
+
+def test_unchanged_state_skips_the_scheduled_report(db, monkeypatch):
+    assert scheduler.generate_and_distribute_report()
+    monkeypatch.setattr(scheduler, "build_priority_report", lambda top_feedback=None: pytest.fail("report regenerated"))
+
+    scheduler.precompute_report()
+    assert scheduler._precomputed == {}
+    assert not scheduler.generate_and_distribute_report()
+    assert len(get_all_reports()) == 1
+
+    monkeypatch.setattr(scheduler, "REPORT_SKIP_UNCHANGED", False)
+    monkeypatch.setattr(scheduler, "build_priority_report", lambda top_feedback=None: "# Report")
+    assert scheduler.generate_and_distribute_report()
+    assert "same items as in the last report" in get_all_reports()[0]["markdown_report"]
+
+
+def test_report_lists_items_that_entered_and_left_the_top(db, monkeypatch):
+    monkeypatch.setattr(scheduler, "REPORT_TOP_K", 1)
+    scheduler.generate_and_distribute_report()
+    assert "Changes Since Last Report" not in get_all_reports()[0]["markdown_report"]
+
+    feedback_id = insert_feedback("Checkout fails on Safari", "support")
+    insert_score(feedback_id, 9, 9, "Blocks purchases", 9.0)
+    scheduler.precompute_report()
+    assert scheduler.generate_and_distribute_report()
+
+    report = get_all_reports()[0]["markdown_report"]
+    entered, left = report.split("## Changes Since Last Report")[1].split("**No longer in the top priorities:**")
+    assert "Checkout fails" in entered and "(priority 9.0)" in entered
+    assert "app crashes" in left
+
+
+def test_feedback_outside_the_top_keeps_the_precomputed_report(db, monkeypatch):
+    monkeypatch.setattr(scheduler, "REPORT_TOP_K", 2)
+    scheduler.generate_and_distribute_report()
+    feedback_id = insert_feedback("Checkout fails on Safari", "support")
+    insert_score(feedback_id, 9, 9, "Blocks purchases", 9.0)
+    scheduler.precompute_report()
+    monkeypatch.setattr(scheduler, "build_priority_report", lambda top_feedback=None: pytest.fail("report regenerated"))
+
+    # Arrives during the lead window, but ranks below the items the report covers.
+    for i in range(3):
+        low = insert_feedback(f"Minor typo on page {i}", "survey")
+        insert_score(low, 1, 1, "Cosmetic", 1.0)
+    insert_feedback("Not scored yet", "email")
+
+    assert scheduler.generate_and_distribute_report()
+    assert "Checkout fails" in get_all_reports()[0]["markdown_report"]
+
+
+def test_aggregate_change_alone_publishes_the_report(db, monkeypatch):
+    monkeypatch.setattr(scheduler, "REPORT_TOP_K", 1)
+    assert scheduler.generate_and_distribute_report()
+
+    # A surge of new feedback that doesn't displace the top item.
+    for i in range(5):
+        low = insert_feedback(f"Slow search results {i}", "survey")
+        insert_score(low, 2, 2, "Annoying", 2.0)
+    insert_feedback("Not scored yet", "email")
+
+    assert scheduler.generate_and_distribute_report()
+    reports = get_all_reports()
+    assert len(reports) == 2
+    assert "same items as in the last report" in reports[0]["markdown_report"]
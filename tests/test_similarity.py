@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+import backend.db as db_module
+from backend.db import (
+    delete_feedback,
+    find_similar_feedback,
+    get_repository,
+    get_similarity_index,
+    insert_feedback,
+    insert_feedback_bulk,
+)
+from backend.embeddings import embed_texts
+from backend.similarity import SimilarityIndex
+
+PHRASES = [
+    "dashboard loading is slow",
+    "subscription price increase",
+    "slack webhook sync failing",
+    "login crashes on android",
+]
+
+
+@pytest.fixture
+def index_path(storage_backend, tmp_path, monkeypatch):
+    path = str(tmp_path / "similar.npz")
+    monkeypatch.setenv("SIMILARITY_INDEX_PATH", path)
+    insert_feedback_bulk([
+        {"text": f"The {phrase}, reported by customer {i}", "source": "support"}
+        for i in range(10) for phrase in PHRASES
+    ])
+    return path
+
+
+def _ids_with(phrase):
+    return {item["id"] for item in db_module.get_all_feedback() if phrase in item["text"]}
+
+
+def test_similar_feedback_describes_the_same_problem(index_path):
+    target = min(_ids_with(PHRASES[1]))
+    similar = find_similar_feedback(target, k=9)
+    assert {item["id"] for item in similar} == _ids_with(PHRASES[1]) - {target}
+    assert similar[0]["similarity"] >= similar[-1]["similarity"]
+
+
+def test_search_matches_brute_force(index_path):
+    index = SimilarityIndex(get_repository(), index_path, probes=1024)
+    index.build()
+    query = embed_texts(["android login crash after update"])[0]
+    vectors = embed_texts([item["text"] for item in db_module.get_all_feedback()])
+    ids = np.array([item["id"] for item in db_module.get_all_feedback()])
+    expected = ids[np.argsort(-(vectors @ query))[:10]]
+    results = index.search(query, 10)
+    assert {feedback_id for feedback_id, _ in results} == set(expected.tolist()) == _ids_with(PHRASES[3])
+    assert [score for _, score in results] == pytest.approx(sorted(vectors @ query, reverse=True)[:10], abs=1e-2)
+
+
+def test_inserts_and_deletes_update_a_loaded_index(index_path):
+    index = get_similarity_index()
+    assert len(index) == 40
+
+    new_id = insert_feedback("Dashboard loading is slow again this morning", "support")
+    assert len(index) == 41, "insert_feedback updates the index in this process"
+    assert new_id in {item["id"] for item in find_similar_feedback(min(_ids_with(PHRASES[0])), k=10)}
+
+    delete_feedback(new_id)
+    assert len(index) == 40
+    assert find_similar_feedback(new_id) == []
+
+    # A write from another process (straight to the repository) is picked up from change_log.
+    other_id = get_repository().insert_feedback("Subscription price increase is too steep", "email")
+    index.refresh(force=True)
+    assert other_id in {item["id"] for item in find_similar_feedback(min(_ids_with(PHRASES[1])), k=10)}
+
+
+def test_index_is_saved_and_caught_up_on_load(index_path):
+    index = get_similarity_index()
+    before = index.similar(min(_ids_with(PHRASES[2])), 5)
+    db_module.close_repositories()
+
+    # Written while no index was loaded.
+    added = db_module.insert_feedback("Slack webhook sync failing for every channel", "support")
+    removed = min(_ids_with(PHRASES[3]))
+    db_module.delete_feedback(removed)
+
+    reloaded = SimilarityIndex(get_repository(), index_path)
+    reloaded.load()
+    assert len(reloaded) == 40
+    assert reloaded.similar(removed) == []
+    assert added in {feedback_id for feedback_id, _ in reloaded.similar(min(_ids_with(PHRASES[2])), 10)}
+    assert before[0] in reloaded.similar(min(_ids_with(PHRASES[2])), 6)
@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+import backend.db as db_module
+from backend.changes import ChangeCursor
+from backend.db import (
+    delete_feedback,
+    get_all_feedback,
+    get_feedback_stats,
+    get_repository,
+    get_top_feedback,
+    insert_feedback,
+    insert_feedback_bulk,
+    insert_score,
+    update_feedback_classification,
+)
+from backend.snapshot import FeedbackSnapshot
+from backend.trends import compute_trends, load_trend_columns
+
+
+def _seed():
+    insert_feedback_bulk([
+        {"text": f"item {i}", "source": ["email", "survey", None][i % 3],
+         "theme": ["Performance", "Pricing", None][i % 3], "sentiment": ["negative", "positive", None][i % 3]}
+        for i in range(30)
+    ])
+    for item in get_all_feedback():
+        if item["id"] % 2:
+            insert_score(item["id"], item["id"] % 10 + 1, 5, "seeded", float(item["id"] % 7))
+
+
+def _approx(stats):
+    for key in ("avg_urgency", "avg_impact", "avg_priority"):
+        stats[key] = pytest.approx(stats[key], abs=1e-3)
+    for item in stats["by_theme"]:
+        item["avg_priority"] = pytest.approx(item["avg_priority"], abs=1e-3)
+    return stats
+
+
+@pytest.fixture
+def snapshot(storage_backend):
+    _seed()
+    snapshot = FeedbackSnapshot(get_repository(), max_staleness=0)
+    snapshot.load()
+    return snapshot
+
+
+FILTERS = [
+    {},
+    {"theme": "Performance"},
+    {"sentiment": "positive", "source": "survey"},
+    {"min_priority": 3.0},
+    {"theme": "Unknown"},
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_snapshot_matches_database(snapshot, filters):
+    repository = get_repository()
+    assert snapshot.stats(**filters) == _approx(repository.feedback_stats(**filters))
+    expected = [item["id"] for item in repository.get_top_feedback(7, **filters)]
+    assert snapshot.top_k(7, **filters) == expected
+
+
+def test_incremental_refresh(snapshot):
+    repository = get_repository()
+    new_id = insert_feedback("Export is broken", "support")
+    update_feedback_classification(new_id, "negative", "Performance", "Export broken")
+    insert_score(new_id, 10, 10, "blocker", 99.0)
+    first = get_all_feedback()[-1]["id"]
+    delete_feedback(first)
+
+    assert snapshot.refresh() == 2
+    assert snapshot.top_k(1) == [new_id]
+    assert len(snapshot) == 30
+    assert snapshot.stats() == _approx(repository.feedback_stats())
+
+    for item in get_all_feedback()[:20]:
+        delete_feedback(item["id"])
+    snapshot.refresh()
+    assert snapshot.dead == 0, "deletes past the compaction ratio are compacted"
+    assert len(snapshot) == 10
+    assert snapshot.stats() == _approx(repository.feedback_stats())
+    assert snapshot.refresh() == 0
+
+
+def test_trend_columns_match_database(snapshot):
+    end = time.time() + 60
+    from_snapshot = compute_trends(snapshot.trend_columns(0), end=end, windows=3)
+    from_database = compute_trends(load_trend_columns(0), end=end, windows=3)
+    from_snapshot.pop("window_end"), from_database.pop("window_end")
+    assert from_snapshot == from_database
+
+
+def test_db_helpers_use_snapshot_when_enabled(storage_backend, monkeypatch):
+    _seed()
+    expected_stats = get_feedback_stats(theme="Pricing")
+    expected_top = get_top_feedback(5)
+
+    monkeypatch.setenv("ANALYTICS_SNAPSHOT", "true")
+    monkeypatch.setenv("ANALYTICS_SNAPSHOT_MAX_STALENESS", "0")
+    assert get_feedback_stats(theme="Pricing") == _approx(expected_stats)
+    assert get_top_feedback(5) == expected_top
+    assert db_module.get_analytics_snapshot() is db_module.get_analytics_snapshot()
+
+    new_id = insert_feedback("Urgent", "manual")
+    insert_score(new_id, 10, 10, "urgent", 50.0)
+    assert get_top_feedback(1)[0]["id"] == new_id
+
+
+def test_change_cursor_waits_for_gaps():
+    log = [{"seq": 1, "entity": "feedback", "entity_id": 1}, {"seq": 3, "entity": "feedback", "entity_id": 3}]
+
+    def fetch(after, limit, until=None):
+        rows = [c for c in sorted(log, key=lambda c: c["seq"]) if c["seq"] > after and (until is None or c["seq"] <= until)]
+        return rows[:limit]
+
+    cursor = ChangeCursor(fetch, gap_timeout=60)
+    assert [c["seq"] for c in cursor.poll()] == [1, 3]
+    assert cursor.gaps.keys() == {2}
+
+    # Seq 2 commits late; it is still delivered, exactly once.
+    log.append({"seq": 2, "entity": "feedback", "entity_id": 2})
+    log.append({"seq": 4, "entity": "feedback", "entity_id": 4})
+    assert [c["seq"] for c in cursor.poll()] == [2, 4]
+    assert cursor.poll() == []
+
+    log.append({"seq": 6, "entity": "feedback", "entity_id": 6})
+    cursor.gap_timeout = 0
+    assert [c["seq"] for c in cursor.poll()] == [6]
+    time.sleep(0.01)
+    cursor.poll()
+    assert cursor.gaps == {}
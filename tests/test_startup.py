@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vesta_backend")
+HEAVY_MODULES = ["crewai", "langchain_openai", "slack_sdk", "apscheduler", "numpy", "markdown"]
+
+# Seconds allowed for `import backend.app` in a fresh interpreter. Override on slow CI machines.
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "2.0"))
+
+
+def run_python(code: str, tmp_path) -> dict:
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR, "MOCK_MODE": "true"}
+    env.pop("DATABASE_URL", None)
+    result = subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(code)],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_app_import_is_fast_and_light(tmp_path):
+    result = run_python(f"""
+        import json, sys, time
+        start = time.perf_counter()
+        import backend.app
+        elapsed = time.perf_counter() - start
+        print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+    """, tmp_path)
+    assert result["loaded"] == []
+    assert result["elapsed"] < IMPORT_TIME_BUDGET, f"import backend.app took {result['elapsed']:.2f}s"
+
+
+def test_read_only_endpoints_without_llm_stack(tmp_path):
+    result = run_python("""
+        import json, sys
+        # Simulate an install without the LLM and integration packages.
+        for name in ["crewai", "langchain_openai", "langchain_core", "slack_sdk", "apscheduler"]:
+            sys.modules[name] = None
+
+        from fastapi.testclient import TestClient
+        import backend.db as db_module
+        from backend.app import app
+
+        with TestClient(app) as client:
+            db_module.insert_feedback("Stored without an LLM", "test")
+            db_module.insert_report("# Report")
+            statuses = {path: client.get(path).status_code
+                        for path in ["/health", "/feedback/", "/feedback/1", "/report/latest", "/report/all"]}
+        print(json.dumps(statuses))
+    """, tmp_path)
+    assert set(result.values()) == {200}
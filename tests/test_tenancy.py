@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.crew_pipeline as pipeline
+from backend.db import (
+    delete_feedback,
+    get_all_reports,
+    get_feedback_by_id,
+    get_feedback_stats,
+    get_tenants,
+    get_top_feedback,
+    insert_feedback,
+    insert_feedback_once,
+    insert_report,
+    insert_score,
+)
+from backend.tenancy import ALL_TENANTS, TenantLimiter, TenantQuotaExceeded, tenant_limiter, tenant_scope
+from tests.llm_stubs import ScriptedLLM
+
+
+def test_storage_is_scoped_to_the_current_tenant(storage_backend):
+    with tenant_scope("acme"):
+        acme_id = insert_feedback("Checkout fails on Safari", "support")
+        insert_score(acme_id, 9, 8, "Blocks purchases", 8.5)
+        insert_report("# Acme report")
+        acme_key, created = insert_feedback_once("Retried submission", "api", idempotency_key="key-1")
+        assert created
+    with tenant_scope("globex"):
+        globex_id = insert_feedback("Love the new dashboard", "survey")
+        insert_score(globex_id, 2, 3, "Praise", 2.5)
+        _, created = insert_feedback_once("Retried submission", "api", idempotency_key="key-1")
+        assert created, "idempotency keys are unique per tenant"
+
+        assert get_feedback_by_id(acme_id) is None
+        assert not delete_feedback(acme_id)
+        assert [item["id"] for item in get_top_feedback(10)] == [globex_id]
+        assert get_feedback_stats()["total"] == 2
+        assert get_all_reports() == []
+
+    with tenant_scope("acme"):
+        assert get_feedback_by_id(acme_id)["priority_score"] == 8.5
+        assert insert_feedback_once("Retried submission", "api", idempotency_key="key-1") == (acme_key, False)
+        assert [report["markdown_report"] for report in get_all_reports()] == ["# Acme report"]
+    with tenant_scope(ALL_TENANTS):
+        assert get_feedback_stats()["total"] == 4
+    assert get_tenants() == ["acme", "globex"]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    import backend.db as db_module
+    from backend.app import app
+    monkeypatch.setenv("MOCK_MODE", "true")
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr(db_module, "DB_PATH", str(tmp_path / "test_tenancy.db"))
+    db_module.init_db()
+    yield TestClient(app)
+    db_module.close_repositories()
+
+
+def test_requests_are_scoped_by_tenant_header(client, monkeypatch):
+    monkeypatch.setenv("TENANTS", "acme,globex")
+    acme = {"X-Tenant-ID": "acme"}
+    created = client.post("/feedback/", json={"text": "Exports time out", "source": "support"}, headers=acme)
+    assert created.status_code == 200
+    feedback_id = created.json()["id"]
+
+    assert [item["id"] for item in client.get("/feedback/", headers=acme).json()] == [feedback_id]
+    assert client.get("/feedback/").json() == []
+    assert client.get(f"/feedback/{feedback_id}", headers={"X-Tenant-ID": "globex"}).status_code == 404
+    assert client.delete(f"/feedback/{feedback_id}").status_code == 404
+
+    tagged = client.get(f"/feedback/{feedback_id}", headers=acme).headers["ETag"]
+    assert tagged.startswith('W/"acme-v'), "tenants never share an ETag"
+
+    assert client.get("/feedback/", headers={"X-Tenant-ID": "no spaces"}).status_code == 400
+    monkeypatch.setenv("TENANTS", "acme")
+    assert client.get("/feedback/", headers={"X-Tenant-ID": "globex"}).status_code == 403
+    assert client.get("/feedback/", headers=acme).status_code == 200
+
+
+def test_tenant_header_is_refused_without_a_tenant_list(client, monkeypatch):
+    monkeypatch.delenv("TENANTS", raising=False)
+    monkeypatch.delenv("TENANT_API_KEYS", raising=False)
+    assert client.get("/feedback/", headers={"X-Tenant-ID": "acme"}).status_code == 403
+    assert client.get("/feedback/", headers={"X-Tenant-ID": "default"}).status_code == 200
+    assert client.get("/feedback/").status_code == 200
+
+
+def test_api_keys_decide_the_tenant(client, monkeypatch):
+    monkeypatch.setenv("TENANT_API_KEYS", json.dumps({"acme-secret": "acme", "globex-secret": "globex"}))
+    acme = {"X-API-Key": "acme-secret"}
+    created = client.post("/feedback/", json={"text": "Exports time out", "source": "support"}, headers=acme)
+    feedback_id = created.json()["id"]
+
+    assert [item["id"] for item in client.get("/feedback/", headers=acme).json()] == [feedback_id]
+    assert client.get("/feedback/", headers={"X-API-Key": "globex-secret"}).json() == []
+    assert client.get("/feedback/").status_code == 401
+    assert client.get("/feedback/", headers={"X-Tenant-ID": "acme"}).status_code == 401
+    assert client.get("/feedback/", headers={"X-API-Key": "guess"}).status_code == 401
+    assert client.get("/feedback/", headers={"X-API-Key": "globex-secret", "X-Tenant-ID": "acme"}).status_code == 403
+    assert client.get("/feedback/", headers={**acme, "X-Tenant-ID": "acme"}).status_code == 200
+    assert client.get("/health").status_code == 200
+    assert get_tenants() == ["acme", "globex"]
+
+
+def test_limiter_isolates_tenant_concurrency(monkeypatch):
+    monkeypatch.setenv("TENANT_QUOTAS", json.dumps({"noisy": {"concurrency": 1}}))
+    limiter = TenantLimiter()
+    release = threading.Event()
+    holding = threading.Event()
+
+    def hold():
+        with limiter.llm_slot("noisy"):
+            holding.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait(5)
+    waiter = threading.Thread(target=hold)
+    waiter.start()
+    time.sleep(0.05)
+    assert limiter.snapshot()["noisy"]["in_flight"] == 1, "the noisy tenant waits for its own slot"
+
+    with limiter.llm_slot("quiet"):
+        assert limiter.snapshot()["quiet"]["in_flight"] == 1
+    release.set()
+    holder.join(5)
+    waiter.join(5)
+    assert limiter.snapshot()["noisy"]["in_flight"] == 0
+
+
+def test_token_quota_resets_with_the_window(monkeypatch):
+    monkeypatch.setenv("TENANT_QUOTAS", json.dumps({"acme": {"tokens": 100}}))
+    limiter = TenantLimiter(window=3600)
+    limiter.record(150, "acme")
+    with pytest.raises(TenantQuotaExceeded):
+        limiter.check("acme")
+    limiter.check("globex")
+
+    limiter.tenants["acme"]["window_start"] -= 3600
+    limiter.check("acme")
+    assert limiter.snapshot()["acme"]["tokens_used"] == 0
+
+
+def test_exhausted_quota_skips_llm_tiers(monkeypatch, sqlite_db):
+    primary = ScriptedLLM(model="stub-primary", calls=[])
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: primary)
+    monkeypatch.delenv("LLM_CHEAP_MODEL", raising=False)
+    monkeypatch.delenv("LOCAL_PREFILTER_THRESHOLD", raising=False)
+    monkeypatch.delenv("LLM_ROUTING_BY_SOURCE", raising=False)
+    monkeypatch.delenv("LLM_ROUTING_TIERS", raising=False)
+    monkeypatch.setenv("TENANT_QUOTAS", json.dumps({"acme": {"tokens": 1}}))
+    tenant_limiter.reset()
+    try:
+        with tenant_scope("acme"):
+            pipeline.route_feedback(1, "The app is slow", "email")
+            assert tenant_limiter.snapshot()["acme"]["tokens_used"] > 0
+            calls = len(primary.calls)
+            with pytest.raises(TenantQuotaExceeded):
+                pipeline.route_feedback(2, "The app is slow", "email")
+            assert len(primary.calls) == calls
+        with tenant_scope("globex"):
+            assert pipeline.route_feedback(3, "The app is slow", "email")[2] == "primary"
+    finally:
+        tenant_limiter.reset()
@@ -0,0 +1,103 @@
+import numpy as np
+
+from backend.crew_pipeline import _build_mock_report
+from backend.db import delete_feedback, get_clusters, get_cluster_members, get_repository, insert_feedback_bulk
+from backend.embeddings import EMBEDDING_MODEL, embed_texts, from_bytes, terms, to_bytes
+from backend.tenancy import tenant_scope
+from backend.themes import discover_themes, minibatch_kmeans
+
+TOPICS = {
+    "Performance": ["dashboard loading slow", "slow dashboard export", "dashboard loading timeout"],
+    "Pricing": ["subscription price increase", "subscription invoice price", "price increase invoice"],
+    "Integrations": ["slack webhook sync broken", "slack sync failing", "webhook sync failing"],
+}
+
+
+def _seed(per_topic=12, offset=0):
+    rows = []
+    for theme, phrases in TOPICS.items():
+        for i in range(per_topic):
+            phrase = phrases[i % len(phrases)]
+            rows.append({"text": f"The {phrase} again, ticket {offset + i}", "source": "support", "theme": theme})
+    insert_feedback_bulk(rows)
+
+
+def test_embeddings_are_deterministic_unit_vectors():
+    vectors = embed_texts(["Dashboard loading is slow", "dashboard LOADING is slow!", "the and of"])
+    assert vectors.shape[0] == 3
+    assert np.allclose(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[2].any(), "stopword-only text has no content to embed"
+    assert np.allclose(from_bytes([to_bytes(v) for v in vectors]), vectors, atol=1e-3)
+    assert "dashboard loading" in terms("Dashboard loading is slow")
+
+
+def test_minibatch_kmeans_separates_clusters():
+    rng = np.random.default_rng(1)
+    centers = np.eye(8)[:3]
+    x = np.vstack([center + 0.05 * rng.standard_normal((200, 8)) for center in centers])
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    centroids, counts = minibatch_kmeans(x, 3, batch_size=64, iterations=50)
+    assert sorted((centroids @ centers.T).argmax(axis=1).tolist()) == [0, 1, 2]
+    assert counts.sum() == 50 * 64
+
+
+def test_discover_themes_fits_then_updates_incrementally(storage_backend):
+    _seed()
+    result = discover_themes(n_clusters=3)
+    assert result["mode"] == "fit"
+    assert result["embedded"] == result["assigned"] == 36
+
+    clusters = get_clusters()
+    assert sorted(c["parent_theme"] for c in clusters) == sorted(TOPICS)
+    assert sum(c["items"] for c in clusters) == 36
+    for cluster in clusters:
+        assert cluster["label"].startswith(f"{cluster['parent_theme']}: ")
+        members = get_cluster_members(cluster["id"])
+        assert {m["theme"] for m in members} == {cluster["parent_theme"]}
+        assert members[0]["similarity"] >= members[-1]["similarity"]
+
+    # Only the new items are embedded and assigned; cluster ids are kept.
+    _seed(per_topic=2, offset=100)
+    result = discover_themes(n_clusters=3)
+    assert result == {**result, "mode": "update", "embedded": 6, "assigned": 6}
+    assert [c["id"] for c in get_clusters()] == [c["id"] for c in clusters]
+    assert sum(c["items"] for c in get_clusters()) == 42
+
+    assert discover_themes(n_clusters=3)["embedded"] == 0
+    assert get_repository().count_embeddings(EMBEDDING_MODEL) == 42
+
+    delete_feedback(get_cluster_members(clusters[0]["id"], 1)[0]["id"])
+    assert sum(c["items"] for c in get_clusters()) == 41
+
+    refit = discover_themes(n_clusters=2, refit=True)
+    assert refit["mode"] == "fit" and refit["embedded"] == 0
+    assert len(get_clusters()) == 2
+
+
+def test_clusters_are_fitted_and_named_per_tenant(storage_backend):
+    _seed()
+    with tenant_scope("acme"):
+        insert_feedback_bulk([{"text": f"Acme warehouse barcode scanner broken {i}", "source": "support",
+                               "theme": "Bug"} for i in range(8)])
+    result = discover_themes(n_clusters=3)
+    assert result["tenants"] == 2
+
+    with tenant_scope("acme"):
+        acme_clusters = get_clusters()
+        assert sum(c["items"] for c in acme_clusters) == 8
+        assert {c["parent_theme"] for c in acme_clusters if c["items"]} == {"Bug"}
+    default_clusters = get_clusters()
+    assert sum(c["items"] for c in default_clusters) == 36
+    labels = " ".join(c["label"] + " " + (c["keywords"] or "") for c in default_clusters)
+    assert "barcode" not in labels and "warehouse" not in labels
+    assert not {c["id"] for c in acme_clusters} & {c["id"] for c in default_clusters}
+    assert get_cluster_members(acme_clusters[0]["id"]) == []
+
+
+def test_report_lists_sub_themes(storage_backend):
+    _seed()
+    discover_themes(n_clusters=3)
+    report = _build_mock_report([], clusters=get_clusters())
+    assert "## Sub-themes" in report
+    assert all(f"- {c['label']}: {c['items']} items" in report for c in get_clusters())
@@ -0,0 +1,100 @@
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from backend.crew_pipeline import _build_mock_report, _build_report_prompt
+from backend.db import insert_feedback_bulk, get_all_feedback, insert_score
+from backend.trends import DAY, SENTIMENTS, TrendColumns, compute_trends, format_trends, get_trends
+
+END = datetime(2026, 3, 2, tzinfo=timezone.utc).timestamp()
+
+
+def _columns(spec):
+    """spec: (days_ago, theme, sentiment, priority) tuples."""
+    labels = sorted({theme for _, theme, _, _ in spec})
+    return TrendColumns(
+        np.array([END - days_ago * DAY for days_ago, _, _, _ in spec], dtype=np.int64),
+        np.array([labels.index(theme) for _, theme, _, _ in spec], dtype=np.int32),
+        labels,
+        np.array([SENTIMENTS.index(s) if s else -1 for _, _, s, _ in spec], dtype=np.int8),
+        np.array([np.nan if p is None else p for _, _, _, p in spec], dtype=np.float64),
+    )
+
+
+def _steady_history(theme, per_week, weeks=range(1, 5), sentiment="neutral"):
+    return [(week * 7 + 0.5 + i * 0.01, theme, sentiment, 5.0) for week in weeks for i in range(per_week)]
+
+
+def test_volume_spike_is_flagged():
+    spec = _steady_history("Performance", 10) + _steady_history("Pricing", 10)
+    spec += [(0.5 + i * 0.01, "Performance", "negative", 8.0) for i in range(40)]
+    spec += [(0.5 + i * 0.01, "Pricing", "neutral", 4.0) for i in range(11)]
+
+    trends = compute_trends(_columns(spec), end=END, window_days=7, windows=5)
+
+    assert trends["spikes"] == ["Performance"]
+    performance = trends["themes"][0]
+    assert performance["theme"] == "Performance"
+    assert performance["volume"] == 40
+    assert performance["series"] == [10, 10, 10, 10, 40]
+    assert performance["baseline_volume"] == 10
+    assert performance["mean_priority"] == 8.0
+    assert performance["baseline_priority"] == 5.0
+    assert performance["negative_ratio"] == 1.0
+    assert performance["negative_shift"]
+    assert trends["negative_shifts"] == ["Performance"]
+
+    pricing = trends["themes"][1]
+    assert not pricing["spike"] and not pricing["negative_shift"]
+
+
+def test_small_themes_and_old_rows_are_ignored():
+    spec = [(0.1, "Other", "negative", None), (0.2, "Other", "negative", None), (100, "Pricing", "neutral", 3.0)]
+    trends = compute_trends(_columns(spec), end=END, window_days=7, windows=5)
+    assert [item["theme"] for item in trends["themes"]] == ["Other"]
+    assert trends["spikes"] == []
+    assert trends["themes"][0]["mean_priority"] is None
+
+
+def test_windows_must_include_baseline():
+    with pytest.raises(ValueError):
+        compute_trends(_columns([(1, "Other", None, None)]), end=END, windows=1)
+
+
+def test_get_trends_from_database(storage_backend):
+    now = time.time()
+
+    def stamp(days_ago):
+        return datetime.fromtimestamp(now - days_ago * DAY, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    rows = [{"text": f"slow {i}", "theme": "Performance", "sentiment": "negative", "created_at": stamp(1)} for i in range(6)]
+    rows += [{"text": f"price {i}", "theme": "Pricing", "sentiment": "positive", "created_at": stamp(9)} for i in range(3)]
+    rows.append({"text": "unclassified", "created_at": stamp(2)})
+    insert_feedback_bulk(rows)
+    for item in get_all_feedback():
+        if item["theme"] == "Performance":
+            insert_score(item["id"], 8, 6, "slow", 7.0)
+
+    trends = get_trends(end=now, window_days=7, windows=3)
+    by_theme = {item["theme"]: item for item in trends["themes"]}
+    assert by_theme["Performance"]["volume"] == 6
+    assert by_theme["Performance"]["mean_priority"] == 7.0
+    assert by_theme["Pricing"]["series"] == [0, 3, 0]
+    assert by_theme["Unclassified"]["volume"] == 1
+    assert trends["total_volume"] == 7
+
+
+def test_trends_reach_the_report():
+    spec = _steady_history("Performance", 10) + [(0.5 + i * 0.01, "Performance", "negative", 8.0) for i in range(40)]
+    trends = compute_trends(_columns(spec), end=END, window_days=7, windows=5)
+    lines = format_trends(trends)
+    assert "**Performance**: 40 items in the last 7 days" in lines
+    assert "volume spike" in lines
+
+    items = [{"theme": "Performance", "priority_score": 8.0, "urgency": 8, "impact": 8, "summary": "Slow"}]
+    assert "## Trends" in _build_mock_report(items, trends)
+    assert "## Trends" not in _build_mock_report(items)
+    assert "using only the computed trends above" in _build_report_prompt(items, trends)
+    assert "do not claim any" in _build_report_prompt(items)
@@ -0,0 +1,90 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.crew_pipeline as pipeline
+from backend.db import get_llm_usage_summary, get_usage_ledger, insert_feedback
+from backend.tenancy import tenant_scope
+from backend.usage import token_usage, usage_context
+from tests.llm_stubs import ScriptedLLM
+
+
+@pytest.fixture
+def llm(monkeypatch, storage_backend):
+    primary = ScriptedLLM(model="stub-primary", calls=[])
+    monkeypatch.setattr(pipeline, "MOCK_MODE", False)
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: primary)
+    for name in ("LLM_CHEAP_MODEL", "LOCAL_PREFILTER_THRESHOLD", "LLM_ROUTING_BY_SOURCE", "LLM_ROUTING_TIERS",
+                 "LLM_PRIMARY_DAILY_BUDGET", "LLM_CHEAP_DAILY_BUDGET"):
+        monkeypatch.delenv(name, raising=False)
+    return primary
+
+
+def test_token_usage_prefers_reported_counts():
+    assert token_usage("a" * 40, "b" * 8, input_tokens=12, output_tokens=3) == {"prompt_tokens": 12, "completion_tokens": 3}
+    assert token_usage("a" * 40, "b" * 8) == {"prompt_tokens": 10, "completion_tokens": 2}
+    assert token_usage("a" * 30, "b" * 10, total_tokens=20) == {"prompt_tokens": 15, "completion_tokens": 5}
+
+
+def test_calls_are_buffered_then_written_in_one_batch(llm):
+    feedback_id = insert_feedback("The app is slow", "email")
+    pipeline.process_single_feedback(feedback_id, "The app is slow", "email")
+
+    ledger = get_usage_ledger()
+    assert len(ledger.pending) == 2
+    assert get_llm_usage_summary([])[0]["calls"] == 0, "nothing is written on the pipeline's thread"
+    assert ledger.flush() == 2
+
+    rows = get_llm_usage_summary(["source", "stage", "tier", "outcome"])
+    assert [(row["source"], row["stage"], row["tier"], row["outcome"], row["calls"]) for row in rows] == [
+        ("email", "classification", "primary", "ok", 1),
+        ("email", "evaluation", "primary", "ok", 1),
+    ]
+    assert all(row["prompt_tokens"] > 0 and row["completion_tokens"] > 0 and row["cost"] > 0 for row in rows)
+
+
+def test_failed_attempts_are_recorded(llm):
+    llm.raw_classification = "Not JSON at all"
+    feedback_id = insert_feedback("The app is slow", "support")
+    pipeline.process_single_feedback(feedback_id, "The app is slow", "support")
+    get_usage_ledger().flush()
+
+    (row,) = get_llm_usage_summary(["stage", "outcome"])
+    assert (row["stage"], row["outcome"], row["calls"], row["retries"]) == ("classification", "parse_error", 3, 2)
+
+
+def test_usage_endpoint_groups_by_day_source_and_stage(llm, monkeypatch):
+    from backend.app import app
+    monkeypatch.setenv("TENANTS", "acme")
+    client = TestClient(app)
+    with tenant_scope("acme"):
+        pipeline.generate_priority_report([{"id": 1, "theme": "Performance", "priority_score": 8.0}])
+    pipeline.route_feedback(1, "The app is slow", "email")
+
+    body = client.get("/usage").json()
+    assert body["group_by"] == ["day", "source", "stage"]
+    assert [(row["source"], row["stage"]) for row in body["rows"]] == [("manual", "classification"),
+                                                                       ("manual", "evaluation")]
+    assert body["totals"]["calls"] == 2
+
+    acme = client.get("/usage", params={"group_by": "stage,model"}, headers={"X-Tenant-ID": "acme"}).json()
+    assert [(row["stage"], row["model"]) for row in acme["rows"]] == [("report", "stub-primary")]
+    assert client.get("/usage", params={"group_by": "text"}).status_code == 422
+
+
+def test_exhausted_budget_switches_to_cheaper_tiers(llm, monkeypatch):
+    cheap = ScriptedLLM(model="stub-cheap", calls=[])
+    monkeypatch.setattr(pipeline, "get_llm", lambda model_name=None: cheap if model_name == "stub-cheap" else llm)
+    monkeypatch.setenv("LLM_CHEAP_MODEL", "stub-cheap")
+    monkeypatch.setenv("LLM_ROUTING_TIERS", "primary")
+    monkeypatch.setenv("LLM_PRIMARY_DAILY_BUDGET", "0.0001")
+
+    assert pipeline.route_feedback(1, "The app is slow", "email")[2] == "primary"
+    assert get_usage_ledger().over_budget("primary")
+    with usage_context(source="email"):
+        _, _, tier = pipeline.route_feedback(2, "The app is slow", "email")
+    assert tier == "local", "the local classifier answers once every configured LLM tier is over budget"
+
+    llm.calls.clear()
+    pipeline.generate_priority_report([{"id": 1, "theme": "Performance", "priority_score": 8.0}])
+    assert (llm.calls, cheap.calls) == ([], ["report"])
+    assert get_usage_ledger().budgets()["primary"]["exceeded"]
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import Counter
+
+from backend.db import (
+    claim_feedback,
+    complete_feedback,
+    enqueue_feedback,
+    fail_feedback,
+    get_feedback_by_id,
+    get_queue_stats,
+    insert_feedback,
+    release_leases,
+)
+from backend.tenancy import current_tenant, tenant_scope
+from backend.worker import Worker, run_fleet
+
+
+def record_processed(feedback_id, text, source):
+    with open(f"processed-{feedback_id}-{time.time_ns()}", "w") as f:
+        f.write(text)
+
+
+def test_claim_leases_each_item_once(storage_backend):
+    ids = [insert_feedback(f"Item {i}") for i in range(5)]
+    assert enqueue_feedback(ids) == 5
+
+    first = claim_feedback("worker-a", 3, lease_seconds=60)
+    second = claim_feedback("worker-b", 3, lease_seconds=60)
+    assert [item["feedback_id"] for item in first] == ids[:3]
+    assert [item["feedback_id"] for item in second] == ids[3:]
+    assert first[0]["text"] == "Item 0"
+    assert claim_feedback("worker-c", 3, lease_seconds=60) == []
+    assert get_queue_stats()["leased"] == 5
+
+
+def test_expired_lease_is_reclaimed(storage_backend):
+    feedback_id = insert_feedback("Crashed worker item")
+    enqueue_feedback([feedback_id])
+
+    assert claim_feedback("crashed", 1, lease_seconds=-1)
+    reclaimed = claim_feedback("healthy", 1, lease_seconds=60)
+    assert [item["feedback_id"] for item in reclaimed] == [feedback_id]
+    assert reclaimed[0]["attempts"] == 2
+
+    # The crashed worker can no longer complete an item it lost.
+    assert complete_feedback(feedback_id, "crashed") is False
+    assert complete_feedback(feedback_id, "healthy") is True
+    assert get_queue_stats() == {"pending": 0, "leased": 0, "failed": 0}
+
+
+def test_item_that_keeps_killing_its_worker_is_parked(storage_backend):
+    feedback_id = insert_feedback("Crashes every worker")
+    enqueue_feedback([feedback_id])
+
+    for attempt in range(3):
+        assert claim_feedback(f"crashed-{attempt}", 1, lease_seconds=-1, max_attempts=3)
+    assert claim_feedback("healthy", 1, lease_seconds=60, max_attempts=3) == []
+    assert get_queue_stats() == {"pending": 0, "leased": 0, "failed": 1}
+
+
+def test_failures_retry_then_park(storage_backend):
+    feedback_id = insert_feedback("Poison item")
+    enqueue_feedback([feedback_id])
+
+    for attempt in range(2):
+        assert claim_feedback("w", 1, lease_seconds=60)
+        fail_feedback(feedback_id, "w", "boom", max_attempts=2)
+    assert get_queue_stats()["failed"] == 1
+    assert claim_feedback("w", 1, lease_seconds=60) == []
+
+
+def test_release_leases(storage_backend):
+    ids = [insert_feedback(f"Item {i}") for i in range(2)]
+    enqueue_feedback(ids)
+    claim_feedback("w", 2, lease_seconds=60)
+    assert release_leases("w") == 2
+    assert get_queue_stats()["pending"] == 2
+    assert claim_feedback("w", 2, lease_seconds=60)[0]["attempts"] == 1
+
+
+def test_worker_processes_queue(storage_backend):
+    ids = [insert_feedback("The app crashes constantly", "support") for _ in range(3)]
+    enqueue_feedback(ids)
+
+    worker = Worker(batch_size=2)
+    worker.run(drain=True)
+
+    assert worker.processed == 3
+    assert get_queue_stats() == {"pending": 0, "leased": 0, "failed": 0}
+    assert get_feedback_by_id(ids[0])["theme"] == "Performance"
+
+
+def test_worker_processes_items_as_their_tenant(storage_backend):
+    with tenant_scope("acme"):
+        acme_id = insert_feedback("Checkout fails", "support")
+    default_id = insert_feedback("Exports are slow", "support")
+    enqueue_feedback([acme_id, default_id])
+
+    seen = {}
+    worker = Worker(process_fn=lambda feedback_id, text, source: seen.update({feedback_id: current_tenant()}))
+    worker.run(drain=True)
+
+    assert seen == {acme_id: "acme", default_id: "default"}
+
+
+def test_worker_stop_releases_unstarted_items(storage_backend):
+    ids = [insert_feedback(f"Item {i}") for i in range(3)]
+    enqueue_feedback(ids)
+
+    worker = Worker(batch_size=3, process_fn=lambda *args: worker.stop())
+    worker.run()
+
+    assert worker.processed == 1
+    assert get_queue_stats()["pending"] == 2
+
+
+def test_slow_batch_skips_items_reclaimed_after_their_lease_expired(storage_backend):
+    ids = [insert_feedback(f"Item {i}") for i in range(3)]
+    enqueue_feedback(ids)
+    processed = Counter()
+
+    def slow(feedback_id, text, source):
+        if not processed:
+            # The batch is claimed; another worker starts polling for expired leases.
+            helper_thread.start()
+        processed[feedback_id] += 1
+        time.sleep(0.3)
+
+    # The batch's lease runs out before the third item is reached, and the helper reclaims it meanwhile.
+    slow_worker = Worker(worker_id="slow", batch_size=3, lease_seconds=0.5, process_fn=slow)
+    helper = Worker(worker_id="helper", batch_size=1, lease_seconds=0.5, poll_interval=0.02, process_fn=slow)
+    helper_thread = threading.Thread(target=helper.run)
+    assert slow_worker.run_once() == 3
+    while get_queue_stats()["leased"]:
+        time.sleep(0.02)
+    helper.stop()
+    helper_thread.join()
+
+    assert processed == Counter(ids), "every item processed exactly once"
+    assert helper.processed >= 1
+    assert get_queue_stats() == {"pending": 0, "leased": 0, "failed": 0}
+
+
+def test_fleet_processes_every_item_once(tmp_path, monkeypatch):
+    import backend.db as db_module
+    db_path = str(tmp_path / "fleet.db")
+    monkeypatch.setattr(db_module, "DB_PATH", db_path)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.chdir(tmp_path)
+    db_module.init_db()
+    enqueue_feedback([insert_feedback(f"Item {i}") for i in range(20)])
+
+    options = {"batch_size": 2, "lease_seconds": 60, "poll_interval": 0.1,
+               "max_attempts": 3, "db_path": db_path, "drain": True}
+    assert run_fleet(2, options, process_fn=record_processed) == 0
+
+    processed = sorted(int(p.name.split("-")[1]) for p in tmp_path.glob("processed-*"))
+    assert processed == list(range(1, 21))
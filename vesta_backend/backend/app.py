@@ -1,12 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 import logging
 import os
 from datetime import datetime
-from backend.db import init_db
-from backend.routes import feedback, reports
+from backend.db import flush_usage, init_db
+from backend.routes import archive, changes, feedback, reports, metrics, usage
 from backend.models.schemas import HealthResponse
+from backend.response_cache import GZIP_MIN_SIZE
+from backend.tenancy import TenantMiddleware
 from dotenv import load_dotenv
 
 load_dotenv()  # Load environment variables from .env file
@@ -22,9 +25,19 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     logger.info("Starting application...")
     init_db()
+    from backend.prompt_budget import load_tokenizer
+    load_tokenizer()
+    scheduler = None
+    if os.getenv("REPORT_SCHEDULER", "false").lower() == "true":
+        # Runs the report jobs in this process, so precomputed reports land in its in-memory cache.
+        from backend.scheduler import start_scheduler
+        scheduler = start_scheduler()
     logger.info("Application started successfully")
     yield
     logger.info("Shutting down application...")
+    if scheduler is not None:
+        scheduler.shutdown(wait=False)
+    flush_usage()
 
 
 app = FastAPI(
@@ -34,6 +47,9 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Innermost, so its 400/403 answers still get CORS headers.
+app.add_middleware(TenantMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -42,8 +58,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cached read endpoints send pre-compressed bodies; this covers the rest. Event streams are left alone.
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
 app.include_router(feedback.router)
 app.include_router(reports.router)
+app.include_router(metrics.router)
+app.include_router(changes.router)
+app.include_router(archive.router)
+app.include_router(usage.router)
 
 
 @app.get("/health", response_model=HealthResponse)
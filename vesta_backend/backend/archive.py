@@ -0,0 +1,212 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from backend.db import (
+    archive_dir,
+    archive_feedback,
+    get_archived_months,
+    get_archived_stat_groups,
+    vacuum_database,
+)
+from backend.storage.base import summarize_stat_groups
+from backend.tenancy import ALL_TENANTS, DEFAULT_TENANT, current_tenant, tenant_scope
+
+logger = logging.getLogger(__name__)
+
+# Feedback older than this many days leaves the live tables; 0 turns archiving off.
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+
+
+def _month(created_at: Any) -> str:
+    return str(created_at)[:7]
+
+
+def write_partitions(items: List[Dict[str, Any]], directory: Optional[str] = None) -> List[str]:
+    """Write one gzipped NDJSON file per month under ``directory/<YYYY-MM>/``; returns the paths.
+
+    Files are named by their id range and replaced atomically, so re-archiving a
+    batch whose database commit failed overwrites the earlier file instead of
+    duplicating it.
+    """
+    directory = directory or archive_dir()
+    by_month: Dict[str, List[Dict[str, Any]]] = {}
+    for item in items:
+        by_month.setdefault(_month(item["created_at"]), []).append(item)
+
+    paths = []
+    for month, records in sorted(by_month.items()):
+        partition = os.path.join(directory, month)
+        os.makedirs(partition, exist_ok=True)
+        ids = [record["id"] for record in records]
+        path = os.path.join(partition, f"feedback-{min(ids)}-{max(ids)}.ndjson.gz")
+        fd, tmp_path = tempfile.mkstemp(dir=partition, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as out:
+                    for record in records:
+                        out.write((json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        paths.append(path)
+    return paths
+
+
+def archive_old_feedback(days: Optional[int] = None, batch_size: Optional[int] = None,
+                         directory: Optional[str] = None) -> Dict[str, Any]:
+    """Archive feedback created more than ``days`` ago, a batch per transaction."""
+    days = ARCHIVE_AFTER_DAYS if days is None else days
+    # created_at is stored as UTC text in SQLite's CURRENT_TIMESTAMP format.
+    before = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    directory = directory or archive_dir()
+    months = set()
+
+    def write(items: List[Dict[str, Any]]):
+        write_partitions(items, directory)
+        months.update(_month(item["created_at"]) for item in items)
+
+    start = time.perf_counter()
+    archived = 0
+    while True:
+        moved = archive_feedback(before, write, batch_size or ARCHIVE_BATCH_SIZE)
+        archived += moved
+        if not moved:
+            break
+    if archived:
+        logger.info(f"Archived {archived} feedback items created before {before} into {len(months)} "
+                    f"monthly partitions in {time.perf_counter() - start:.1f}s")
+    return {"archived": archived, "before": before, "months": sorted(months)}
+
+
+def _partition_files(directory: str, start_month: Optional[str], end_month: Optional[str]) -> Iterator[str]:
+    if not os.path.isdir(directory):
+        return
+    # Newest partitions first: recent history is what is usually searched for.
+    for month in sorted(os.listdir(directory), reverse=True):
+        if (start_month and month < start_month) or (end_month and month > end_month):
+            continue
+        partition = os.path.join(directory, month)
+        if os.path.isdir(partition):
+            for name in sorted(os.listdir(partition), reverse=True):
+                if name.endswith(".ndjson.gz"):
+                    yield os.path.join(partition, name)
+
+
+def search_archive(query: str, start_month: Optional[str] = None, end_month: Optional[str] = None,
+                   theme: Optional[str] = None, source: Optional[str] = None, limit: int = 50,
+                   directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Archived items whose text or summary contains ``query`` (case-insensitive), newest partitions first.
+
+    Only the partitions in the month range are decompressed, and a line is
+    only decoded when the query appears somewhere in it. Partitions hold every
+    tenant's items; only the current tenant's are returned.
+    """
+    needle = query.lower()
+    tenant = current_tenant()
+    results: List[Dict[str, Any]] = []
+    seen = set()
+    for path in _partition_files(directory or archive_dir(), start_month, end_month):
+        with gzip.open(path, "rt", encoding="utf-8") as lines:
+            for line in lines:
+                if needle not in line.lower():
+                    continue
+                record = json.loads(line)
+                if record["id"] in seen:
+                    continue
+                # Items archived before tenants existed belong to the default tenant.
+                if tenant is not None and record.get("tenant_id", DEFAULT_TENANT) != tenant:
+                    continue
+                if theme is not None and record["theme"] != theme:
+                    continue
+                if source is not None and record["source"] != source:
+                    continue
+                if needle not in f"{record['text']}\n{record.get('summary') or ''}".lower():
+                    continue
+                seen.add(record["id"])
+                results.append(record)
+                if len(results) >= limit:
+                    return results
+    return results
+
+
+def get_archive_stats(start_month: Optional[str] = None, end_month: Optional[str] = None,
+                      **filters) -> Dict[str, Any]:
+    """Counts and mean scores of archived feedback, in the same shape as the live statistics."""
+    return summarize_stat_groups(get_archived_stat_groups(start_month, end_month, **filters))
+
+
+def list_partitions(directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    directory = directory or archive_dir()
+    partitions = []
+    for row in get_archived_months():
+        path = os.path.join(directory, row["month"])
+        files = [os.path.join(path, name) for name in os.listdir(path)] if os.path.isdir(path) else []
+        partitions.append({
+            "month": row["month"],
+            "items": row["items"],
+            "files": len(files),
+            "bytes": sum(os.path.getsize(name) for name in files),
+        })
+    return partitions
+
+
+def run_maintenance() -> Dict[str, Any]:
+    """Archive every tenant's old feedback, then VACUUM and ANALYZE so the freed pages and new statistics take effect."""
+    with tenant_scope(ALL_TENANTS):
+        result = archive_old_feedback() if ARCHIVE_AFTER_DAYS > 0 else {"archived": 0}
+    start = time.perf_counter()
+    vacuum_database()
+    result["vacuum_seconds"] = round(time.perf_counter() - start, 3)
+    logger.info(f"Database maintenance finished: {result}")
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Archive old feedback and maintain the database")
+    parser.add_argument("--days", type=int, help="Archive feedback older than this (ARCHIVE_AFTER_DAYS)")
+    parser.add_argument("--no-vacuum", action="store_true", help="Archive only")
+    parser.add_argument("--search", help="Search the archive instead")
+    parser.add_argument("--from", dest="start_month", help="First month to search, YYYY-MM")
+    parser.add_argument("--to", dest="end_month", help="Last month to search, YYYY-MM")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--tenant", help="Only archive or search this tenant (default: every tenant)")
+    parser.add_argument("--db-path", help="SQLite file to use when DATABASE_URL is not set")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    if args.db_path:
+        import backend.db as db_module
+        db_module.DB_PATH = args.db_path
+    from backend.db import init_db
+    init_db()
+
+    with tenant_scope(args.tenant or ALL_TENANTS):
+        if args.search:
+            for record in search_archive(args.search, args.start_month, args.end_month, limit=args.limit):
+                print(json.dumps(record, ensure_ascii=False, default=str))
+            return 0
+        result = archive_old_feedback(args.days)
+    if not args.no_vacuum:
+        vacuum_database()
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
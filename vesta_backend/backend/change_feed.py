@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.changes import ChangeCursor
+from backend.models.schemas import FeedbackResponse
+from backend.storage import FeedbackRepository
+from backend.tenancy import ALL_TENANTS, DEFAULT_TENANT, tenant_scope, write_tenant
+
+logger = logging.getLogger(__name__)
+
+# Seconds between change_log polls while at least one client is subscribed.
+POLL_INTERVAL = float(os.getenv("CHANGE_FEED_INTERVAL", "1.0"))
+# Changes a reconnecting client may catch up on before it is told to refetch instead.
+CATCHUP_LIMIT = int(os.getenv("CHANGE_FEED_CATCHUP", "5000"))
+# Undelivered batches a client may fall behind by before it is told to refetch.
+QUEUE_SIZE = int(os.getenv("CHANGE_FEED_QUEUE", "100"))
+POLL_LIMIT = 1000
+
+
+class FeedBatch:
+    """Events from one poll, serialized once and shared by every subscriber."""
+
+    def __init__(self, events: List[Tuple[int, str]], reset: bool = False):
+        # (seq, event JSON), oldest first.
+        self.events = events
+        self.reset = reset
+
+    @cached_property
+    def sse(self) -> str:
+        if self.reset:
+            return "event: reset\ndata: {}\n\n"
+        return "".join(f"id: {seq}\nevent: change\ndata: {text}\n\n" for seq, text in self.events)
+
+    @cached_property
+    def message(self) -> str:
+        if self.reset:
+            return '{"type":"reset"}'
+        return '{"type":"changes","events":[' + ",".join(text for _, text in self.events) + "]}"
+
+
+RESET = FeedBatch([], reset=True)
+
+
+class Subscription:
+    def __init__(self, queue_size: int, tenant: str = DEFAULT_TENANT):
+        self.queue: "asyncio.Queue[FeedBatch]" = asyncio.Queue(queue_size)
+        self.tenant = tenant
+
+    def push(self, batch: FeedBatch):
+        try:
+            self.queue.put_nowait(batch)
+        except asyncio.QueueFull:
+            # Too far behind to catch up with deltas: drop them and have the client refetch.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+    async def next(self, timeout: float) -> Optional[FeedBatch]:
+        """The next batch, or None if nothing arrived within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ChangeFeed:
+    """Pushes change_log entries to subscribed clients as small deltas.
+
+    One task per process polls change_log while anyone is subscribed and fans
+    each batch out to every subscriber's queue, so the database cost does not
+    grow with the number of clients. Feedback events carry the item's current
+    state; deletes and reports carry only the id. A client reconnecting with
+    the last ``seq`` it saw is caught up from change_log. Clients only receive
+    their own tenant's changes, and only tenants with a subscriber cost a
+    feedback read per poll.
+    """
+
+    def __init__(self, repository: FeedbackRepository, interval: Optional[float] = None,
+                 queue_size: Optional[int] = None):
+        self.repository = repository
+        self.interval = POLL_INTERVAL if interval is None else interval
+        self.queue_size = queue_size or QUEUE_SIZE
+        self.cursor: Optional[ChangeCursor] = None
+        # The cursor is read from worker threads; two polls at once would both deliver the same changes.
+        self.cursor_lock = threading.Lock()
+        self.subscribers: Set[Subscription] = set()
+        self.task: Optional[asyncio.Task] = None
+
+    def build_events(self, changes: List[Dict[str, Any]]) -> List[Tuple[int, str]]:
+        """Collapse changes to one event per entity, oldest first, with current feedback state attached."""
+        latest: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for change in sorted(changes, key=lambda change: change["seq"]):
+            key = (change["entity"], change["entity_id"])
+            previous = latest.get(key)
+            op = change["op"]
+            if previous is not None and previous["op"] == "insert" and op == "update":
+                op = "insert"
+            latest[key] = {"seq": change["seq"], "entity": key[0], "id": key[1], "op": op}
+
+        live = [entity_id for (entity, entity_id), event in latest.items()
+                if entity == "feedback" and event["op"] != "delete"]
+        # Callers pass one tenant's changes; the rows are read by id, whatever the caller's scope.
+        with tenant_scope(ALL_TENANTS):
+            rows = {row["id"]: row for row in self.repository.get_feedback_by_ids(live)}
+        events = []
+        for event in sorted(latest.values(), key=lambda event: event["seq"]):
+            if event["entity"] == "feedback" and event["op"] != "delete":
+                row = rows.get(event["id"])
+                if row is None:
+                    # Deleted since; the delete follows in a later batch.
+                    continue
+                event["data"] = FeedbackResponse.model_validate(row).model_dump(mode="json")
+            events.append((event["seq"], json.dumps(event, separators=(",", ":"))))
+        return events
+
+    def _catch_up(self, after: int, until: int, tenant: str) -> List[FeedBatch]:
+        if after > until:
+            # The client followed another database, or this one was restored.
+            return [RESET]
+        if after == until:
+            return []
+        changes = self.repository.get_changes(after, CATCHUP_LIMIT, until)
+        if len(changes) >= CATCHUP_LIMIT and changes[-1]["seq"] < until:
+            return [RESET]
+        events = self.build_events([change for change in changes if change["tenant_id"] == tenant])
+        return [FeedBatch(events)] if events else []
+
+    async def subscribe(self, after: Optional[int] = None,
+                        tenant: Optional[str] = None) -> Tuple[Subscription, List[FeedBatch]]:
+        """Register a client of ``tenant`` (the current one by default).
+
+        Returns its subscription and the batches it missed since ``after``.
+        """
+        tenant = tenant or write_tenant()
+        loop = asyncio.get_running_loop()
+        if not self._running(loop):
+            watermark = await asyncio.to_thread(self.repository.get_change_watermark)
+            if not self._running(loop):
+                # Nothing was followed while idle: start from now, reconnecting clients catch up below.
+                self.cursor = ChangeCursor(self.repository.get_changes, watermark)
+                self.task = loop.create_task(self._run())
+        subscription = Subscription(self.queue_size, tenant)
+        self.subscribers.add(subscription)
+        catchup = []
+        if after is not None:
+            catchup = await asyncio.to_thread(self._catch_up, after, self.cursor.watermark, tenant)
+        return subscription, catchup
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def _running(self, loop) -> bool:
+        # A task left on a loop that has since closed (a finished test client) never runs again.
+        return self.task is not None and not self.task.done() and self.task.get_loop() is loop
+
+    def _poll_cursor(self) -> List[Dict[str, Any]]:
+        with self.cursor_lock:
+            return self.cursor.poll(POLL_LIMIT)
+
+    async def poll_once(self) -> int:
+        """Broadcast everything logged since the last poll; returns the number of events sent."""
+        sent = 0
+        while True:
+            changes = await asyncio.to_thread(self._poll_cursor)
+            watched = {subscription.tenant for subscription in self.subscribers}
+            by_tenant: Dict[str, List[Dict[str, Any]]] = {}
+            for change in changes:
+                if change["tenant_id"] in watched:
+                    by_tenant.setdefault(change["tenant_id"], []).append(change)
+            for tenant, tenant_changes in by_tenant.items():
+                events = await asyncio.to_thread(self.build_events, tenant_changes)
+                if events:
+                    batch = FeedBatch(events)
+                    for subscription in list(self.subscribers):
+                        if subscription.tenant == tenant:
+                            subscription.push(batch)
+                    sent += len(events)
+            if len(changes) < POLL_LIMIT:
+                return sent
+
+    async def _run(self):
+        try:
+            while self.subscribers:
+                # The cursor starts at the watermark read on subscribe, so there is nothing to poll yet.
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.poll_once()
+                except Exception as e:
+                    logger.error(f"Change feed poll failed: {e}")
+        finally:
+            self.task = None
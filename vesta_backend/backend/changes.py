@@ -0,0 +1,53 @@
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# (after_seq, limit, until_seq) -> changes ordered by seq
+FetchChanges = Callable[[int, int, Optional[int]], List[Dict[str, Any]]]
+
+# How long a missing sequence number is waited for before it is treated as a rolled-back write.
+GAP_TIMEOUT = float(os.getenv("CHANGE_GAP_TIMEOUT", "30"))
+# Jumps larger than this (sequence caching, restores) are skipped rather than waited for.
+MAX_TRACKED_GAP = 1000
+
+
+class ChangeCursor:
+    """Follows change_log from a watermark.
+
+    Sequence numbers are assigned when a write starts, not when it commits, so
+    on PostgreSQL seq 11 can become visible before seq 10. Missing numbers
+    below the watermark are remembered and re-read until they show up or
+    ``gap_timeout`` passes, so a slow transaction is not skipped for good.
+    """
+
+    def __init__(self, fetch_changes: FetchChanges, watermark: int = 0, gap_timeout: float = GAP_TIMEOUT):
+        self.fetch_changes = fetch_changes
+        self.watermark = watermark
+        self.gap_timeout = gap_timeout
+        self.gaps: Dict[int, float] = {}
+
+    def poll(self, limit: int = 10000) -> List[Dict[str, Any]]:
+        """Return changes not delivered before, oldest first."""
+        now = time.monotonic()
+        for seq, first_seen in list(self.gaps.items()):
+            if now - first_seen > self.gap_timeout:
+                logger.debug(f"Giving up on change {seq}")
+                del self.gaps[seq]
+
+        fresh = []
+        if self.gaps:
+            low, high = min(self.gaps), max(self.gaps)
+            for change in self.fetch_changes(low - 1, high - low + 1, high):
+                if self.gaps.pop(change["seq"], None) is not None:
+                    fresh.append(change)
+
+        for change in self.fetch_changes(self.watermark, limit, None):
+            seq = change["seq"]
+            if seq - self.watermark - 1 <= MAX_TRACKED_GAP:
+                self.gaps.update({missing: now for missing in range(self.watermark + 1, seq)})
+            self.watermark = seq
+            fresh.append(change)
+        return fresh
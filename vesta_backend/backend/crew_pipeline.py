@@ -1,51 +1,75 @@
 import os
 import logging
-import re
-from typing import List, Dict, Any
-from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
-from backend.db import update_feedback_classification, insert_score
+import threading
+import time
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Optional
+from backend.db import get_usage_ledger, update_feedback_classification, insert_score
+from backend.models.schemas import (
+    ClassifiedFeedback, ClassificationOutput, EvaluationOutput, PrioritizationScore,
+)
+from backend.llm_parsing import LLMOutputError, invoke_structured, parse_output
+from backend.prompt_budget import PROMPT_REPORT_ITEM_TOKENS, compact_feedback, compact_text
+from backend.tenancy import TenantQuotaExceeded, tenant_limiter
+from backend.usage import TIER_COST_PER_1K, tier_budget, token_usage, usage_context
 import json
 from functools import lru_cache
 
+# crewai, langchain_openai and the NumPy classifier are imported on first use so
+# that importing the API (and serving read-only endpoints) stays fast and works
+# without the LLM stack installed.
+if TYPE_CHECKING:
+    from crewai import Agent
+
 logger = logging.getLogger(__name__)
 
 MOCK_MODE = os.getenv("MOCK_MODE", "false").lower() == "true"
 
+EMPTY_REPORT = "# Weekly Feedback Priority Report\n\nNo feedback to prioritize this week."
 
-def extract_json_from_response(response: str) -> str:
-    """Extract JSON string from LLM response, handling markdown code blocks."""
-    # Try to find JSON in markdown code blocks
-    json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
-    if json_match:
-        return json_match.group(1).strip()
-    # If no code block, assume it's raw JSON
-    return response.strip()
+PRIORITIZER_BACKSTORY = (
+    "You are a strategic product leader who synthesizes feedback analysis into "
+    "clear, actionable recommendations. You create concise reports that help teams "
+    "focus on what matters most."
+)
 
 
-@lru_cache(maxsize=1)
-def get_llm():
+@lru_cache(maxsize=8)
+def get_llm(model_name: Optional[str] = None):
     if MOCK_MODE:
         return None
 
+    model_name = model_name or os.getenv("LLM_MODEL", "gpt-4o-mini")
+    cassette_path = os.getenv("LLM_CASSETTE")
+    if cassette_path:
+        from backend.llm_cassette import get_cassette, wrap_llm
+        if not get_cassette(cassette_path).recording:
+            # Answered from the cassette: no API key or network needed.
+            return wrap_llm(model_name)
+
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         logger.warning("OPENAI_API_KEY not set. Running in mock mode.")
         return None
 
-    model_name = os.getenv("LLM_MODEL", "gpt-4o-mini")
     temperature = float(os.getenv("LLM_TEMPERATURE", "0.7"))
     base_url = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
 
-    return ChatOpenAI(
+    from langchain_openai import ChatOpenAI
+
+    llm = ChatOpenAI(
         model=model_name,
         temperature=temperature,
         api_key=api_key,
         base_url=base_url
     )
+    if cassette_path:
+        return wrap_llm(model_name, llm)
+    return llm
+
 
+def create_classifier_agent(llm) -> "Agent":
+    from crewai import Agent
 
-def create_classifier_agent(llm) -> Agent:
     return Agent(
         role="Feedback Classifier",
         goal="Classify customer feedback into sentiment and theme categories",
@@ -61,7 +85,9 @@ def create_classifier_agent(llm) -> Agent:
     )
 
 
-def create_evaluator_agent(llm) -> Agent:
+def create_evaluator_agent(llm) -> "Agent":
+    from crewai import Agent
+
     return Agent(
         role="Impact Evaluator",
         goal="Evaluate the urgency and business impact of customer feedback",
@@ -77,103 +103,221 @@ def create_evaluator_agent(llm) -> Agent:
     )
 
 
-def create_prioritizer_agent(llm) -> Agent:
+def create_prioritizer_agent(llm) -> "Agent":
+    from crewai import Agent
+
     return Agent(
         role="Priority Strategist",
         goal="Generate actionable priority lists for product teams",
-        backstory=(
-            "You are a strategic product leader who synthesizes feedback analysis into "
-            "clear, actionable recommendations. You create concise reports that help teams "
-            "focus on what matters most."
-        ),
+        backstory=PRIORITIZER_BACKSTORY,
         llm=llm,
         verbose=True,
         allow_delegation=False
     )
 
 
-def classify_feedback_mock(feedback_id: int, text: str) -> Dict[str, Any]:
-    sentiments = ["positive", "neutral", "negative"]
-    themes = ["Product/Features", "Performance", "UX/UI", "Pricing", "Service", "Other"]
+def _kickoff(agent: "Agent", description: str, expected_output: str):
+    from crewai import Crew, Process, Task
 
-    import hashlib
-    hash_val = int(hashlib.md5(text.encode()).hexdigest(), 16)
+    task = Task(
+        description=description,
+        agent=agent,
+        expected_output=expected_output
+    )
+
+    crew = Crew(
+        agents=[agent],
+        tasks=[task],
+        process=Process.sequential,
+        verbose=True
+    )
+
+    return crew.kickoff()
+
+
+def get_local_classifier():
+    from backend.local_classifier import get_local_classifier as load
+
+    return load()
+
+
+def classify_feedback_mock(feedback_id: int, text: str) -> Dict[str, Any]:
+    prediction = get_local_classifier().predict(text)
 
     return {
         "feedback_id": feedback_id,
         "text": text,
-        "sentiment": sentiments[hash_val % 3],
-        "theme": themes[hash_val % 6],
-        "summary": f"Mock summary: {text[:100]}..."
+        "sentiment": prediction["sentiment"],
+        "theme": prediction["theme"],
+        "summary": prediction["summary"],
     }
 
 
 def evaluate_feedback_mock(feedback_id: int, classified: Dict[str, Any]) -> Dict[str, Any]:
-    import hashlib
-    hash_val = int(hashlib.md5(classified["text"].encode()).hexdigest(), 16)
-
-    urgency = (hash_val % 10) + 1
-    impact = ((hash_val // 10) % 10) + 1
-    priority_score = round((urgency + impact) / 2, 2)
+    prediction = get_local_classifier().predict(classified["text"])
 
     return {
         "feedback_id": feedback_id,
-        "urgency": urgency,
-        "impact": impact,
-        "justification": f"Mock justification for {classified['theme']} with {classified['sentiment']} sentiment",
-        "priority_score": priority_score
+        "urgency": prediction["urgency"],
+        "impact": prediction["impact"],
+        "justification": (
+            f"{prediction['justification']} "
+            f"(classified as {classified['theme']} with {classified['sentiment']} sentiment)"
+        ),
+        "priority_score": prediction["priority_score"],
     }
 
 
-def classify_feedback_with_llm(feedback_id: int, text: str, llm) -> Dict[str, Any]:
-    agent = create_classifier_agent(llm)
+class RoutingStats:
+    """Thread-safe counters for the tiered router, exposed through /metrics/routing."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._tiers: Dict[str, Dict[str, float]] = {}
+            self._sources: Dict[str, Dict[str, int]] = {}
+
+    def record(self, tier: str, source: str, outcome: str, latency: float, tokens: int = 0):
+        cost = tokens / 1000 * TIER_COST_PER_1K.get(tier, 0.0)
+        with self._lock:
+            stats = self._tiers.setdefault(tier, {
+                "attempts": 0, "accepted": 0, "escalated": 0, "failed": 0,
+                "latency_total": 0.0, "tokens": 0, "cost": 0.0,
+            })
+            stats["attempts"] += 1
+            stats[outcome] += 1
+            stats["latency_total"] += latency
+            stats["tokens"] += tokens
+            stats["cost"] += cost
+            by_source = self._sources.setdefault(source, {})
+            key = f"{tier}_{outcome}"
+            by_source[key] = by_source.get(key, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            tiers = {}
+            for tier, stats in self._tiers.items():
+                attempts = stats["attempts"] or 1
+                tiers[tier] = {
+                    "attempts": stats["attempts"],
+                    "accepted": stats["accepted"],
+                    "escalated": stats["escalated"],
+                    "failed": stats["failed"],
+                    "escalation_rate": round((stats["escalated"] + stats["failed"]) / attempts, 4),
+                    "avg_latency_ms": round(stats["latency_total"] / attempts * 1000, 2),
+                    "tokens": stats["tokens"],
+                    "estimated_cost": round(stats["cost"], 6),
+                }
+            return {"tiers": tiers, "sources": {k: dict(v) for k, v in self._sources.items()}}
+
+
+routing_stats = RoutingStats()
+
+
+def get_routing_stats() -> Dict[str, Any]:
+    return routing_stats.snapshot()
+
+
+def get_routing_config(source: str) -> Dict[str, Any]:
+    """Resolve the tier list and thresholds for a feedback source.
+
+    Defaults come from LLM_ROUTING_TIERS, LOCAL_PREFILTER_THRESHOLD and
+    LLM_ESCALATION_THRESHOLD. LLM_ROUTING_BY_SOURCE holds a JSON object mapping
+    a source to either a comma-separated tier list or an object with any of
+    ``tiers``, ``local_threshold`` and ``threshold``.
+    """
+    local_threshold = os.getenv("LOCAL_PREFILTER_THRESHOLD")
+    config = {
+        "tiers": os.getenv("LLM_ROUTING_TIERS", "local,cheap,primary"),
+        "local_threshold": float(local_threshold) if local_threshold else None,
+        "threshold": float(os.getenv("LLM_ESCALATION_THRESHOLD", "0.7")),
+    }
+
+    overrides = os.getenv("LLM_ROUTING_BY_SOURCE")
+    if overrides:
+        try:
+            override = json.loads(overrides).get(source)
+        except (json.JSONDecodeError, AttributeError):
+            logger.error("LLM_ROUTING_BY_SOURCE is not a JSON object, ignoring it")
+            override = None
+        if isinstance(override, str):
+            config["tiers"] = override
+        elif isinstance(override, dict):
+            config.update({k: v for k, v in override.items() if k in config})
+            if config["local_threshold"] is not None:
+                config["local_threshold"] = float(config["local_threshold"])
+            config["threshold"] = float(config["threshold"])
+
+    tiers = [t.strip() for t in config["tiers"].split(",") if t.strip()]
+    # The local tier only answers when a confidence bar is configured and the
+    # cheap tier only when a cheap model is; primary is always the last resort.
+    if config["local_threshold"] is None:
+        tiers = [t for t in tiers if t != "local"]
+    if not os.getenv("LLM_CHEAP_MODEL"):
+        tiers = [t for t in tiers if t != "cheap"]
+    if not tiers:
+        tiers = ["primary"]
+    config["tiers"] = tiers
+    return config
+
+
+def _within_budget(tiers: List[str]) -> List[str]:
+    """Drop LLM tiers that spent their daily budget; the local classifier answers when none is left."""
+    allowed = [tier for tier in tiers
+               if tier == "local" or tier_budget(tier) <= 0 or not get_usage_ledger().over_budget(tier)]
+    if len(allowed) < len(tiers):
+        logger.debug(f"Tiers over their daily budget skipped: {sorted(set(tiers) - set(allowed))}")
+    return allowed or ["local"]
+
+
+def _usage(result, prompt: str, completion: str) -> Dict[str, int]:
+    """Prompt and completion tokens of a crew run."""
+    usage = getattr(result, "token_usage", None)
+    return token_usage(
+        prompt, completion,
+        getattr(usage, "prompt_tokens", 0) or 0,
+        getattr(usage, "completion_tokens", 0) or 0,
+        getattr(usage, "total_tokens", 0) or 0,
+    )
 
-    task = Task(
-        description=f"""Analyze this customer feedback and classify it:
 
-Feedback: {text}
+def _run_classification(feedback_id: int, text: str, llm) -> Dict[str, Any]:
+    prompt_text, saved_tokens = compact_feedback(text)
+    description = f"""Analyze this customer feedback and classify it:
+
+Feedback: {prompt_text}
 
 Provide your analysis in the following JSON format:
 {{
     "sentiment": "positive|neutral|negative",
     "theme": "Product/Features|Performance|UX/UI|Pricing|Service|Other",
-    "summary": "A brief 1-2 sentence summary of the feedback"
-}}""",
-        agent=agent,
-        expected_output="JSON object with sentiment, theme, and summary"
-    )
-
-    crew = Crew(
-        agents=[agent],
-        tasks=[task],
-        process=Process.sequential,
-        verbose=True
-    )
-
-    result = crew.kickoff()
-
-    try:
-        cleaned = extract_json_from_response(str(result))
-        parsed = json.loads(cleaned)
-        return {
-            "feedback_id": feedback_id,
-            "text": text,
-            "sentiment": parsed["sentiment"],
-            "theme": parsed["theme"],
-            "summary": parsed["summary"]
-        }
-    except json.JSONDecodeError:
-        logger.error(f"Failed to parse LLM response: {result}")
-        return classify_feedback_mock(feedback_id, text)
+    "summary": "A brief 1-2 sentence summary of the feedback",
+    "confidence": "0.0-1.0 (float, how certain you are of sentiment and theme)"
+}}"""
+
+    with get_usage_ledger().track("classification", llm, description, saved_tokens=saved_tokens) as call:
+        structured = invoke_structured(llm, description, ClassificationOutput, "classification")
+        if structured is not None:
+            output, call["usage"] = structured
+        else:
+            agent = create_classifier_agent(llm)
+            result = _kickoff(agent, description, "JSON object with sentiment, theme, summary, and confidence")
+            call["usage"] = _usage(result, description, str(result))
+            output = parse_output(str(result), ClassificationOutput, "classification")
+    tokens = sum(call["usage"].values())
 
+    classified = ClassifiedFeedback(feedback_id=feedback_id, text=text, **output.model_dump(exclude={"confidence"}))
+    return {**classified.model_dump(), "confidence": output.confidence, "tokens": tokens}
 
-def evaluate_feedback_with_llm(feedback_id: int, classified: Dict[str, Any], llm) -> Dict[str, Any]:
-    agent = create_evaluator_agent(llm)
 
-    task = Task(
-        description=f"""Evaluate this classified customer feedback:
+def _run_evaluation(feedback_id: int, classified: Dict[str, Any], llm) -> Dict[str, Any]:
+    prompt_text, saved_tokens = compact_feedback(classified["text"])
+    description = f"""Evaluate this classified customer feedback:
 
-Feedback: {classified['text']}
+Feedback: {prompt_text}
 Sentiment: {classified['sentiment']}
 Theme: {classified['theme']}
 Summary: {classified['summary']}
@@ -183,54 +327,127 @@ Provide your evaluation in the following JSON format:
     "urgency": "1-10 (integer, how quickly this needs to be addressed)",
     "impact": "1-10 (integer, how much business impact addressing this would have)",
     "justification": "Clear explanation for these scores"
-}}""",
-        agent=agent,
-        expected_output="JSON object with urgency, impact, and justification"
-    )
+}}"""
 
-    crew = Crew(
-        agents=[agent],
-        tasks=[task],
-        process=Process.sequential,
-        verbose=True
-    )
+    with get_usage_ledger().track("evaluation", llm, description, saved_tokens=saved_tokens) as call:
+        structured = invoke_structured(llm, description, EvaluationOutput, "evaluation")
+        if structured is not None:
+            output, call["usage"] = structured
+        else:
+            agent = create_evaluator_agent(llm)
+            result = _kickoff(agent, description, "JSON object with urgency, impact, and justification")
+            call["usage"] = _usage(result, description, str(result))
+            output = parse_output(str(result), EvaluationOutput, "evaluation")
+    tokens = sum(call["usage"].values())
+
+    score = PrioritizationScore(
+        feedback_id=feedback_id,
+        urgency=output.urgency,
+        impact=output.impact,
+        justification=output.justification,
+        priority_score=round((output.urgency + output.impact) / 2, 2),
+    ).model_dump()
+    score["tokens"] = tokens
+    return score
 
-    result = crew.kickoff()
 
+def classify_feedback_with_llm(feedback_id: int, text: str, llm) -> Dict[str, Any]:
     try:
-        # Extract JSON from markdown code block if present
-        response_str = str(result)
-        json_str = re.search(r'```json\s*(.*?)\s*```', response_str, re.DOTALL)
-        if json_str:
-            parsed = json.loads(json_str.group(1))
-        else:
-            parsed = json.loads(response_str)
-
-        urgency = int(parsed["urgency"])
-        impact = int(parsed["impact"])
-        priority_score = round((urgency + impact) / 2, 2)
-
-        return {
-            "feedback_id": feedback_id,
-            "urgency": urgency,
-            "impact": impact,
-            "justification": parsed["justification"],
-            "priority_score": priority_score
-        }
-    except (json.JSONDecodeError, ValueError, KeyError) as e:
-        logger.error(f"Failed to parse LLM response: {result}, error: {e}")
+        classified = _run_classification(feedback_id, text, llm)
+        classified.pop("confidence", None)
+        classified.pop("tokens", None)
+        return classified
+    except LLMOutputError as e:
+        logger.error(f"Failed to parse LLM response: {e}")
+        return classify_feedback_mock(feedback_id, text)
+
+
+def evaluate_feedback_with_llm(feedback_id: int, classified: Dict[str, Any], llm) -> Dict[str, Any]:
+    try:
+        score = _run_evaluation(feedback_id, classified, llm)
+        score.pop("tokens", None)
+        return score
+    except LLMOutputError as e:
+        logger.error(f"Failed to parse LLM response: {e}")
         return evaluate_feedback_mock(feedback_id, classified)
-        response_str = str(result)
-        response_str = str(result)
 
 
-def process_single_feedback(feedback_id: int, text: str) -> Dict[str, Any]:
+def _run_local_tier(feedback_id: int, text: str):
+    prediction = get_local_classifier().predict(text)
+    classified = {
+        "feedback_id": feedback_id,
+        "text": text,
+        "sentiment": prediction["sentiment"],
+        "theme": prediction["theme"],
+        "summary": prediction["summary"],
+    }
+    score = {
+        "feedback_id": feedback_id,
+        "urgency": prediction["urgency"],
+        "impact": prediction["impact"],
+        "justification": prediction["justification"],
+        "priority_score": prediction["priority_score"],
+    }
+    return classified, score, prediction["confidence"]
+
+
+def route_feedback(feedback_id: int, text: str, source: str = "manual"):
+    """Run feedback through the configured tiers, cheapest first.
+
+    A tier's answer is accepted when its confidence clears the tier threshold;
+    otherwise, or when its output fails schema validation, the item escalates to
+    the next tier. The last tier's valid answer is always accepted. Returns
+    ``(classified, score, tier)`` or raises LLMOutputError if the last tier
+    produced no valid answer.
+    """
+    config = get_routing_config(source)
+    tiers = _within_budget(config["tiers"])
+    last_error: Exception = LLMOutputError("No routing tier available")
+
+    for position, tier in enumerate(tiers):
+        is_last = position == len(tiers) - 1
+        start = time.perf_counter()
+        tokens = 0
+        try:
+            if tier == "local":
+                classified, score, confidence = _run_local_tier(feedback_id, text)
+                threshold = config["local_threshold"]
+            else:
+                model_name = os.getenv("LLM_CHEAP_MODEL") if tier == "cheap" else None
+                llm = get_llm(model_name)
+                if llm is None:
+                    raise LLMOutputError(f"LLM for tier '{tier}' is not configured")
+                with tenant_limiter.llm_slot(), usage_context(tier=tier):
+                    classified = _run_classification(feedback_id, text, llm)
+                    score = _run_evaluation(feedback_id, classified, llm)
+                confidence = classified.pop("confidence")
+                tokens = classified.pop("tokens") + score.pop("tokens")
+                tenant_limiter.record(tokens)
+                threshold = config["threshold"]
+        except LLMOutputError as e:
+            routing_stats.record(tier, source, "failed", time.perf_counter() - start, tokens)
+            logger.warning(f"Tier '{tier}' failed for feedback {feedback_id}: {e}")
+            last_error = e
+            continue
+
+        if is_last or confidence >= threshold:
+            routing_stats.record(tier, source, "accepted", time.perf_counter() - start, tokens)
+            return classified, score, tier
+
+        routing_stats.record(tier, source, "escalated", time.perf_counter() - start, tokens)
+        logger.info(f"Tier '{tier}' confidence {confidence:.2f} below {threshold}, escalating feedback {feedback_id}")
+
+    raise last_error
+
+
+def process_single_feedback(feedback_id: int, text: str, source: str = "manual") -> Dict[str, Any]:
     logger.info(f"Processing feedback {feedback_id}")
 
     llm = get_llm()
 
     classified = None
     score = None
+    label_source = "local"
 
     if llm is None or MOCK_MODE:
         logger.info("Running in mock mode")
@@ -240,8 +457,16 @@ def process_single_feedback(feedback_id: int, text: str) -> Dict[str, Any]:
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                classified = classify_feedback_with_llm(feedback_id, text, llm)
-                score = evaluate_feedback_with_llm(feedback_id, classified, llm)
+                with usage_context(feedback_id=feedback_id, source=source or "manual", attempt=attempt + 1):
+                    classified, score, tier = route_feedback(feedback_id, text, source or "manual")
+                logger.info(f"Feedback {feedback_id} answered by tier '{tier}'")
+                label_source = "local" if tier == "local" else "llm"
+                break
+            except TenantQuotaExceeded as e:
+                # Retrying cannot help before the quota window resets.
+                logger.warning(f"{e}, using mock mode for feedback {feedback_id}")
+                classified = classify_feedback_mock(feedback_id, text)
+                score = evaluate_feedback_mock(feedback_id, classified)
                 break
             except Exception as e:
                 logger.error(f"Attempt {attempt + 1}/{max_retries} failed: {e}")
@@ -254,7 +479,8 @@ def process_single_feedback(feedback_id: int, text: str) -> Dict[str, Any]:
         feedback_id,
         classified["sentiment"],
         classified["theme"],
-        classified["summary"]
+        classified["summary"],
+        label_source
     )
 
     insert_score(
@@ -269,41 +495,94 @@ def process_single_feedback(feedback_id: int, text: str) -> Dict[str, Any]:
     return {**classified, **score}
 
 
-def generate_priority_report(feedback_list: List[Dict[str, Any]]) -> str:
-    logger.info("Generating priority report")
-
-    llm = get_llm()
-
-    if not feedback_list:
-        return "# Weekly Feedback Priority Report\n\nNo feedback to prioritize this week."
-
-    sorted_feedback = sorted(
+def _top_feedback(feedback_list: List[Dict[str, Any]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Items by priority, highest first; callers pick how many (REPORT_TOP_K), so all are kept by default."""
+    return sorted(
         feedback_list,
         key=lambda x: x.get("priority_score") if x.get("priority_score") is not None else 0,
         reverse=True
-    )[:5]
-
-    if llm is None or MOCK_MODE:
-        report = "# Weekly Feedback Priority Report\n\n"
-        report += "## Top 5 Action Items\n\n"
-
-        for i, item in enumerate(sorted_feedback, 1):
-            priority_score = item.get('priority_score') or 0
-            urgency = item.get('urgency') or 0
-            impact = item.get('impact') or 0
-            theme = item.get('theme') or 'Unknown Theme'
-            summary = item.get('summary') or item.get('text') or 'No summary'
-            justification = item.get('justification') or 'No justification'
-
-            report += f"### {i}. {theme}\n\n"
-            report += f"**Priority Score:** {priority_score:.2f}\n\n"
-            report += f"**Urgency:** {urgency}/10 | **Impact:** {impact}/10\n\n"
-            report += f"**Feedback:** {summary}\n\n"
-            report += f"**Justification:** {justification}\n\n"
-            report += "---\n\n"
-
-        return report
-
+    )[:limit]
+
+
+def _trend_lines(trends: Optional[Dict[str, Any]]) -> str:
+    if not trends:
+        return ""
+    from backend.trends import format_trends
+    return format_trends(trends)
+
+
+def _cluster_lines(clusters: Optional[List[Dict[str, Any]]], limit: int = 8) -> str:
+    lines = []
+    for cluster in (clusters or [])[:limit]:
+        line = f"- {cluster['label']}: {cluster['items']} items"
+        if cluster.get("avg_priority") is not None:
+            line += f", avg priority {cluster['avg_priority']:.2f}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _group_heading(group: Dict[str, Any]) -> str:
+    heading = f"{group['label']} ({group['items']} items"
+    if group.get("avg_priority") is not None:
+        heading += f", avg priority {group['avg_priority']:.2f}"
+    return heading + ")"
+
+
+def _build_mock_report(sorted_feedback: List[Dict[str, Any]], trends: Optional[Dict[str, Any]] = None,
+                       clusters: Optional[List[Dict[str, Any]]] = None,
+                       theme_summaries: Optional[List[Dict[str, Any]]] = None) -> str:
+    report = "# Weekly Feedback Priority Report\n\n"
+    report += f"## Top {len(sorted_feedback)} Action Items\n\n"
+
+    for i, item in enumerate(sorted_feedback, 1):
+        priority_score = item.get('priority_score') or 0
+        urgency = item.get('urgency') or 0
+        impact = item.get('impact') or 0
+        theme = item.get('theme') or 'Unknown Theme'
+        summary = item.get('summary') or item.get('text') or 'No summary'
+        justification = item.get('justification') or 'No justification'
+
+        report += f"### {i}. {theme}\n\n"
+        report += f"**Priority Score:** {priority_score:.2f}\n\n"
+        report += f"**Urgency:** {urgency}/10 | **Impact:** {impact}/10\n\n"
+        report += f"**Feedback:** {summary}\n\n"
+        report += f"**Justification:** {justification}\n\n"
+        report += "---\n\n"
+
+    trend_lines = _trend_lines(trends)
+    if trend_lines:
+        report += f"## Trends (last {trends['window_days']:g} days vs. previous {trends['windows'] - 1} windows)\n\n"
+        report += trend_lines + "\n"
+
+    cluster_lines = _cluster_lines(clusters)
+    if cluster_lines:
+        report += "## Sub-themes\n\n" + cluster_lines + "\n"
+
+    if theme_summaries:
+        report += "\n## Themes\n\n"
+        for group in theme_summaries:
+            report += f"### {_group_heading(group)}\n\n{group['summary']}\n\n"
+
+    return report
+
+
+def _compact_report_items(items: List[Dict[str, Any]]):
+    """Items with summaries and justifications cut to PROMPT_REPORT_ITEM_TOKENS, and the tokens saved."""
+    compacted, saved_tokens = [], 0
+    for item in items:
+        item = dict(item)
+        for field in ("summary", "text", "justification"):
+            if item.get(field):
+                # Summaries and justifications are model output: nothing to clean, only to shorten.
+                item[field], saved = compact_text(item[field], PROMPT_REPORT_ITEM_TOKENS, clean=field == "text")
+                saved_tokens += saved
+        compacted.append(item)
+    return compacted, saved_tokens
+
+
+def _build_report_prompt(sorted_feedback: List[Dict[str, Any]], trends: Optional[Dict[str, Any]] = None,
+                         clusters: Optional[List[Dict[str, Any]]] = None,
+                         theme_summaries: Optional[List[Dict[str, Any]]] = None) -> str:
     feedback_summary = "\n".join([
         f"{i+1}. [{item.get('theme')}] (Priority: {(item.get('priority_score', 0) or 0):.2f}, "
         f"Urgency: {item.get('urgency', 0) or 0}, Impact: {item.get('impact', 0) or 0})\n"
@@ -312,51 +591,165 @@ def generate_priority_report(feedback_list: List[Dict[str, Any]]) -> str:
         for i, item in enumerate(sorted_feedback)
     ])
 
-    agent = create_prioritizer_agent(llm)
+    trend_lines = _trend_lines(trends)
+    if trend_lines:
+        trend_context = (
+            f"\n\nComputed trends per theme (last {trends['window_days']:g} days compared with the previous "
+            f"{trends['windows'] - 1} windows; z-scores of 3 or more are significant):\n\n{trend_lines}"
+        )
+        trend_instruction = "3. Brief summary of trends, using only the computed trends above"
+    else:
+        trend_context = ""
+        trend_instruction = "3. Brief summary of patterns across these items (no trend data is available, so do not claim any)"
 
-    task = Task(
-        description=f"""Create a concise, actionable weekly priority report based on these top 5 feedback items:
+    cluster_lines = _cluster_lines(clusters)
+    cluster_context = f"\n\nLargest sub-themes found by clustering all feedback:\n\n{cluster_lines}" if cluster_lines else ""
 
-{feedback_summary}
+    if theme_summaries:
+        summary_lines = "\n\n".join(f"{_group_heading(group)}:\n{group['summary']}" for group in theme_summaries)
+        summary_context = f"\n\nSummaries of all feedback, one per group:\n\n{summary_lines}"
+        summary_instruction = "\n4. A short section per group, drawing on its summary above and on nothing else"
+    else:
+        summary_context = summary_instruction = ""
+
+    return f"""Create a concise, actionable weekly priority report based on these top {len(sorted_feedback)} feedback items:
+
+{feedback_summary}{trend_context}{cluster_context}{summary_context}
 
 Generate a Markdown report with:
 1. A clear title
-2. Top 5 action items with theme, priority scores, and recommended actions
-3. Brief summary of trends or patterns
+2. Top {len(sorted_feedback)} action items with theme, priority scores, and recommended actions
+{trend_instruction}{summary_instruction}
 
-Keep it professional and actionable for a product team.""",
-        agent=agent,
-        expected_output="Markdown-formatted priority report"
-    )
+Keep it professional and actionable for a product team."""
 
-    crew = Crew(
-        agents=[agent],
-        tasks=[task],
-        process=Process.sequential,
-        verbose=True
+
+def _build_group_prompt(group: Dict[str, Any]) -> str:
+    items = "\n".join(
+        f"- (Priority: {(item.get('priority_score') or 0):.2f}, Sentiment: {item.get('sentiment') or 'unknown'}) "
+        f"{item.get('summary') or item.get('text') or 'No summary'}"
+        for item in group["sample"]
     )
+    return f"""Summarize this group of customer feedback for a weekly priority report.
+
+Group: {group['label']}
+Highest-priority items in the group:
+
+{items}
+
+Write at most 80 words of plain text: the recurring problems or requests, what makes the top items urgent,
+and one recommended action. Do not list the items one by one."""
+
+
+def _report_llm():
+    """``(llm, tier)`` for reports: the primary model, or the cheap one once primary spent its daily budget.
+
+    ``(None, None)`` means the template report.
+    """
+    if get_llm() is None or MOCK_MODE:
+        return None, None
+    cheap_model = os.getenv("LLM_CHEAP_MODEL")
+    for tier in _within_budget(["primary", "cheap"] if cheap_model else ["primary"]):
+        if tier == "primary":
+            return get_llm(), tier
+        if tier == "cheap":
+            return get_llm(cheap_model), tier
+    return None, None
+
+
+def generate_priority_report(feedback_list: List[Dict[str, Any]], trends: Optional[Dict[str, Any]] = None,
+                             clusters: Optional[List[Dict[str, Any]]] = None,
+                             theme_summaries: Optional[List[Dict[str, Any]]] = None) -> str:
+    """The report over the top items, plus the per-group summaries of map-reduce mode when given."""
+    logger.info("Generating priority report")
+
+    if not feedback_list:
+        return EMPTY_REPORT
+
+    sorted_feedback = _top_feedback(feedback_list)
+
+    llm, tier = _report_llm()
+    if llm is None:
+        return _build_mock_report(sorted_feedback, trends, clusters, theme_summaries)
+
+    agent = create_prioritizer_agent(llm)
+    prompt_items, saved_tokens = _compact_report_items(sorted_feedback)
+    prompt = _build_report_prompt(prompt_items, trends, clusters, theme_summaries)
 
     try:
-        result = crew.kickoff()
+        with tenant_limiter.llm_slot(), get_usage_ledger().track(
+                "report", llm, prompt, source="report", tier=tier, saved_tokens=saved_tokens) as call:
+            result = _kickoff(agent, prompt, "Markdown-formatted priority report")
+            call["usage"] = _usage(result, prompt, str(result))
+        tenant_limiter.record(sum(call["usage"].values()))
         return str(result)
     except Exception as e:
         logger.error(f"Failed to generate report with LLM: {e}")
-        report = "# Weekly Feedback Priority Report\n\n"
-        report += "## Top 5 Action Items\n\n"
-
-        for i, item in enumerate(sorted_feedback, 1):
-            priority_score = item.get('priority_score') or 0
-            urgency = item.get('urgency') or 0
-            impact = item.get('impact') or 0
-            theme = item.get('theme') or 'Unknown Theme'
-            summary = item.get('summary') or item.get('text') or 'No summary'
-            justification = item.get('justification') or 'No justification'
-
-            report += f"### {i}. {theme}\n\n"
-            report += f"**Priority Score:** {priority_score:.2f}\n\n"
-            report += f"**Urgency:** {urgency}/10 | **Impact:** {impact}/10\n\n"
-            report += f"**Feedback:** {summary}\n\n"
-            report += f"**Justification:** {justification}\n\n"
-            report += "---\n\n"
-
-        return report
+        return _build_mock_report(sorted_feedback, trends, clusters, theme_summaries)
+
+
+def stream_priority_report(feedback_list: List[Dict[str, Any]], trends: Optional[Dict[str, Any]] = None,
+                           clusters: Optional[List[Dict[str, Any]]] = None,
+                           theme_summaries: Optional[List[Dict[str, Any]]] = None) -> Iterator[str]:
+    """Yield the priority report in chunks as the model produces them.
+
+    Talks to the chat model directly rather than through a crew, because crews
+    only return the finished answer. Falls back to the mock report when no LLM
+    is configured or the model fails before sending anything; a failure after
+    the first chunk is re-raised so callers don't keep a truncated report.
+    """
+    logger.info("Streaming priority report")
+
+    if not feedback_list:
+        yield EMPTY_REPORT
+        return
+
+    sorted_feedback = _top_feedback(feedback_list)
+
+    llm, tier = _report_llm()
+    if llm is None:
+        for line in _build_mock_report(sorted_feedback, trends, clusters, theme_summaries).splitlines(keepends=True):
+            yield line
+        return
+
+    prompt_items, saved_tokens = _compact_report_items(sorted_feedback)
+    messages = [
+        ("system", f"You are a Priority Strategist. {PRIORITIZER_BACKSTORY}"),
+        ("human", _build_report_prompt(prompt_items, trends, clusters, theme_summaries)),
+    ]
+    prompt = "\n".join(content for _, content in messages)
+    started = False
+    streamed: List[str] = []
+    try:
+        with tenant_limiter.llm_slot(), get_usage_ledger().track(
+                "report", llm, prompt, source="report", tier=tier, saved_tokens=saved_tokens) as call:
+            try:
+                for chunk in llm.stream(messages):
+                    text = getattr(chunk, "content", chunk)
+                    if text:
+                        started = True
+                        streamed.append(text)
+                        yield text
+            finally:
+                # Streams report no usage, so it is estimated from the text, including a stream cut short.
+                call["usage"] = token_usage(prompt, "".join(streamed))
+        tenant_limiter.record(sum(call["usage"].values()))
+    except Exception as e:
+        if started:
+            logger.error(f"Report stream failed midway: {e}")
+            raise
+        logger.error(f"Failed to stream report with LLM: {e}")
+        yield _build_mock_report(sorted_feedback, trends, clusters, theme_summaries)
+
+
+def summarize_feedback_group(group: Dict[str, Any], llm, tier: str) -> str:
+    """One map step of a map-reduce report: a short summary of ``group`` written by ``llm``."""
+    agent = create_prioritizer_agent(llm)
+    prompt_items, saved_tokens = _compact_report_items(group["sample"])
+    prompt = _build_group_prompt({**group, "sample": prompt_items})
+    with tenant_limiter.llm_slot(), get_usage_ledger().track(
+            "report_map", llm, prompt, source="report", tier=tier, saved_tokens=saved_tokens) as call:
+        result = _kickoff(agent, prompt, "A summary of the feedback group in at most 80 words")
+        call["usage"] = _usage(result, prompt, str(result))
+    tenant_limiter.record(sum(call["usage"].values()))
+    return str(result).strip()
@@ -0,0 +1,342 @@
+import argparse
+import bisect
+import csv
+import itertools
+import json
+import logging
+import random
+import string
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+THEMES = ["Product/Features", "Performance", "UX/UI", "Pricing", "Service", "Other"]
+SENTIMENTS = ["positive", "neutral", "negative"]
+SOURCES = ["email", "support", "survey", "pricing_inquiry", "app_store", "chat"]
+
+# Sentence templates per (theme, sentiment). Placeholders are filled from SLOTS.
+TEMPLATES: Dict[str, Dict[str, List[str]]] = {
+    "Product/Features": {
+        "positive": [
+            "The new {feature} feature is fantastic! Makes my work so much easier.",
+            "Love the {feature}, it saves our team hours every week.",
+            "The integration with {integration} works perfectly.",
+        ],
+        "neutral": [
+            "Feature request: please add {feature}.",
+            "Would love to see more customization options for {feature}.",
+            "Can you add {feature}? We have a few users asking for it.",
+        ],
+        "negative": [
+            "The {feature} feature is missing basic options we need.",
+            "We can't use {feature} because it doesn't support {integration}.",
+            "The {feature} was removed in the last update and our workflow is broken.",
+        ],
+    },
+    "Performance": {
+        "positive": [
+            "Performance has improved significantly after the last update. Thank you!",
+            "The {page} page loads instantly now.",
+        ],
+        "neutral": [
+            "The {page} page sometimes takes a few seconds to load.",
+            "Exports of large datasets are a bit slow but they finish.",
+        ],
+        "negative": [
+            "App crashes when I try to export large datasets. Very frustrating.",
+            "The {platform} app is too slow. Takes forever to load the {page} page.",
+            "Website is down frequently. This is affecting our business operations.",
+            "Timeouts on the {page} page every morning, we lose {amount} minutes a day.",
+        ],
+    },
+    "UX/UI": {
+        "positive": [
+            "Love the recent UI update, the {page} page is much cleaner.",
+            "Navigation on {platform} is intuitive and easy to learn.",
+        ],
+        "neutral": [
+            "The color scheme could be more accessible.",
+            "It took a while to find the {feature} settings.",
+        ],
+        "negative": [
+            "The onboarding process was confusing. Took me hours to set up.",
+            "Buttons on the {page} page are too small on {platform}.",
+            "The new layout hides {feature} behind three menus.",
+        ],
+    },
+    "Pricing": {
+        "positive": [
+            "Great value for the price, the annual plan is worth it.",
+            "The new {plan} plan fits our budget perfectly.",
+        ],
+        "neutral": [
+            "Would appreciate a discount for annual plans.",
+            "Is there a non-profit discount for the {plan} plan?",
+        ],
+        "negative": [
+            "Pricing seems high compared to competitors.",
+            "We were charged twice for the {plan} plan this month.",
+            "The price increase of {amount}% is hard to justify.",
+        ],
+    },
+    "Service": {
+        "positive": [
+            "Customer support responded within minutes. Great experience!",
+            "{agent} from support solved our issue on the first call.",
+        ],
+        "neutral": [
+            "Support answered after a day, which was fine for our case.",
+            "Documentation for {feature} could be more detailed.",
+        ],
+        "negative": [
+            "Support has not replied to my ticket for {amount} days.",
+            "Found a bug in the payment processing and support keeps closing the ticket.",
+            "Nobody at support could explain why {feature} stopped working.",
+        ],
+    },
+    "Other": {
+        "positive": [
+            "Overall great product, keep it up!",
+            "Thanks to the whole team for the hard work.",
+        ],
+        "neutral": [
+            "Just checking whether there is a public roadmap.",
+            "Can you add multi-language support? We have international users.",
+        ],
+        "negative": [
+            "Not happy with the direction of the product lately.",
+            "I am thinking about cancelling our subscription.",
+        ],
+    },
+}
+
+SLOTS: Dict[str, List[str]] = {
+    "feature": ["dashboard", "dark mode", "report export", "bulk upload", "notifications",
+                "search", "API access", "calendar sync", "audit log", "SSO"],
+    "integration": ["Slack", "Notion", "Jira", "Salesforce", "Zapier", "Google Sheets"],
+    "page": ["dashboard", "reports", "settings", "billing", "login", "analytics"],
+    "platform": ["mobile", "iOS", "Android", "desktop", "web"],
+    "plan": ["Starter", "Pro", "Team", "Enterprise"],
+    "agent": ["Priya", "Sam", "Alex", "Maria", "Jordan"],
+    "amount": ["5", "10", "15", "20", "30", "45"],
+}
+
+# Filler sentences used to stretch items to the requested length.
+FILLER = [
+    "We have been customers for {amount} months.",
+    "Our team uses it every day on {platform}.",
+    "This happens mostly when we use the {page} page.",
+    "Let me know if you need more details.",
+    "I already tried clearing the cache and logging in again.",
+    "Several colleagues reported the same thing.",
+    "It would really help our workflow with {integration}.",
+]
+
+LENGTH_PROFILES = {
+    "short": (0, 0),
+    "medium": (1, 3),
+    "long": (4, 12),
+}
+
+
+def _slot_keys(template: str) -> Tuple[str, ...]:
+    return tuple(field for _, field, _, _ in string.Formatter().parse(template) if field)
+
+
+TEMPLATE_SLOTS: Dict[str, Tuple[str, ...]] = {
+    template: _slot_keys(template)
+    for template in itertools.chain(
+        FILLER, *(texts for by_sentiment in TEMPLATES.values() for texts in by_sentiment.values())
+    )
+}
+
+
+def parse_mix(spec: Optional[str], labels: List[str]) -> Dict[str, float]:
+    """Parse a ``name=weight,name=weight`` spec; unlisted labels keep weight 1."""
+    weights = {label: 1.0 for label in labels}
+    if not spec:
+        return weights
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip()
+        if name not in weights:
+            raise ValueError(f"Unknown label '{name}', expected one of {labels}")
+        weights[name] = float(value) if value else 1.0
+    if sum(weights.values()) <= 0:
+        raise ValueError("Mix weights must not all be zero")
+    return weights
+
+
+class FeedbackGenerator:
+    def __init__(
+        self,
+        seed: int = 42,
+        theme_mix: Optional[Dict[str, float]] = None,
+        sentiment_mix: Optional[Dict[str, float]] = None,
+        source_mix: Optional[Dict[str, float]] = None,
+        length_mix: Optional[Dict[str, float]] = None,
+        duplicate_rate: float = 0.05,
+        days: int = 90,
+        end: Optional[datetime] = None,
+    ):
+        if not 0 <= duplicate_rate < 1:
+            raise ValueError("duplicate_rate must be in [0, 1)")
+        self.rng = random.Random(seed)
+        theme_mix = theme_mix or parse_mix(None, THEMES)
+        sentiment_mix = sentiment_mix or parse_mix(None, SENTIMENTS)
+        source_mix = source_mix or parse_mix(None, SOURCES)
+        length_mix = length_mix or {"short": 0.5, "medium": 0.4, "long": 0.1}
+        self.themes, self.theme_weights = self._cumulative(theme_mix)
+        self.sentiments, self.sentiment_weights = self._cumulative(sentiment_mix)
+        self.sources, self.source_weights = self._cumulative(source_mix)
+        self.lengths, self.length_weights = self._cumulative(length_mix)
+        self.duplicate_rate = duplicate_rate
+        self.end = end or datetime.now().replace(microsecond=0)
+        self.span_seconds = max(days, 1) * 86400
+        self._recent: List[Dict[str, str]] = []
+
+    @staticmethod
+    def _cumulative(mix: Dict[str, float]) -> Tuple[List[str], List[float]]:
+        return list(mix), list(itertools.accumulate(mix.values()))
+
+    def _pick(self, labels: Sequence[str], cum_weights: List[float]) -> str:
+        # Same result as rng.choices(labels, cum_weights=...) without its per-call overhead.
+        return labels[bisect.bisect(cum_weights, self.rng.random() * cum_weights[-1], 0, len(labels) - 1)]
+
+    def _fill(self, template: str) -> str:
+        keys = TEMPLATE_SLOTS[template]
+        if not keys:
+            return template
+        rng = self.rng
+        return template.format(**{key: rng.choice(SLOTS[key]) for key in keys})
+
+    def _text(self, theme: str, sentiment: str) -> str:
+        rng = self.rng
+        low, high = LENGTH_PROFILES[self._pick(self.lengths, self.length_weights)]
+        parts = [self._fill(rng.choice(TEMPLATES[theme][sentiment]))]
+        for _ in range(rng.randint(low, high) if high else 0):
+            parts.append(self._fill(rng.choice(FILLER)))
+        return " ".join(parts)
+
+    def _created_at(self) -> str:
+        offset = timedelta(seconds=self.rng.randrange(self.span_seconds))
+        return (self.end - offset).strftime("%Y-%m-%d %H:%M:%S")
+
+    def row(self) -> Dict[str, str]:
+        rng = self.rng
+        if self._recent and rng.random() < self.duplicate_rate:
+            # Re-send a recent item, as retrying clients and re-imported exports do.
+            original = rng.choice(self._recent)
+            return {**original, "created_at": self._created_at()}
+
+        theme = self._pick(self.themes, self.theme_weights)
+        sentiment = self._pick(self.sentiments, self.sentiment_weights)
+        row = {
+            "text": self._text(theme, sentiment),
+            "source": self._pick(self.sources, self.source_weights),
+            "created_at": self._created_at(),
+            "sentiment": sentiment,
+            "theme": theme,
+        }
+        if len(self._recent) < 1000:
+            self._recent.append(row)
+        else:
+            self._recent[rng.randrange(1000)] = row
+        return row
+
+    def rows(self, count: int) -> Iterator[Dict[str, str]]:
+        for _ in range(count):
+            yield self.row()
+
+
+def write_csv(rows: Iterator[Dict[str, str]], out: TextIO, with_labels: bool = False) -> int:
+    fields = ["text", "source", "created_at"] + (["sentiment", "theme"] if with_labels else [])
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_ndjson(rows: Iterator[Dict[str, str]], out: TextIO, with_labels: bool = False) -> int:
+    count = 0
+    for row in rows:
+        if not with_labels:
+            row = {"text": row["text"], "source": row["source"], "created_at": row["created_at"]}
+        out.write(json.dumps(row, ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def seed_db(rows: Iterator[Dict[str, str]], with_labels: bool = False, batch_size: int = 10000) -> int:
+    from backend.db import init_db, insert_feedback_bulk
+
+    init_db()
+    total = 0
+    batch = []
+    for row in rows:
+        if not with_labels:
+            row = {**row, "sentiment": None, "theme": None}
+        batch.append(row)
+        if len(batch) >= batch_size:
+            total += insert_feedback_bulk(batch)
+            batch = []
+    if batch:
+        total += insert_feedback_bulk(batch)
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic customer feedback corpus")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of rows to generate")
+    parser.add_argument("--format", choices=["csv", "ndjson", "db"], default="csv")
+    parser.add_argument("--output", default="-", help="Output file for csv/ndjson ('-' for stdout)")
+    parser.add_argument("--db-path", help="SQLite file to seed with --format db (defaults to DB_PATH)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--themes", help="Theme mix, e.g. 'Performance=3,Pricing=1'")
+    parser.add_argument("--sentiments", help="Sentiment mix, e.g. 'negative=2,positive=1'")
+    parser.add_argument("--sources", help="Source mix, e.g. 'support=5,email=2'")
+    parser.add_argument("--lengths", help="Length mix over short/medium/long, e.g. 'short=1,long=1'")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--days", type=int, default=90, help="Spread created_at over this many days")
+    parser.add_argument("--with-labels", action="store_true",
+                        help="Include ground-truth sentiment/theme (and store them with --format db)")
+    args = parser.parse_args(argv)
+
+    generator = FeedbackGenerator(
+        seed=args.seed,
+        theme_mix=parse_mix(args.themes, THEMES),
+        sentiment_mix=parse_mix(args.sentiments, SENTIMENTS),
+        source_mix=parse_mix(args.sources, SOURCES),
+        length_mix=parse_mix(args.lengths, list(LENGTH_PROFILES)),
+        duplicate_rate=args.duplicate_rate,
+        days=args.days,
+    )
+    rows = generator.rows(args.rows)
+
+    if args.format == "db":
+        if args.db_path:
+            import backend.db as db_module
+            db_module.DB_PATH = args.db_path
+        count = seed_db(rows, with_labels=args.with_labels)
+    else:
+        writer = write_csv if args.format == "csv" else write_ndjson
+        if args.output == "-":
+            count = writer(rows, sys.stdout, args.with_labels)
+        else:
+            with open(args.output, "w", newline="", encoding="utf-8") as out:
+                count = writer(rows, out, args.with_labels)
+
+    print(f"Generated {count} feedback rows", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
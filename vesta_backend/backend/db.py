@@ -1,161 +1,419 @@
-import sqlite3
+import os
 import logging
-from contextlib import contextmanager
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional, Dict, Any, Iterable, Iterator, Tuple
+from backend.report_cache import LatestReportCache
+from backend.response_cache import ResponseCache
+from backend.storage import FeedbackRepository, create_repository
+from backend.storage.base import FEEDBACK_LISTING_COLUMNS
+from backend.tenancy import configured_tenants, current_tenant
+from backend.usage import UsageLedger
+
+if TYPE_CHECKING:
+    from backend.change_feed import ChangeFeed
+    from backend.similarity import SimilarityIndex
+    from backend.snapshot import FeedbackSnapshot
 
 logger = logging.getLogger(__name__)
 
+# SQLite file used when DATABASE_URL is not set. Tests and CLIs override it at runtime.
 DB_PATH = "customer_feedback.db"
 
+# Caches holding one tenant's data are keyed by (database, tenant); see _tenant_key().
+_repositories: Dict[str, FeedbackRepository] = {}
+_snapshots: Dict[Tuple[str, Optional[str]], "FeedbackSnapshot"] = {}
+_similarity_indexes: Dict[str, "SimilarityIndex"] = {}
+_report_caches: Dict[Tuple[str, Optional[str]], LatestReportCache] = {}
+_response_caches: Dict[Tuple[str, Optional[str]], ResponseCache] = {}
+_change_feeds: Dict[str, "ChangeFeed"] = {}
+_usage_ledgers: Dict[str, UsageLedger] = {}
+_repositories_lock = threading.Lock()
 
-@contextmanager
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+
+def _target() -> str:
+    return os.getenv("DATABASE_URL") or DB_PATH
+
+
+def _tenant_key() -> Tuple[str, Optional[str]]:
+    return _target(), current_tenant()
+
+
+def get_repository() -> FeedbackRepository:
+    """Return the storage backend for DATABASE_URL, or the SQLite file at DB_PATH."""
+    target = _target()
+    repository = _repositories.get(target)
+    if repository is None:
+        with _repositories_lock:
+            repository = _repositories.get(target)
+            if repository is None:
+                repository = create_repository(target)
+                _repositories[target] = repository
+                logger.info(f"Using {repository.name} storage backend")
+    return repository
+
+
+def close_repositories():
+    with _repositories_lock:
+        # Ledgers write their last batch before the connections go.
+        for ledger in _usage_ledgers.values():
+            ledger.close()
+        _usage_ledgers.clear()
+        for repository in _repositories.values():
+            repository.close()
+        _repositories.clear()
+        _snapshots.clear()
+        _similarity_indexes.clear()
+        _report_caches.clear()
+        _response_caches.clear()
+        _change_feeds.clear()
+
+
+def analytics_snapshot_enabled() -> bool:
+    return os.getenv("ANALYTICS_SNAPSHOT", "false").lower() == "true"
+
+
+def get_analytics_snapshot() -> Optional["FeedbackSnapshot"]:
+    """The in-process columnar snapshot for the current database, when ANALYTICS_SNAPSHOT is on.
+
+    It is loaded on first use and then caught up from change_log before each read.
+    Each tenant has its own snapshot holding only its rows.
+    """
+    if not analytics_snapshot_enabled():
+        return None
+    key = _tenant_key()
+    snapshot = _snapshots.get(key)
+    if snapshot is None:
+        # NumPy is only imported when the snapshot is switched on.
+        from backend.snapshot import FeedbackSnapshot
+        with _repositories_lock:
+            snapshot = _snapshots.get(key)
+            if snapshot is None:
+                snapshot = FeedbackSnapshot(get_repository())
+                _snapshots[key] = snapshot
+    snapshot.refresh()
+    return snapshot
+
+
+def similarity_index_path() -> str:
+    """Where the similarity index is saved: next to the SQLite file unless SIMILARITY_INDEX_PATH is set."""
+    default = "similarity_index.npz" if os.getenv("DATABASE_URL") else f"{DB_PATH}.similar.npz"
+    return os.getenv("SIMILARITY_INDEX_PATH") or default
+
+
+def get_similarity_index() -> "SimilarityIndex":
+    """The nearest-neighbour index for the current database, loaded (or built) on first use."""
+    target = _target()
+    index = _similarity_indexes.get(target)
+    if index is None:
+        from backend.similarity import SimilarityIndex
+        with _repositories_lock:
+            index = _similarity_indexes.get(target)
+            if index is None:
+                index = SimilarityIndex(get_repository(), similarity_index_path())
+                index.load()
+                _similarity_indexes[target] = index
+    return index
+
+
+def _sync_similarity_index():
+    # Only an index this process has loaded is updated here; others catch up from change_log.
+    index = _similarity_indexes.get(_target())
+    if index is None:
+        return
     try:
-        yield conn
-        conn.commit()
+        index.refresh(force=True)
     except Exception as e:
-        conn.rollback()
-        logger.error(f"Database error: {e}")
-        raise
-    finally:
-        conn.close()
+        logger.error(f"Error updating similarity index: {e}")
+
+
+def find_similar_feedback(feedback_id: int, k: int = 10) -> List[Dict[str, Any]]:
+    """The ``k`` items of the current tenant closest in meaning to ``feedback_id``, with their cosine similarity.
+
+    The index is shared by all tenants, so neighbours from other tenants are
+    dropped and more are fetched until ``k`` remain or the index runs out.
+    """
+    index = get_similarity_index()
+    fetch = k
+    while True:
+        neighbours = index.similar(feedback_id, fetch)
+        similarity = dict(neighbours)
+        rows = get_repository().get_feedback_by_ids([feedback_id for feedback_id, _ in neighbours])
+        if len(rows) >= k or len(neighbours) < fetch or fetch >= len(index):
+            break
+        fetch *= 4
+    return [{**row, "similarity": similarity[row["id"]]} for row in rows[:k]]
+
+
+def get_db():
+    return get_repository().connection()
 
 
 def init_db():
     logger.info("Initializing database...")
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS feedback (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                text TEXT NOT NULL,
-                source TEXT DEFAULT 'manual',
-                sentiment TEXT,
-                theme TEXT,
-                summary TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS scores (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                feedback_id INTEGER NOT NULL,
-                urgency INTEGER NOT NULL,
-                impact INTEGER NOT NULL,
-                justification TEXT NOT NULL,
-                priority_score REAL NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (feedback_id) REFERENCES feedback (id)
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS reports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                markdown_report TEXT NOT NULL
+    get_repository().init_db()
+    logger.info("Database initialized successfully")
+
+
+def get_response_cache() -> ResponseCache:
+    """Serialized read responses for the current database and tenant, versioned by the change_log watermark."""
+    key = _tenant_key()
+    cache = _response_caches.get(key)
+    if cache is None:
+        repository = get_repository()
+        with _repositories_lock:
+            cache = _response_caches.setdefault(
+                key, ResponseCache(repository.get_change_watermark, tenant=key[1])
             )
-        """)
-        
-        logger.info("Database initialized successfully")
+    return cache
+
+
+def _invalidate_response_cache():
+    # Other tenants' responses are unaffected; a cross-tenant write invalidates them all.
+    target, tenant = _tenant_key()
+    for (cache_target, cache_tenant), cache in list(_response_caches.items()):
+        if cache_target == target and (tenant is None or cache_tenant == tenant):
+            cache.invalidate()
 
 
 def insert_feedback(text: str, source: str = "manual") -> int:
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO feedback (text, source) VALUES (?, ?)",
-            (text, source)
-        )
-        return cursor.lastrowid
+    feedback_id = get_repository().insert_feedback(text, source)
+    _invalidate_response_cache()
+    _sync_similarity_index()
+    return feedback_id
+
+
+def insert_feedback_once(text: str, source: str = "manual", idempotency_key: Optional[str] = None,
+                         external_id: Optional[str] = None) -> Tuple[int, bool]:
+    """Insert unless the idempotency key or (source, external id) was seen before; returns (id, created)."""
+    feedback_id, created = get_repository().insert_feedback_once(text, source, idempotency_key, external_id)
+    if created:
+        _invalidate_response_cache()
+        _sync_similarity_index()
+    return feedback_id, created
+
+
+def insert_feedback_bulk(rows: Iterable[Dict[str, Any]]) -> int:
+    """Insert many feedback rows in one transaction; missing columns use the table defaults."""
+    inserted = get_repository().insert_feedback_bulk(rows)
+    _invalidate_response_cache()
+    _sync_similarity_index()
+    return inserted
+
+
+def update_feedback_classification(feedback_id: int, sentiment: str, theme: str, summary: str,
+                                   label_source: Optional[str] = None):
+    """``label_source`` is 'llm' or 'local', whichever produced the sentiment and theme."""
+    get_repository().update_feedback_classification(feedback_id, sentiment, theme, summary, label_source)
+    _invalidate_response_cache()
+
 
+def insert_score(feedback_id: int, urgency: int, impact: int, justification: str, priority_score: float) -> int:
+    """Store a new score version as the item's current score; earlier versions stay in score_history."""
+    score_id = get_repository().insert_score(feedback_id, urgency, impact, justification, priority_score)
+    _invalidate_response_cache()
+    return score_id
 
-def update_feedback_classification(feedback_id: int, sentiment: str, theme: str, summary: str):
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE feedback SET sentiment = ?, theme = ?, summary = ? WHERE id = ?",
-            (sentiment, theme, summary, feedback_id)
-        )
 
+def get_score_history(feedback_id: int) -> List[Dict[str, Any]]:
+    return get_repository().get_score_history(feedback_id)
 
-def insert_score(feedback_id: int, urgency: int, impact: int, justification: str, priority_score: float):
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO scores (feedback_id, urgency, impact, justification, priority_score) VALUES (?, ?, ?, ?, ?)",
-            (feedback_id, urgency, impact, justification, priority_score)
-        )
+
+def get_priority_drift(since: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    return get_repository().get_priority_drift(since, limit)
+
+
+def get_top_feedback(limit: int = 5, **filters) -> List[Dict[str, Any]]:
+    """Highest-priority scored feedback; filters are theme, sentiment, source, min_priority and since."""
+    snapshot = get_analytics_snapshot()
+    if snapshot is not None:
+        return get_repository().get_feedback_by_ids(snapshot.top_k(limit, **filters))
+    return get_repository().get_top_feedback(limit, **filters)
+
+
+def get_feedback_stats(**filters) -> Dict[str, Any]:
+    """Counts and mean scores overall and per theme, sentiment and source."""
+    snapshot = get_analytics_snapshot()
+    if snapshot is not None:
+        return snapshot.stats(**filters)
+    return get_repository().feedback_stats(**filters)
+
+
+def get_clusters() -> List[Dict[str, Any]]:
+    """Sub-themes found by `python -m backend.themes`, largest first."""
+    return get_repository().get_clusters()
+
+
+def get_cluster_members(cluster_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+    return get_repository().get_cluster_members(cluster_id, limit)
+
+
+def iter_feedback_listing(batch_size: int = 5000) -> Iterator[List[tuple]]:
+    return get_repository().iter_feedback_listing(batch_size)
 
 
 def get_all_feedback() -> List[Dict[str, Any]]:
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                f.id, f.text, f.source, f.sentiment, f.theme, f.summary, f.created_at,
-                s.urgency, s.impact, s.justification, s.priority_score
-            FROM feedback f
-            LEFT JOIN scores s ON f.id = s.feedback_id
-            ORDER BY f.created_at DESC
-        """)
-        return [dict(row) for row in cursor.fetchall()]
+    return get_repository().get_all_feedback()
+
+
+def get_llm_labelled_feedback() -> List[Dict[str, Any]]:
+    return get_repository().get_llm_labelled_feedback()
+
+
+def get_trend_rows(since: str) -> List[tuple]:
+    """Columns for trend detection: (epoch, theme, sentiment, priority_score) since a UTC timestamp."""
+    return get_repository().get_trend_rows(since)
 
 
 def get_feedback_by_id(feedback_id: int) -> Optional[Dict[str, Any]]:
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                f.id, f.text, f.source, f.sentiment, f.theme, f.summary, f.created_at,
-                s.urgency, s.impact, s.justification, s.priority_score
-            FROM feedback f
-            LEFT JOIN scores s ON f.id = s.feedback_id
-            WHERE f.id = ?
-        """, (feedback_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
-
-
-def insert_report(markdown_report: str) -> int:
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO reports (markdown_report) VALUES (?)",
-            (markdown_report,)
-        )
-        return cursor.lastrowid
+    return get_repository().get_feedback_by_id(feedback_id)
+
+
+def insert_report(markdown_report: str, fingerprint: Optional[str] = None,
+                  top_items: Optional[List[Dict[str, Any]]] = None) -> int:
+    report_id = get_repository().insert_report(markdown_report, fingerprint, top_items)
+    get_latest_report_cache().invalidate()
+    _invalidate_response_cache()
+    return report_id
+
+
+def get_latest_report_cache() -> LatestReportCache:
+    """In-memory latest report for the current database and tenant, so dashboard polls skip the query."""
+    key = _tenant_key()
+    cache = _report_caches.get(key)
+    if cache is None:
+        repository = get_repository()
+        with _repositories_lock:
+            cache = _report_caches.setdefault(key, LatestReportCache(repository.get_latest_report))
+    return cache
+
+
+def get_tenants() -> List[str]:
+    """Tenants listed in TENANTS plus every tenant that has feedback."""
+    return sorted(set(configured_tenants()) | set(get_repository().list_tenants()))
 
 
 def get_latest_report() -> Optional[Dict[str, Any]]:
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT id, generated_at, markdown_report FROM reports ORDER BY generated_at DESC LIMIT 1"
-        )
-        row = cursor.fetchone()
-        return dict(row) if row else None
+    return get_repository().get_latest_report()
+
+
+def get_latest_report_state() -> Optional[Dict[str, Any]]:
+    return get_repository().get_latest_report_state()
+
+
+def get_report_summaries() -> Dict[str, Dict[str, Any]]:
+    return get_repository().get_report_summaries()
+
+
+def save_report_summaries(summaries: Iterable[Dict[str, Any]]):
+    get_repository().save_report_summaries(summaries)
 
 
 def get_all_reports() -> List[Dict[str, Any]]:
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT id, generated_at, markdown_report FROM reports ORDER BY generated_at DESC"
-        )
-        return [dict(row) for row in cursor.fetchall()]
+    return get_repository().get_all_reports()
+
+
+def get_change_watermark() -> int:
+    return get_repository().get_change_watermark()
+
+
+def get_changes(after_seq: int, limit: int = 10000, until_seq: Optional[int] = None) -> List[Dict[str, Any]]:
+    return get_repository().get_changes(after_seq, limit, until_seq)
+
+
+def get_change_feed() -> "ChangeFeed":
+    """The process-wide change feed for the current database, shared by every connected client."""
+    target = _target()
+    feed = _change_feeds.get(target)
+    if feed is None:
+        from backend.change_feed import ChangeFeed
+        repository = get_repository()
+        with _repositories_lock:
+            feed = _change_feeds.setdefault(target, ChangeFeed(repository))
+    return feed
+
+
+def get_usage_ledger() -> UsageLedger:
+    """The process-wide LLM usage ledger for the current database."""
+    target = _target()
+    ledger = _usage_ledgers.get(target)
+    if ledger is None:
+        repository = get_repository()
+        with _repositories_lock:
+            ledger = _usage_ledgers.setdefault(target, UsageLedger(repository))
+    return ledger
+
+
+def flush_usage():
+    """Write every ledger's buffered LLM calls now."""
+    for ledger in list(_usage_ledgers.values()):
+        ledger.flush()
 
 
+def get_llm_usage_summary(group_by: Iterable[str], since: Optional[str] = None,
+                          until: Optional[str] = None) -> List[Dict[str, Any]]:
+    return get_repository().llm_usage_summary(group_by, since, until)
+
 
 def delete_feedback(feedback_id: int) -> bool:
-    with get_db() as conn:
-        cursor = conn.cursor()
-        # Delete scores first due to foreign key constraint
-        cursor.execute("DELETE FROM scores WHERE feedback_id = ?", (feedback_id,))
-        # Delete feedback
-        cursor.execute("DELETE FROM feedback WHERE id = ?", (feedback_id,))
-        return cursor.rowcount > 0
+    deleted = get_repository().delete_feedback(feedback_id)
+    if deleted:
+        _invalidate_response_cache()
+        _sync_similarity_index()
+    return deleted
+
+
+def archive_dir() -> str:
+    """Where archived feedback partitions go: next to the SQLite file unless ARCHIVE_DIR is set."""
+    default = "archive" if os.getenv("DATABASE_URL") else f"{DB_PATH}.archive"
+    return os.getenv("ARCHIVE_DIR") or default
+
+
+def archive_feedback(before: str, write: Callable[[List[Dict[str, Any]]], None], limit: int = 5000) -> int:
+    """Move feedback created before ``before`` out of the live tables once ``write`` has stored it."""
+    moved = get_repository().archive_feedback(before, write, limit)
+    if moved:
+        _invalidate_response_cache()
+        _sync_similarity_index()
+    return moved
+
+
+def get_archived_stat_groups(start_month: Optional[str] = None, end_month: Optional[str] = None,
+                             **filters) -> List[Dict[str, Any]]:
+    return get_repository().archived_stat_groups(start_month, end_month, **filters)
+
+
+def get_archived_months() -> List[Dict[str, Any]]:
+    return get_repository().archived_months()
+
+
+def vacuum_database():
+    get_repository().vacuum()
+
+
+def enqueue_feedback(feedback_ids: Iterable[int], requeue: bool = True) -> int:
+    return get_repository().enqueue_feedback(feedback_ids, requeue)
+
+
+def claim_feedback(worker_id: str, limit: int, lease_seconds: float, max_attempts: int = 3) -> List[Dict[str, Any]]:
+    return get_repository().claim_feedback(worker_id, limit, lease_seconds, max_attempts, time.time())
+
+
+def complete_feedback(feedback_id: int, worker_id: str) -> bool:
+    return get_repository().complete_feedback(feedback_id, worker_id)
+
+
+def renew_lease(feedback_id: int, worker_id: str, lease_seconds: float) -> bool:
+    return get_repository().renew_lease(feedback_id, worker_id, lease_seconds, time.time())
+
+
+def fail_feedback(feedback_id: int, worker_id: str, error: str, max_attempts: int):
+    get_repository().fail_feedback(feedback_id, worker_id, error, max_attempts)
+
+
+def release_leases(worker_id: str, feedback_ids: Optional[Iterable[int]] = None) -> int:
+    return get_repository().release_leases(worker_id, feedback_ids)
+
+
+def get_queue_stats() -> Dict[str, int]:
+    return get_repository().queue_stats()
@@ -0,0 +1,89 @@
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Sequence
+
+import numpy as np
+
+# Bump the version whenever tokenization or projection changes: stored vectors
+# tagged with another model id are treated as missing and re-embedded.
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "128"))
+EMBEDDING_MODEL = f"hashed-ngrams-rp-v1-{EMBEDDING_DIM}"
+HASH_BUCKETS = 1 << 15
+EMBED_CHUNK = 256
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a about after again all also am an and any are as at be because been before being but by can could did do does
+doing for from had has have having he her here him his how i if in into is it its itself just me more most my
+no nor not of off on once only or other our out over own same she should so some such than that the their them
+then there these they this those through to too under until up very was we were what when where which while who
+why will with would you your yours i'm it's i've we're they're that's there's don't can't isn't doesn't won't
+really get got still even much many every one way thing things lot since please thanks thank
+""".split())
+
+
+@lru_cache(maxsize=1)
+def _projection() -> np.ndarray:
+    # A fixed seed keeps vectors comparable across processes and runs.
+    rng = np.random.default_rng(20240611)
+    return (rng.standard_normal((HASH_BUCKETS, EMBEDDING_DIM)) / np.sqrt(EMBEDDING_DIM)).astype(np.float32)
+
+
+@lru_cache(maxsize=1 << 20)
+def _bucket(term: str) -> int:
+    # crc32 rather than hash(): str hashes are salted per process.
+    return zlib.crc32(term.encode()) & (HASH_BUCKETS - 1)
+
+
+def terms(text: str) -> List[str]:
+    """Content unigrams and adjacent bigrams, the units that get embedded and used to name clusters."""
+    tokens = [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS and len(token) > 1]
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+def embed_texts(texts: Sequence[str]) -> np.ndarray:
+    """Unit-length float32 vectors: hashed n-gram counts, log-scaled, through a random projection.
+
+    Texts without any content terms get a zero vector.
+    """
+    if len(texts) <= EMBED_CHUNK:
+        return _embed_chunk(texts)
+    # Small chunks keep the gathered projection rows in cache.
+    return np.vstack([_embed_chunk(texts[start:start + EMBED_CHUNK]) for start in range(0, len(texts), EMBED_CHUNK)])
+
+
+def _embed_chunk(texts: Sequence[str]) -> np.ndarray:
+    vectors = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    docs: List[int] = []
+    buckets: List[int] = []
+    for doc, text in enumerate(texts):
+        text_buckets = [_bucket(term) for term in terms(text)]
+        buckets.extend(text_buckets)
+        docs.extend([doc] * len(text_buckets))
+    if not docs:
+        return vectors
+
+    # One key per (document, bucket); unique() sorts them by document and counts repeats.
+    keys, counts = np.unique(np.asarray(docs, dtype=np.int64) * HASH_BUCKETS + np.asarray(buckets), return_counts=True)
+    doc_index = keys // HASH_BUCKETS
+    rows = _projection()[keys % HASH_BUCKETS] * (1.0 + np.log(counts)).astype(np.float32)[:, None]
+    present, starts = np.unique(doc_index, return_index=True)
+    vectors[present] = np.add.reduceat(rows, starts, axis=0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    """Stored vectors are float16: half the space, and ample precision for cosine similarity."""
+    return np.asarray(vector, dtype=np.float16).tobytes()
+
+
+def from_bytes(blobs: Sequence[bytes]) -> np.ndarray:
+    if not blobs:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    return np.frombuffer(b"".join(bytes(blob) for blob in blobs), dtype=np.float16) \
+        .reshape(len(blobs), -1).astype(np.float32)
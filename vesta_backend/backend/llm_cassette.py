@@ -0,0 +1,265 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+from crewai.llms.base_llm import BaseLLM
+
+logger = logging.getLogger(__name__)
+
+# LLM_CASSETTE names the JSONL file of recorded calls; unset, calls go to the model as usual.
+# "record" calls the model and appends each call to the cassette; "replay" answers from it without a model.
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "replay").lower()
+# Replayed calls take "recorded" latency, or this many seconds each; either is multiplied by the scale.
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "recorded")
+LLM_REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0"))
+# Share of replayed calls that fail, and of answers cut off half-way (0-1).
+LLM_REPLAY_ERROR_RATE = float(os.getenv("LLM_REPLAY_ERROR_RATE", "0"))
+LLM_REPLAY_TRUNCATE_RATE = float(os.getenv("LLM_REPLAY_TRUNCATE_RATE", "0"))
+# Seed for the injected failures, so a replay is the same every run.
+LLM_REPLAY_SEED = int(os.getenv("LLM_REPLAY_SEED", "0"))
+
+
+class CassetteMiss(LookupError):
+    """The cassette has no recording of this request."""
+
+
+class InjectedLLMError(RuntimeError):
+    """A failure injected into a replayed call."""
+
+
+def _messages(messages: Any) -> List[List[str]]:
+    """Messages as ``[role, content]`` pairs, whichever client format they came in."""
+    if isinstance(messages, str):
+        return [["user", messages]]
+    pairs = []
+    for message in messages:
+        if isinstance(message, dict):
+            pairs.append([str(message.get("role")), str(message.get("content"))])
+        elif isinstance(message, (tuple, list)):
+            pairs.append([str(message[0]), str(message[1])])
+        else:
+            pairs.append([str(getattr(message, "type", "message")), str(getattr(message, "content", message))])
+    return pairs
+
+
+def request_key(kind: str, model: str, messages: Any, schema: Optional[str] = None) -> str:
+    material = {"kind": kind, "model": model, "schema": schema, "messages": _messages(messages)}
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Recorded LLM calls in a JSONL file, keyed by call kind, model and messages.
+
+    In record mode every completed call is appended as one line. In replay
+    mode the same request is answered from the recording; a request recorded
+    more than once gets its answers in turn. Replays sleep for the recorded
+    latency (or a fixed one) and fail or truncate a seeded share of calls, so
+    a benchmark or test sees realistic timing and the pipeline's error paths.
+    """
+
+    def __init__(self, path: str, mode: Optional[str] = None, latency: Optional[str] = None,
+                 latency_scale: Optional[float] = None, error_rate: Optional[float] = None,
+                 truncate_rate: Optional[float] = None, seed: Optional[int] = None):
+        self.path = path
+        self.mode = mode or LLM_CASSETTE_MODE
+        self.latency = latency or LLM_REPLAY_LATENCY
+        self.latency_scale = LLM_REPLAY_LATENCY_SCALE if latency_scale is None else latency_scale
+        self.error_rate = LLM_REPLAY_ERROR_RATE if error_rate is None else error_rate
+        self.truncate_rate = LLM_REPLAY_TRUNCATE_RATE if truncate_rate is None else truncate_rate
+        self.random = random.Random(LLM_REPLAY_SEED if seed is None else seed)
+        self.lock = threading.Lock()
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self.cursors: Dict[str, int] = {}
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0, "injected_errors": 0, "truncated": 0}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries.setdefault(entry["key"], []).append(entry)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def has_kind(self, kind: str, model: str) -> bool:
+        return any(entry["kind"] == kind and entry["model"] == model
+                   for entries in self.entries.values() for entry in entries)
+
+    def record(self, kind: str, model: str, messages: Any, latency: float, schema: Optional[str] = None,
+               **response):
+        """Append one completed call; ``response`` holds ``content`` or ``chunks`` and optional ``usage``."""
+        entry = {"key": request_key(kind, model, messages, schema), "kind": kind, "model": model, "schema": schema,
+                 "messages": _messages(messages), "latency": round(latency, 4), **response}
+        line = json.dumps(entry, ensure_ascii=False)
+        with self.lock:
+            self.entries.setdefault(entry["key"], []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.stats["recorded"] += 1
+
+    def play(self, kind: str, model: str, messages: Any, schema: Optional[str] = None) -> Dict[str, Any]:
+        """The next recorded answer to this request, after its latency; raises CassetteMiss or InjectedLLMError."""
+        key = request_key(kind, model, messages, schema)
+        with self.lock:
+            entries = self.entries.get(key)
+            if not entries:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"No recorded {kind} request to {model} matches this one in {self.path}")
+            position = self.cursors.get(key, 0)
+            self.cursors[key] = position + 1
+            entry = dict(entries[position % len(entries)])
+            fail = self.random.random() < self.error_rate
+            truncate = not fail and self.random.random() < self.truncate_rate
+            self.stats["injected_errors" if fail else "truncated" if truncate else "replayed"] += 1
+        entry["time_factor"] = self._time_factor(entry)
+        if kind != "stream":
+            time.sleep(entry["latency"] * entry["time_factor"])
+        if fail:
+            raise InjectedLLMError(f"Injected failure of a replayed {kind} request to {model}")
+        if truncate and entry.get("content"):
+            entry["content"] = entry["content"][:len(entry["content"]) // 2]
+        return entry
+
+    def _time_factor(self, entry: Dict[str, Any]) -> float:
+        """Multiplier from recorded to replayed time."""
+        if self.latency == "recorded":
+            return self.latency_scale
+        return float(self.latency) / max(entry["latency"], 1e-6) * self.latency_scale
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"path": self.path, "mode": self.mode, "requests": len(self.entries), **self.stats}
+
+
+class _StructuredRunnable:
+    """What ``with_structured_output`` returns: one ``invoke`` that records or replays."""
+
+    def __init__(self, llm: "CassetteLLM", schema, inner=None):
+        self.llm = llm
+        self.schema = schema
+        self.inner = inner
+
+    def invoke(self, messages):
+        cassette, model, name = self.llm.cassette, self.llm.model, self.schema.__name__
+        if self.inner is not None:
+            start = time.perf_counter()
+            result = self.inner.invoke(messages)
+            raw = result.get("raw")
+            cassette.record("structured", model, messages, time.perf_counter() - start, name,
+                            content=str(getattr(raw, "content", "") or ""),
+                            usage=dict(getattr(raw, "usage_metadata", None) or {}))
+            return result
+        entry = cassette.play("structured", model, messages, name)
+        try:
+            parsed = self.schema.model_validate_json(entry["content"])
+        except ValueError:
+            # Left to the caller's repair and parsing, as a malformed provider reply would be.
+            parsed = None
+        raw = SimpleNamespace(content=entry["content"], usage_metadata=entry.get("usage") or {})
+        return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+
+class CassetteLLM(BaseLLM):
+    """Chat model that records calls to ``inner`` in a cassette, or replays them when there is no ``inner``.
+
+    It stands in for the model wherever the pipeline uses one: as a crew
+    agent's LLM (``call``), for JSON-schema output (``with_structured_output``)
+    and for streamed reports (``stream``). Replayed crew calls report no token
+    usage, so the ledger estimates it from the text, as for streams.
+    """
+
+    cassette: Any = None
+    inner: Any = None
+    agent_llm: Any = None
+
+    def model_post_init(self, context: Any):
+        # BaseLLM's ``stream`` is a flag; the pipeline calls ``stream(messages)`` as on a chat model.
+        self.__dict__["stream"] = self._stream
+
+    def _effective_stream(self) -> bool:
+        return False
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        if self.inner is None:
+            return self.cassette.play("call", self.model, messages)["content"]
+        if self.agent_llm is None:
+            from crewai.utilities.llm_utils import create_llm
+            # What crewai would have built from the chat model had it been given to the agent directly.
+            self.agent_llm = create_llm(self.inner)
+        start = time.perf_counter()
+        content = self.agent_llm.call(messages, tools, callbacks, available_functions, from_task, from_agent,
+                                      response_model)
+        self.cassette.record("call", self.model, messages, time.perf_counter() - start, content=str(content))
+        return content
+
+    def with_structured_output(self, schema, **kwargs):
+        if self.inner is not None:
+            if not hasattr(self.inner, "with_structured_output"):
+                raise NotImplementedError(f"{type(self.inner).__name__} has no structured output")
+            return _StructuredRunnable(self, schema, self.inner.with_structured_output(schema, **kwargs))
+        if not self.cassette.has_kind("structured", self.model):
+            # Recorded through the agent path only; replay it the same way.
+            raise NotImplementedError(f"No structured output recorded for {self.model}")
+        return _StructuredRunnable(self, schema)
+
+    def _stream(self, messages) -> Iterator[Any]:
+        if self.inner is not None:
+            start = time.perf_counter()
+            first_chunk, chunks = None, []
+            for chunk in self.inner.stream(messages):
+                text = getattr(chunk, "content", chunk)
+                if text:
+                    first_chunk = time.perf_counter() - start if first_chunk is None else first_chunk
+                    chunks.append(text)
+                yield chunk
+            self.cassette.record("stream", self.model, messages, time.perf_counter() - start,
+                                 chunks=chunks, first_chunk=round(first_chunk or 0.0, 4))
+            return
+        entry = self.cassette.play("stream", self.model, messages)
+        chunks, factor = entry["chunks"], entry["time_factor"]
+        time.sleep(entry.get("first_chunk", 0.0) * factor)
+        gap = (entry["latency"] - entry.get("first_chunk", 0.0)) / max(1, len(chunks) - 1) * factor
+        for i, text in enumerate(chunks):
+            if i:
+                time.sleep(gap)
+            yield SimpleNamespace(content=text)
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: Optional[str] = None) -> Optional[Cassette]:
+    """The cassette at ``path`` (LLM_CASSETTE by default), loaded once per process; None when unset."""
+    path = path or os.getenv("LLM_CASSETTE")
+    if not path:
+        return None
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path)
+            logger.info(f"LLM cassette {path} in {_cassettes[path].mode} mode")
+        return _cassettes[path]
+
+
+def wrap_llm(model_name: str, llm=None):
+    """``llm`` wrapped to record into the configured cassette, or a replaying stand-in when replaying.
+
+    Returns ``llm`` unchanged when no cassette is configured.
+    """
+    cassette = get_cassette()
+    if cassette is None:
+        return llm
+    if cassette.recording:
+        return CassetteLLM(model=model_name, cassette=cassette, inner=llm) if llm is not None else None
+    return CassetteLLM(model=model_name, cassette=cassette)
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from backend.usage import token_usage
+
+logger = logging.getLogger(__name__)
+
+Model = TypeVar("Model", bound=BaseModel)
+
+CLOSERS = {"{": "}", "[": "]"}
+
+# How an answer was obtained, best first.
+OUTCOMES = ("structured", "clean", "extracted", "repaired", "failed")
+
+
+class LLMOutputError(ValueError):
+    """Raised when an LLM response cannot be parsed into the expected schema."""
+
+
+class ParseStats:
+    """Thread-safe parse outcome counters per output schema, exposed through /metrics/llm-parsing."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._schemas: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, schema: str, outcome: str, detail: Optional[str] = None):
+        with self._lock:
+            stats = self._schemas.setdefault(schema, {
+                **{name: 0 for name in OUTCOMES}, "repairs": {}, "failures": {},
+            })
+            stats[outcome] += 1
+            if detail:
+                bucket = stats["failures" if outcome == "failed" else "repairs"]
+                bucket[detail] = bucket.get(detail, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            schemas = {}
+            for schema, stats in self._schemas.items():
+                attempts = sum(stats[name] for name in OUTCOMES)
+                schemas[schema] = {
+                    "attempts": attempts,
+                    **{name: stats[name] for name in OUTCOMES},
+                    "failure_rate": round(stats["failed"] / (attempts or 1), 4),
+                    "repair_rate": round(stats["repaired"] / (attempts or 1), 4),
+                    "repairs": dict(stats["repairs"]),
+                    "failures": dict(stats["failures"]),
+                }
+            return {"schemas": schemas}
+
+
+parse_stats = ParseStats()
+
+
+def get_parse_stats() -> Dict[str, Any]:
+    return parse_stats.snapshot()
+
+
+def _json_start(text: str) -> int:
+    # Prefer an object inside a ```json fence; otherwise the first brace anywhere.
+    fence = text.find("```json")
+    if fence >= 0:
+        start = text.find("{", fence)
+        if start >= 0:
+            return start
+    return text.find("{")
+
+
+def repair_json(text: str) -> Tuple[Optional[str], List[str]]:
+    """Extract the first JSON object from ``text`` in one pass, fixing what it can.
+
+    Handles prose or code fences around the object, trailing commas, raw
+    newlines inside strings and truncation: open strings and containers are
+    closed, and a member cut off mid-way is dropped back to the last complete
+    one. Returns ``(json_text, repairs)``; json_text is None when there is no
+    object to extract.
+    """
+    start = _json_start(text)
+    if start < 0:
+        return None, []
+    out: List[str] = []
+    stack: List[str] = []
+    repairs: List[str] = []
+    # (length of out, open containers) after each complete member, for truncated output.
+    safe_points: List[Tuple[int, Tuple[str, ...]]] = []
+    in_string = escaped = False
+    complete = False
+
+    for char in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char in "\n\r\t":
+                char = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}[char]
+                if "control_character" not in repairs:
+                    repairs.append("control_character")
+            out.append(char)
+            continue
+        if char == '"':
+            in_string = True
+        elif char in CLOSERS:
+            stack.append(char)
+        elif char in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+                repairs.append("trailing_comma")
+            if not stack:
+                break
+            char = CLOSERS[stack.pop()]
+            if not stack:
+                out.append(char)
+                complete = True
+                break
+        elif char == ",":
+            safe_points.append((len(out), tuple(stack)))
+        out.append(char)
+
+    if complete:
+        return "".join(out), repairs
+
+    repairs.append("truncated")
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    candidate = "".join(out).rstrip().rstrip(",:") + "".join(CLOSERS[c] for c in reversed(stack))
+    try:
+        json.loads(candidate)
+        return candidate, repairs
+    except json.JSONDecodeError:
+        pass
+    # The last member was cut off part-way (a key, a half literal): drop it.
+    for length, open_containers in reversed(safe_points):
+        candidate = "".join(out[:length]) + "".join(CLOSERS[c] for c in reversed(open_containers))
+        try:
+            json.loads(candidate)
+            return candidate, repairs
+        except json.JSONDecodeError:
+            continue
+    return "".join(out[:1]) + "}", repairs
+
+
+def parse_output(text: str, schema: Type[Model], name: str) -> Model:
+    """Parse an LLM answer into ``schema``, trying plain JSON first and repairs only when needed.
+
+    Every call records its outcome in ``parse_stats`` under ``name``. Raises
+    LLMOutputError when no valid object can be recovered.
+    """
+    stripped = text.strip()
+    outcome, detail = "clean", None
+    try:
+        data = json.loads(stripped)
+    except json.JSONDecodeError:
+        extracted, repairs = repair_json(stripped)
+        if extracted is None:
+            parse_stats.record(name, "failed", "no_json")
+            raise LLMOutputError(f"No JSON object in {name} response: {text[:200]!r}")
+        outcome = "repaired" if repairs else "extracted"
+        detail = ",".join(repairs) or None
+        try:
+            data = json.loads(extracted)
+        except json.JSONDecodeError as e:
+            parse_stats.record(name, "failed", "invalid_json")
+            raise LLMOutputError(f"Invalid JSON in {name} response: {text[:200]!r}") from e
+    try:
+        parsed = schema.model_validate(data)
+    except ValidationError as e:
+        parse_stats.record(name, "failed", "schema")
+        raise LLMOutputError(f"{name} response does not match the schema: {e}") from e
+    parse_stats.record(name, outcome, detail)
+    return parsed
+
+
+def structured_output_enabled() -> bool:
+    return os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+
+# Models that rejected JSON-schema mode; they go straight to the agent path afterwards.
+_unsupported_models = set()
+
+
+def invoke_structured(llm, prompt: str, schema: Type[Model], name: str) -> Optional[Tuple[Model, Dict[str, int]]]:
+    """Ask the chat model for ``schema`` directly using its JSON-schema output mode.
+
+    Returns ``(parsed, usage)`` with the prompt and completion tokens, or None when the client or provider has no
+    such mode, so the caller can fall back to the agent and text parsing. A
+    reply that fails provider-side parsing is repaired locally rather than
+    paying for another call.
+    """
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+    if not structured_output_enabled() or not hasattr(llm, "with_structured_output") \
+            or model in _unsupported_models:
+        return None
+    try:
+        runnable = llm.with_structured_output(schema, method="json_schema", include_raw=True)
+        result = runnable.invoke([("human", prompt)])
+    except (NotImplementedError, TypeError, ValueError) as e:
+        logger.warning(f"Structured output unavailable for {model}, using the agent path: {e}")
+        _unsupported_models.add(model)
+        return None
+    except Exception as e:
+        # Providers without JSON-schema support reject the request with a 400.
+        if type(e).__name__ != "BadRequestError":
+            raise
+        logger.warning(f"Structured output rejected by {model}, using the agent path: {e}")
+        _unsupported_models.add(model)
+        return None
+
+    raw = result.get("raw")
+    content = str(getattr(raw, "content", "") or "")
+    metadata = getattr(raw, "usage_metadata", None) or {}
+    usage = token_usage(prompt, content, metadata.get("input_tokens", 0), metadata.get("output_tokens", 0),
+                        metadata.get("total_tokens", 0))
+    if result.get("parsed") is not None:
+        parse_stats.record(name, "structured")
+        return result["parsed"], usage
+    return parse_output(content, schema, name), usage
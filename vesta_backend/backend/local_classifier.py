@@ -0,0 +1,374 @@
+import argparse
+import csv
+import json
+import logging
+import re
+import sys
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+THEMES = ["Product/Features", "Performance", "UX/UI", "Pricing", "Service", "Other"]
+SENTIMENTS = ["positive", "neutral", "negative"]
+
+# Lexicon feature columns. Theme columns come first and line up with THEMES[:-1];
+# "Other" has no lexicon and wins through its bias when nothing else fires.
+FEATURES = [
+    "theme_product", "theme_performance", "theme_ux", "theme_pricing", "theme_service",
+    "positive", "negative", "request", "urgency", "impact",
+]
+F = {name: i for i, name in enumerate(FEATURES)}
+
+LEXICON: Dict[str, Dict[str, float]] = {
+    "theme_product": {
+        "feature": 1.0, "features": 1.0, "add": 0.6, "integration": 1.0, "option": 0.6,
+        "options": 0.6, "customization": 1.0, "export": 0.6, "dashboard": 0.5, "mode": 0.5,
+        "support": 0.2, "api": 0.8, "roadmap": 0.6, "sync": 0.8, "notifications": 0.8,
+        "functionality": 1.0, "workflow": 0.5, "language": 0.6, "sso": 0.8, "search": 0.5,
+    },
+    "theme_performance": {
+        "slow": 1.5, "crash": 1.5, "crashes": 1.5, "crashed": 1.5, "load": 0.8, "loads": 0.8,
+        "loading": 0.8, "lag": 1.2, "laggy": 1.2, "timeout": 1.5, "timeouts": 1.5, "down": 1.0,
+        "performance": 1.5, "fast": 0.8, "speed": 1.0, "freeze": 1.2, "freezes": 1.2,
+        "outage": 1.5, "latency": 1.5, "instantly": 0.8, "forever": 0.8, "hang": 1.0,
+        "hangs": 1.0, "error": 0.6, "errors": 0.6, "bug": 0.6,
+    },
+    "theme_ux": {
+        "ui": 1.5, "ux": 1.5, "design": 1.0, "layout": 1.2, "navigation": 1.2, "confusing": 1.2,
+        "intuitive": 1.2, "button": 1.0, "buttons": 1.0, "color": 1.0, "scheme": 0.6,
+        "accessible": 1.0, "accessibility": 1.2, "onboarding": 1.2, "menu": 1.0, "menus": 1.0,
+        "cleaner": 0.8, "font": 1.0, "find": 0.4, "interface": 1.2, "screen": 0.6,
+    },
+    "theme_pricing": {
+        "price": 1.5, "prices": 1.5, "pricing": 1.5, "expensive": 1.5, "cheap": 1.0,
+        "cost": 1.2, "costs": 1.2, "discount": 1.5, "plan": 0.8, "plans": 0.8, "billing": 1.2,
+        "charged": 1.5, "refund": 1.5, "subscription": 1.0, "invoice": 1.2, "value": 0.6,
+        "budget": 1.0, "payment": 1.0, "competitors": 0.6,
+    },
+    "theme_service": {
+        "support": 1.2, "service": 1.2, "ticket": 1.2, "agent": 1.0, "responded": 1.0,
+        "response": 0.8, "replied": 1.0, "help": 0.6, "helpful": 0.6, "documentation": 1.0,
+        "docs": 1.0, "team": 0.3, "call": 0.6, "staff": 1.0, "representative": 1.0,
+    },
+    "positive": {
+        "love": 1.5, "great": 1.2, "fantastic": 1.5, "amazing": 1.5, "excellent": 1.5,
+        "good": 0.8, "perfectly": 1.2, "perfect": 1.2, "easy": 0.8, "easier": 0.8,
+        "helpful": 1.0, "thanks": 1.0, "thank": 1.0, "improved": 1.0, "intuitive": 1.0,
+        "worth": 0.8, "awesome": 1.5, "happy": 1.0, "solved": 1.0, "instantly": 0.8,
+        "cleaner": 0.6, "fine": 0.4, "nice": 0.8, "best": 1.2, "like": 0.4, "saves": 0.8,
+    },
+    "negative": {
+        "crash": 1.2, "crashes": 1.2, "slow": 1.0, "bug": 1.0, "broken": 1.5, "frustrating": 1.5,
+        "bad": 1.2, "terrible": 1.8, "awful": 1.8, "hate": 1.8, "confusing": 1.0, "down": 0.8,
+        "expensive": 1.0, "high": 0.4, "error": 1.0, "errors": 1.0, "fail": 1.2, "fails": 1.2,
+        "failed": 1.2, "missing": 0.8, "unhappy": 1.5, "cancel": 1.2, "cancelling": 1.2,
+        "charged": 0.8, "twice": 0.6, "duplicating": 1.0, "forever": 0.6, "timeouts": 1.0,
+        "worse": 1.2, "worst": 1.8, "problem": 0.8, "issue": 0.6, "removed": 0.6,
+        "stopped": 0.8, "lose": 0.8, "hard": 0.6, "disappointed": 1.5, "annoying": 1.2,
+    },
+    "request": {
+        "please": 1.0, "request": 1.2, "would": 0.6, "could": 0.5, "add": 0.8, "wish": 1.0,
+        "suggest": 1.0, "suggestion": 1.0, "can": 0.3, "maybe": 0.5, "whether": 0.6,
+        "appreciate": 0.8, "consider": 0.8,
+    },
+    "urgency": {
+        "crash": 2.0, "crashes": 2.0, "down": 1.8, "outage": 2.5, "urgent": 2.5, "asap": 2.0,
+        "immediately": 1.5, "broken": 1.8, "security": 2.5, "breach": 3.0, "charged": 1.5,
+        "twice": 1.0, "duplicating": 1.5, "lost": 1.5, "lose": 1.2, "blocked": 1.8,
+        "cannot": 1.0, "can't": 1.0, "stopped": 1.2, "timeouts": 1.5, "bug": 1.2, "data": 0.8,
+        "payment": 1.0, "frequently": 1.0, "error": 1.0, "fails": 1.2,
+    },
+    "impact": {
+        "business": 2.0, "customers": 1.5, "revenue": 2.5, "users": 1.2, "team": 0.8,
+        "everyone": 1.2, "operations": 1.5, "cancel": 2.0, "cancelling": 2.0, "churn": 2.5,
+        "subscription": 1.0, "competitors": 1.2, "enterprise": 1.2, "international": 1.0,
+        "colleagues": 0.8, "workflow": 1.0, "every": 0.5, "all": 0.5, "payment": 1.2,
+    },
+}
+
+NEGATORS = {"not", "no", "never", "dont", "don't", "cant", "can't", "isnt", "isn't",
+            "doesnt", "doesn't", "wont", "won't", "nothing", "hardly", "without"}
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Linear layers over [lexicon features, log length, exclamations, questions, bias].
+# Columns of the sentiment layer follow SENTIMENTS, of the theme layer THEMES.
+EXTRA = ["log_length", "exclamations", "questions", "bias"]
+N_INPUTS = len(FEATURES) + len(EXTRA)
+
+
+def _sentiment_weights() -> np.ndarray:
+    w = np.zeros((N_INPUTS, len(SENTIMENTS)))
+    w[F["positive"]] = [1.6, -0.2, -1.0]
+    w[F["negative"]] = [-1.0, -0.2, 1.6]
+    w[F["request"]] = [-0.2, 0.9, 0.0]
+    w[len(FEATURES) + 1] = [0.3, -0.3, 0.2]  # exclamations amplify whichever side
+    w[len(FEATURES) + 2] = [-0.2, 0.5, 0.0]  # questions lean neutral
+    w[len(FEATURES) + 3] = [0.0, 0.6, 0.0]   # neutral wins when nothing fires
+    return w
+
+
+def _theme_weights() -> np.ndarray:
+    w = np.zeros((N_INPUTS, len(THEMES)))
+    for i in range(len(THEMES) - 1):
+        w[i, i] = 2.0
+    w[len(FEATURES) + 3, THEMES.index("Other")] = 0.8
+    return w
+
+
+def _score_weights() -> np.ndarray:
+    # Columns: urgency, impact. Applied to features plus class probabilities.
+    w = np.zeros((N_INPUTS + len(SENTIMENTS), 2))
+    w[F["urgency"]] = [1.1, 0.3]
+    w[F["impact"]] = [0.2, 1.2]
+    w[F["negative"]] = [0.4, 0.3]
+    w[F["request"]] = [-0.2, 0.3]
+    w[len(FEATURES)] = [0.2, 0.3]            # longer reports carry more context
+    w[len(FEATURES) + 3] = [2.5, 3.0]
+    w[N_INPUTS + SENTIMENTS.index("negative")] = [2.0, 1.5]
+    w[N_INPUTS + SENTIMENTS.index("positive")] = [-0.5, 0.0]
+    return w
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def summarize_text(text: str, max_chars: int = 200) -> str:
+    """Extractive summary: the first sentence, trimmed to max_chars."""
+    stripped = " ".join(text.split())
+    if not stripped:
+        return "Empty feedback"
+    first = SENTENCE_RE.split(stripped, maxsplit=1)[0]
+    if len(first) > max_chars:
+        first = first[:max_chars].rsplit(" ", 1)[0] + "..."
+    return first
+
+
+class LocalClassifier:
+    """Lexicon-plus-linear classifier that runs entirely on CPU with NumPy."""
+
+    def __init__(self):
+        vocab = sorted({token for words in LEXICON.values() for token in words})
+        self.vocab = {token: i for i, token in enumerate(vocab)}
+        size = len(vocab)
+        # Rows [0, size) hold plain tokens, rows [size, 2 * size) the same tokens
+        # after a negator, with positive and negative evidence swapped.
+        self.lexicon = np.zeros((2 * size, len(FEATURES)))
+        for feature, words in LEXICON.items():
+            for token, weight in words.items():
+                self.lexicon[self.vocab[token], F[feature]] = weight
+        self.lexicon[size:] = self.lexicon[:size]
+        self.lexicon[size:, [F["positive"], F["negative"]]] = self.lexicon[:size, [F["negative"], F["positive"]]]
+        self.sentiment_w = _sentiment_weights()
+        self.theme_w = _theme_weights()
+        self.score_w = _score_weights()
+
+    def featurize(self, texts: Sequence[str]) -> np.ndarray:
+        size = len(self.vocab)
+        docs: List[int] = []
+        rows: List[int] = []
+        lengths = np.zeros(len(texts))
+        exclamations = np.zeros(len(texts))
+        questions = np.zeros(len(texts))
+        vocab_get = self.vocab.get
+        for doc, text in enumerate(texts):
+            lowered = text.lower()
+            tokens = TOKEN_RE.findall(lowered)
+            lengths[doc] = len(tokens)
+            exclamations[doc] = lowered.count("!")
+            questions[doc] = lowered.count("?")
+            negate = 0
+            for token in tokens:
+                index = vocab_get(token)
+                if index is not None:
+                    docs.append(doc)
+                    rows.append(index + size if negate else index)
+                if token in NEGATORS:
+                    negate = 3
+                elif negate:
+                    negate -= 1
+
+        counts = np.zeros((len(texts), 2 * size))
+        if docs:
+            np.add.at(counts, (np.asarray(docs), np.asarray(rows)), 1.0)
+        features = counts @ self.lexicon
+        extra = np.column_stack([
+            np.log1p(lengths),
+            np.minimum(exclamations, 3),
+            np.minimum(questions, 3),
+            np.ones(len(texts)),
+        ])
+        return np.hstack([features, extra])
+
+    def predict_batch(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        if not texts:
+            return []
+        x = self.featurize(texts)
+        sentiment_p = _softmax(x @ self.sentiment_w)
+        theme_p = _softmax(x @ self.theme_w)
+        scores = np.hstack([x, sentiment_p]) @ self.score_w
+        scores = np.clip(np.rint(scores), 1, 10).astype(int)
+
+        sentiment_idx = sentiment_p.argmax(axis=1)
+        theme_idx = theme_p.argmax(axis=1)
+        confidence = np.minimum(sentiment_p.max(axis=1), theme_p.max(axis=1))
+
+        results = []
+        for i, text in enumerate(texts):
+            urgency, impact = int(scores[i, 0]), int(scores[i, 1])
+            sentiment = SENTIMENTS[sentiment_idx[i]]
+            theme = THEMES[theme_idx[i]]
+            results.append({
+                "sentiment": sentiment,
+                "theme": theme,
+                "summary": summarize_text(text),
+                "urgency": urgency,
+                "impact": impact,
+                "justification": (
+                    f"Local classifier: {sentiment} {theme} feedback with "
+                    f"{x[i, F['urgency']]:.1f} urgency and {x[i, F['impact']]:.1f} impact cue weight"
+                ),
+                "priority_score": round((urgency + impact) / 2, 2),
+                "confidence": round(float(confidence[i]), 4),
+            })
+        return results
+
+    def predict(self, text: str) -> Dict[str, Any]:
+        return self.predict_batch([text])[0]
+
+
+@lru_cache(maxsize=1)
+def get_local_classifier() -> LocalClassifier:
+    return LocalClassifier()
+
+
+def classify_batch(texts: Sequence[str]) -> List[Dict[str, Any]]:
+    return get_local_classifier().predict_batch(list(texts))
+
+
+def evaluate_against_labels(
+    records: Iterable[Dict[str, Any]],
+    thresholds: Sequence[float] = (0.5, 0.6, 0.7, 0.8, 0.9),
+    batch_size: int = 5000,
+) -> Dict[str, Any]:
+    """Compare local predictions with reference (LLM) labels.
+
+    Each record needs ``text`` and may carry ``sentiment``, ``theme``, ``urgency``
+    and ``impact``. Reports accuracy, score MAE, throughput and, per confidence
+    threshold, how many items a pre-filter would keep away from the LLM and how
+    accurate those items are.
+    """
+    classifier = get_local_classifier()
+    sentiment_hits: List[bool] = []
+    theme_hits: List[bool] = []
+    both_hits: List[bool] = []
+    confidences: List[float] = []
+    urgency_err: List[float] = []
+    impact_err: List[float] = []
+    elapsed = 0.0
+    total = 0
+
+    def flush(batch: List[Dict[str, Any]]):
+        nonlocal elapsed, total
+        start = time.perf_counter()
+        predictions = classifier.predict_batch([r["text"] for r in batch])
+        elapsed += time.perf_counter() - start
+        total += len(batch)
+        for record, pred in zip(batch, predictions):
+            s_ok = record.get("sentiment") is None or pred["sentiment"] == record["sentiment"]
+            t_ok = record.get("theme") is None or pred["theme"] == record["theme"]
+            if record.get("sentiment") is not None:
+                sentiment_hits.append(s_ok)
+            if record.get("theme") is not None:
+                theme_hits.append(t_ok)
+            both_hits.append(s_ok and t_ok)
+            confidences.append(pred["confidence"])
+            if record.get("urgency") is not None:
+                urgency_err.append(abs(pred["urgency"] - int(record["urgency"])))
+            if record.get("impact") is not None:
+                impact_err.append(abs(pred["impact"] - int(record["impact"])))
+
+    batch: List[Dict[str, Any]] = []
+    for record in records:
+        if not record.get("text"):
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    def mean(values: List[Any]) -> Optional[float]:
+        return round(float(np.mean(values)), 4) if values else None
+
+    conf = np.asarray(confidences)
+    hits = np.asarray(both_hits)
+    prefilter = []
+    for threshold in thresholds:
+        mask = conf >= threshold
+        prefilter.append({
+            "threshold": threshold,
+            "coverage": round(float(mask.mean()), 4) if total else 0.0,
+            "accuracy": round(float(hits[mask].mean()), 4) if mask.any() else None,
+        })
+
+    return {
+        "items": total,
+        "sentiment_accuracy": mean(sentiment_hits),
+        "theme_accuracy": mean(theme_hits),
+        "joint_accuracy": mean(both_hits),
+        "urgency_mae": mean(urgency_err),
+        "impact_mae": mean(impact_err),
+        "items_per_second": round(total / elapsed, 1) if elapsed else None,
+        "prefilter": prefilter,
+    }
+
+
+def _load_records(path: str) -> Iterable[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _db_records() -> Iterable[Dict[str, Any]]:
+    # Rows the local classifier labelled itself (mock mode, fallbacks, the local tier)
+    # would grade it against its own answers.
+    from backend.db import get_llm_labelled_feedback
+    return get_llm_labelled_feedback()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate the local classifier against reference labels")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="CSV or NDJSON file with text and reference labels")
+    source.add_argument("--db", action="store_true", help="Use rows labelled by an LLM from the database")
+    parser.add_argument("--db-path", help="SQLite file to read with --db (defaults to DB_PATH)")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        if args.db_path:
+            import backend.db as db_module
+            db_module.DB_PATH = args.db_path
+        records = _db_records()
+    else:
+        records = _load_records(args.input)
+
+    print(json.dumps(evaluate_against_labels(records), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
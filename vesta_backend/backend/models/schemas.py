@@ -1,11 +1,17 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional, Literal
 from datetime import datetime
 
 
 class FeedbackInput(BaseModel):
     text: str = Field(..., description="Raw customer feedback text")
     source: Optional[str] = Field(default="manual", description="Source of feedback (e.g., email, survey, support)")
+    idempotency_key: Optional[str] = Field(
+        default=None, max_length=255, description="Client-chosen key; retries with the same key return the first result"
+    )
+    external_id: Optional[str] = Field(
+        default=None, max_length=255, description="Id in the source system; each (source, external_id) is stored once"
+    )
 
 
 class ClassifiedFeedback(BaseModel):
@@ -16,6 +22,31 @@ class ClassifiedFeedback(BaseModel):
     summary: str
 
 
+class ClassificationOutput(BaseModel):
+    """What the classifier model returns; validated into ClassifiedFeedback."""
+    sentiment: Literal["positive", "neutral", "negative"]
+    theme: str
+    summary: str
+    confidence: float = Field(default=1.0, description="0.0-1.0, how certain the model is of sentiment and theme")
+
+    @field_validator("sentiment", mode="before")
+    @classmethod
+    def normalize_sentiment(cls, value):
+        return value.strip().lower() if isinstance(value, str) else value
+
+    @field_validator("confidence", mode="before")
+    @classmethod
+    def clamp_confidence(cls, value):
+        return min(max(float(value), 0.0), 1.0)
+
+
+class EvaluationOutput(BaseModel):
+    """What the evaluator model returns; validated into PrioritizationScore."""
+    urgency: int = Field(..., ge=1, le=10, description="How quickly this needs to be addressed")
+    impact: int = Field(..., ge=1, le=10, description="How much business impact addressing this would have")
+    justification: str
+
+
 class PrioritizationScore(BaseModel):
     feedback_id: int
     urgency: int = Field(..., ge=1, le=10, description="Urgency score from 1-10")
@@ -37,6 +68,95 @@ class FeedbackResponse(BaseModel):
     priority_score: Optional[float] = None
     created_at: datetime
 
+    @field_validator("source", mode="before")
+    @classmethod
+    def default_source(cls, value):
+        # Rows written outside the API may have no source; the column defaults to 'manual'.
+        return "manual" if value is None else value
+
+
+class ScoreHistoryEntry(BaseModel):
+    version: int
+    urgency: int
+    impact: int
+    justification: str
+    priority_score: float
+    created_at: datetime
+
+
+class PriorityDrift(BaseModel):
+    feedback_id: int
+    theme: Optional[str] = None
+    summary: Optional[str] = None
+    versions: int
+    min_priority: float
+    max_priority: float
+    first_priority: float
+    current_priority: float
+    drift: float
+
+
+class ThemeStats(BaseModel):
+    theme: Optional[str] = None
+    count: int
+    scored: int
+    avg_priority: Optional[float] = None
+
+
+class SentimentCount(BaseModel):
+    sentiment: Optional[str] = None
+    count: int
+
+
+class SourceCount(BaseModel):
+    source: Optional[str] = None
+    count: int
+
+
+class FeedbackStats(BaseModel):
+    total: int
+    scored: int
+    avg_urgency: Optional[float] = None
+    avg_impact: Optional[float] = None
+    avg_priority: Optional[float] = None
+    by_theme: List[ThemeStats]
+    by_sentiment: List[SentimentCount]
+    by_source: List[SourceCount]
+
+
+class ThemeCluster(BaseModel):
+    id: int
+    label: str
+    keywords: Optional[str] = None
+    parent_theme: Optional[str] = None
+    items: int
+    scored: int
+    avg_priority: Optional[float] = None
+    updated_at: Optional[datetime] = None
+
+
+class ClusterMember(FeedbackResponse):
+    similarity: Optional[float] = None
+
+
+class SimilarFeedback(FeedbackResponse):
+    similarity: float
+
+
+class ThemeClusterDetail(ThemeCluster):
+    members: List[ClusterMember]
+
+
+class ArchivedFeedback(FeedbackResponse):
+    month: str
+
+
+class ArchivePartition(BaseModel):
+    month: str
+    items: int
+    files: int
+    bytes: int
+
 
 class ReportResponse(BaseModel):
     id: int
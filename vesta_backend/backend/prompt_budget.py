@@ -0,0 +1,268 @@
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Token budget for one feedback text in the classifier and evaluator prompts.
+PROMPT_FEEDBACK_TOKENS = int(os.getenv("PROMPT_FEEDBACK_TOKENS", "400"))
+# Token budget for each item's summary and justification in the report prompt.
+PROMPT_REPORT_ITEM_TOKENS = int(os.getenv("PROMPT_REPORT_ITEM_TOKENS", "80"))
+# tiktoken encoding used to count tokens, or "chars" to estimate ~4 characters per token.
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "o200k_base")
+
+GAP = "[...]"
+
+# Everything from the first of these lines on is an earlier message being replied to or forwarded.
+QUOTE_HEADERS = re.compile(
+    r"^(?:on\b.{0,200}\bwrote:|-{2,}\s*(?:original|forwarded) message\s*-{2,}|_{10,}|"
+    r"from:\s.+\n(?:sent|date|to):\s)",
+    re.IGNORECASE | re.MULTILINE,
+)
+SIGNATURE_DELIMITER = re.compile(r"^--\s*$", re.MULTILINE)
+SIGN_OFF = re.compile(
+    r"^(?:(?:best|kind|warm|many)\s+(?:regards|wishes|thanks)|regards|thanks(?: again| so much)?|thank you|"
+    r"cheers|sincerely|best|all the best|br)\s*[,.!]?\s*$",
+    re.IGNORECASE,
+)
+DEVICE_FOOTER = re.compile(
+    r"^\s*(?:sent from my \w[\w ]*|get outlook for \w+|sent with \w+ mail|sent from mail for windows)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+BOILERPLATE = re.compile(
+    r"\b(?:confidential\w*\b.{0,200}\bintended (?:solely )?for|this (?:e-?mail|message) and any attachments|"
+    r"if you (?:have )?received this (?:e-?mail|message) in error|please consider the environment|"
+    r"to unsubscribe|unsubscribe from|you are receiving this (?:e-?mail|message) because)",
+    re.IGNORECASE | re.DOTALL,
+)
+SEGMENT = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])|\n+")
+WORD = re.compile(r"[a-z][a-z']{2,}")
+# Words that make a sentence worth keeping when a long text has to be cut down.
+SIGNAL_WORDS = {
+    "error", "errors", "exception", "fail", "fails", "failed", "failure", "crash", "crashes", "crashed",
+    "broken", "bug", "slow", "timeout", "cannot", "can't", "unable", "refund", "cancel", "charged",
+    "expensive", "missing", "lost", "wrong", "please", "need", "wish", "love", "hate", "urgent",
+}
+STOPWORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "your", "all", "any", "can", "had", "has", "have", "her",
+    "was", "one", "our", "out", "his", "they", "them", "this", "that", "with", "from", "were", "what", "when",
+    "which", "will", "would", "there", "their", "been", "into", "just", "also", "than", "then", "some", "very",
+}
+# Signature blocks are short; a sign-off further from the end than this is part of the message.
+MAX_SIGNATURE_LINES = 6
+
+
+class PromptStats:
+    """Thread-safe token savings of prompt compaction, exposed through /metrics/prompts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stats: Dict[str, Any] = {
+                "texts": 0, "compacted": 0, "original_tokens": 0, "tokens": 0, "steps": {},
+            }
+
+    def record(self, original_tokens: int, tokens: int, steps: List[str]):
+        with self._lock:
+            stats = self._stats
+            stats["texts"] += 1
+            stats["compacted"] += 1 if steps else 0
+            stats["original_tokens"] += original_tokens
+            stats["tokens"] += tokens
+            for step in steps:
+                stats["steps"][step] = stats["steps"].get(step, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = self._stats
+            saved = stats["original_tokens"] - stats["tokens"]
+            return {
+                "texts": stats["texts"],
+                "compacted": stats["compacted"],
+                "original_tokens": stats["original_tokens"],
+                "tokens": stats["tokens"],
+                "saved_tokens": saved,
+                "saved_rate": round(saved / (stats["original_tokens"] or 1), 4),
+                "steps": dict(stats["steps"]),
+            }
+
+
+prompt_stats = PromptStats()
+
+
+def get_prompt_stats() -> Dict[str, Any]:
+    return prompt_stats.snapshot()
+
+
+_tokenizer: Dict[str, Any] = {"encoding": None}
+
+
+def load_tokenizer():
+    """Load the PROMPT_TOKENIZER encoding; returns it, or None when tokens are estimated from characters.
+
+    tiktoken downloads an encoding the first time it is used, so processes
+    call this once at startup rather than leaving it to the first request.
+    Until it has been called, tokens are estimated from characters.
+    """
+    encoding = None
+    if PROMPT_TOKENIZER != "chars":
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding(PROMPT_TOKENIZER)
+        except Exception as e:
+            logger.warning(f"Tokenizer '{PROMPT_TOKENIZER}' unavailable, estimating tokens from characters: {e}")
+    _tokenizer["encoding"] = encoding
+    return encoding
+
+
+def _encoding():
+    return _tokenizer["encoding"]
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _truncate(text: str, budget: int) -> str:
+    """Keep the start and the end of ``text`` within ``budget`` tokens."""
+    encoding = _encoding()
+    head_budget = max(1, budget * 2 // 3)
+    tail_budget = max(0, budget - head_budget - 2)
+    if encoding is None:
+        head, tail = text[:head_budget * 4], text[max(0, len(text) - tail_budget * 4):] if tail_budget else ""
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        head = encoding.decode(tokens[:head_budget])
+        tail = encoding.decode(tokens[len(tokens) - tail_budget:]) if tail_budget else ""
+    return f"{head.rstrip()} {GAP} {tail.lstrip()}".rstrip()
+
+
+def clean_text(text: str) -> Tuple[str, List[str]]:
+    """Remove quoted replies, signatures, device footers, legal boilerplate and repeated lines.
+
+    Returns the cleaned text and the steps that changed it. A step that would
+    leave nothing is skipped, so text that is all quote or all signature is kept.
+    """
+    steps = []
+
+    def apply(step: str, cleaned: str):
+        nonlocal text
+        cleaned = cleaned.strip()
+        if cleaned and cleaned != text.strip():
+            text = cleaned
+            steps.append(step)
+
+    quote = QUOTE_HEADERS.search(text)
+    if quote:
+        apply("quoted_reply", text[:quote.start()])
+    apply("quoted_reply", "\n".join(line for line in text.splitlines() if not line.lstrip().startswith(">")))
+
+    delimiter = SIGNATURE_DELIMITER.search(text)
+    if delimiter:
+        apply("signature", text[:delimiter.start()])
+    apply("signature", DEVICE_FOOTER.sub("", text))
+    lines = text.splitlines()
+    for position in range(max(0, len(lines) - MAX_SIGNATURE_LINES), len(lines)):
+        if SIGN_OFF.match(lines[position].strip()):
+            apply("signature", "\n".join(lines[:position]))
+            break
+
+    paragraphs = re.split(r"\n\s*\n", text)
+    apply("boilerplate", "\n\n".join(paragraph for paragraph in paragraphs if not BOILERPLATE.search(paragraph)))
+
+    # Pasted logs repeat the same line many times; keep one with a count.
+    collapsed, previous, repeats = [], None, 0
+    for line in text.splitlines() + [None]:
+        if line is not None and previous is not None and line.strip() and line.strip() == previous.strip():
+            repeats += 1
+            continue
+        if previous is not None:
+            collapsed.append(f"{previous} (repeated {repeats + 1} times)" if repeats else previous)
+        previous, repeats = line, 0
+    apply("repeated_lines", "\n".join(collapsed))
+
+    apply("whitespace", re.sub(r"\n{3,}", "\n\n", re.sub(r"[ \t]+", " ", text)))
+    return text, steps
+
+
+def summarize_extractive(text: str, budget: int) -> str:
+    """The most informative sentences or lines of ``text`` that fit ``budget`` tokens, in their original order.
+
+    The first segment, which usually says what the message is about, is kept.
+    The rest are ranked by how common their words are across the text (on a
+    log scale, so repetition does not dominate), with extra weight for words
+    that signal a problem or request. A segment mostly made of words already
+    kept adds nothing and is skipped. Skipped stretches are marked with ``[...]``.
+    """
+    segments = [segment.strip() for segment in SEGMENT.split(text) if segment and segment.strip()]
+    if len(segments) <= 1:
+        return _truncate(text, budget)
+
+    frequency = Counter(word for word in WORD.findall(text.lower()) if word not in STOPWORDS)
+    costs = [count_tokens(segment) + 1 for segment in segments]
+    word_sets, scores = [], []
+    for segment in segments:
+        words = {word for word in WORD.findall(segment.lower()) if word not in STOPWORDS}
+        score = sum(math.log1p(frequency[word]) for word in words) / math.sqrt(len(words) + 1)
+        score += 3 * len(SIGNAL_WORDS & words)
+        word_sets.append(words)
+        scores.append(score)
+
+    chosen, used, covered = set(), 0, set()
+    gap_cost = count_tokens(GAP) + 1
+    for position in [0] + sorted(range(1, len(segments)), key=lambda i: (-scores[i], i)):
+        words = word_sets[position]
+        if chosen and words and len(words - covered) <= len(words) // 4:
+            continue
+        if used + costs[position] + gap_cost <= budget:
+            chosen.add(position)
+            covered |= words
+            used += costs[position] + gap_cost
+    if not chosen:
+        return _truncate(segments[0], budget)
+
+    parts, skipped = [], False
+    for position, segment in enumerate(segments):
+        if position in chosen:
+            if skipped and parts:
+                parts.append(GAP)
+            parts.append(segment)
+            skipped = False
+        else:
+            skipped = True
+    if skipped:
+        parts.append(GAP)
+    return " ".join(parts)
+
+
+def compact_text(text: Optional[str], budget: int, clean: bool = True) -> Tuple[str, int]:
+    """Clean ``text`` and cut it down to ``budget`` tokens; returns the compacted text and the tokens saved."""
+    if not text:
+        return text or "", 0
+    original_tokens = count_tokens(text)
+    steps: List[str] = []
+    compacted = text
+    if clean:
+        compacted, steps = clean_text(text)
+    tokens = count_tokens(compacted) if steps else original_tokens
+    if budget > 0 and tokens > budget:
+        compacted = summarize_extractive(compacted, budget)
+        tokens = count_tokens(compacted)
+        steps.append("summarized")
+    prompt_stats.record(original_tokens, tokens, steps)
+    return compacted, max(0, original_tokens - tokens)
+
+
+def compact_feedback(text: str) -> Tuple[str, int]:
+    """Feedback text for the classifier and evaluator prompts, within PROMPT_FEEDBACK_TOKENS."""
+    return compact_text(text, PROMPT_FEEDBACK_TOKENS)
@@ -0,0 +1,70 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# How long a cached latest report is served before the database is asked whether a newer one exists.
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "30"))
+
+
+class CachedReport:
+    def __init__(self, report: Dict[str, Any]):
+        self.report = report
+        digest = hashlib.sha1(report["markdown_report"].encode("utf-8")).hexdigest()[:16]
+        self.etag = f'"report-{report["id"]}-{digest}"'
+        self._html: Optional[str] = None
+
+    @property
+    def html(self) -> str:
+        if self._html is None:
+            # Markdown is only imported once a report is rendered.
+            from backend.markdown_to_html import convert_markdown_to_html
+            self._html = convert_markdown_to_html(self.report["markdown_report"])
+        return self._html
+
+
+class LatestReportCache:
+    """The latest report and its rendered HTML, held in memory for dashboard polls.
+
+    Reports published in this process replace the entry straight away; reports
+    written by another process (a separate scheduler) are noticed within
+    ``ttl`` seconds, so a poll touches the database at most once per ``ttl``.
+    """
+
+    def __init__(self, load_latest: Callable[[], Optional[Dict[str, Any]]], ttl: Optional[float] = None):
+        self.load_latest = load_latest
+        self.ttl = REPORT_CACHE_TTL if ttl is None else ttl
+        self.lock = threading.Lock()
+        self.entry: Optional[CachedReport] = None
+        self.checked_at = 0.0
+
+    def get(self) -> Optional[CachedReport]:
+        with self.lock:
+            if self.entry is not None and time.monotonic() - self.checked_at < self.ttl:
+                return self.entry
+            report = self.load_latest()
+            self.checked_at = time.monotonic()
+            if report is None:
+                self.entry = None
+            elif self.entry is None or self.entry.report["id"] != report["id"]:
+                self.entry = CachedReport(report)
+            return self.entry
+
+    def warm(self):
+        """Load the latest report and render its HTML ahead of the first request."""
+        cached = self.get()
+        if cached is not None:
+            cached.html
+
+    def invalidate(self):
+        with self.lock:
+            self.checked_at = 0.0
+
+    def clear(self):
+        with self.lock:
+            self.entry = None
+            self.checked_at = 0.0
@@ -0,0 +1,79 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+# Priority scores are compared at this many decimals, so re-scoring noise doesn't count as a change.
+FINGERPRINT_PRECISION = 1
+
+
+def report_state(top_feedback: List[Dict[str, Any]], stats: Dict[str, Any]) -> Dict[str, Any]:
+    """What a scheduled report is generated from: its top items and the per-theme and per-sentiment counts."""
+    return {
+        "top": [
+            {
+                "id": item["id"],
+                "theme": item.get("theme"),
+                "summary": item.get("summary") or item.get("text"),
+                "priority_score": round(item.get("priority_score") or 0, FINGERPRINT_PRECISION),
+            }
+            for item in top_feedback
+        ],
+        "aggregate": {
+            "total": stats["total"],
+            "scored": stats["scored"],
+            "by_theme": [[group["theme"], group["count"], group["scored"]] for group in stats["by_theme"]],
+            "by_sentiment": [[group["sentiment"], group["count"]] for group in stats["by_sentiment"]],
+        },
+    }
+
+
+def _bucket(count: int) -> int:
+    """``count`` to two significant figures, so a handful of new items in a large tenant isn't a change."""
+    return round(count, -max(0, len(str(count)) - 2))
+
+
+def top_fingerprint(state: Dict[str, Any]) -> str:
+    """Hash of the ranked item ids and their rounded scores, which is what the report is written from.
+
+    A precomputed report stays valid while this is unchanged, whatever
+    arrives outside the top items.
+    """
+    material = [[item["id"], item["priority_score"]] for item in state["top"]]
+    return hashlib.sha256(json.dumps(material, default=str).encode("utf-8")).hexdigest()
+
+
+def fingerprint(state: Dict[str, Any]) -> str:
+    """Hash of the top items and the bucketed aggregate counts; a report is only published when this changes."""
+    aggregate = state["aggregate"]
+    material = {
+        "top": top_fingerprint(state),
+        "total": _bucket(aggregate["total"]),
+        "scored": _bucket(aggregate["scored"]),
+        "by_theme": [[theme, _bucket(count), _bucket(scored)] for theme, count, scored in aggregate["by_theme"]],
+        "by_sentiment": [[sentiment, _bucket(count)] for sentiment, count in aggregate["by_sentiment"]],
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _item_line(item: Dict[str, Any]) -> str:
+    return f"- [{item.get('theme') or 'Unknown Theme'}] {item.get('summary') or 'No summary'} " \
+           f"(priority {item['priority_score']:.{FINGERPRINT_PRECISION}f})"
+
+
+def diff_section(previous_top: Optional[List[Dict[str, Any]]], current_top: List[Dict[str, Any]]) -> str:
+    """Markdown listing the items that entered or left the top priorities since the previous report."""
+    if previous_top is None:
+        return ""
+    previous_ids = {item["id"] for item in previous_top}
+    current_ids = {item["id"] for item in current_top}
+    entered = [item for item in current_top if item["id"] not in previous_ids]
+    left = [item for item in previous_top if item["id"] not in current_ids]
+
+    section = "## Changes Since Last Report\n\n"
+    if not entered and not left:
+        return section + "The top priorities are the same items as in the last report.\n"
+    if entered:
+        section += "**New in the top priorities:**\n\n" + "\n".join(_item_line(item) for item in entered) + "\n\n"
+    if left:
+        section += "**No longer in the top priorities:**\n\n" + "\n".join(_item_line(item) for item in left) + "\n"
+    return section
@@ -0,0 +1,132 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from backend.db import (
+    get_cluster_members, get_clusters, get_feedback_stats, get_report_summaries, get_top_feedback,
+    save_report_summaries,
+)
+from backend.report_delta import FINGERPRINT_PRECISION
+
+logger = logging.getLogger(__name__)
+
+# "top" reports on the highest-priority items only; "map_reduce" also summarizes every group of feedback.
+REPORT_MODE = os.getenv("REPORT_MODE", "top").lower()
+# Group feedback by "theme" or by the sub-theme "cluster" found by `python -m backend.themes`.
+REPORT_MAP_GROUP = os.getenv("REPORT_MAP_GROUP", "theme").lower()
+# Group summaries requested from the LLM at the same time (each also holds one of the tenant's LLM slots).
+REPORT_MAP_CONCURRENCY = int(os.getenv("REPORT_MAP_CONCURRENCY", "4"))
+# Items per group shown to the LLM: the highest-priority ones for themes, the most typical for clusters.
+REPORT_MAP_ITEMS = int(os.getenv("REPORT_MAP_ITEMS", "20"))
+# Largest groups summarized; smaller ones are left to the top items and the counts.
+REPORT_MAP_MAX_GROUPS = int(os.getenv("REPORT_MAP_MAX_GROUPS", "12"))
+
+
+def map_reduce_enabled() -> bool:
+    return REPORT_MODE == "map_reduce"
+
+
+def load_report_groups() -> List[Dict[str, Any]]:
+    """The current tenant's largest groups, each with its counts and a sample of its items.
+
+    One query per group, so the cost follows the number of groups rather than
+    the number of items.
+    """
+    groups = []
+    if REPORT_MAP_GROUP == "cluster":
+        for cluster in get_clusters()[:REPORT_MAP_MAX_GROUPS]:
+            if cluster["items"]:
+                groups.append({
+                    "key": f"cluster:{cluster['id']}", "label": cluster["label"], "items": cluster["items"],
+                    "avg_priority": cluster["avg_priority"],
+                    "sample": get_cluster_members(cluster["id"], REPORT_MAP_ITEMS),
+                })
+        return groups
+
+    for theme in get_feedback_stats()["by_theme"][:REPORT_MAP_MAX_GROUPS]:
+        if theme["theme"] is None or not theme["scored"]:
+            # Unclassified or unscored feedback has no summaries to work from yet.
+            continue
+        groups.append({
+            "key": f"theme:{theme['theme']}", "label": theme["theme"], "items": theme["count"],
+            "avg_priority": theme["avg_priority"],
+            "sample": get_top_feedback(REPORT_MAP_ITEMS, theme=theme["theme"]),
+        })
+    return groups
+
+
+def group_fingerprint(group: Dict[str, Any]) -> str:
+    """Hash of what the group's summary is written from: its sampled items, their scores and summaries.
+
+    Counts are left out; the reduce step gets them fresh, so new items that
+    don't reach the sample don't cost a new summary.
+    """
+    material = [
+        [item["id"], round(item.get("priority_score") or 0, FINGERPRINT_PRECISION), item.get("summary")]
+        for item in group["sample"]
+    ]
+    return hashlib.sha256(json.dumps([group["key"], material], default=str).encode("utf-8")).hexdigest()
+
+
+def _template_summary(group: Dict[str, Any]) -> str:
+    summaries = [item.get("summary") or item.get("text") for item in group["sample"][:3]]
+    return "Top items: " + "; ".join(summary for summary in summaries if summary) + "."
+
+
+def summarize_groups(groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The map step: a summary per group, reused from report_summaries while the group is unchanged.
+
+    Changed groups are summarized concurrently, REPORT_MAP_CONCURRENCY at a
+    time. Without an LLM, or when a call fails, the group gets a template
+    summary of its top items, which is not cached.
+    """
+    from backend.crew_pipeline import _report_llm, summarize_feedback_group
+
+    cached = get_report_summaries()
+    results: Dict[str, Dict[str, Any]] = {}
+    stale = []
+    for group in groups:
+        group_fp = group_fingerprint(group)
+        hit = cached.get(group["key"])
+        summary = hit["summary"] if hit is not None and hit["fingerprint"] == group_fp else None
+        results[group["key"]] = {"label": group["label"], "items": group["items"],
+                                 "avg_priority": group["avg_priority"], "summary": summary, "cached": summary is not None}
+        if summary is None:
+            stale.append((group, group_fp))
+
+    llm, tier = _report_llm() if stale else (None, None)
+
+    def summarize(group: Dict[str, Any]) -> Optional[str]:
+        try:
+            return summarize_feedback_group(group, llm, tier)
+        except Exception as e:
+            logger.error(f"Failed to summarize report group '{group['label']}': {e}")
+            return None
+
+    fresh = [None] * len(stale)
+    if llm is not None:
+        with ThreadPoolExecutor(max_workers=max(1, min(REPORT_MAP_CONCURRENCY, len(stale))),
+                                thread_name_prefix="report-map") as pool:
+            # Each call runs in a copy of this context, so it is billed to and cached for the current tenant.
+            futures = [pool.submit(contextvars.copy_context().run, summarize, group) for group, _ in stale]
+            fresh = [future.result() for future in futures]
+
+    saved = []
+    for (group, group_fp), summary in zip(stale, fresh):
+        if summary:
+            saved.append({"group_key": group["key"], "fingerprint": group_fp, "summary": summary})
+        results[group["key"]]["summary"] = summary or _template_summary(group)
+    if saved:
+        save_report_summaries(saved)
+    logger.info(f"Report groups: {len(groups) - len(stale)} unchanged, {len(saved)} summarized, "
+                f"{len(stale) - len(saved)} from the template")
+    return [results[group["key"]] for group in groups]
+
+
+def get_theme_summaries() -> List[Dict[str, Any]]:
+    """Per-group summaries for a map-reduce report over the current tenant's feedback."""
+    return summarize_groups(load_report_groups())
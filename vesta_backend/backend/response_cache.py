@@ -0,0 +1,125 @@
+import gzip
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from pydantic import TypeAdapter
+from starlette.requests import Request
+from starlette.responses import Response
+
+from backend.tenancy import DEFAULT_TENANT, TENANT_HEADER
+
+logger = logging.getLogger(__name__)
+
+# How long the change_log watermark is trusted before it is read again; bounds how stale
+# a response can be after a write from another process.
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "2"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+# Bodies at least this large are gzipped for clients that accept it.
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+
+
+class CachedBody:
+    def __init__(self, body: bytes, version: int):
+        self.body = body
+        self.version = version
+        self._gzipped: Optional[bytes] = None
+
+    @property
+    def gzipped(self) -> bytes:
+        # Compressed once per version rather than on every request.
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6)
+        return self._gzipped
+
+
+class ResponseCache:
+    """Serialized JSON bodies keyed by request, valid until the database changes.
+
+    ``current_version`` is the change_log watermark, which every feedback and
+    report write advances. It is read at most once per ``ttl`` seconds, or
+    right after ``invalidate()``, which the write helpers in backend.db call,
+    so writes in this process show up immediately.
+    """
+
+    def __init__(self, current_version: Callable[[], int], ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None, tenant: Optional[str] = None):
+        self.current_version = current_version
+        # Part of the ETag, so a client switching tenants never gets another tenant's 304.
+        self.tenant = tenant
+        self.ttl = RESPONSE_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or RESPONSE_CACHE_MAX_ENTRIES
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self._version = 0
+        self._checked_at: Optional[float] = None
+
+    def version(self) -> int:
+        with self.lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.ttl:
+                return self._version
+        version = self.current_version()
+        with self.lock:
+            if version != self._version:
+                self.entries.clear()
+            self._version = version
+            self._checked_at = time.monotonic()
+        return version
+
+    def get(self, key: str, build: Callable[[], bytes]) -> CachedBody:
+        version = self.version()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.version == version:
+                self.entries.move_to_end(key)
+                return entry
+        entry = CachedBody(build(), version)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self._checked_at = None
+
+
+def etag_for(version: int, tenant: Optional[str] = None) -> str:
+    # Weak: the same version may be sent gzipped or not.
+    if tenant and tenant != DEFAULT_TENANT:
+        return f'W/"{tenant}-v{version}"'
+    return f'W/"v{version}"'
+
+
+def cached_json_response(cache: ResponseCache, request: Request, response_type: Any,
+                         build: Callable[[], Any]) -> Response:
+    """Serve ``build()`` as JSON, from ``cache`` when the database has not changed since it was built.
+
+    ``response_type`` validates and serializes the value, as ``response_model``
+    would. A matching If-None-Match gets a 304 without building anything.
+    """
+    adapter = TypeAdapter(response_type)
+    return cached_body_response(cache, request, lambda: adapter.dump_json(adapter.validate_python(build())))
+
+
+def cached_body_response(cache: ResponseCache, request: Request, build_body: Callable[[], bytes]) -> Response:
+    """Like cached_json_response, for endpoints that serialize their own JSON bytes."""
+    version = cache.version()
+    etag = etag_for(version, cache.tenant)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": f"Accept-Encoding, {TENANT_HEADER}"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    key = request.url.path + ("?" + request.url.query if request.url.query else "")
+    entry = cache.get(key, build_body)
+    headers["ETag"] = etag_for(entry.version, cache.tenant)
+    if len(entry.body) >= GZIP_MIN_SIZE and "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(entry.gzipped, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Dict, List, Optional
+import logging
+from backend.models.schemas import ArchivedFeedback, ArchivePartition, FeedbackStats
+from backend.archive import get_archive_stats, list_partitions, search_archive
+
+router = APIRouter(prefix="/archive", tags=["archive"])
+logger = logging.getLogger(__name__)
+
+MONTH = r"^\d{4}-\d{2}$"
+
+
+def _archived_feedback(record: Dict[str, Any]) -> ArchivedFeedback:
+    score = record.get("score") or {}
+    return ArchivedFeedback(
+        **{key: record[key] for key in ("id", "text", "source", "sentiment", "theme", "summary", "created_at")},
+        **{key: score.get(key) for key in ("urgency", "impact", "justification", "priority_score")},
+        month=str(record["created_at"])[:7],
+    )
+
+
+@router.get("/stats", response_model=FeedbackStats)
+def archive_stats(
+    start_month: Optional[str] = Query(default=None, alias="from", pattern=MONTH),
+    end_month: Optional[str] = Query(default=None, alias="to", pattern=MONTH),
+    theme: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    source: Optional[str] = None,
+):
+    """Counts and mean scores of archived feedback, kept in the database when the rows leave it."""
+    try:
+        return FeedbackStats(**get_archive_stats(start_month, end_month, theme=theme, sentiment=sentiment,
+                                                 source=source))
+    except Exception as e:
+        logger.error(f"Error computing archive stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search", response_model=List[ArchivedFeedback])
+def archive_search(
+    q: str = Query(min_length=2),
+    start_month: Optional[str] = Query(default=None, alias="from", pattern=MONTH),
+    end_month: Optional[str] = Query(default=None, alias="to", pattern=MONTH),
+    theme: Optional[str] = None,
+    source: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    """Search archived feedback text; narrow the months to scan fewer partitions."""
+    try:
+        records = search_archive(q, start_month, end_month, theme=theme, source=source, limit=limit)
+        return [_archived_feedback(record) for record in records]
+    except Exception as e:
+        logger.error(f"Error searching archive: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/partitions", response_model=List[ArchivePartition])
+def archive_partitions():
+    try:
+        return list_partitions()
+    except Exception as e:
+        logger.error(f"Error listing archive partitions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional
+import logging
+import os
+from backend.db import get_change_feed
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+logger = logging.getLogger(__name__)
+
+# Idle connections get a keep-alive this often, which also notices clients that went away.
+KEEPALIVE_SECONDS = float(os.getenv("CHANGE_FEED_KEEPALIVE", "15"))
+
+
+def _resume_from(after: Optional[int], last_event_id: Optional[str]) -> Optional[int]:
+    if after is not None:
+        return after
+    if last_event_id and last_event_id.isdigit():
+        return int(last_event_id)
+    return None
+
+
+async def _sse_change_events(feed, subscription, catchup: List) -> AsyncIterator[str]:
+    try:
+        for batch in catchup:
+            yield batch.sse
+        while True:
+            batch = await subscription.next(KEEPALIVE_SECONDS)
+            yield ": keep-alive\n\n" if batch is None else batch.sse
+    finally:
+        feed.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def change_stream(
+    after: Optional[int] = Query(default=None, ge=0, description="Last seq seen; missed changes are sent first"),
+    last_event_id: Optional[str] = Header(default=None),
+):
+    """Server-Sent Events: a `change` event per feedback or report change of the request's tenant.
+
+    A `reset` event tells the client to refetch.
+    """
+    feed = get_change_feed()
+    subscription, catchup = await feed.subscribe(_resume_from(after, last_event_id))
+    return StreamingResponse(
+        _sse_change_events(feed, subscription, catchup),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def change_socket(websocket: WebSocket, after: Optional[int] = None):
+    """The same feed over a WebSocket: `changes` messages with a list of events, `reset` and `ping`.
+
+    Browsers cannot set headers on a WebSocket, so `?api_key=` and `?tenant=` stand in for them.
+    """
+    await websocket.accept()
+    feed = get_change_feed()
+    subscription, catchup = await feed.subscribe(after)
+    try:
+        for batch in catchup:
+            await websocket.send_text(batch.message)
+        while True:
+            batch = await subscription.next(KEEPALIVE_SECONDS)
+            await websocket.send_text('{"type":"ping"}' if batch is None else batch.message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        feed.unsubscribe(subscription)
@@ -1,28 +1,118 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from typing import List
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Header, Request, Response
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 import csv
 import io
 import logging
+import os
+import threading
+from functools import lru_cache
 from pydantic import BaseModel
-from backend.models.schemas import FeedbackInput, FeedbackResponse
-from backend.db import insert_feedback, get_all_feedback, get_feedback_by_id, delete_feedback
+from backend.models.schemas import (
+    FeedbackInput, FeedbackResponse, FeedbackStats, ScoreHistoryEntry, PriorityDrift, ThemeCluster,
+    ThemeClusterDetail, SimilarFeedback,
+)
+from backend.db import (
+    insert_feedback, insert_feedback_once, get_feedback_by_id, delete_feedback, enqueue_feedback,
+    get_score_history, get_priority_drift, get_top_feedback, get_feedback_stats, get_clusters, get_cluster_members,
+    find_similar_feedback, get_response_cache, iter_feedback_listing, FEEDBACK_LISTING_COLUMNS,
+)
+from backend.response_cache import cached_body_response, cached_json_response
+from backend.serialization import rows_to_json
 from backend.crew_pipeline import process_single_feedback
-from integrations.email_integration import EmailIntegration
 
 class EmailRequest(BaseModel):
     email: str
 
 router = APIRouter(prefix="/feedback", tags=["feedback"])
 logger = logging.getLogger(__name__)
-email_integration = EmailIntegration()
 
 
-@router.post("/", response_model=FeedbackResponse)
-async def submit_feedback(feedback: FeedbackInput):
+@lru_cache(maxsize=1)
+def get_email_integration():
+    # Imported on first use to keep the SMTP/markdown stack out of API start-up.
+    from integrations.email_integration import EmailIntegration
+    return EmailIntegration()
+
+
+def queue_mode() -> bool:
+    """In queue mode submissions are only enqueued; `python -m backend.worker` processes them."""
+    return os.getenv("PROCESSING_MODE", "inline").lower() == "queue"
+
+
+# Feedback ids this process is classifying inline, so a retry waits for the running attempt.
+_in_flight: Dict[int, threading.Event] = {}
+_in_flight_lock = threading.Lock()
+IN_FLIGHT_WAIT = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "60"))
+
+
+def _process_once(feedback_id: int, text: str, source: str):
+    with _in_flight_lock:
+        running = _in_flight.get(feedback_id)
+        owner = running is None
+        if owner:
+            running = _in_flight[feedback_id] = threading.Event()
+    if not owner:
+        running.wait(IN_FLIGHT_WAIT)
+        return
     try:
-        feedback_id = insert_feedback(feedback.text, feedback.source)
+        process_single_feedback(feedback_id, text, source)
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(feedback_id, None)
+        running.set()
+
+
+def _submit(text: str, source: str, idempotency_key: Optional[str], external_id: Optional[str],
+            queued: List[int]) -> Tuple[int, str]:
+    """Store one submission and get it classified at most once.
 
-        process_single_feedback(feedback_id, feedback.text)
+    Returns the feedback id and "created", "duplicate" or "conflict" (the
+    idempotency key was used before for different text). A duplicate that was
+    never scored, because the first attempt failed or is still running, is
+    processed or waited for instead of being inserted again. Queue-mode ids
+    are appended to ``queued``.
+    """
+    if idempotency_key or external_id:
+        feedback_id, created = insert_feedback_once(text, source, idempotency_key, external_id)
+    else:
+        feedback_id, created = insert_feedback(text, source), True
+    status = "created"
+    if not created:
+        existing = get_feedback_by_id(feedback_id)
+        if idempotency_key and existing and existing["text"] != text:
+            return feedback_id, "conflict"
+        if not existing or existing["priority_score"] is not None:
+            return feedback_id, "duplicate"
+        text, status = existing["text"], "duplicate"
+
+    if queue_mode():
+        queued.append(feedback_id)
+    else:
+        _process_once(feedback_id, text, source)
+    return feedback_id, status
+
+
+@router.post("/", response_model=FeedbackResponse)
+def submit_feedback(feedback: FeedbackInput, response: Response,
+                    idempotency_key: Optional[str] = Header(default=None, max_length=255)):
+    """Classify and score new feedback.
+
+    With an Idempotency-Key header (or ``idempotency_key``/``external_id`` in
+    the body) a retried request returns the original item, marked with an
+    ``Idempotent-Replayed: true`` header, instead of creating another one.
+    """
+    try:
+        queued: List[int] = []
+        feedback_id, status = _submit(
+            feedback.text, feedback.source, feedback.idempotency_key or idempotency_key, feedback.external_id, queued
+        )
+        if status == "conflict":
+            raise HTTPException(status_code=409, detail="Idempotency key was already used for different feedback")
+        if queued:
+            enqueue_feedback(queued, requeue=False)
+        if status == "duplicate":
+            response.headers["Idempotent-Replayed"] = "true"
 
         result = get_feedback_by_id(feedback_id)
         if not result:
@@ -31,28 +121,116 @@ async def submit_feedback(feedback: FeedbackInput):
         # Notion integration removed, no posting to Notion
 
         return FeedbackResponse(**result)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error submitting feedback: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/", response_model=List[FeedbackResponse])
-async def list_feedback():
+def list_feedback(request: Request):
     try:
-        feedback_list = get_all_feedback()
-        return [FeedbackResponse(**item) for item in feedback_list]
+        return cached_body_response(
+            get_response_cache(), request,
+            lambda: rows_to_json(FeedbackResponse, FEEDBACK_LISTING_COLUMNS, iter_feedback_listing()),
+        )
     except Exception as e:
         logger.error(f"Error listing feedback: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _since(days: Optional[int]) -> Optional[str]:
+    # created_at is stored as UTC text in SQLite's CURRENT_TIMESTAMP format.
+    if days is None:
+        return None
+    return (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _filters(theme: Optional[str], sentiment: Optional[str], source: Optional[str],
+             min_priority: Optional[float], days: Optional[int]) -> dict:
+    return {"theme": theme, "sentiment": sentiment, "source": source, "min_priority": min_priority, "since": _since(days)}
+
+
+@router.get("/stats", response_model=FeedbackStats)
+def feedback_stats(
+    theme: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    source: Optional[str] = None,
+    min_priority: Optional[float] = None,
+    days: Optional[int] = Query(default=None, ge=1, description="Only feedback from the last N days"),
+):
+    try:
+        return FeedbackStats(**get_feedback_stats(**_filters(theme, sentiment, source, min_priority, days)))
+    except Exception as e:
+        logger.error(f"Error computing feedback stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/top", response_model=List[FeedbackResponse])
+def top_feedback(
+    k: int = Query(default=10, ge=1, le=1000),
+    theme: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    source: Optional[str] = None,
+    min_priority: Optional[float] = None,
+    days: Optional[int] = Query(default=None, ge=1, description="Only feedback from the last N days"),
+):
+    try:
+        items = get_top_feedback(k, **_filters(theme, sentiment, source, min_priority, days))
+        return [FeedbackResponse(**item) for item in items]
+    except Exception as e:
+        logger.error(f"Error getting top feedback: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/drift", response_model=List[PriorityDrift])
+def priority_drift(
+    days: Optional[int] = Query(default=None, ge=1, description="Only consider re-scores from the last N days"),
+    limit: int = Query(default=20, ge=1, le=500),
+):
+    try:
+        return [PriorityDrift(**item) for item in get_priority_drift(_since(days), limit)]
+    except Exception as e:
+        logger.error(f"Error getting priority drift: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/clusters", response_model=List[ThemeCluster])
+def list_clusters():
+    try:
+        return [ThemeCluster(**cluster) for cluster in get_clusters()]
+    except Exception as e:
+        logger.error(f"Error listing clusters: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/clusters/{cluster_id}", response_model=ThemeClusterDetail)
+def get_cluster(cluster_id: int, limit: int = Query(default=20, ge=1, le=500)):
+    try:
+        cluster = next((c for c in get_clusters() if c["id"] == cluster_id), None)
+        if not cluster:
+            raise HTTPException(status_code=404, detail="Cluster not found")
+        return ThemeClusterDetail(**cluster, members=get_cluster_members(cluster_id, limit))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting cluster: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _feedback_or_404(feedback_id: int):
+    result = get_feedback_by_id(feedback_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Feedback not found")
+    return result
+
+
 @router.get("/{feedback_id}", response_model=FeedbackResponse)
-async def get_feedback(feedback_id: int):
+def get_feedback(feedback_id: int, request: Request):
     try:
-        result = get_feedback_by_id(feedback_id)
-        if not result:
-            raise HTTPException(status_code=404, detail="Feedback not found")
-        return FeedbackResponse(**result)
+        return cached_json_response(get_response_cache(), request, FeedbackResponse,
+                                    lambda: _feedback_or_404(feedback_id))
     except HTTPException:
         raise
     except Exception as e:
@@ -60,6 +238,32 @@ async def get_feedback(feedback_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{feedback_id}/similar", response_model=List[SimilarFeedback])
+def similar_feedback(feedback_id: int, k: int = Query(default=10, ge=1, le=100)):
+    try:
+        if not get_feedback_by_id(feedback_id):
+            raise HTTPException(status_code=404, detail="Feedback not found")
+        return [SimilarFeedback(**item) for item in find_similar_feedback(feedback_id, k)]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error finding similar feedback: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{feedback_id}/scores", response_model=List[ScoreHistoryEntry])
+def get_feedback_scores(feedback_id: int):
+    try:
+        if not get_feedback_by_id(feedback_id):
+            raise HTTPException(status_code=404, detail="Feedback not found")
+        return [ScoreHistoryEntry(**entry) for entry in get_score_history(feedback_id)]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting score history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete("/{feedback_id}", status_code=204)
 async def delete_feedback_endpoint(feedback_id: int):
     try:
@@ -75,29 +279,39 @@ async def delete_feedback_endpoint(feedback_id: int):
 
 
 @router.post("/upload-csv")
-async def upload_csv(file: UploadFile = File(...)):
+def upload_csv(file: UploadFile = File(...)):
+    # A plain def runs in the threadpool: classifying the rows, or waiting on a duplicate's
+    # first attempt, must not hold up the event loop.
     try:
         if not file.filename.endswith('.csv'):
             raise HTTPException(status_code=400, detail="File must be a CSV")
 
-        contents = await file.read()
+        contents = file.file.read()
         csv_file = io.StringIO(contents.decode('utf-8'))
         csv_reader = csv.DictReader(csv_file)
 
-        processed_count = 0
+        counts = {"created": 0, "duplicate": 0, "conflict": 0}
+        queued_ids = []
         for row in csv_reader:
             if 'text' in row or 'feedback' in row:
                 text = row.get('text') or row.get('feedback')
                 source = row.get('source', 'csv_upload')
 
                 if text and text.strip():
-                    feedback_id = insert_feedback(text, source)
-                    process_single_feedback(feedback_id, text)
-                    processed_count += 1
+                    # Rows keyed by external_id or idempotency_key are skipped when uploaded again.
+                    _, status = _submit(
+                        text, source, row.get('idempotency_key') or None, row.get('external_id') or None, queued_ids
+                    )
+                    counts[status] += 1
+
+        if queued_ids:
+            enqueue_feedback(queued_ids, requeue=False)
 
         return {
-            "message": f"Successfully processed {processed_count} feedback entries",
-            "count": processed_count
+            "message": f"Successfully processed {counts['created']} feedback entries",
+            "count": counts["created"],
+            "duplicates": counts["duplicate"],
+            "conflicts": counts["conflict"],
         }
     except Exception as e:
         logger.error(f"Error uploading CSV: {e}")
@@ -107,7 +321,7 @@ async def upload_csv(file: UploadFile = File(...)):
 @router.post("/send-email")
 async def send_email(request: EmailRequest):
     try:
-        success = email_integration.send_custom_email(
+        success = get_email_integration().send_custom_email(
             request.email,
             "Email Sent Successfully",
             "Your email has been sent successfully from VESTA Agent."
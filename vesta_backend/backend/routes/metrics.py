@@ -0,0 +1,37 @@
+from fastapi import APIRouter
+import logging
+from backend.crew_pipeline import get_routing_stats
+from backend.db import get_queue_stats
+from backend.llm_parsing import get_parse_stats
+from backend.prompt_budget import get_prompt_stats
+from backend.tenancy import tenant_limiter
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+logger = logging.getLogger(__name__)
+
+
+@router.get("/routing")
+async def routing_metrics():
+    return get_routing_stats()
+
+
+@router.get("/queue")
+async def queue_metrics():
+    return get_queue_stats()
+
+
+@router.get("/llm-parsing")
+async def llm_parsing_metrics():
+    return get_parse_stats()
+
+
+@router.get("/prompts")
+async def prompt_metrics():
+    """Tokens removed from feedback and report prompts by compaction (this process)."""
+    return get_prompt_stats()
+
+
+@router.get("/tenants")
+async def tenant_metrics():
+    """LLM calls in flight and tokens used per tenant in the current quota window (this process)."""
+    return tenant_limiter.snapshot()
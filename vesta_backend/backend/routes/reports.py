@@ -1,45 +1,144 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Dict, Iterator, List, Any, Optional
+import json
 import logging
 from datetime import datetime
 import os
 from pydantic import BaseModel
 from backend.models.schemas import ReportResponse
-from backend.db import get_all_feedback, insert_report, get_latest_report, get_all_reports
-from backend.crew_pipeline import generate_priority_report
-from integrations.email_integration import EmailIntegration
+from backend.db import (
+    get_top_feedback, insert_report, get_latest_report, get_all_reports, get_clusters, get_latest_report_cache,
+    get_response_cache,
+)
+from backend.response_cache import cached_json_response
+from backend.crew_pipeline import generate_priority_report, stream_priority_report
+from backend.report_mapreduce import get_theme_summaries, map_reduce_enabled
+from backend.tenancy import DEFAULT_TENANT, write_tenant
 
 router = APIRouter(prefix="/report", tags=["reports"])
 logger = logging.getLogger(__name__)
 
+# Reports cover the highest-priority items only, so only those are loaded.
+REPORT_TOP_K = int(os.getenv("REPORT_TOP_K", "5"))
+
 class EmailRequest(BaseModel):
     email: str
 
 
-@router.post("/generate", response_model=ReportResponse)
-async def generate_report():
+def save_and_distribute_report(markdown_report: str) -> int:
+    report_id = insert_report(markdown_report)
+
+    tenant = write_tenant()
+    directory = "reports" if tenant == DEFAULT_TENANT else os.path.join("reports", tenant)
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{directory}/{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.md"
+    with open(filename, 'w') as f:
+        f.write(markdown_report)
+    logger.info(f"Report saved to {filename}")
+
+    # Send email with report
+    from integrations.email_integration import EmailIntegration
+    email_integration = EmailIntegration()
+    subject = f"Feedback Priority Report - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+    body = markdown_report + "\n\nAccess the Admin Panel here: http://localhost:5000"
+    success = email_integration.send_report_email(subject, body)
+    if success:
+        logger.info("Report email sent successfully")
+    else:
+        logger.warning("Failed to send report email")
+
+    return report_id
+
+
+def load_report_trends() -> Optional[Dict[str, Any]]:
+    """Computed trends for the report, or None if they can't be computed."""
     try:
-        feedback_list = get_all_feedback()
+        # NumPy is only needed once a report is generated.
+        from backend.trends import get_trends
+        return get_trends()
+    except Exception as e:
+        logger.error(f"Error computing trends for report: {e}")
+        return None
 
-        markdown_report = generate_priority_report(feedback_list)
 
-        insert_report(markdown_report)
+def load_report_clusters() -> List[Dict[str, Any]]:
+    """Sub-themes from the last `python -m backend.themes` run; empty if it never ran."""
+    try:
+        return get_clusters()
+    except Exception as e:
+        logger.error(f"Error loading clusters for report: {e}")
+        return []
 
-        os.makedirs("reports", exist_ok=True)
-        filename = f"reports/{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.md"
-        with open(filename, 'w') as f:
-            f.write(markdown_report)
-        logger.info(f"Report saved to {filename}")
 
-        # Send email with report
-        email_integration = EmailIntegration()
-        subject = f"Feedback Priority Report - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-        body = markdown_report + "\n\nAccess the Admin Panel here: http://localhost:5000"
-        success = email_integration.send_report_email(subject, body)
-        if success:
-            logger.info("Report email sent successfully")
-        else:
-            logger.warning("Failed to send report email")
+def load_report_summaries() -> Optional[List[Dict[str, Any]]]:
+    """Per-group summaries when REPORT_MODE is map_reduce, or None (or if they can't be produced)."""
+    if not map_reduce_enabled():
+        return None
+    try:
+        return get_theme_summaries()
+    except Exception as e:
+        logger.error(f"Error summarizing feedback groups for report: {e}")
+        return None
+
+
+def build_priority_report(top_feedback: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Generate a report over the top-priority items (loaded unless given), with trends and sub-themes."""
+    if top_feedback is None:
+        top_feedback = get_top_feedback(REPORT_TOP_K)
+    return generate_priority_report(top_feedback, load_report_trends(), load_report_clusters(),
+                                    load_report_summaries())
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _stream_report_events(state: Dict[str, Any]) -> Iterator[str]:
+    # Runs in Starlette's threadpool, so the blocking LLM stream doesn't stall the event loop.
+    chunks = state["chunks"]
+    try:
+        for chunk in stream_priority_report(get_top_feedback(REPORT_TOP_K), load_report_trends(),
+                                            load_report_clusters(), load_report_summaries()):
+            chunks.append(chunk)
+            yield _sse_event("token", {"text": chunk})
+    except Exception as e:
+        logger.error(f"Error streaming report: {e}")
+        yield _sse_event("error", {"detail": str(e)})
+        return
+    state["complete"] = True
+    yield _sse_event("done", {"length": sum(len(c) for c in chunks)})
+
+
+def _persist_streamed_report(state: Dict[str, Any]):
+    if not state["complete"]:
+        logger.warning("Report stream did not complete, not persisting partial report")
+        return
+    try:
+        save_and_distribute_report("".join(state["chunks"]))
+    except Exception as e:
+        logger.error(f"Error persisting streamed report: {e}")
+
+
+@router.api_route("/generate/stream", methods=["GET", "POST"])
+async def generate_report_stream():
+    """Stream the report as Server-Sent Events, then persist and distribute it in the background."""
+    state: Dict[str, Any] = {"chunks": [], "complete": False}
+    return StreamingResponse(
+        _stream_report_events(state),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(_persist_streamed_report, state),
+    )
+
+
+@router.post("/generate", response_model=ReportResponse)
+async def generate_report():
+    try:
+        markdown_report = build_priority_report()
+
+        save_and_distribute_report(markdown_report)
 
         report = get_latest_report()
         if not report:
@@ -51,25 +150,63 @@ async def generate_report():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/latest", response_model=ReportResponse)
-async def get_latest():
+@router.get("/trends")
+def get_report_trends(
+    window_days: Optional[float] = Query(default=None, gt=0, description="Window length in days (TREND_WINDOW_DAYS)"),
+    windows: Optional[int] = Query(default=None, ge=2, le=104, description="Current window plus baseline windows (TREND_WINDOWS)"),
+):
+    """Per-theme volume, sentiment and priority for the latest window against the baseline windows."""
     try:
-        report = get_latest_report()
-        if not report:
-            raise HTTPException(status_code=404, detail="No reports found")
-        return ReportResponse(**report)
-    except HTTPException:
-        raise
+        from backend.trends import get_trends
+        return get_trends(window_days=window_days, windows=windows)
+    except Exception as e:
+        logger.error(f"Error computing trends: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _cached_latest_report():
+    try:
+        cached = get_latest_report_cache().get()
     except Exception as e:
         logger.error(f"Error getting latest report: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    if cached is None:
+        raise HTTPException(status_code=404, detail="No reports found")
+    return cached
+
+
+def _not_modified(cached, if_none_match: Optional[str]) -> Optional[Response]:
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if if_none_match and cached.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+@router.get("/latest", response_model=ReportResponse)
+def get_latest(response: Response, if_none_match: Optional[str] = Header(default=None)):
+    """Served from memory; answers 304 when the client's ETag is still the latest report."""
+    cached = _cached_latest_report()
+    not_modified = _not_modified(cached, if_none_match)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = cached.etag
+    response.headers["Cache-Control"] = "no-cache"
+    return ReportResponse(**cached.report)
+
+
+@router.get("/latest/html", response_class=HTMLResponse)
+def get_latest_html(if_none_match: Optional[str] = Header(default=None)):
+    cached = _cached_latest_report()
+    not_modified = _not_modified(cached, if_none_match)
+    if not_modified:
+        return not_modified
+    return HTMLResponse(cached.html, headers={"ETag": cached.etag, "Cache-Control": "no-cache"})
 
 
 @router.get("/all", response_model=List[ReportResponse])
-async def get_all():
+def get_all(request: Request):
     try:
-        reports = get_all_reports()
-        return [ReportResponse(**report) for report in reports]
+        return cached_json_response(get_response_cache(), request, List[ReportResponse], get_all_reports)
     except Exception as e:
         logger.error(f"Error getting all reports: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -84,6 +221,7 @@ async def send_report_to_email(request: EmailRequest):
             raise HTTPException(status_code=404, detail="No reports found")
         
         # Send email with report
+        from integrations.email_integration import EmailIntegration
         email_integration = EmailIntegration()
         subject = f"Feedback Priority Report - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
         body = report['markdown_report'] + "\n\nAccess the Admin Panel here: http://localhost:5000"
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Dict, Optional
+import logging
+from backend.db import flush_usage, get_llm_usage_summary, get_usage_ledger
+from backend.usage import USAGE_GROUPS
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+logger = logging.getLogger(__name__)
+
+DAY = r"^\d{4}-\d{2}-\d{2}$"
+
+
+@router.get("")
+def llm_usage(
+    group_by: str = Query(default="day,source,stage", description=f"Comma-separated: {', '.join(USAGE_GROUPS)}"),
+    since: Optional[str] = Query(default=None, pattern=DAY, description="First UTC day, YYYY-MM-DD"),
+    until: Optional[str] = Query(default=None, pattern=DAY, description="Last UTC day, YYYY-MM-DD"),
+) -> Dict[str, Any]:
+    """Tokens, cost, latency and failures of this tenant's LLM calls, plus today's spend against the budgets."""
+    groups = [group.strip() for group in group_by.split(",") if group.strip()]
+    unknown = [group for group in groups if group not in USAGE_GROUPS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Cannot group by {', '.join(unknown)}; use {', '.join(USAGE_GROUPS)}")
+    try:
+        # Include calls still buffered in this process.
+        flush_usage()
+        rows = get_llm_usage_summary(groups, since, until)
+        totals = get_llm_usage_summary([], since, until)[0]
+        return {"group_by": groups, "rows": rows, "totals": totals, "budgets": get_usage_ledger().budgets()}
+    except Exception as e:
+        logger.error(f"Error summarizing LLM usage: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
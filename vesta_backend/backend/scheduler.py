@@ -1,67 +1,217 @@
 import os
 import logging
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.base import BaseTrigger
 from apscheduler.triggers.cron import CronTrigger
-from backend.db import get_all_feedback, insert_report
-from backend.crew_pipeline import generate_priority_report
+from backend.archive import run_maintenance
+from backend.db import (
+    get_feedback_stats, get_latest_report_cache, get_latest_report_state, get_tenants, get_top_feedback, insert_report,
+)
+from backend.report_delta import diff_section, fingerprint, report_state, top_fingerprint
+from backend.routes.reports import REPORT_TOP_K, build_priority_report
+from backend.tenancy import DEFAULT_TENANT, tenant_scope, write_tenant
 from integrations.slack import SlackIntegration
 from integrations.email_service import EmailIntegration
-from integrations.notion import NotionIntegration
 
 logger = logging.getLogger(__name__)
 
+# Minutes before each REPORT_CRON deadline at which the report is generated, so publishing is instant.
+PRECOMPUTE_LEAD_MINUTES = float(os.getenv("REPORT_PRECOMPUTE_MINUTES", "30"))
+# Tenants whose scheduled reports are generated at the same time.
+REPORT_CONCURRENCY = int(os.getenv("REPORT_CONCURRENCY", "4"))
+# Skip a scheduled report when its top items and counts match the last one's.
+REPORT_SKIP_UNCHANGED = os.getenv("REPORT_SKIP_UNCHANGED", "true").lower() == "true"
+
+# Precomputed reports by tenant.
+_precomputed: Dict[str, Dict[str, Any]] = {}
+_precomputed_lock = threading.Lock()
+
+
+class LeadTrigger(BaseTrigger):
+    """Fires ``lead`` before every fire time of ``trigger``."""
+
+    def __init__(self, trigger: BaseTrigger, lead: timedelta):
+        self.trigger = trigger
+        self.lead = lead
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        previous = previous_fire_time + self.lead if previous_fire_time else None
+        fire_time = self.trigger.get_next_fire_time(previous, now + self.lead)
+        return fire_time - self.lead if fire_time else None
+
+    def __str__(self):
+        return f"{self.trigger} minus {self.lead}"
+
+
+def for_each_tenant(job: Callable[[], Any], tenants: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run ``job`` once per tenant, REPORT_CONCURRENCY at a time, each in its tenant's scope.
+
+    Tenants share the thread pool but not their LLM slots (see
+    backend.tenancy), so a tenant with a slow report does not hold up the rest.
+    Returns each tenant's result.
+    """
+    tenants = tenants or get_tenants() or [DEFAULT_TENANT]
+
+    def run(tenant: str):
+        with tenant_scope(tenant):
+            return job()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(REPORT_CONCURRENCY, len(tenants))),
+                            thread_name_prefix="tenant-report") as pool:
+        return dict(zip(tenants, pool.map(run, tenants)))
+
+
+def _current_state():
+    """The current tenant's top items and counts, their fingerprint, and the last scheduled report's state."""
+    top_feedback = get_top_feedback(REPORT_TOP_K)
+    state = report_state(top_feedback, get_feedback_stats())
+    return top_feedback, state, fingerprint(state), get_latest_report_state()
+
+
+def _unchanged(current_fingerprint: str, previous: Optional[Dict[str, Any]]) -> bool:
+    return REPORT_SKIP_UNCHANGED and previous is not None and previous["fingerprint"] == current_fingerprint
+
+
+def precompute_report():
+    """Generate the current tenant's next scheduled report ahead of its deadline and hold it until then."""
+    tenant = write_tenant()
+    logger.info(f"Precomputing scheduled report for tenant '{tenant}'...")
+    try:
+        top_feedback, state, current_fingerprint, previous = _current_state()
+        if _unchanged(current_fingerprint, previous):
+            logger.info(f"Nothing changed for tenant '{tenant}' since report {previous['id']}, not precomputing")
+            return
+        markdown_report = build_priority_report(top_feedback)
+    except Exception as e:
+        logger.error(f"Failed to precompute scheduled report for tenant '{tenant}', "
+                     f"it will be generated at the deadline: {e}")
+        return
+    with _precomputed_lock:
+        _precomputed[tenant] = {"markdown_report": markdown_report, "generated_at": datetime.now(),
+                                "top_fingerprint": top_fingerprint(state)}
+    logger.info(f"Scheduled report for tenant '{tenant}' precomputed")
+
+
+def _take_precomputed(max_age: timedelta, current_top_fingerprint: str) -> Optional[str]:
+    with _precomputed_lock:
+        precomputed = _precomputed.pop(write_tenant(), None)
+    if precomputed is None or datetime.now() - precomputed["generated_at"] > max_age:
+        return None
+    if precomputed["top_fingerprint"] != current_top_fingerprint:
+        logger.info("Top items changed since the report was precomputed, regenerating")
+        return None
+    return precomputed["markdown_report"]
+
+
+def precompute_all_reports():
+    for_each_tenant(precompute_report)
+
+
+def generate_all_reports():
+    """The scheduled job: every tenant's report, generated concurrently."""
+    results = for_each_tenant(generate_and_distribute_report)
+    logger.info(f"Scheduled reports published for {sum(1 for ok in results.values() if ok)} of {len(results)} tenants")
+
+
+def generate_and_distribute_report() -> bool:
+    """Publish the current tenant's scheduled report; returns whether it was published.
+
+    Nothing is generated or sent when the top items and counts are the same as
+    in the last scheduled report. Otherwise the report ends with the items
+    that entered or left the top priorities since then.
+    """
+    tenant = write_tenant()
+    logger.info(f"Starting scheduled report generation for tenant '{tenant}'...")
 
-def generate_and_distribute_report():
-    logger.info("Starting scheduled report generation...")
-    
     try:
-        feedback_list = get_all_feedback()
-        markdown_report = generate_priority_report(feedback_list)
-        
-        insert_report(markdown_report)
-        
-        os.makedirs("reports", exist_ok=True)
-        filename = f"reports/{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.md"
+        top_feedback, state, current_fingerprint, previous = _current_state()
+        if _unchanged(current_fingerprint, previous):
+            with _precomputed_lock:
+                _precomputed.pop(tenant, None)
+            logger.info(f"Nothing changed for tenant '{tenant}' since report {previous['id']}, skipping")
+            return False
+
+        # A report older than two lead windows was left over from a missed deadline.
+        markdown_report = _take_precomputed(timedelta(minutes=PRECOMPUTE_LEAD_MINUTES * 2),
+                                           top_fingerprint(state))
+        if markdown_report is None:
+            markdown_report = build_priority_report(top_feedback)
+        else:
+            logger.info("Publishing precomputed report")
+
+        diff = diff_section(previous["top_items"] if previous else None, state["top"])
+        if diff:
+            markdown_report = f"{markdown_report.rstrip()}\n\n{diff}"
+
+        insert_report(markdown_report, current_fingerprint, state["top"])
+        # Load and render it now, so dashboard polls after the deadline are served from memory.
+        get_latest_report_cache().warm()
+
+        directory = "reports" if tenant == DEFAULT_TENANT else os.path.join("reports", tenant)
+        os.makedirs(directory, exist_ok=True)
+        filename = f"{directory}/{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.md"
         with open(filename, 'w') as f:
             f.write(markdown_report)
         logger.info(f"Report saved to {filename}")
-        
+
+        if tenant != DEFAULT_TENANT:
+            # Every tenant's report goes to the same channel and recipients, so say whose it is.
+            markdown_report = f"**Tenant:** {tenant}\n\n{markdown_report}"
+
         slack = SlackIntegration()
         if slack.is_configured():
             slack.post_report(markdown_report)
-        
+
         email = EmailIntegration()
         if email.is_configured():
             recipients = os.getenv("EMAIL_RECIPIENTS", "").split(",")
             recipients = [r.strip() for r in recipients if r.strip()]
             if recipients:
                 email.send_report(recipients, markdown_report)
-        
-        notion = NotionIntegration()
-        if notion.is_configured():
-            title = f"Weekly Feedback Report - {datetime.now().strftime('%Y-%m-%d')}"
-            notion.post_report_sync(title, markdown_report)
-        
-        logger.info("Scheduled report generation completed successfully")
+
+        logger.info(f"Scheduled report generation for tenant '{tenant}' completed successfully")
+        return True
     except Exception as e:
-        logger.error(f"Failed to generate scheduled report: {e}")
+        logger.error(f"Failed to generate scheduled report for tenant '{tenant}': {e}")
+        return False
 
 
 def start_scheduler():
     scheduler = BackgroundScheduler()
-    
+
     cron_schedule = os.getenv("REPORT_CRON", "0 9 * * 1")
-    
+    trigger = CronTrigger.from_crontab(cron_schedule)
+
     scheduler.add_job(
-        generate_and_distribute_report,
-        trigger=CronTrigger.from_crontab(cron_schedule),
+        generate_all_reports,
+        trigger=trigger,
         id="weekly_report",
         name="Generate Weekly Feedback Report",
         replace_existing=True
     )
-    
+    if PRECOMPUTE_LEAD_MINUTES > 0:
+        scheduler.add_job(
+            precompute_all_reports,
+            trigger=LeadTrigger(trigger, timedelta(minutes=PRECOMPUTE_LEAD_MINUTES)),
+            id="weekly_report_precompute",
+            name="Precompute Weekly Feedback Report",
+            replace_existing=True
+        )
+
+    maintenance_schedule = os.getenv("MAINTENANCE_CRON", "0 3 * * sun")
+    scheduler.add_job(
+        run_maintenance,
+        trigger=CronTrigger.from_crontab(maintenance_schedule),
+        id="database_maintenance",
+        name="Archive Old Feedback and Vacuum the Database",
+        replace_existing=True
+    )
+
     scheduler.start()
     logger.info(f"Scheduler started with cron: {cron_schedule}")
-    
+
     return scheduler
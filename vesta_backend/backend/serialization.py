@@ -0,0 +1,64 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Sequence, Type, get_args
+
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # Optional: the pydantic path below produces the same JSON, only slower.
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_datetime(value):
+    if isinstance(value, str):
+        try:
+            # SQLite hands back TIMESTAMP columns as text.
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return TypeAdapter(datetime).validate_python(value)
+    return value
+
+
+def _annotation_types(annotation) -> tuple:
+    return get_args(annotation) or (annotation,)
+
+
+def rows_to_json(model: Type[BaseModel], columns: Sequence[str], batches: Iterable[List[tuple]]) -> bytes:
+    """Serialize database rows as a JSON array of ``model`` objects without building a model per row.
+
+    ``columns`` names the tuple fields and must follow the model's field order,
+    so the output is byte-for-byte what ``List[model]`` would produce. The
+    database schema stands in for validation: datetime columns are parsed and
+    integers in float fields widened, and the rare row with a NULL where the
+    model allows none goes through the model, so its validators fill it in.
+    """
+    if orjson is None:
+        adapter = TypeAdapter(List[model])
+        rows = [dict(zip(columns, row)) for batch in batches for row in batch]
+        return adapter.dump_json(adapter.validate_python(rows))
+
+    fields = [_annotation_types(model.model_fields[column].annotation) for column in columns]
+    datetime_fields = [i for i, types in enumerate(fields) if datetime in types]
+    float_fields = [i for i, types in enumerate(fields) if float in types]
+    required_fields = [i for i, types in enumerate(fields) if type(None) not in types]
+    chunks = []
+    for batch in batches:
+        objects: List[Dict[str, Any]] = []
+        for row in batch:
+            row = list(row)
+            for i in datetime_fields:
+                row[i] = _parse_datetime(row[i])
+            for i in float_fields:
+                if isinstance(row[i], int) and not isinstance(row[i], bool):
+                    row[i] = float(row[i])
+            obj = dict(zip(columns, row))
+            if any(row[i] is None for i in required_fields):
+                obj = model.model_validate(obj).model_dump(mode="json")
+            objects.append(obj)
+        if objects:
+            # Each batch is dumped as an array, then the arrays are spliced into one.
+            chunks.append(orjson.dumps(objects, option=orjson.OPT_UTC_Z)[1:-1])
+    return b"[" + b",".join(chunks) + b"]"
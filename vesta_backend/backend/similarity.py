@@ -0,0 +1,339 @@
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.changes import ChangeCursor
+from backend.embeddings import EMBEDDING_DIM, EMBEDDING_MODEL, embed_texts, to_bytes
+from backend.storage import FeedbackRepository
+from backend.tenancy import ALL_TENANTS, tenant_scope
+from backend.themes import FIT_SAMPLE, embed_pending, iter_embeddings, minibatch_kmeans
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DEFAULT_PROBES = int(os.getenv("SIMILARITY_PROBES", "8"))
+# New vectors are scanned from an unsorted tail until it reaches this share of the index.
+TAIL_RATIO = 0.05
+MIN_TAIL = 10000
+# Deleted rows are compacted away once they make up this share of the index.
+COMPACT_RATIO = 0.25
+# Retrain the lists once the index has grown this many times past what they were trained on.
+REBUILD_GROWTH = 4
+
+
+def default_lists(count: int) -> int:
+    # About 250 lists at 1M vectors, i.e. ~4k vectors per list.
+    return max(1, min(1024, int(math.sqrt(count) / 4)))
+
+
+class SimilarityIndex:
+    """Inverted-file (IVF) nearest-neighbour index over feedback embeddings.
+
+    Vectors are grouped into lists by their nearest k-means centroid and kept
+    contiguous per list, so a query only scans the ``probes`` lists closest to
+    it. Vectors added since the last rebuild sit in an unsorted tail that is
+    filtered by list id; it is merged in once it grows past TAIL_RATIO.
+
+    Vectors are held as int8 with one shared scale: a quarter of the memory of
+    float32, and much faster to widen for the dot products than float16.
+
+    The index is saved as an .npz file with the change_log watermark it
+    reflects. On load it catches up from change_log, like the analytics snapshot.
+    """
+
+    def __init__(self, repository: FeedbackRepository, path: str, probes: Optional[int] = None,
+                 max_staleness: Optional[float] = None):
+        self.repository = repository
+        self.path = path
+        self.probes = probes or DEFAULT_PROBES
+        self.max_staleness = float(os.getenv("SIMILARITY_MAX_STALENESS", "1.0")) \
+            if max_staleness is None else max_staleness
+        self.lock = threading.RLock()
+        self.cursor: Optional[ChangeCursor] = None
+        self.refreshed_at = 0.0
+        self.scale = 127.0
+        self._set_main(np.zeros((0, EMBEDDING_DIM), dtype=np.float32),
+                       np.zeros(0, dtype=np.int64), np.zeros((0, EMBEDDING_DIM), dtype=np.int8))
+
+    def _set_main(self, centroids: np.ndarray, ids: np.ndarray, vectors: np.ndarray,
+                  lists: Optional[np.ndarray] = None, trained_for: Optional[int] = None):
+        """Replace the contents with ``ids`` and quantized ``vectors``, sorted into lists."""
+        self.centroids = centroids.astype(np.float32)
+        if lists is None:
+            lists = self._nearest_list(vectors)
+        order = np.argsort(lists, kind="stable")
+        self.ids, self.vectors, self.lists = ids[order], vectors[order], lists[order].astype(np.int32)
+        self.alive = np.ones(len(ids), dtype=bool)
+        self.size = self.main_size = len(ids)
+        self.dead = 0
+        self.offsets = np.searchsorted(self.lists, np.arange(len(self.centroids) + 1))
+        self.id_order = np.argsort(self.ids)
+        self.sorted_ids = self.ids[self.id_order]
+        self.tail: Dict[int, int] = {}
+        self.trained_for = len(ids) if trained_for is None else trained_for
+
+    def __len__(self) -> int:
+        return self.size - self.dead
+
+    def memory_bytes(self) -> int:
+        return sum(array.nbytes for array in (self.ids, self.vectors, self.lists, self.alive, self.id_order,
+                                               self.sorted_ids, self.centroids))
+
+    def _quantize(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors.astype(np.float32) * self.scale), -127, 127).astype(np.int8)
+
+    def _nearest_list(self, vectors: np.ndarray) -> np.ndarray:
+        if len(self.centroids) <= 1:
+            return np.zeros(len(vectors), dtype=np.int32)
+        return np.concatenate([
+            (vectors[start:start + 50000].astype(np.float32) @ self.centroids.T).argmax(axis=1)
+            for start in range(0, len(vectors), 50000)
+        ] or [np.zeros(0, dtype=np.int64)]).astype(np.int32)
+
+    def build(self):
+        """Train the lists on a sample of every stored embedding and index them all."""
+        with self.lock:
+            start = time.perf_counter()
+            watermark = self.repository.get_change_watermark()
+            embed_pending(self.repository)
+            batches = [(ids, vectors.astype(np.float16)) for ids, vectors in iter_embeddings(self.repository, 50000)]
+            ids = np.concatenate([b[0] for b in batches] or [np.zeros(0, dtype=np.int64)])
+            vectors = np.vstack([b[1] for b in batches] or [np.zeros((0, EMBEDDING_DIM), dtype=np.float16)])
+            # Items without content words have no meaningful neighbours.
+            keep = vectors.any(axis=1)
+            ids, vectors = ids[keep], vectors[keep]
+            if len(ids) > 1:
+                sample = vectors[np.random.default_rng(0).choice(len(ids), min(len(ids), FIT_SAMPLE), replace=False)]
+                centroids, _ = minibatch_kmeans(sample.astype(np.float32), default_lists(len(ids)))
+            else:
+                centroids = np.zeros((1, EMBEDDING_DIM), dtype=np.float32)
+            self.scale = 127.0 / max(float(np.abs(vectors).max()) if len(vectors) else 1.0, 1e-6)
+            self._set_main(centroids, ids, self._quantize(vectors))
+            self.cursor = ChangeCursor(self.repository.get_changes, watermark)
+            self.refreshed_at = time.monotonic()
+            logger.info(f"Similarity index built over {len(ids)} vectors in {len(self.centroids)} lists "
+                        f"in {time.perf_counter() - start:.1f}s")
+            self.save()
+
+    def save(self):
+        with self.lock:
+            if self.cursor is None:
+                return
+            self._compact()
+            # Changes still awaited in a gap must be re-read after a restart.
+            watermark = min([self.cursor.watermark] + [seq - 1 for seq in self.cursor.gaps])
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "wb") as f:
+                np.savez(
+                    f, format=np.array(FORMAT_VERSION), model=np.array(EMBEDDING_MODEL),
+                    watermark=np.array(watermark), trained_for=np.array(self.trained_for), scale=np.array(self.scale),
+                    centroids=self.centroids, ids=self.ids, vectors=self.vectors, lists=self.lists,
+                )
+            os.replace(temporary, self.path)
+
+    def load(self):
+        """Load the saved index and catch up from change_log; build from scratch if it is missing or stale."""
+        with self.lock:
+            try:
+                with np.load(self.path, allow_pickle=False) as saved:
+                    if int(saved["format"]) != FORMAT_VERSION or str(saved["model"]) != EMBEDDING_MODEL:
+                        raise ValueError("saved with another format or embedding model")
+                    watermark = int(saved["watermark"])
+                    if watermark > self.repository.get_change_watermark():
+                        raise ValueError("newer than the database")
+                    self.scale = float(saved["scale"])
+                    self._set_main(saved["centroids"], saved["ids"], saved["vectors"], saved["lists"],
+                                   int(saved["trained_for"]))
+            except FileNotFoundError:
+                logger.info(f"No similarity index at {self.path}, building one")
+                self.build()
+                return
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Rebuilding similarity index {self.path}: {e}")
+                self.build()
+                return
+            self.cursor = ChangeCursor(self.repository.get_changes, watermark)
+            logger.info(f"Similarity index loaded with {len(self)} vectors at change {watermark}")
+            self.refresh(force=True)
+
+    def refresh(self, force: bool = False) -> int:
+        """Apply feedback inserts and deletes logged since the last refresh; returns how many were applied."""
+        with self.lock:
+            if self.cursor is None:
+                self.load()
+                return len(self)
+            if not force and time.monotonic() - self.refreshed_at < self.max_staleness:
+                return 0
+            if self.repository.get_change_watermark() < self.cursor.watermark:
+                # change_log went backwards: the database was replaced or restored.
+                self.build()
+                return len(self)
+            added: Dict[int, None] = {}
+            removed = set()
+            while True:
+                changes = self.cursor.poll()
+                for change in changes:
+                    if change["entity"] != "feedback":
+                        continue
+                    if change["op"] == "insert":
+                        added[change["entity_id"]] = None
+                    elif change["op"] == "delete":
+                        added.pop(change["entity_id"], None)
+                        removed.add(change["entity_id"])
+                if len(changes) < 10000:
+                    break
+            self.refreshed_at = time.monotonic()
+            self.remove(removed)
+            self._add_feedback(list(added))
+            if len(self) > max(REBUILD_GROWTH * self.trained_for, MIN_TAIL):
+                logger.info(f"Similarity index grew to {len(self)} vectors, retraining lists")
+                self.build()
+            return len(added) + len(removed)
+
+    def _add_feedback(self, feedback_ids: List[int]):
+        for start in range(0, len(feedback_ids), 500):
+            # One index serves every tenant; results are filtered per tenant when read.
+            with tenant_scope(ALL_TENANTS):
+                rows = self.repository.get_feedback_by_ids(feedback_ids[start:start + 500])
+            if not rows:
+                continue
+            vectors = embed_texts([row["text"] for row in rows])
+            # Stored so theme discovery never embeds these again.
+            self.repository.save_embeddings(EMBEDDING_MODEL, [(row["id"], to_bytes(v)) for row, v in zip(rows, vectors)])
+            self.add(np.array([row["id"] for row in rows], dtype=np.int64), vectors)
+
+    def _positions(self, feedback_ids: Iterable[int]) -> np.ndarray:
+        """Row of each live id, or -1."""
+        ids = np.asarray(list(feedback_ids), dtype=np.int64)
+        positions = np.full(len(ids), -1, dtype=np.int64)
+        if self.main_size and len(ids):
+            index = np.minimum(np.searchsorted(self.sorted_ids, ids), self.main_size - 1)
+            found = self.sorted_ids[index] == ids
+            positions[found] = self.id_order[index[found]]
+        for i, feedback_id in enumerate(ids.tolist()):
+            tail_position = self.tail.get(feedback_id)
+            if tail_position is not None:
+                positions[i] = tail_position
+        positions[(positions >= 0) & ~self.alive[np.maximum(positions, 0)]] = -1
+        return positions
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray):
+        with self.lock:
+            keep = vectors.any(axis=1) & (self._positions(ids) < 0)
+            ids, vectors = ids[keep], self._quantize(vectors[keep])
+            if not len(ids):
+                return
+            self._reserve(len(ids))
+            rows = slice(self.size, self.size + len(ids))
+            self.ids[rows], self.vectors[rows] = ids, vectors
+            self.lists[rows] = self._nearest_list(vectors)
+            self.alive[rows] = True
+            self.tail.update(zip(ids.tolist(), range(rows.start, rows.stop)))
+            self.size = rows.stop
+            if self.size - self.main_size > max(MIN_TAIL, TAIL_RATIO * self.main_size):
+                self.save()
+
+    def remove(self, feedback_ids: Iterable[int]):
+        with self.lock:
+            positions = self._positions(feedback_ids)
+            positions = positions[positions >= 0]
+            self.alive[positions] = False
+            self.dead += len(positions)
+            if self.dead > COMPACT_RATIO * max(self.size, 1):
+                self._compact()
+
+    def _reserve(self, count: int):
+        capacity = len(self.ids)
+        if self.size + count <= capacity:
+            return
+        capacity = max(self.size + count, capacity + capacity // 4, 1024)
+        for name in ("ids", "vectors", "lists", "alive"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _compact(self):
+        """Drop deleted rows and merge the tail into the sorted lists."""
+        if self.size == self.main_size and not self.dead and len(self.ids) == self.size:
+            return
+        keep = np.flatnonzero(self.alive[:self.size])
+        self._set_main(self.centroids, self.ids[keep], self.vectors[keep], self.lists[keep], self.trained_for)
+
+    def search(self, vector: np.ndarray, k: int = 10, exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """(feedback_id, cosine similarity) of the ``k`` nearest vectors, best first."""
+        with self.lock:
+            if not len(self):
+                return []
+            vector = np.asarray(vector, dtype=np.float32)
+            probes = np.argsort(-(self.centroids @ vector))[:self.probes]
+            positions, scores = [], []
+            # Each probed list is a contiguous slice, so no gather is needed for the main segment.
+            for start, stop in zip(self.offsets[probes], self.offsets[probes + 1]):
+                positions.append(np.arange(start, stop))
+                scores.append(self.vectors[start:stop].astype(np.float32) @ vector)
+            tail = self.main_size + np.flatnonzero(np.isin(self.lists[self.main_size:self.size], probes))
+            positions.append(tail)
+            scores.append(self.vectors[tail].astype(np.float32) @ vector)
+            # Quantization can push a near-duplicate just past 1.
+            candidates, scores = np.concatenate(positions), np.minimum(np.concatenate(scores) / self.scale, 1.0)
+            keep = self.alive[candidates]
+            if exclude is not None:
+                keep &= self.ids[candidates] != exclude
+            candidates, scores = candidates[keep], scores[keep]
+            if len(candidates) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                candidates, scores = candidates[top], scores[top]
+            order = np.lexsort((self.ids[candidates], -scores))
+            return [(int(self.ids[c]), round(float(s), 4)) for c, s in zip(candidates[order], scores[order])]
+
+    def similar(self, feedback_id: int, k: int = 10) -> List[Tuple[int, float]]:
+        """Nearest neighbours of an indexed item; empty if it has no content to compare."""
+        self.refresh()
+        with self.lock:
+            position = self._positions([feedback_id])[0]
+            if position < 0:
+                return []
+            return self.search(self.vectors[position].astype(np.float32) / self.scale, k, exclude=feedback_id)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the feedback similarity index or query it")
+    parser.add_argument("--rebuild", action="store_true", help="Retrain the lists and reindex every item")
+    parser.add_argument("--similar-to", type=int, help="Print the nearest neighbours of a feedback id")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--db-path", help="SQLite file to use when DATABASE_URL is not set")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    import backend.db as db_module
+    if args.db_path:
+        db_module.DB_PATH = args.db_path
+    db_module.init_db()
+
+    index = SimilarityIndex(db_module.get_repository(), db_module.similarity_index_path())
+    if args.rebuild:
+        index.build()
+    else:
+        index.load()
+    print(json.dumps({"path": index.path, "vectors": len(index), "lists": len(index.centroids),
+                      "memory_mib": round(index.memory_bytes() / 2**20, 1)}))
+    if args.similar_to is not None:
+        for feedback_id, score in index.similar(args.similar_to, args.k):
+            print(f"{score:.3f}  {feedback_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
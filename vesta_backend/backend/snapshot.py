@@ -0,0 +1,282 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from backend.changes import ChangeCursor
+from backend.storage.base import FeedbackRepository, summarize_stat_groups
+from backend.tenancy import current_tenant
+from backend.trends import SENTIMENTS, UNCLASSIFIED, TrendColumns
+
+logger = logging.getLogger(__name__)
+
+# Deleted rows are compacted away once they make up this share of the arrays.
+COMPACT_RATIO = 0.25
+
+
+class Dictionary:
+    """Maps labels to small integer codes; None is always code -1."""
+
+    def __init__(self, labels: Iterable[str] = ()):
+        self.labels: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for label in labels:
+            self.encode(label)
+
+    def encode(self, label: Optional[str]) -> int:
+        if label is None:
+            return -1
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def lookup(self, label: Optional[str]) -> Optional[int]:
+        """Code for ``label``, or None when it has never been seen."""
+        return -1 if label is None else self.codes.get(label)
+
+    def decode(self, code: int) -> Optional[str]:
+        return None if code < 0 else self.labels[code]
+
+
+class FeedbackSnapshot:
+    """Columnar in-memory copy of the feedback + current score view.
+
+    Theme, sentiment and source are dictionary-encoded; missing scores are
+    NaN. ``refresh()`` reads change_log past the snapshot's watermark and
+    re-reads only the feedback rows that changed, so it stays cheap while
+    workers and API processes keep writing.
+    """
+
+    def __init__(self, repository: FeedbackRepository, max_staleness: Optional[float] = None):
+        self.repository = repository
+        self.max_staleness = float(os.getenv("ANALYTICS_SNAPSHOT_MAX_STALENESS", "1.0")) \
+            if max_staleness is None else max_staleness
+        self.lock = threading.RLock()
+        self.themes = Dictionary()
+        self.sentiments = Dictionary(SENTIMENTS)
+        self.sources = Dictionary()
+        self.size = 0
+        self.dead = 0
+        self.positions: Dict[int, int] = {}
+        self._allocate(0)
+        self.cursor: Optional[ChangeCursor] = None
+        self.refreshed_at = 0.0
+
+    def _allocate(self, capacity: int):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.created = np.zeros(capacity, dtype=np.int64)
+        self.theme = np.full(capacity, -1, dtype=np.int32)
+        self.sentiment = np.full(capacity, -1, dtype=np.int32)
+        self.source = np.full(capacity, -1, dtype=np.int32)
+        self.urgency = np.full(capacity, np.nan, dtype=np.float32)
+        self.impact = np.full(capacity, np.nan, dtype=np.float32)
+        self.priority = np.full(capacity, np.nan, dtype=np.float64)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in
+                ("ids", "created", "theme", "sentiment", "source", "urgency", "impact", "priority", "alive")}
+
+    def _reserve(self, count: int):
+        capacity = len(self.ids)
+        if self.size + count <= capacity:
+            return
+        old = self._arrays()
+        self._allocate(max(self.size + count, capacity * 2, 1024))
+        for name, array in old.items():
+            getattr(self, name)[:self.size] = array[:self.size]
+
+    def __len__(self) -> int:
+        return self.size - self.dead
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the column arrays and the position index (excluding dictionary labels)."""
+        arrays = sum(array.nbytes for array in self._arrays().values())
+        # Rough dict cost: ~100 bytes per entry for the key, value and table slot.
+        return arrays + 100 * len(self.positions)
+
+    def load(self):
+        """Rebuild from scratch; the watermark is read first so nothing written meanwhile is lost."""
+        with self.lock:
+            watermark = self.repository.get_change_watermark()
+            rows = self.repository.get_snapshot_rows()
+            self.size = self.dead = 0
+            self.positions = {}
+            self._allocate(0)
+            self._upsert(rows)
+            self.cursor = ChangeCursor(self.repository.get_changes, watermark)
+            self.refreshed_at = time.monotonic()
+            logger.info(f"Analytics snapshot loaded with {len(self)} rows at change {watermark}")
+
+    def refresh(self, force: bool = False) -> int:
+        """Apply changes logged since the last refresh; returns the number of rows re-read."""
+        with self.lock:
+            if self.cursor is None:
+                self.load()
+                return len(self)
+            if not force and time.monotonic() - self.refreshed_at < self.max_staleness:
+                return 0
+            if self.repository.get_change_watermark() < self.cursor.watermark:
+                # change_log went backwards: the database was replaced or restored.
+                self.load()
+                return len(self)
+            # Snapshots hold one tenant's rows (they are read in that tenant's scope).
+            tenant = current_tenant()
+            changed = set()
+            while True:
+                changes = self.cursor.poll()
+                changed.update(c["entity_id"] for c in changes
+                               if c["entity"] == "feedback" and tenant in (None, c["tenant_id"]))
+                if len(changes) < 10000:
+                    break
+            self.refreshed_at = time.monotonic()
+            if changed:
+                self._apply(changed)
+            return len(changed)
+
+    def _apply(self, feedback_ids: Iterable[int]):
+        ids = sorted(feedback_ids)
+        rows = []
+        for start in range(0, len(ids), 500):
+            rows.extend(self.repository.get_snapshot_rows(ids[start:start + 500]))
+        self._upsert(rows)
+        found = {row[0] for row in rows}
+        for feedback_id in ids:
+            if feedback_id not in found:
+                self._delete(feedback_id)
+        if self.dead > COMPACT_RATIO * max(self.size, 1):
+            self._compact()
+
+    def _upsert(self, rows: Sequence[Sequence[Any]]):
+        if not rows:
+            return
+        count = len(rows)
+        positions = np.empty(count, dtype=np.int64)
+        added = 0
+        for index, row in enumerate(rows):
+            position = self.positions.get(row[0])
+            if position is None:
+                position = self.positions[row[0]] = self.size + added
+                added += 1
+            positions[index] = position
+        self._reserve(added)
+        self.size += added
+
+        ids, created, themes, sentiments, sources, urgency, impact, priority = zip(*rows)
+        self.ids[positions] = ids
+        self.created[positions] = created
+        self.theme[positions] = np.fromiter(map(self.themes.encode, themes), dtype=np.int32, count=count)
+        self.sentiment[positions] = np.fromiter(map(self.sentiments.encode, sentiments), dtype=np.int32, count=count)
+        self.source[positions] = np.fromiter(map(self.sources.encode, sources), dtype=np.int32, count=count)
+        # None becomes NaN when converted to a float array.
+        self.urgency[positions] = np.array(urgency, dtype=np.float32)
+        self.impact[positions] = np.array(impact, dtype=np.float32)
+        self.priority[positions] = np.array(priority, dtype=np.float64)
+        self.alive[positions] = True
+
+    def _delete(self, feedback_id: int):
+        position = self.positions.pop(feedback_id, None)
+        if position is not None:
+            self.alive[position] = False
+            self.priority[position] = np.nan
+            self.dead += 1
+
+    def _compact(self):
+        keep = np.flatnonzero(self.alive[:self.size])
+        for name, array in self._arrays().items():
+            array[:len(keep)] = array[keep]
+        self.size, self.dead = len(keep), 0
+        self.alive[self.size:] = False
+        self.positions = {int(feedback_id): position for position, feedback_id in enumerate(self.ids[:self.size])}
+
+    def _mask(self, theme: Optional[str] = None, sentiment: Optional[str] = None, source: Optional[str] = None,
+              min_priority: Optional[float] = None, since: Optional[str] = None) -> np.ndarray:
+        mask = self.alive[:self.size].copy()
+        for dictionary, column, label in ((self.themes, self.theme, theme),
+                                          (self.sentiments, self.sentiment, sentiment),
+                                          (self.sources, self.source, source)):
+            if label is not None:
+                code = dictionary.lookup(label)
+                if code is None:
+                    return np.zeros(self.size, dtype=bool)
+                mask &= column[:self.size] == code
+        if min_priority is not None:
+            with np.errstate(invalid="ignore"):
+                mask &= self.priority[:self.size] >= min_priority
+        if since is not None:
+            epoch = datetime.strptime(since, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+            mask &= self.created[:self.size] >= epoch
+        return mask
+
+    def top_k(self, k: int, **filters) -> List[int]:
+        """Ids of the ``k`` highest-priority scored items, ties broken by id like the SQL path."""
+        with self.lock:
+            mask = self._mask(**filters) & ~np.isnan(self.priority[:self.size])
+            candidates = np.flatnonzero(mask)
+            priorities = self.priority[candidates]
+            if len(candidates) > k:
+                # Keep every item tied with the k-th priority so the id tie-break is exact.
+                cutoff = np.partition(priorities, len(priorities) - k)[len(priorities) - k]
+                keep = priorities >= cutoff
+                candidates, priorities = candidates[keep], priorities[keep]
+            order = np.lexsort((self.ids[candidates], -priorities))[:k]
+            return [int(feedback_id) for feedback_id in self.ids[candidates[order]]]
+
+    def stats(self, **filters) -> Dict[str, Any]:
+        """Same shape as FeedbackRepository.feedback_stats, computed with bincount over group codes."""
+        with self.lock:
+            mask = self._mask(**filters)
+            # Shift codes by one so None (-1) gets its own group.
+            theme = self.theme[:self.size][mask].astype(np.int64) + 1
+            sentiment = self.sentiment[:self.size][mask].astype(np.int64) + 1
+            source = self.source[:self.size][mask].astype(np.int64) + 1
+            priority = self.priority[:self.size][mask]
+            urgency = self.urgency[:self.size][mask].astype(np.float64)
+            impact = self.impact[:self.size][mask].astype(np.float64)
+            widths = (len(self.sentiments.labels) + 1, len(self.sources.labels) + 1)
+            key = (theme * widths[0] + sentiment) * widths[1] + source
+            scored = ~np.isnan(priority)
+
+            groups, index = np.unique(key, return_inverse=True)
+            count = np.bincount(index, minlength=len(groups))
+            scored_count = np.bincount(index, weights=scored, minlength=len(groups))
+            sums = {
+                name: np.bincount(index[scored], weights=values[scored], minlength=len(groups))
+                for name, values in (("urgency_sum", urgency), ("impact_sum", impact), ("priority_sum", priority))
+            }
+            rows = []
+            for position, group in enumerate(groups.tolist()):
+                group, source_code = divmod(group, widths[1])
+                theme_code, sentiment_code = divmod(group, widths[0])
+                rows.append({
+                    "theme": self.themes.decode(theme_code - 1),
+                    "sentiment": self.sentiments.decode(sentiment_code - 1),
+                    "source": self.sources.decode(source_code - 1),
+                    "count": int(count[position]),
+                    "scored": int(scored_count[position]),
+                    **{name: float(values[position]) for name, values in sums.items()},
+                })
+        return summarize_stat_groups(rows)
+
+    def trend_columns(self, since: float) -> TrendColumns:
+        """Columns for backend.trends without going back to the database."""
+        with self.lock:
+            mask = self.alive[:self.size] & (self.created[:self.size] >= since)
+            themes = self.theme[:self.size][mask]
+            labels = list(self.themes.labels)
+            if (themes < 0).any():
+                themes = np.where(themes < 0, len(labels), themes)
+                labels.append(UNCLASSIFIED)
+            return TrendColumns(
+                self.created[:self.size][mask],
+                themes,
+                labels,
+                self.sentiment[:self.size][mask].astype(np.int8),
+                self.priority[:self.size][mask],
+            )
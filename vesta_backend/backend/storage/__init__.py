@@ -0,0 +1,15 @@
+from backend.storage.base import FeedbackRepository
+from backend.storage.sqlite import SQLiteRepository
+
+
+def create_repository(url: str) -> FeedbackRepository:
+    """Build a repository from a DATABASE_URL or a plain SQLite file path."""
+    if url.startswith(("postgres://", "postgresql://")):
+        from backend.storage.postgres import PostgresRepository
+        return PostgresRepository(url)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SQLiteRepository(url)
+
+
+__all__ = ["FeedbackRepository", "SQLiteRepository", "create_repository"]
@@ -0,0 +1,1184 @@
+import json
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.tenancy import current_tenant, write_tenant
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_FILTERS = ("theme", "sentiment", "source", "min_priority", "since")
+# Rows per multi-row INSERT in insert_feedback_bulk; 7 parameters each stays well under SQLite's limit.
+BULK_INSERT_ROWS = 500
+# Columns of iter_feedback_listing(), in FeedbackResponse field order.
+FEEDBACK_LISTING_COLUMNS = (
+    "id", "text", "source", "sentiment", "theme", "summary",
+    "urgency", "impact", "justification", "priority_score", "created_at",
+)
+
+
+def summarize_stat_groups(groups: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fold (theme, sentiment, source) groups into dashboard statistics.
+
+    Each group carries ``count``, ``scored`` and the sums of urgency, impact
+    and priority over its scored items.
+    """
+    total = scored = 0
+    urgency = impact = priority = 0.0
+    themes: Dict[Any, Dict[str, Any]] = {}
+    sentiments: Dict[Any, int] = {}
+    sources: Dict[Any, int] = {}
+    for group in groups:
+        total += group["count"]
+        scored += group["scored"]
+        urgency += group["urgency_sum"] or 0
+        impact += group["impact_sum"] or 0
+        priority += group["priority_sum"] or 0
+        theme = themes.setdefault(group["theme"], {"theme": group["theme"], "count": 0, "scored": 0, "priority_sum": 0.0})
+        theme["count"] += group["count"]
+        theme["scored"] += group["scored"]
+        theme["priority_sum"] += group["priority_sum"] or 0
+        sentiments[group["sentiment"]] = sentiments.get(group["sentiment"], 0) + group["count"]
+        sources[group["source"]] = sources.get(group["source"], 0) + group["count"]
+
+    def mean(value: float, count: int) -> Optional[float]:
+        return round(value / count, 4) if count else None
+
+    return {
+        "total": total,
+        "scored": scored,
+        "avg_urgency": mean(urgency, scored),
+        "avg_impact": mean(impact, scored),
+        "avg_priority": mean(priority, scored),
+        "by_theme": [
+            {"theme": item["theme"], "count": item["count"], "scored": item["scored"],
+             "avg_priority": mean(item["priority_sum"], item["scored"])}
+            for item in sorted(themes.values(), key=lambda item: (-item["count"], str(item["theme"])))
+        ],
+        "by_sentiment": [
+            {"sentiment": label, "count": count}
+            for label, count in sorted(sentiments.items(), key=lambda item: (-item[1], str(item[0])))
+        ],
+        "by_source": [
+            {"source": label, "count": count}
+            for label, count in sorted(sources.items(), key=lambda item: (-item[1], str(item[0])))
+        ],
+    }
+
+
+class FeedbackRepository:
+    """Storage operations shared by every backend.
+
+    Queries are written once with ``?`` placeholders and portable SQL; backends
+    provide ``connection()``, translate placeholders in ``_sql`` and override the
+    few dialect-specific pieces (primary key column type, bulk statements).
+    """
+
+    name = "base"
+    id_column = "INTEGER PRIMARY KEY"
+    blob_type = "BLOB"
+    # Appended to the queue claim subquery; PostgreSQL skips rows other workers hold.
+    claim_lock_clause = ""
+    # Appended to reads that must hold the row until commit; SQLite already serializes writers.
+    row_lock_clause = ""
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _sql(self, query: str) -> str:
+        return query
+
+    def _execute(self, conn, query: str, params: Iterable[Any] = ()):
+        return conn.execute(self._sql(query), tuple(params))
+
+    def _fetchone(self, conn, query: str, params: Iterable[Any] = ()) -> Optional[Dict[str, Any]]:
+        row = self._execute(conn, query, params).fetchone()
+        return dict(row) if row else None
+
+    def _fetchall(self, conn, query: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._execute(conn, query, params).fetchall()]
+
+    def _insert(self, conn, query: str, params: Iterable[Any] = ()) -> int:
+        row = self._execute(conn, query + " RETURNING id", params).fetchone()
+        return row["id"]
+
+    def _tuple_cursor(self, conn, query: str, params: Iterable[Any] = ()):
+        """An executed cursor yielding plain tuples, for bulk reads that skip the per-row dict conversion."""
+        raise NotImplementedError
+
+    def _fetch_tuples(self, conn, query: str, params: Iterable[Any] = ()) -> List[tuple]:
+        return self._tuple_cursor(conn, query, params).fetchall()
+
+    def _epoch(self, column: str) -> str:
+        """SQL expression for a TIMESTAMP column as integer epoch seconds (UTC)."""
+        raise NotImplementedError
+
+    def _columns(self, conn, table: str) -> List[str]:
+        raise NotImplementedError
+
+    def _log_change(self, conn, entity: str, entity_id: int, op: str, tenant_id: Optional[str] = None):
+        self._execute(
+            conn,
+            "INSERT INTO change_log (entity, entity_id, op, tenant_id) VALUES (?, ?, ?, ?)",
+            (entity, entity_id, op, tenant_id or write_tenant())
+        )
+
+    def _tenant_clause(self, column: str = "f.tenant_id", prefix: str = " AND ") -> Tuple[str, List[Any]]:
+        """``column = ?`` for the current tenant, or nothing when working across tenants."""
+        tenant = current_tenant()
+        if tenant is None:
+            return "", []
+        return f"{prefix}{column} = ?", [tenant]
+
+    def _feedback_filters(self, theme: Optional[str] = None, sentiment: Optional[str] = None,
+                          source: Optional[str] = None, min_priority: Optional[float] = None,
+                          since: Optional[str] = None, tenant_column: str = "f.tenant_id"):
+        """WHERE clause and params over ``feedback f`` joined with ``scores s``, for the current tenant."""
+        clauses, params = [], []
+        tenant = current_tenant()
+        if tenant is not None:
+            clauses.append(f"{tenant_column} = ?")
+            params.append(tenant)
+        for column, value in (("f.theme", theme), ("f.sentiment", sentiment), ("f.source", source)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if min_priority is not None:
+            clauses.append("s.priority_score >= ?")
+            params.append(min_priority)
+        if since is not None:
+            clauses.append("f.created_at >= ?")
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _add_column(self, conn, table: str, column: str, definition: str) -> bool:
+        """Add ``column`` to an existing table unless it is already there."""
+        if column in self._columns(conn, table):
+            return False
+        self._execute(conn, f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+
+    def schema(self) -> List[str]:
+        return [
+            f"""
+            CREATE TABLE IF NOT EXISTS feedback (
+                id {self.id_column},
+                text TEXT NOT NULL,
+                source TEXT DEFAULT 'manual',
+                sentiment TEXT,
+                theme TEXT,
+                summary TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                idempotency_key TEXT,
+                external_id TEXT,
+                label_source TEXT,
+                tenant_id TEXT NOT NULL DEFAULT 'default'
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_feedback_created ON feedback (created_at)",
+            f"""
+            CREATE TABLE IF NOT EXISTS scores (
+                id {self.id_column},
+                feedback_id INTEGER NOT NULL,
+                urgency INTEGER NOT NULL,
+                impact INTEGER NOT NULL,
+                justification TEXT NOT NULL,
+                priority_score REAL NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                version INTEGER NOT NULL DEFAULT 1,
+                tenant_id TEXT NOT NULL DEFAULT 'default',
+                FOREIGN KEY (feedback_id) REFERENCES feedback (id)
+            )
+            """,
+            f"""
+            CREATE TABLE IF NOT EXISTS score_history (
+                id {self.id_column},
+                feedback_id INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                urgency INTEGER NOT NULL,
+                impact INTEGER NOT NULL,
+                justification TEXT NOT NULL,
+                priority_score REAL NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (feedback_id) REFERENCES feedback (id)
+            )
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_score_history_version ON score_history (feedback_id, version)",
+            "CREATE INDEX IF NOT EXISTS idx_score_history_created ON score_history (created_at)",
+            f"""
+            CREATE TABLE IF NOT EXISTS reports (
+                id {self.id_column},
+                generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                markdown_report TEXT NOT NULL,
+                tenant_id TEXT NOT NULL DEFAULT 'default'
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS feedback_queue (
+                feedback_id INTEGER PRIMARY KEY,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires_at DOUBLE PRECISION,
+                last_error TEXT,
+                enqueued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (feedback_id) REFERENCES feedback (id)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_feedback_queue_claim ON feedback_queue (status, lease_expires_at)",
+            f"""
+            CREATE TABLE IF NOT EXISTS feedback_embeddings (
+                feedback_id INTEGER PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector {self.blob_type} NOT NULL,
+                FOREIGN KEY (feedback_id) REFERENCES feedback (id)
+            )
+            """,
+            f"""
+            CREATE TABLE IF NOT EXISTS theme_clusters (
+                id {self.id_column},
+                tenant_id TEXT NOT NULL DEFAULT 'default',
+                label TEXT NOT NULL,
+                keywords TEXT,
+                parent_theme TEXT,
+                weight REAL NOT NULL DEFAULT 0,
+                centroid {self.blob_type} NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS feedback_clusters (
+                feedback_id INTEGER PRIMARY KEY,
+                cluster_id INTEGER,
+                similarity REAL,
+                FOREIGN KEY (feedback_id) REFERENCES feedback (id),
+                FOREIGN KEY (cluster_id) REFERENCES theme_clusters (id)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_feedback_clusters_cluster ON feedback_clusters (cluster_id, similarity)",
+            """
+            CREATE TABLE IF NOT EXISTS archived_stats (
+                month TEXT NOT NULL,
+                theme TEXT,
+                sentiment TEXT,
+                source TEXT,
+                count INTEGER NOT NULL,
+                scored INTEGER NOT NULL,
+                urgency_sum DOUBLE PRECISION,
+                impact_sum DOUBLE PRECISION,
+                priority_sum DOUBLE PRECISION,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                tenant_id TEXT NOT NULL DEFAULT 'default'
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_archived_stats_month ON archived_stats (month)",
+            f"""
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq {self.id_column},
+                entity TEXT NOT NULL,
+                entity_id INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                tenant_id TEXT NOT NULL DEFAULT 'default'
+            )
+            """,
+            f"""
+            CREATE TABLE IF NOT EXISTS llm_usage (
+                id {self.id_column},
+                created_at TIMESTAMP NOT NULL,
+                day TEXT NOT NULL,
+                tenant_id TEXT NOT NULL DEFAULT 'default',
+                feedback_id INTEGER,
+                source TEXT,
+                stage TEXT NOT NULL,
+                tier TEXT NOT NULL,
+                model TEXT,
+                attempt INTEGER NOT NULL DEFAULT 1,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                saved_tokens INTEGER NOT NULL DEFAULT 0,
+                cost DOUBLE PRECISION NOT NULL,
+                latency_ms DOUBLE PRECISION NOT NULL,
+                outcome TEXT NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_llm_usage_tenant_day ON llm_usage (tenant_id, day)",
+            "CREATE INDEX IF NOT EXISTS idx_llm_usage_day_tier ON llm_usage (day, tier)",
+            """
+            CREATE TABLE IF NOT EXISTS report_summaries (
+                tenant_id TEXT NOT NULL DEFAULT 'default',
+                group_key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (tenant_id, group_key)
+            )
+            """,
+        ]
+
+    def init_db(self):
+        with self.connection() as conn:
+            for statement in self.schema():
+                self._execute(conn, statement)
+            self.migrate(conn)
+
+    def migrate(self, conn):
+        """Bring databases created by older versions up to the current schema."""
+        # scores used to get a new row per run; it now holds only the current score,
+        # and every run is kept in score_history.
+        self._add_column(conn, "scores", "version", "INTEGER NOT NULL DEFAULT 1")
+        if not self._fetchone(conn, "SELECT 1 AS found FROM score_history LIMIT 1"):
+            self._execute(conn, """
+                INSERT INTO score_history (feedback_id, version, urgency, impact, justification, priority_score, created_at)
+                SELECT feedback_id, ROW_NUMBER() OVER (PARTITION BY feedback_id ORDER BY id),
+                       urgency, impact, justification, priority_score, created_at
+                FROM scores
+            """)
+            self._execute(conn, "DELETE FROM scores WHERE id NOT IN (SELECT MAX(id) FROM scores GROUP BY feedback_id)")
+            self._execute(conn, """
+                UPDATE scores SET version = (
+                    SELECT MAX(h.version) FROM score_history h WHERE h.feedback_id = scores.feedback_id
+                )
+            """)
+        self._execute(conn, "CREATE UNIQUE INDEX IF NOT EXISTS idx_scores_feedback ON scores (feedback_id)")
+        self._execute(conn, "CREATE INDEX IF NOT EXISTS idx_scores_priority ON scores (priority_score)")
+        # Dedup keys for retried submissions and re-uploaded exports.
+        self._add_column(conn, "feedback", "idempotency_key", "TEXT")
+        self._add_column(conn, "feedback", "external_id", "TEXT")
+        # Tenants: every row belongs to one, existing rows to 'default'. Indexes lead with
+        # tenant_id so each tenant's queries only touch its own index range.
+        for table in ("feedback", "scores", "reports", "archived_stats", "change_log"):
+            self._add_column(conn, table, "tenant_id", "TEXT NOT NULL DEFAULT 'default'")
+        self._execute(conn, "DROP INDEX IF EXISTS idx_feedback_idempotency_key")
+        self._execute(conn, "DROP INDEX IF EXISTS idx_feedback_external_id")
+        self._execute(conn, """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_feedback_tenant_idempotency_key
+            ON feedback (tenant_id, idempotency_key) WHERE idempotency_key IS NOT NULL
+        """)
+        self._execute(conn, """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_feedback_tenant_external_id
+            ON feedback (tenant_id, source, external_id) WHERE external_id IS NOT NULL
+        """)
+        self._execute(conn, "CREATE INDEX IF NOT EXISTS idx_feedback_tenant_created ON feedback (tenant_id, created_at)")
+        self._execute(conn, "CREATE INDEX IF NOT EXISTS idx_scores_tenant_priority ON scores (tenant_id, priority_score)")
+        self._execute(conn, "CREATE INDEX IF NOT EXISTS idx_reports_tenant_generated ON reports (tenant_id, generated_at)")
+        self._execute(conn, "CREATE INDEX IF NOT EXISTS idx_archived_stats_tenant_month ON archived_stats (tenant_id, month)")
+        # Scheduled reports record the state they were generated from, so unchanged runs can be skipped.
+        self._add_column(conn, "reports", "fingerprint", "TEXT")
+        self._add_column(conn, "reports", "top_items", "TEXT")
+        self._add_column(conn, "llm_usage", "saved_tokens", "INTEGER NOT NULL DEFAULT 0")
+        # Clusters used to be fitted and named over every tenant's feedback, so their labels quote
+        # other tenants' text; drop them, and the next discovery run fits each tenant's own.
+        if self._add_column(conn, "theme_clusters", "tenant_id", "TEXT NOT NULL DEFAULT 'default'"):
+            self._execute(conn, "DELETE FROM feedback_clusters")
+            self._execute(conn, "DELETE FROM theme_clusters")
+        self._execute(conn, "CREATE INDEX IF NOT EXISTS idx_theme_clusters_tenant ON theme_clusters (tenant_id)")
+        # Whether an LLM or the local classifier wrote the sentiment and theme; unknown for older rows.
+        self._add_column(conn, "feedback", "label_source", "TEXT")
+
+    def insert_feedback(self, text: str, source: str = "manual") -> int:
+        with self.connection() as conn:
+            feedback_id = self._insert(
+                conn,
+                "INSERT INTO feedback (text, source, tenant_id) VALUES (?, ?, ?)",
+                (text, source, write_tenant())
+            )
+            self._log_change(conn, "feedback", feedback_id, "insert")
+            return feedback_id
+
+    def insert_feedback_once(self, text: str, source: str = "manual", idempotency_key: Optional[str] = None,
+                             external_id: Optional[str] = None) -> Tuple[int, bool]:
+        """Insert unless a row of this tenant with the same idempotency key, or source and external id, exists.
+
+        Returns ``(feedback_id, created)``. A concurrent insert of the same key
+        waits on the unique index, so exactly one caller gets ``created``.
+        """
+        tenant = write_tenant()
+        with self.connection() as conn:
+            row = self._fetchone(
+                conn,
+                "INSERT INTO feedback (text, source, idempotency_key, external_id, tenant_id) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT DO NOTHING RETURNING id",
+                (text, source, idempotency_key, external_id, tenant)
+            )
+            if row:
+                self._log_change(conn, "feedback", row["id"], "insert", tenant)
+                return row["id"], True
+            existing = self._fetchone(
+                conn,
+                "SELECT id FROM feedback WHERE tenant_id = ? AND (idempotency_key = ? OR (source = ? AND external_id = ?)) "
+                "ORDER BY id LIMIT 1",
+                (tenant, idempotency_key, source, external_id)
+            )
+            return existing["id"], False
+
+    def insert_feedback_bulk(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Insert rows for the current tenant, unless a row names its own ``tenant_id``."""
+        tenant = write_tenant()
+        params = [
+            (
+                row["text"],
+                row.get("source") or "manual",
+                row.get("sentiment"),
+                row.get("theme"),
+                row.get("summary"),
+                row.get("created_at"),
+                row.get("tenant_id") or tenant,
+            )
+            for row in rows
+        ]
+        if not params:
+            return 0
+        row_values = "(?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)"
+        with self.connection() as conn:
+            inserted: List[Dict[str, Any]] = []
+            for start in range(0, len(params), BULK_INSERT_ROWS):
+                chunk = params[start:start + BULK_INSERT_ROWS]
+                inserted += self._fetchall(
+                    conn,
+                    "INSERT INTO feedback (text, source, sentiment, theme, summary, created_at, tenant_id) "
+                    f"VALUES {', '.join(row_values for _ in chunk)} RETURNING id, tenant_id",
+                    [value for row in chunk for value in row]
+                )
+            # Log exactly the ids we got back; concurrent inserts can interleave with ours.
+            conn.cursor().executemany(
+                self._sql("INSERT INTO change_log (entity, entity_id, op, tenant_id) VALUES ('feedback', ?, 'insert', ?)"),
+                [(row["id"], row["tenant_id"]) for row in inserted]
+            )
+        return len(params)
+
+    def update_feedback_classification(self, feedback_id: int, sentiment: str, theme: str, summary: str,
+                                       label_source: Optional[str] = None):
+        tenant_clause, tenant_params = self._tenant_clause("tenant_id")
+        with self.connection() as conn:
+            row = self._fetchone(
+                conn,
+                "UPDATE feedback SET sentiment = ?, theme = ?, summary = ?, label_source = ? "
+                f"WHERE id = ?{tenant_clause} RETURNING tenant_id",
+                [sentiment, theme, summary, label_source, feedback_id] + tenant_params
+            )
+            if row:
+                self._log_change(conn, "feedback", feedback_id, "update", row["tenant_id"])
+
+    def insert_score(self, feedback_id: int, urgency: int, impact: int, justification: str, priority_score: float) -> int:
+        """Record a new score version and make it the item's current score; returns the version."""
+        with self.connection() as conn:
+            # Scores belong to their feedback's tenant, which leads the top-priority index. Locking the
+            # feedback row makes concurrent scorings of one item take their version numbers in turn.
+            owner = self._fetchone(
+                conn, f"SELECT tenant_id FROM feedback WHERE id = ?{self.row_lock_clause}", (feedback_id,)
+            )
+            tenant = owner["tenant_id"] if owner else write_tenant()
+            version = self._fetchone(conn, """
+                INSERT INTO score_history (feedback_id, version, urgency, impact, justification, priority_score)
+                SELECT ?, COALESCE(MAX(version), 0) + 1, ?, ?, ?, ? FROM score_history WHERE feedback_id = ?
+                RETURNING version
+            """, (feedback_id, urgency, impact, justification, priority_score, feedback_id))["version"]
+            # The version guard keeps a slower concurrent run from overwriting a newer score.
+            self._execute(conn, """
+                INSERT INTO scores (feedback_id, version, urgency, impact, justification, priority_score, tenant_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (feedback_id) DO UPDATE SET
+                    version = excluded.version, urgency = excluded.urgency, impact = excluded.impact,
+                    justification = excluded.justification, priority_score = excluded.priority_score,
+                    created_at = CURRENT_TIMESTAMP
+                WHERE scores.version < excluded.version
+            """, (feedback_id, version, urgency, impact, justification, priority_score, tenant))
+            self._log_change(conn, "feedback", feedback_id, "update", tenant)
+            return version
+
+    def get_score_history(self, feedback_id: int) -> List[Dict[str, Any]]:
+        tenant_clause, tenant_params = self._tenant_clause()
+        with self.connection() as conn:
+            return self._fetchall(conn, f"""
+                SELECT h.version, h.urgency, h.impact, h.justification, h.priority_score, h.created_at
+                FROM score_history h
+                JOIN feedback f ON f.id = h.feedback_id
+                WHERE h.feedback_id = ?{tenant_clause}
+                ORDER BY h.version
+            """, [feedback_id] + tenant_params)
+
+    def get_priority_drift(self, since: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Items re-scored since ``since``, ordered by how far their priority moved."""
+        tenant_clause, tenant_params = self._tenant_clause(prefix=" WHERE ")
+        with self.connection() as conn:
+            return self._fetchall(conn, f"""
+                SELECT
+                    w.feedback_id, f.theme, f.summary, w.versions, w.min_priority, w.max_priority,
+                    h.priority_score AS first_priority, s.priority_score AS current_priority,
+                    s.priority_score - h.priority_score AS drift
+                FROM (
+                    SELECT feedback_id, COUNT(*) AS versions, MIN(version) AS first_version,
+                           MIN(priority_score) AS min_priority, MAX(priority_score) AS max_priority
+                    FROM score_history
+                    WHERE created_at >= ?
+                    GROUP BY feedback_id
+                    HAVING COUNT(*) > 1
+                ) w
+                JOIN score_history h ON h.feedback_id = w.feedback_id AND h.version = w.first_version
+                JOIN scores s ON s.feedback_id = w.feedback_id
+                JOIN feedback f ON f.id = w.feedback_id{tenant_clause}
+                ORDER BY ABS(s.priority_score - h.priority_score) DESC, w.feedback_id
+                LIMIT ?
+            """, [since or "1970-01-01 00:00:00"] + tenant_params + [limit])
+
+    def get_top_feedback(self, limit: int = 5, **filters) -> List[Dict[str, Any]]:
+        # Filtering on the scores side lets the (tenant_id, priority_score) index drive the scan.
+        where, params = self._feedback_filters(**filters, tenant_column="s.tenant_id")
+        with self.connection() as conn:
+            return self._fetchall(conn, f"""
+                SELECT
+                    f.id, f.text, f.source, f.sentiment, f.theme, f.summary, f.created_at,
+                    s.urgency, s.impact, s.justification, s.priority_score
+                FROM scores s
+                JOIN feedback f ON f.id = s.feedback_id{where}
+                ORDER BY s.priority_score DESC, f.id
+                LIMIT ?
+            """, params + [limit])
+
+    def get_feedback_by_ids(self, feedback_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Feedback with current scores, in the order the ids were given; other tenants' ids are left out."""
+        ids = list(feedback_ids)
+        if not ids:
+            return []
+        tenant_clause, tenant_params = self._tenant_clause()
+        with self.connection() as conn:
+            rows = self._fetchall(conn, f"""
+                SELECT
+                    f.id, f.text, f.source, f.sentiment, f.theme, f.summary, f.created_at,
+                    s.urgency, s.impact, s.justification, s.priority_score
+                FROM feedback f
+                LEFT JOIN scores s ON f.id = s.feedback_id
+                WHERE f.id IN ({', '.join('?' for _ in ids)}){tenant_clause}
+            """, ids + tenant_params)
+        by_id = {row["id"]: row for row in rows}
+        return [by_id[feedback_id] for feedback_id in ids if feedback_id in by_id]
+
+    def feedback_stats(self, **filters) -> Dict[str, Any]:
+        where, params = self._feedback_filters(**filters)
+        with self.connection() as conn:
+            groups = self._fetchall(conn, f"""
+                SELECT
+                    f.theme, f.sentiment, f.source, COUNT(*) AS count, COUNT(s.priority_score) AS scored,
+                    SUM(s.urgency) AS urgency_sum, SUM(s.impact) AS impact_sum, SUM(s.priority_score) AS priority_sum
+                FROM feedback f
+                LEFT JOIN scores s ON f.id = s.feedback_id{where}
+                GROUP BY f.theme, f.sentiment, f.source
+            """, params)
+        return summarize_stat_groups(groups)
+
+    def get_snapshot_rows(self, feedback_ids: Optional[Iterable[int]] = None) -> List[tuple]:
+        """(id, epoch, theme, sentiment, source, urgency, impact, priority_score) for the analytics snapshot."""
+        query = f"""
+            SELECT f.id, {self._epoch("f.created_at")}, f.theme, f.sentiment, f.source,
+                   s.urgency, s.impact, s.priority_score
+            FROM feedback f
+            LEFT JOIN scores s ON f.id = s.feedback_id
+        """
+        tenant_clause, params = self._tenant_clause(prefix=" WHERE ")
+        query += tenant_clause
+        if feedback_ids is not None:
+            ids = list(feedback_ids)
+            if not ids:
+                return []
+            query += f"{' AND' if params else ' WHERE'} f.id IN ({', '.join('?' for _ in ids)})"
+            params += ids
+        with self.connection() as conn:
+            return self._fetch_tuples(conn, query, params)
+
+    def get_change_watermark(self) -> int:
+        with self.connection() as conn:
+            return self._fetchone(conn, "SELECT COALESCE(MAX(seq), 0) AS seq FROM change_log")["seq"]
+
+    def get_changes(self, after_seq: int, limit: int = 10000, until_seq: Optional[int] = None) -> List[Dict[str, Any]]:
+        """change_log entries of every tenant, each with its ``tenant_id``; readers filter as they need."""
+        query = "SELECT seq, entity, entity_id, op, changed_at, tenant_id FROM change_log WHERE seq > ?"
+        params: List[Any] = [after_seq]
+        if until_seq is not None:
+            query += " AND seq <= ?"
+            params.append(until_seq)
+        with self.connection() as conn:
+            return self._fetchall(conn, query + " ORDER BY seq LIMIT ?", params + [limit])
+
+    def get_all_feedback(self) -> List[Dict[str, Any]]:
+        tenant_clause, tenant_params = self._tenant_clause(prefix=" WHERE ")
+        with self.connection() as conn:
+            return self._fetchall(conn, f"""
+                SELECT
+                    f.id, f.text, f.source, f.sentiment, f.theme, f.summary, f.created_at,
+                    s.urgency, s.impact, s.justification, s.priority_score
+                FROM feedback f
+                LEFT JOIN scores s ON f.id = s.feedback_id{tenant_clause}
+                ORDER BY f.created_at DESC
+            """, tenant_params)
+
+    def get_llm_labelled_feedback(self) -> List[Dict[str, Any]]:
+        """Classified feedback whose sentiment and theme came from an LLM, not the local classifier."""
+        tenant_clause, tenant_params = self._tenant_clause()
+        with self.connection() as conn:
+            return self._fetchall(conn, f"""
+                SELECT
+                    f.id, f.text, f.sentiment, f.theme, s.urgency, s.impact, s.priority_score
+                FROM feedback f
+                LEFT JOIN scores s ON f.id = s.feedback_id
+                WHERE f.label_source = 'llm' AND f.sentiment IS NOT NULL AND f.theme IS NOT NULL{tenant_clause}
+                ORDER BY f.id
+            """, tenant_params)
+
+    def iter_feedback_listing(self, batch_size: int = 5000) -> Iterator[List[tuple]]:
+        """The rows of get_all_feedback() as tuples of FEEDBACK_LISTING_COLUMNS, read from the cursor in batches."""
+        tenant_clause, tenant_params = self._tenant_clause(prefix=" WHERE ")
+        with self.connection() as conn:
+            cursor = self._tuple_cursor(conn, f"""
+                SELECT
+                    f.id, f.text, f.source, f.sentiment, f.theme, f.summary,
+                    s.urgency, s.impact, s.justification, s.priority_score, f.created_at
+                FROM feedback f
+                LEFT JOIN scores s ON f.id = s.feedback_id{tenant_clause}
+                ORDER BY f.created_at DESC
+            """, tenant_params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+
+    def get_trend_rows(self, since: str) -> List[tuple]:
+        """(epoch, theme, sentiment, priority_score) for feedback created at or after ``since``."""
+        tenant_clause, tenant_params = self._tenant_clause()
+        with self.connection() as conn:
+            return self._fetch_tuples(conn, f"""
+                SELECT {self._epoch("f.created_at")}, f.theme, f.sentiment, s.priority_score
+                FROM feedback f
+                LEFT JOIN scores s ON f.id = s.feedback_id
+                WHERE f.created_at >= ?{tenant_clause}
+            """, [since] + tenant_params)
+
+    def get_feedback_by_id(self, feedback_id: int) -> Optional[Dict[str, Any]]:
+        tenant_clause, tenant_params = self._tenant_clause()
+        with self.connection() as conn:
+            return self._fetchone(conn, f"""
+                SELECT
+                    f.id, f.text, f.source, f.sentiment, f.theme, f.summary, f.created_at,
+                    s.urgency, s.impact, s.justification, s.priority_score
+                FROM feedback f
+                LEFT JOIN scores s ON f.id = s.feedback_id
+                WHERE f.id = ?{tenant_clause}
+            """, [feedback_id] + tenant_params)
+
+    def list_tenants(self) -> List[str]:
+        """Tenants that have feedback, in name order."""
+        with self.connection() as conn:
+            return [row["tenant_id"] for row in self._fetchall(
+                conn, "SELECT DISTINCT tenant_id FROM feedback ORDER BY tenant_id"
+            )]
+
+    def insert_report(self, markdown_report: str, fingerprint: Optional[str] = None,
+                      top_items: Optional[List[Dict[str, Any]]] = None) -> int:
+        tenant = write_tenant()
+        with self.connection() as conn:
+            report_id = self._insert(
+                conn,
+                "INSERT INTO reports (markdown_report, tenant_id, fingerprint, top_items) VALUES (?, ?, ?, ?)",
+                (markdown_report, tenant, fingerprint, json.dumps(top_items) if top_items is not None else None)
+            )
+            self._log_change(conn, "report", report_id, "insert", tenant)
+            return report_id
+
+    def get_latest_report_state(self) -> Optional[Dict[str, Any]]:
+        """Fingerprint and top items of the latest report that recorded them (the scheduled ones)."""
+        tenant_clause, tenant_params = self._tenant_clause("tenant_id")
+        with self.connection() as conn:
+            row = self._fetchone(
+                conn,
+                f"SELECT id, generated_at, fingerprint, top_items FROM reports WHERE fingerprint IS NOT NULL{tenant_clause} "
+                "ORDER BY generated_at DESC, id DESC LIMIT 1",
+                tenant_params
+            )
+        if row is not None:
+            row["top_items"] = json.loads(row["top_items"]) if row["top_items"] else []
+        return row
+
+    def get_report_summaries(self) -> Dict[str, Dict[str, Any]]:
+        """The current tenant's cached per-group report summaries by group key."""
+        tenant_clause, tenant_params = self._tenant_clause("tenant_id", " WHERE ")
+        with self.connection() as conn:
+            rows = self._fetchall(
+                conn, f"SELECT group_key, fingerprint, summary, updated_at FROM report_summaries{tenant_clause}",
+                tenant_params
+            )
+        return {row["group_key"]: row for row in rows}
+
+    def save_report_summaries(self, summaries: Iterable[Dict[str, Any]]):
+        """Upsert ``{group_key, fingerprint, summary}`` rows for the current tenant."""
+        tenant = write_tenant()
+        params = [(tenant, s["group_key"], s["fingerprint"], s["summary"]) for s in summaries]
+        if not params:
+            return
+        with self.connection() as conn:
+            conn.cursor().executemany(
+                self._sql(
+                    "INSERT INTO report_summaries (tenant_id, group_key, fingerprint, summary) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (tenant_id, group_key) DO UPDATE SET fingerprint = excluded.fingerprint, "
+                    "summary = excluded.summary, updated_at = CURRENT_TIMESTAMP"
+                ),
+                params
+            )
+
+    def get_latest_report(self) -> Optional[Dict[str, Any]]:
+        tenant_clause, tenant_params = self._tenant_clause("tenant_id", " WHERE ")
+        with self.connection() as conn:
+            return self._fetchone(
+                conn,
+                f"SELECT id, generated_at, markdown_report FROM reports{tenant_clause} "
+                "ORDER BY generated_at DESC, id DESC LIMIT 1",
+                tenant_params
+            )
+
+    def get_all_reports(self) -> List[Dict[str, Any]]:
+        tenant_clause, tenant_params = self._tenant_clause("tenant_id", " WHERE ")
+        with self.connection() as conn:
+            return self._fetchall(
+                conn,
+                f"SELECT id, generated_at, markdown_report FROM reports{tenant_clause} ORDER BY generated_at DESC, id DESC",
+                tenant_params
+            )
+
+    def delete_feedback(self, feedback_id: int) -> bool:
+        tenant_clause, tenant_params = self._tenant_clause("tenant_id")
+        with self.connection() as conn:
+            owner = self._fetchone(
+                conn, f"SELECT tenant_id FROM feedback WHERE id = ?{tenant_clause}", [feedback_id] + tenant_params
+            )
+            if owner is None:
+                return False
+            # Delete scores and queue entries first due to foreign key constraints
+            self._execute(conn, "DELETE FROM scores WHERE feedback_id = ?", (feedback_id,))
+            self._execute(conn, "DELETE FROM score_history WHERE feedback_id = ?", (feedback_id,))
+            self._execute(conn, "DELETE FROM feedback_embeddings WHERE feedback_id = ?", (feedback_id,))
+            self._execute(conn, "DELETE FROM feedback_clusters WHERE feedback_id = ?", (feedback_id,))
+            self._execute(conn, "DELETE FROM feedback_queue WHERE feedback_id = ?", (feedback_id,))
+            # Delete feedback
+            cursor = self._execute(conn, "DELETE FROM feedback WHERE id = ?", (feedback_id,))
+            if cursor.rowcount == 0:
+                return False
+            self._log_change(conn, "feedback", feedback_id, "delete", owner["tenant_id"])
+            return True
+
+    def archive_feedback(self, before: str, write: Callable[[List[Dict[str, Any]]], None],
+                         limit: int = 5000) -> int:
+        """Move up to ``limit`` feedback items created before ``before`` out of the live tables.
+
+        ``write`` gets the items, oldest first, each with its current ``score``
+        and ``score_history``, and must have stored them durably when it
+        returns. The rows are deleted and their counts added to archived_stats
+        in the same transaction, so a failing write leaves everything in place.
+        Items still waiting in the queue are skipped. Returns how many moved.
+        Scoped to the current tenant, or every tenant under ALL_TENANTS.
+        """
+        tenant_clause, tenant_params = self._tenant_clause()
+        with self.connection() as conn:
+            rows = self._fetchall(conn, f"""
+                SELECT
+                    f.id, f.text, f.source, f.sentiment, f.theme, f.summary, f.created_at,
+                    f.idempotency_key, f.external_id, f.tenant_id,
+                    s.urgency, s.impact, s.justification, s.priority_score, s.version
+                FROM feedback f
+                LEFT JOIN scores s ON f.id = s.feedback_id
+                WHERE f.created_at < ? AND NOT EXISTS (
+                    SELECT 1 FROM feedback_queue q
+                    WHERE q.feedback_id = f.id AND q.status IN ('pending', 'leased')
+                ){tenant_clause}
+                ORDER BY f.created_at, f.id
+                LIMIT ?
+            """, [before] + tenant_params + [limit])
+            if not rows:
+                return 0
+            ids = [row["id"] for row in rows]
+            placeholders = ", ".join("?" for _ in ids)
+            history: Dict[int, List[Dict[str, Any]]] = {}
+            for entry in self._fetchall(conn, f"""
+                SELECT feedback_id, version, urgency, impact, justification, priority_score, created_at
+                FROM score_history WHERE feedback_id IN ({placeholders})
+                ORDER BY feedback_id, version
+            """, ids):
+                history.setdefault(entry.pop("feedback_id"), []).append(entry)
+
+            items = []
+            groups: Dict[Tuple[Any, ...], List[float]] = {}
+            for row in rows:
+                score_fields = {name: row.pop(name) for name in ("urgency", "impact", "justification",
+                                                                  "priority_score", "version")}
+                scored = score_fields["priority_score"] is not None
+                items.append({**row, "score": score_fields if scored else None,
+                              "score_history": history.get(row["id"], [])})
+                key = (str(row["created_at"])[:7], row["theme"], row["sentiment"], row["source"], row["tenant_id"])
+                group = groups.setdefault(key, [0, 0, 0.0, 0.0, 0.0])
+                group[0] += 1
+                if scored:
+                    group[1] += 1
+                    group[2] += score_fields["urgency"]
+                    group[3] += score_fields["impact"]
+                    group[4] += score_fields["priority_score"]
+            write(items)
+
+            conn.cursor().executemany(
+                self._sql(
+                    "INSERT INTO archived_stats (month, theme, sentiment, source, tenant_id, count, scored, "
+                    "urgency_sum, impact_sum, priority_sum) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                ),
+                [key + tuple(values) for key, values in groups.items()]
+            )
+            for table, column in (("scores", "feedback_id"), ("score_history", "feedback_id"),
+                                  ("feedback_embeddings", "feedback_id"), ("feedback_clusters", "feedback_id"),
+                                  ("feedback_queue", "feedback_id"), ("feedback", "id")):
+                self._execute(conn, f"DELETE FROM {table} WHERE {column} IN ({placeholders})", ids)
+            conn.cursor().executemany(
+                self._sql("INSERT INTO change_log (entity, entity_id, op, tenant_id) VALUES ('feedback', ?, 'delete', ?)"),
+                [(row["id"], row["tenant_id"]) for row in rows]
+            )
+            return len(ids)
+
+    def archived_stat_groups(self, start_month: Optional[str] = None, end_month: Optional[str] = None,
+                             theme: Optional[str] = None, sentiment: Optional[str] = None,
+                             source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """archived_stats summed per (theme, sentiment, source), for summarize_stat_groups."""
+        clauses, params = [], []
+        for clause, value in (("tenant_id = ?", current_tenant()), ("month >= ?", start_month),
+                              ("month <= ?", end_month), ("theme = ?", theme),
+                              ("sentiment = ?", sentiment), ("source = ?", source)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.connection() as conn:
+            return self._fetchall(conn, f"""
+                SELECT
+                    theme, sentiment, source, SUM(count) AS count, SUM(scored) AS scored,
+                    SUM(urgency_sum) AS urgency_sum, SUM(impact_sum) AS impact_sum, SUM(priority_sum) AS priority_sum
+                FROM archived_stats{where}
+                GROUP BY theme, sentiment, source
+            """, params)
+
+    def archived_months(self) -> List[Dict[str, Any]]:
+        tenant_clause, tenant_params = self._tenant_clause("tenant_id", " WHERE ")
+        with self.connection() as conn:
+            return self._fetchall(conn, f"""
+                SELECT month, SUM(count) AS items, MAX(archived_at) AS archived_at
+                FROM archived_stats{tenant_clause} GROUP BY month ORDER BY month
+            """, tenant_params)
+
+    def insert_llm_usage(self, entries: List[Dict[str, Any]]):
+        columns = ("created_at", "day", "tenant_id", "feedback_id", "source", "stage", "tier", "model", "attempt",
+                   "prompt_tokens", "completion_tokens", "saved_tokens", "cost", "latency_ms", "outcome")
+        with self.connection() as conn:
+            conn.cursor().executemany(
+                self._sql(f"INSERT INTO llm_usage ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"),
+                [tuple(entry[column] for column in columns) for entry in entries]
+            )
+
+    def get_llm_spend(self, day: str) -> Dict[str, float]:
+        """Cost of every tenant's LLM calls on ``day`` (UTC, YYYY-MM-DD) per tier."""
+        with self.connection() as conn:
+            return {row["tier"]: row["cost"] or 0.0 for row in self._fetchall(
+                conn, "SELECT tier, SUM(cost) AS cost FROM llm_usage WHERE day = ? GROUP BY tier", (day,)
+            )}
+
+    def llm_usage_summary(self, group_by: Iterable[str], since: Optional[str] = None,
+                          until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Calls, tokens, cost and latency of the current tenant's LLM calls per ``group_by`` columns.
+
+        ``group_by`` holds column names from backend.usage.USAGE_GROUPS; ``since``
+        and ``until`` are inclusive UTC days.
+        """
+        groups = list(group_by)
+        clauses, params = [], []
+        for clause, value in (("tenant_id = ?", current_tenant()), ("day >= ?", since), ("day <= ?", until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        select = "".join(f"{column}, " for column in groups)
+        group = f" GROUP BY {', '.join(groups)} ORDER BY {', '.join(groups)}" if groups else ""
+        with self.connection() as conn:
+            return self._fetchall(conn, f"""
+                SELECT
+                    {select}COUNT(*) AS calls,
+                    SUM(CASE WHEN outcome = 'ok' THEN 0 ELSE 1 END) AS failed,
+                    SUM(CASE WHEN attempt > 1 THEN 1 ELSE 0 END) AS retries,
+                    SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens,
+                    SUM(saved_tokens) AS saved_tokens, SUM(cost) AS cost, AVG(latency_ms) AS avg_latency_ms
+                FROM llm_usage{where}{group}
+            """, params)
+
+    def vacuum(self):
+        """Reclaim space left by deleted rows and refresh planner statistics."""
+        raise NotImplementedError
+
+    def get_unembedded_feedback(self, model: str, after_id: int = 0, limit: int = 2000) -> List[Dict[str, Any]]:
+        """Feedback past ``after_id`` with no vector from ``model`` yet, in id order."""
+        with self.connection() as conn:
+            return self._fetchall(conn, """
+                SELECT f.id, f.text
+                FROM feedback f
+                LEFT JOIN feedback_embeddings e ON e.feedback_id = f.id
+                WHERE f.id > ? AND (e.feedback_id IS NULL OR e.model <> ?)
+                ORDER BY f.id
+                LIMIT ?
+            """, (after_id, model, limit))
+
+    def save_embeddings(self, model: str, vectors: Iterable[tuple]):
+        """Upsert (feedback_id, vector bytes) pairs."""
+        params = [(feedback_id, model, vector) for feedback_id, vector in vectors]
+        if not params:
+            return
+        with self.connection() as conn:
+            conn.cursor().executemany(
+                self._sql(
+                    "INSERT INTO feedback_embeddings (feedback_id, model, vector) VALUES (?, ?, ?) "
+                    "ON CONFLICT (feedback_id) DO UPDATE SET model = excluded.model, vector = excluded.vector"
+                ),
+                params
+            )
+
+    def count_embeddings(self, model: str) -> int:
+        tenant_clause, tenant_params = self._tenant_clause()
+        with self.connection() as conn:
+            return self._fetchone(conn, f"""
+                SELECT COUNT(*) AS count
+                FROM feedback_embeddings e
+                JOIN feedback f ON f.id = e.feedback_id
+                WHERE e.model = ?{tenant_clause}
+            """, [model] + tenant_params)["count"]
+
+    def get_embeddings(self, model: str, after_id: int = 0, limit: int = 10000, stride: int = 1,
+                       unclustered: bool = False) -> List[tuple]:
+        """(feedback_id, vector bytes) of the current tenant's feedback in id order.
+
+        ``stride`` > 1 samples every n-th id.
+        """
+        tenant_clause, tenant_params = self._tenant_clause()
+        query = """
+            SELECT e.feedback_id, e.vector
+            FROM feedback_embeddings e
+            JOIN feedback f ON f.id = e.feedback_id
+        """
+        if unclustered:
+            query += " LEFT JOIN feedback_clusters c ON c.feedback_id = e.feedback_id"
+        query += " WHERE e.model = ? AND e.feedback_id > ?" + tenant_clause
+        params: List[Any] = [model, after_id] + tenant_params
+        if unclustered:
+            query += " AND c.feedback_id IS NULL"
+        if stride > 1:
+            query += " AND e.feedback_id % ? = 0"
+            params.append(stride)
+        with self.connection() as conn:
+            return self._fetch_tuples(conn, query + " ORDER BY e.feedback_id LIMIT ?", params + [limit])
+
+    def replace_clusters(self, clusters: List[Dict[str, Any]]) -> List[int]:
+        """Drop the current tenant's clusters and assignments and store ``clusters``; returns their new ids in order."""
+        tenant_clause, tenant_params = self._tenant_clause("tenant_id", prefix=" WHERE ")
+        with self.connection() as conn:
+            self._execute(
+                conn, f"DELETE FROM feedback_clusters WHERE feedback_id IN (SELECT id FROM feedback{tenant_clause})",
+                tenant_params
+            )
+            self._execute(conn, f"DELETE FROM theme_clusters{tenant_clause}", tenant_params)
+            return [
+                self._insert(
+                    conn,
+                    "INSERT INTO theme_clusters (label, keywords, parent_theme, weight, centroid, tenant_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (c["label"], c.get("keywords"), c.get("parent_theme"), c["weight"], c["centroid"], write_tenant())
+                )
+                for c in clusters
+            ]
+
+    def update_clusters(self, clusters: Iterable[Dict[str, Any]]):
+        params = [
+            (c["label"], c.get("keywords"), c.get("parent_theme"), c["weight"], c["centroid"], c["id"])
+            for c in clusters
+        ]
+        if not params:
+            return
+        with self.connection() as conn:
+            conn.cursor().executemany(
+                self._sql(
+                    "UPDATE theme_clusters SET label = ?, keywords = ?, parent_theme = ?, weight = ?, centroid = ?, "
+                    "updated_at = CURRENT_TIMESTAMP WHERE id = ?"
+                ),
+                params
+            )
+
+    def save_cluster_assignments(self, assignments: Iterable[tuple]):
+        """Upsert (feedback_id, cluster_id, similarity) rows; cluster_id None means no content to cluster."""
+        params = list(assignments)
+        if not params:
+            return
+        with self.connection() as conn:
+            conn.cursor().executemany(
+                self._sql(
+                    "INSERT INTO feedback_clusters (feedback_id, cluster_id, similarity) VALUES (?, ?, ?) "
+                    "ON CONFLICT (feedback_id) DO UPDATE SET cluster_id = excluded.cluster_id, "
+                    "similarity = excluded.similarity"
+                ),
+                params
+            )
+
+    def get_cluster_centroids(self) -> List[Dict[str, Any]]:
+        tenant_clause, tenant_params = self._tenant_clause("tenant_id", prefix=" WHERE ")
+        with self.connection() as conn:
+            return self._fetchall(conn, f"""
+                SELECT id, label, keywords, parent_theme, weight, centroid
+                FROM theme_clusters{tenant_clause}
+                ORDER BY id
+            """, tenant_params)
+
+    def get_clusters(self) -> List[Dict[str, Any]]:
+        """The current tenant's clusters with live item counts and mean current priority, largest first.
+
+        Each tenant's clusters are fitted and named from its own feedback only.
+        """
+        tenant_clause, tenant_params = self._tenant_clause("f.tenant_id")
+        cluster_clause, cluster_params = self._tenant_clause("c.tenant_id", prefix=" WHERE ")
+        with self.connection() as conn:
+            return self._fetchall(conn, f"""
+                SELECT
+                    c.id, c.label, c.keywords, c.parent_theme, c.updated_at,
+                    COUNT(f.id) AS items, COUNT(s.priority_score) AS scored,
+                    AVG(s.priority_score) AS avg_priority
+                FROM theme_clusters c
+                LEFT JOIN feedback_clusters fc ON fc.cluster_id = c.id
+                LEFT JOIN feedback f ON f.id = fc.feedback_id{tenant_clause}
+                LEFT JOIN scores s ON s.feedback_id = f.id{cluster_clause}
+                GROUP BY c.id, c.label, c.keywords, c.parent_theme, c.updated_at
+                ORDER BY items DESC, c.id
+            """, tenant_params + cluster_params)
+
+    def get_cluster_members(self, cluster_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        """The current tenant's members, closest to the centroid first."""
+        tenant_clause, tenant_params = self._tenant_clause()
+        with self.connection() as conn:
+            return self._fetchall(conn, f"""
+                SELECT
+                    f.id, f.text, f.source, f.sentiment, f.theme, f.summary, f.created_at,
+                    s.urgency, s.impact, s.justification, s.priority_score, fc.similarity
+                FROM feedback_clusters fc
+                JOIN feedback f ON f.id = fc.feedback_id
+                LEFT JOIN scores s ON s.feedback_id = f.id
+                WHERE fc.cluster_id = ?{tenant_clause}
+                ORDER BY fc.similarity DESC, f.id
+                LIMIT ?
+            """, [cluster_id] + tenant_params + [limit])
+
+    def enqueue_feedback(self, feedback_ids: Iterable[int], requeue: bool = True) -> int:
+        """Queue items for the workers; ``requeue`` resets items already queued, otherwise they are left alone."""
+        params = [(feedback_id,) for feedback_id in feedback_ids]
+        if not params:
+            return 0
+        conflict = (
+            "DO UPDATE SET status = 'pending', attempts = 0, "
+            "lease_owner = NULL, lease_expires_at = NULL, last_error = NULL"
+        ) if requeue else "DO NOTHING"
+        with self.connection() as conn:
+            conn.cursor().executemany(
+                self._sql(f"INSERT INTO feedback_queue (feedback_id) VALUES (?) ON CONFLICT (feedback_id) {conflict}"),
+                params
+            )
+        return len(params)
+
+    def claim_feedback(self, worker_id: str, limit: int, lease_seconds: float, max_attempts: int,
+                       now: float) -> List[Dict[str, Any]]:
+        """Lease up to ``limit`` pending items, including items whose lease has expired.
+
+        An expired lease means the worker died on the item; once that has
+        happened ``max_attempts`` times the item is marked failed rather than
+        handed to the next worker.
+        """
+        with self.connection() as conn:
+            self._execute(conn, """
+                UPDATE feedback_queue
+                SET status = 'failed', lease_owner = NULL, lease_expires_at = NULL,
+                    last_error = 'lease expired on the last attempt'
+                WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?
+            """, (now, max_attempts))
+            claimed = self._fetchall(conn, f"""
+                UPDATE feedback_queue
+                SET status = 'leased', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1
+                WHERE feedback_id IN (
+                    SELECT feedback_id FROM feedback_queue
+                    WHERE status = 'pending' OR (status = 'leased' AND lease_expires_at < ? AND attempts < ?)
+                    ORDER BY feedback_id
+                    LIMIT ?{self.claim_lock_clause}
+                )
+                RETURNING feedback_id, attempts
+            """, (worker_id, now + lease_seconds, now, max_attempts, limit))
+            if not claimed:
+                return []
+            attempts = {row["feedback_id"]: row["attempts"] for row in claimed}
+            placeholders = ", ".join("?" for _ in attempts)
+            rows = self._fetchall(
+                conn,
+                f"SELECT id AS feedback_id, text, source, tenant_id FROM feedback WHERE id IN ({placeholders}) ORDER BY id",
+                list(attempts)
+            )
+        for row in rows:
+            row["attempts"] = attempts[row["feedback_id"]]
+        return rows
+
+    def complete_feedback(self, feedback_id: int, worker_id: str) -> bool:
+        with self.connection() as conn:
+            cursor = self._execute(
+                conn,
+                "DELETE FROM feedback_queue WHERE feedback_id = ? AND lease_owner = ?",
+                (feedback_id, worker_id)
+            )
+            return cursor.rowcount > 0
+
+    def renew_lease(self, feedback_id: int, worker_id: str, lease_seconds: float, now: float) -> bool:
+        """Extend a worker's lease on one item; False when another worker has claimed or finished it since."""
+        with self.connection() as conn:
+            cursor = self._execute(
+                conn,
+                "UPDATE feedback_queue SET lease_expires_at = ? "
+                "WHERE feedback_id = ? AND lease_owner = ? AND status = 'leased'",
+                (now + lease_seconds, feedback_id, worker_id)
+            )
+            return cursor.rowcount > 0
+
+    def fail_feedback(self, feedback_id: int, worker_id: str, error: str, max_attempts: int):
+        with self.connection() as conn:
+            self._execute(conn, """
+                UPDATE feedback_queue
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    lease_owner = NULL, lease_expires_at = NULL, last_error = ?
+                WHERE feedback_id = ? AND lease_owner = ?
+            """, (max_attempts, error[:1000], feedback_id, worker_id))
+
+    def release_leases(self, worker_id: str, feedback_ids: Optional[Iterable[int]] = None) -> int:
+        """Hand a worker's leased items back to the queue without counting an attempt."""
+        query = """
+            UPDATE feedback_queue
+            SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL, attempts = attempts - 1
+            WHERE lease_owner = ? AND status = 'leased'
+        """
+        params: List[Any] = [worker_id]
+        if feedback_ids is not None:
+            ids = list(feedback_ids)
+            if not ids:
+                return 0
+            query += f" AND feedback_id IN ({', '.join('?' for _ in ids)})"
+            params.extend(ids)
+        with self.connection() as conn:
+            return self._execute(conn, query, params).rowcount
+
+    def queue_stats(self) -> Dict[str, int]:
+        with self.connection() as conn:
+            rows = self._fetchall(conn, "SELECT status, COUNT(*) AS count FROM feedback_queue GROUP BY status")
+        stats = {"pending": 0, "leased": 0, "failed": 0}
+        stats.update({row["status"]: row["count"] for row in rows})
+        return stats
@@ -0,0 +1,78 @@
+import logging
+import os
+from contextlib import contextmanager
+from typing import Any, Iterator, List
+from backend.storage.base import FeedbackRepository
+
+logger = logging.getLogger(__name__)
+
+
+class PostgresRepository(FeedbackRepository):
+    """PostgreSQL backend on psycopg 3 with a shared connection pool.
+
+    Requires the optional ``psycopg[binary,pool]`` dependency. Pool bounds come
+    from DB_POOL_MIN_SIZE and DB_POOL_MAX_SIZE.
+    """
+
+    name = "postgres"
+    id_column = "BIGSERIAL PRIMARY KEY"
+    blob_type = "BYTEA"
+    claim_lock_clause = " FOR UPDATE SKIP LOCKED"
+    row_lock_clause = " FOR UPDATE"
+
+    def __init__(self, url: str):
+        try:
+            from psycopg.rows import dict_row
+            from psycopg_pool import ConnectionPool
+        except ImportError as e:
+            raise ImportError("PostgreSQL storage requires 'psycopg[binary,pool]' to be installed") from e
+
+        self.url = url
+        self.pool = ConnectionPool(
+            url,
+            min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+            max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            kwargs={"row_factory": dict_row},
+            open=True,
+        )
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        # The pool commits when the block succeeds and rolls back when it raises.
+        try:
+            with self.pool.connection() as conn:
+                yield conn
+        except Exception as e:
+            logger.error(f"Database error: {e}")
+            raise
+
+    def close(self):
+        self.pool.close()
+
+    def _sql(self, query: str) -> str:
+        return query.replace("%", "%%").replace("?", "%s")
+
+    def _columns(self, conn, table: str) -> List[str]:
+        rows = self._fetchall(
+            conn,
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = ?",
+            (table,)
+        )
+        return [row["column_name"] for row in rows]
+
+    def _tuple_cursor(self, conn, query: str, params=()):
+        from psycopg.rows import tuple_row
+        return conn.cursor(row_factory=tuple_row).execute(self._sql(query), tuple(params))
+
+    def vacuum(self):
+        # VACUUM cannot run inside a transaction block.
+        with self.pool.connection() as conn:
+            conn.autocommit = True
+            try:
+                for table in ("feedback", "scores", "score_history", "feedback_queue", "change_log"):
+                    conn.execute(f"VACUUM (ANALYZE) {table}")
+            finally:
+                conn.autocommit = False
+
+    def _epoch(self, column: str) -> str:
+        return f"CAST(EXTRACT(EPOCH FROM {column}) AS BIGINT)"
@@ -0,0 +1,56 @@
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Iterator, List
+from backend.storage.base import FeedbackRepository
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteRepository(FeedbackRepository):
+    name = "sqlite"
+    id_column = "INTEGER PRIMARY KEY AUTOINCREMENT"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.timeout = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Database error: {e}")
+            raise
+        finally:
+            conn.close()
+
+    def init_db(self):
+        # WAL lets API processes read while queue workers write.
+        with self.connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+        super().init_db()
+
+    def _columns(self, conn, table: str) -> List[str]:
+        return [row["name"] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+    def _tuple_cursor(self, conn, query: str, params=()):
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        return cursor.execute(self._sql(query), tuple(params))
+
+    def vacuum(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        try:
+            conn.execute("VACUUM")
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+
+    def _epoch(self, column: str) -> str:
+        return f"CAST(strftime('%s', {column}) AS INTEGER)"
@@ -0,0 +1,272 @@
+import hmac
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+from starlette.responses import JSONResponse
+from starlette.websockets import WebSocketClose
+
+logger = logging.getLogger(__name__)
+
+# Rows written before tenants existed, and requests without a tenant header, belong here.
+DEFAULT_TENANT = "default"
+TENANT_HEADER = "X-Tenant-ID"
+# With TENANT_API_KEYS set, each request's key in this header decides its tenant.
+API_KEY_HEADER = "X-API-Key"
+# Endpoints that hold no tenant data and answer without a key, such as health probes.
+PUBLIC_PATHS = {"/", "/health", "/docs", "/redoc", "/openapi.json"}
+TENANT_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+# LLM calls one tenant may have in flight at once in this process.
+TENANT_LLM_CONCURRENCY = int(os.getenv("TENANT_LLM_CONCURRENCY", "4"))
+# Tokens one tenant may spend per TENANT_QUOTA_WINDOW seconds; 0 means unlimited.
+TENANT_TOKEN_QUOTA = int(os.getenv("TENANT_TOKEN_QUOTA", "0"))
+TENANT_QUOTA_WINDOW = float(os.getenv("TENANT_QUOTA_WINDOW", "86400"))
+
+# Scope for maintenance jobs and shared indexes that read and write across tenants.
+ALL_TENANTS = None
+
+_current_tenant: ContextVar[Optional[str]] = ContextVar("tenant", default=DEFAULT_TENANT)
+
+
+class TenantQuotaExceeded(Exception):
+    pass
+
+
+class TenantAuthenticationError(Exception):
+    """The request has no API key, or one that maps to no tenant."""
+
+
+def current_tenant() -> Optional[str]:
+    """The tenant queries are scoped to, or None (ALL_TENANTS) for cross-tenant work."""
+    return _current_tenant.get()
+
+
+def write_tenant() -> str:
+    """The tenant new rows are written for."""
+    return _current_tenant.get() or DEFAULT_TENANT
+
+
+@contextmanager
+def tenant_scope(tenant: Optional[str]) -> Iterator[Optional[str]]:
+    """Scope storage reads and writes in this block (and threads started with its context) to ``tenant``."""
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+
+@lru_cache(maxsize=4)
+def _parse_api_keys(raw: str) -> Dict[str, str]:
+    keys = json.loads(raw)
+    if not isinstance(keys, dict) or not all(isinstance(v, str) and TENANT_PATTERN.match(v) for v in keys.values()):
+        raise ValueError("TENANT_API_KEYS must be a JSON object mapping API keys to tenant ids")
+    return keys
+
+
+def tenant_api_keys() -> Dict[str, str]:
+    """API keys mapped to the tenant they act for, from the JSON object in TENANT_API_KEYS."""
+    raw = os.getenv("TENANT_API_KEYS", "").strip()
+    return _parse_api_keys(raw) if raw else {}
+
+
+def configured_tenants() -> List[str]:
+    """Tenants listed in TENANTS or holding a key in TENANT_API_KEYS; requests for any other tenant are refused."""
+    listed = [tenant.strip() for tenant in os.getenv("TENANTS", "").split(",") if tenant.strip()]
+    return listed + sorted(set(tenant_api_keys().values()) - set(listed))
+
+
+def validate_tenant(tenant: str) -> str:
+    if not TENANT_PATTERN.match(tenant):
+        raise ValueError("Tenant ids are 1-64 letters, digits, '.', '_' or '-'")
+    if tenant == DEFAULT_TENANT:
+        return tenant
+    allowed = configured_tenants()
+    if not allowed:
+        # Without a list, any client could name any tenant; single-tenant deployments only serve the default one.
+        raise PermissionError("Set TENANTS or TENANT_API_KEYS to serve tenants other than the default one")
+    if tenant not in allowed:
+        raise PermissionError(f"Unknown tenant '{tenant}'")
+    return tenant
+
+
+def authenticate_tenant(requested: Optional[str], api_key: Optional[str]) -> str:
+    """The tenant a request acts for.
+
+    With TENANT_API_KEYS set the tenant is the one its API key maps to, and a
+    tenant header, if sent, must name the same one. Otherwise the header is
+    trusted as set by the proxy in front, restricted to TENANTS.
+    """
+    keys = tenant_api_keys()
+    if not keys:
+        return validate_tenant(requested or DEFAULT_TENANT)
+    if not api_key:
+        raise TenantAuthenticationError(f"Missing {API_KEY_HEADER} header")
+    tenant = None
+    for key, key_tenant in keys.items():
+        # Compare every key in constant time, so timing doesn't reveal how much of a key matched.
+        if hmac.compare_digest(key.encode("utf-8"), api_key.encode("utf-8")):
+            tenant = key_tenant
+    if tenant is None:
+        raise TenantAuthenticationError("Invalid API key")
+    if requested and requested != tenant:
+        raise PermissionError(f"This API key does not belong to tenant '{requested}'")
+    return tenant
+
+
+def tenant_limits(tenant: str) -> Dict[str, Any]:
+    """Concurrency and token quota for ``tenant``.
+
+    Defaults come from TENANT_LLM_CONCURRENCY and TENANT_TOKEN_QUOTA;
+    TENANT_QUOTAS holds a JSON object mapping a tenant to an object with any
+    of ``concurrency`` and ``tokens``.
+    """
+    limits = {"concurrency": TENANT_LLM_CONCURRENCY, "tokens": TENANT_TOKEN_QUOTA}
+    overrides = os.getenv("TENANT_QUOTAS")
+    if overrides:
+        try:
+            override = json.loads(overrides).get(tenant)
+        except (json.JSONDecodeError, AttributeError):
+            logger.error("TENANT_QUOTAS is not a JSON object, ignoring it")
+            override = None
+        if isinstance(override, dict):
+            limits.update({k: int(v) for k, v in override.items() if k in limits})
+    limits["concurrency"] = max(1, limits["concurrency"])
+    return limits
+
+
+class TenantLimiter:
+    """Per-tenant LLM concurrency and token budgets, so one busy tenant cannot starve the others.
+
+    Each tenant gets its own semaphore; a tenant at its limit waits for its
+    own calls to finish while other tenants' calls go ahead. Token use is
+    counted in fixed windows of ``window`` seconds, and a tenant past its
+    quota is refused further calls until the window resets.
+    """
+
+    def __init__(self, window: Optional[float] = None):
+        self.window = TENANT_QUOTA_WINDOW if window is None else window
+        self.lock = threading.Lock()
+        self.tenants: Dict[str, Dict[str, Any]] = {}
+
+    def _state(self, tenant: str) -> Dict[str, Any]:
+        # Called with the lock held.
+        state = self.tenants.get(tenant)
+        if state is None:
+            limits = tenant_limits(tenant)
+            state = self.tenants[tenant] = {
+                **limits,
+                "semaphore": threading.BoundedSemaphore(limits["concurrency"]),
+                "in_flight": 0,
+                "used": 0,
+                "window_start": time.monotonic(),
+            }
+        if time.monotonic() - state["window_start"] >= self.window:
+            state["used"] = 0
+            state["window_start"] = time.monotonic()
+        return state
+
+    def check(self, tenant: Optional[str] = None):
+        tenant = tenant or write_tenant()
+        with self.lock:
+            state = self._state(tenant)
+            if state["tokens"] and state["used"] >= state["tokens"]:
+                raise TenantQuotaExceeded(
+                    f"Tenant '{tenant}' used {state['used']} of {state['tokens']} tokens in this quota window"
+                )
+
+    @contextmanager
+    def llm_slot(self, tenant: Optional[str] = None) -> Iterator[None]:
+        """Hold one of the tenant's LLM slots; raises TenantQuotaExceeded when its budget is spent."""
+        tenant = tenant or write_tenant()
+        self.check(tenant)
+        with self.lock:
+            semaphore = self._state(tenant)["semaphore"]
+        semaphore.acquire()
+        with self.lock:
+            self.tenants[tenant]["in_flight"] += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.tenants[tenant]["in_flight"] -= 1
+            semaphore.release()
+
+    def record(self, tokens: int, tenant: Optional[str] = None):
+        tenant = tenant or write_tenant()
+        with self.lock:
+            self._state(tenant)["used"] += tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            now = time.monotonic()
+            return {
+                tenant: {
+                    "in_flight": state["in_flight"],
+                    "concurrency": state["concurrency"],
+                    "tokens_used": state["used"],
+                    "token_quota": state["tokens"] or None,
+                    "window_resets_in": round(max(0.0, self.window - (now - state["window_start"])), 1),
+                }
+                for tenant, state in sorted(self.tenants.items())
+            }
+
+    def reset(self):
+        with self.lock:
+            self.tenants.clear()
+
+
+tenant_limiter = TenantLimiter()
+
+
+class TenantMiddleware:
+    """Scope each request to its tenant: the one its X-API-Key maps to, or the one in its X-Tenant-ID header.
+
+    WebSocket clients, which cannot set headers from a browser, may pass
+    ``?api_key=`` and ``?tenant=`` instead. Without TENANT_API_KEYS, requests
+    without a tenant use the default one.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] in PUBLIC_PATHS:
+            await self.app(scope, receive, send)
+            return
+        try:
+            tenant = authenticate_tenant(self._credential(scope, TENANT_HEADER, "tenant"),
+                                         self._credential(scope, API_KEY_HEADER, "api_key"))
+        except (ValueError, PermissionError, TenantAuthenticationError) as e:
+            if scope["type"] == "websocket":
+                await WebSocketClose(code=1008, reason=str(e))(scope, receive, send)
+            else:
+                status = (401 if isinstance(e, TenantAuthenticationError)
+                          else 403 if isinstance(e, PermissionError) else 400)
+                await JSONResponse({"detail": str(e)}, status_code=status)(scope, receive, send)
+            return
+        with tenant_scope(tenant):
+            await self.app(scope, receive, send)
+
+    @staticmethod
+    def _credential(scope, header_name: str, query_name: str) -> Optional[str]:
+        header = header_name.lower().encode("latin-1")
+        for name, value in scope.get("headers", []):
+            if name == header:
+                return value.decode("latin-1").strip()
+        if scope["type"] == "websocket":
+            from urllib.parse import parse_qs
+            values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get(query_name)
+            if values:
+                return values[0].strip()
+        return None
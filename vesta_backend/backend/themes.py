@@ -0,0 +1,266 @@
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.db import get_repository
+from backend.embeddings import EMBEDDING_MODEL, embed_texts, from_bytes, terms, to_bytes
+from backend.storage import FeedbackRepository
+from backend.tenancy import ALL_TENANTS, tenant_scope
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLUSTERS = int(os.getenv("THEME_CLUSTERS", "24"))
+# Embeddings sampled to fit centroids; the rest are only assigned.
+FIT_SAMPLE = int(os.getenv("THEME_FIT_SAMPLE", "100000"))
+NAMING_SAMPLE = 300
+KEYWORDS_PER_CLUSTER = 3
+
+
+def embed_pending(repository: FeedbackRepository, batch_size: int = 2000) -> int:
+    """Embed feedback that has no vector from the current model; returns how many were embedded.
+
+    Works forward by id, so an interrupted run resumes where it stopped and
+    vectors that already exist are never recomputed.
+    """
+    embedded, after_id = 0, 0
+    while True:
+        rows = repository.get_unembedded_feedback(EMBEDDING_MODEL, after_id, batch_size)
+        if not rows:
+            return embedded
+        vectors = embed_texts([row["text"] for row in rows])
+        repository.save_embeddings(EMBEDDING_MODEL, [(row["id"], to_bytes(v)) for row, v in zip(rows, vectors)])
+        embedded += len(rows)
+        after_id = rows[-1]["id"]
+        logger.info(f"Embedded {embedded} feedback items")
+
+
+def iter_embeddings(repository: FeedbackRepository, batch_size: int, stride: int = 1, unclustered: bool = False):
+    """Stored vectors for the current model as (ids, float32 matrix) batches in id order."""
+    after_id = 0
+    while True:
+        rows = repository.get_embeddings(EMBEDDING_MODEL, after_id, batch_size, stride, unclustered)
+        if not rows:
+            return
+        yield np.array([row[0] for row in rows], dtype=np.int64), from_bytes([row[1] for row in rows])
+        after_id = rows[-1][0]
+
+
+def _kmeans_plus_plus(x: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = [x[rng.integers(len(x))]]
+    distance = 1.0 - x @ centroids[0]
+    for _ in range(1, k):
+        weights = np.maximum(distance, 0) ** 2
+        total = weights.sum()
+        index = rng.choice(len(x), p=weights / total) if total > 0 else rng.integers(len(x))
+        centroids.append(x[index])
+        distance = np.minimum(distance, 1.0 - x @ x[index])
+    return np.array(centroids)
+
+
+def minibatch_kmeans(x: np.ndarray, k: int, batch_size: int = 1024, iterations: int = 150,
+                     seed: int = 0) -> tuple:
+    """Spherical mini-batch k-means over unit vectors.
+
+    Each centroid moves toward the members of a batch with a step of
+    1 / (points it has absorbed), as in Sculley's web-scale k-means.
+    Returns (unit centroids, absorbed counts).
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(x))
+    init = x[rng.choice(len(x), size=min(len(x), 20 * k + 1000), replace=False)]
+    centroids = _kmeans_plus_plus(init, k, rng)
+    counts = np.zeros(k)
+    for _ in range(iterations):
+        batch = x[rng.integers(0, len(x), size=min(batch_size, len(x)))]
+        assignment = (batch @ centroids.T).argmax(axis=1)
+        batch_counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, batch)
+        touched = batch_counts > 0
+        counts[touched] += batch_counts[touched]
+        rate = (batch_counts[touched] / counts[touched])[:, None]
+        centroids[touched] += rate * (sums[touched] / batch_counts[touched][:, None] - centroids[touched])
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids, counts
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> tuple:
+    similarity = vectors @ centroids.T
+    nearest = similarity.argmax(axis=1)
+    best = similarity[np.arange(len(vectors)), nearest]
+    empty = ~vectors.any(axis=1)
+    return nearest, best, empty
+
+
+def _assign_and_store(repository: FeedbackRepository, ids: np.ndarray, vectors: np.ndarray,
+                      centroids: np.ndarray, cluster_ids: Sequence[int]) -> tuple:
+    nearest, best, empty = _assign(vectors, centroids)
+    repository.save_cluster_assignments([
+        (int(feedback_id), None if is_empty else int(cluster_ids[n]), None if is_empty else round(float(b), 4))
+        for feedback_id, n, b, is_empty in zip(ids, nearest, best, empty)
+    ])
+    return nearest[~empty], vectors[~empty]
+
+
+def name_clusters(repository: FeedbackRepository, clusters: List[Dict[str, Any]]):
+    """Label each cluster with the terms most over-represented among its central members."""
+    samples = {c["id"]: repository.get_cluster_members(c["id"], NAMING_SAMPLE) for c in clusters}
+    document_frequency = {cid: Counter(t for m in members for t in set(terms(m["text"])))
+                          for cid, members in samples.items()}
+    background = Counter()
+    for counts in document_frequency.values():
+        background.update(counts)
+    background_docs = max(sum(len(members) for members in samples.values()), 1)
+
+    for cluster in clusters:
+        members = samples[cluster["id"]]
+        counts = document_frequency[cluster["id"]]
+        if not members:
+            continue
+        size = len(members)
+        scored = []
+        for term, count in counts.items():
+            share = count / size
+            if count < 2 and size > 5:
+                continue
+            baseline = (background[term] + 1) / (background_docs + 1)
+            scored.append((share * math.log(share / baseline + 1e-9), term))
+        keywords: List[str] = []
+        for _, term in sorted(scored, reverse=True):
+            # Skip words already covered by a chosen phrase, and phrases made of chosen words.
+            if any(term in chosen.split() or chosen in term.split() for chosen in keywords):
+                continue
+            keywords.append(term)
+            if len(keywords) == KEYWORDS_PER_CLUSTER:
+                break
+        themes = Counter(m["theme"] for m in members if m["theme"])
+        cluster["parent_theme"] = themes.most_common(1)[0][0] if themes else None
+        cluster["keywords"] = ", ".join(keywords)
+        name = " / ".join(keywords) or "misc"
+        cluster["label"] = f"{cluster['parent_theme']}: {name}" if cluster["parent_theme"] else name
+
+
+def fit(repository: FeedbackRepository, n_clusters: int, batch_size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Fit fresh centroids on a sample of the current tenant's embeddings and reassign all its items."""
+    total = repository.count_embeddings(EMBEDDING_MODEL)
+    stride = max(1, total // FIT_SAMPLE)
+    sample = [vectors for _, vectors in iter_embeddings(repository, 50000, stride)]
+    x = np.vstack(sample) if sample else np.zeros((0, 1), dtype=np.float32)
+    x = x[x.any(axis=1)]
+    if len(x) == 0:
+        repository.replace_clusters([])
+        return []
+
+    centroids, weights = minibatch_kmeans(x, n_clusters, seed=seed)
+    clusters = [{"label": f"cluster {i}", "weight": float(w), "centroid": to_bytes(c)}
+                for i, (c, w) in enumerate(zip(centroids, weights))]
+    ids = repository.replace_clusters(clusters)
+    for cluster, cluster_id in zip(clusters, ids):
+        cluster["id"] = cluster_id
+    for feedback_ids, vectors in iter_embeddings(repository, batch_size):
+        _assign_and_store(repository, feedback_ids, vectors, centroids, ids)
+    return clusters
+
+
+def update(repository: FeedbackRepository, clusters: List[Dict[str, Any]], batch_size: int) -> int:
+    """Assign items that have no cluster yet and nudge centroids toward them; returns items assigned."""
+    centroids = from_bytes([c["centroid"] for c in clusters])
+    cluster_ids = [c["id"] for c in clusters]
+    weights = np.array([c["weight"] for c in clusters], dtype=np.float64)
+    assigned = 0
+    for feedback_ids, vectors in iter_embeddings(repository, batch_size, unclustered=True):
+        nearest, members = _assign_and_store(repository, feedback_ids, vectors, centroids, cluster_ids)
+        assigned += len(feedback_ids)
+        counts = np.bincount(nearest, minlength=len(clusters))
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, nearest, members)
+        touched = counts > 0
+        weights[touched] += counts[touched]
+        rate = (counts[touched] / weights[touched])[:, None]
+        centroids[touched] += rate * (sums[touched] / counts[touched][:, None] - centroids[touched])
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    for cluster, centroid, weight in zip(clusters, centroids, weights):
+        cluster["centroid"] = to_bytes(centroid)
+        cluster["weight"] = float(weight)
+    return assigned
+
+
+def _discover_tenant_themes(repository: FeedbackRepository, n_clusters: int, batch_size: int, refit: bool,
+                            seed: int) -> Dict[str, Any]:
+    clusters = repository.get_cluster_centroids()
+    if refit or not clusters:
+        clusters = fit(repository, n_clusters, batch_size, seed)
+        assigned = repository.count_embeddings(EMBEDDING_MODEL)
+        mode = "fit"
+    else:
+        assigned = update(repository, clusters, batch_size)
+        mode = "update"
+    if clusters and (assigned or mode == "fit"):
+        name_clusters(repository, clusters)
+        repository.update_clusters(clusters)
+    return {"mode": mode, "assigned": assigned, "clusters": len(clusters)}
+
+
+def discover_themes(n_clusters: int = DEFAULT_CLUSTERS, batch_size: int = 5000, refit: bool = False,
+                    seed: int = 0) -> Dict[str, Any]:
+    """Embed new feedback, then fit clusters (first run or ``refit``) or fold new items into existing ones.
+
+    Each tenant's clusters are fitted and named from its own feedback only,
+    so no label or keyword is drawn from another tenant's text.
+    """
+    repository = get_repository()
+    start = time.perf_counter()
+    with tenant_scope(ALL_TENANTS):
+        embedded = embed_pending(repository, batch_size)
+        tenants = repository.list_tenants()
+    results = []
+    for tenant in tenants:
+        with tenant_scope(tenant):
+            results.append(_discover_tenant_themes(repository, n_clusters, batch_size, refit, seed))
+    return {
+        "mode": "update" if results and all(r["mode"] == "update" for r in results) else "fit",
+        "embedded": embedded,
+        "assigned": sum(r["assigned"] for r in results),
+        "clusters": sum(r["clusters"] for r in results),
+        "tenants": len(tenants),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Embed feedback and discover sub-themes with mini-batch k-means")
+    parser.add_argument("--clusters", type=int, default=DEFAULT_CLUSTERS)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--refit", action="store_true", help="Fit new centroids and reassign every item")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db-path", help="SQLite file to use when DATABASE_URL is not set")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    if args.db_path:
+        import backend.db as db_module
+        db_module.DB_PATH = args.db_path
+    from backend.db import init_db
+    init_db()
+
+    result = discover_themes(args.clusters, args.batch_size, args.refit, args.seed)
+    print(json.dumps(result))
+    with tenant_scope(ALL_TENANTS):
+        for cluster in get_repository().get_clusters():
+            print(f"{cluster['items']:>8}  {cluster['label']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
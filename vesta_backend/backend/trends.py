@@ -0,0 +1,235 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.db import get_analytics_snapshot, get_trend_rows
+
+logger = logging.getLogger(__name__)
+
+SENTIMENTS = ["positive", "neutral", "negative"]
+UNCLASSIFIED = "Unclassified"
+DAY = 86400
+
+
+def trend_settings() -> Dict[str, Any]:
+    return {
+        "window_days": float(os.getenv("TREND_WINDOW_DAYS", "7")),
+        "windows": int(os.getenv("TREND_WINDOWS", "5")),
+        "z_threshold": float(os.getenv("TREND_Z_THRESHOLD", "3.0")),
+        "min_volume": int(os.getenv("TREND_MIN_VOLUME", "5")),
+    }
+
+
+class TrendColumns:
+    """Columnar view of feedback for trend maths.
+
+    ``timestamps`` are epoch seconds, ``themes`` index into ``theme_labels``,
+    ``sentiments`` index into SENTIMENTS (-1 when unclassified) and
+    ``priorities`` are NaN for items that have not been scored.
+    """
+
+    def __init__(self, timestamps: np.ndarray, themes: np.ndarray, theme_labels: List[str],
+                 sentiments: np.ndarray, priorities: np.ndarray):
+        self.timestamps = timestamps
+        self.themes = themes
+        self.theme_labels = theme_labels
+        self.sentiments = sentiments
+        self.priorities = priorities
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]]) -> "TrendColumns":
+        """Build columns from (epoch, theme, sentiment, priority_score) tuples."""
+        count = len(rows)
+        theme_codes: Dict[str, int] = {}
+        sentiment_codes = {label: code for code, label in enumerate(SENTIMENTS)}
+        timestamps = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+        themes = np.fromiter(
+            (theme_codes.setdefault(row[1] or UNCLASSIFIED, len(theme_codes)) for row in rows),
+            dtype=np.int32, count=count
+        )
+        sentiments = np.fromiter((sentiment_codes.get(row[2], -1) for row in rows), dtype=np.int8, count=count)
+        priorities = np.fromiter(
+            (np.nan if row[3] is None else row[3] for row in rows), dtype=np.float64, count=count
+        )
+        return cls(timestamps, themes, list(theme_codes), sentiments, priorities)
+
+
+def load_trend_columns(since: float) -> TrendColumns:
+    since_text = datetime.fromtimestamp(since, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    return TrendColumns.from_rows(get_trend_rows(since_text))
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / np.maximum(denominator, 1), np.nan)
+
+
+def _rounded(value: float, digits: int = 3) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def compute_trends(
+    columns: TrendColumns,
+    end: Optional[float] = None,
+    window_days: float = 7,
+    windows: int = 5,
+    z_threshold: float = 3.0,
+    min_volume: int = 5,
+) -> Dict[str, Any]:
+    """Compare the latest window of each theme against the windows before it.
+
+    Window 0 ends at ``end`` and windows 1..N-1 form the baseline. A volume
+    spike is a z-score against the baseline mean, with the variance floored at
+    the Poisson variance so that quiet themes don't flag on noise; a negative
+    sentiment shift is a two-proportion z-test against the pooled baseline.
+    """
+    if windows < 2:
+        raise ValueError("windows must be at least 2: one current window and a baseline")
+    end = time.time() if end is None else end
+    span = window_days * DAY
+    labels = columns.theme_labels
+    theme_count, width = len(labels), windows
+
+    age = end - columns.timestamps
+    window = (age // span).astype(np.int64)
+    mask = (age >= 0) & (window < windows)
+    flat = columns.themes[mask].astype(np.int64) * width + window[mask]
+    sentiments = columns.sentiments[mask]
+    priorities = columns.priorities[mask]
+    size = theme_count * width
+
+    def grid(weights=None, index=flat) -> np.ndarray:
+        return np.bincount(index, weights=weights, minlength=size).reshape(theme_count, width)
+
+    volume = grid()
+    classified = grid(sentiments >= 0)
+    negative = grid(sentiments == SENTIMENTS.index("negative"))
+    positive = grid(sentiments == SENTIMENTS.index("positive"))
+    scored = ~np.isnan(priorities)
+    priority_sum = grid(priorities[scored], flat[scored])
+    priority_count = grid(None, flat[scored])
+
+    current, baseline = volume[:, 0], volume[:, 1:]
+    baseline_mean = baseline.mean(axis=1)
+    baseline_var = baseline.var(axis=1, ddof=1) if windows > 2 else np.zeros(theme_count)
+    volume_z = (current - baseline_mean) / np.sqrt(np.maximum(np.maximum(baseline_var, baseline_mean), 1.0))
+
+    negative_now, classified_now = negative[:, 0], classified[:, 0]
+    negative_before, classified_before = negative[:, 1:].sum(axis=1), classified[:, 1:].sum(axis=1)
+    negative_ratio = _ratio(negative_now, classified_now)
+    negative_baseline = _ratio(negative_before, classified_before)
+    pooled = _ratio(negative_now + negative_before, classified_now + classified_before)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        standard_error = np.sqrt(pooled * (1 - pooled) * (1 / classified_now + 1 / classified_before))
+        negative_z = np.where(standard_error > 0, (negative_ratio - negative_baseline) / standard_error, 0.0)
+    negative_z = np.nan_to_num(negative_z, nan=0.0, posinf=0.0, neginf=0.0)
+
+    mean_priority = _ratio(priority_sum[:, 0], priority_count[:, 0])
+    baseline_priority = _ratio(priority_sum[:, 1:].sum(axis=1), priority_count[:, 1:].sum(axis=1))
+
+    themes = []
+    for code in sorted(range(theme_count), key=lambda code: (-current[code], labels[code])):
+        if volume[code].sum() == 0:
+            continue
+        spike = bool(current[code] >= min_volume and volume_z[code] >= z_threshold)
+        negative_shift = bool(classified_now[code] >= min_volume and negative_z[code] >= z_threshold)
+        themes.append({
+            "theme": labels[code],
+            "volume": int(current[code]),
+            "baseline_volume": round(float(baseline_mean[code]), 2),
+            "volume_z": round(float(volume_z[code]), 2),
+            "spike": spike,
+            "series": [int(v) for v in volume[code, ::-1]],
+            "positive_ratio": _rounded(_ratio(positive[code, 0], classified_now[code])),
+            "negative_ratio": _rounded(negative_ratio[code]),
+            "baseline_negative_ratio": _rounded(negative_baseline[code]),
+            "negative_z": round(float(negative_z[code]), 2),
+            "negative_shift": negative_shift,
+            "mean_priority": _rounded(mean_priority[code], 2),
+            "baseline_priority": _rounded(baseline_priority[code], 2),
+        })
+
+    return {
+        "window_end": datetime.fromtimestamp(end, timezone.utc).isoformat(),
+        "window_days": window_days,
+        "windows": windows,
+        "total_volume": int(current.sum()),
+        "baseline_volume": round(float(baseline.sum(axis=0).mean()), 2),
+        "themes": themes,
+        "spikes": [item["theme"] for item in themes if item["spike"]],
+        "negative_shifts": [item["theme"] for item in themes if item["negative_shift"]],
+    }
+
+
+def get_trends(end: Optional[float] = None, **overrides) -> Dict[str, Any]:
+    """Compute trends over the rows the configured windows cover.
+
+    Uses the analytics snapshot when it is enabled, otherwise loads the rows
+    from the database.
+    """
+    settings = trend_settings()
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    end = time.time() if end is None else end
+    since = end - settings["window_days"] * settings["windows"] * DAY
+    snapshot = get_analytics_snapshot()
+    columns = snapshot.trend_columns(since) if snapshot is not None else load_trend_columns(since)
+    return compute_trends(columns, end=end, **settings)
+
+
+def format_trends(trends: Optional[Dict[str, Any]], limit: int = 6) -> str:
+    """Render computed trends as Markdown bullets for reports and prompts."""
+    if not trends or not trends.get("themes"):
+        return ""
+    window = f"{trends['window_days']:g}"
+    lines = []
+    for item in trends["themes"][:limit]:
+        flags = [flag for flag, on in (("volume spike", item["spike"]), ("negative shift", item["negative_shift"])) if on]
+        line = (
+            f"- **{item['theme']}**: {item['volume']} items in the last {window} days "
+            f"(baseline {item['baseline_volume']:g}, z={item['volume_z']:+.1f})"
+        )
+        if item["negative_ratio"] is not None:
+            line += f", {item['negative_ratio']:.0%} negative"
+            if item["baseline_negative_ratio"] is not None:
+                line += f" (baseline {item['baseline_negative_ratio']:.0%})"
+        if item["mean_priority"] is not None:
+            line += f", mean priority {item['mean_priority']:.2f}"
+        if flags:
+            line += f" — {', '.join(flags)}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Print per-theme feedback trends")
+    parser.add_argument("--db-path", help="SQLite file to use when DATABASE_URL is not set")
+    parser.add_argument("--window-days", type=float)
+    parser.add_argument("--windows", type=int)
+    parser.add_argument("--end", help="End of the latest window, YYYY-MM-DD (default: now)")
+    parser.add_argument("--json", action="store_true", help="Print the raw trends as JSON")
+    args = parser.parse_args(argv)
+
+    if args.db_path:
+        import backend.db as db_module
+        db_module.DB_PATH = args.db_path
+    end = None
+    if args.end:
+        end = datetime.strptime(args.end, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+
+    trends = get_trends(end=end, window_days=args.window_days, windows=args.windows)
+    print(json.dumps(trends, indent=2) if args.json else (format_trends(trends, limit=50) or "No feedback in range"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
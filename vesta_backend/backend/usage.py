@@ -0,0 +1,222 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from backend.tenancy import write_tenant
+
+if TYPE_CHECKING:
+    from backend.storage import FeedbackRepository
+
+logger = logging.getLogger(__name__)
+
+# Seconds between ledger writes; calls are buffered in memory until then.
+USAGE_FLUSH_INTERVAL = float(os.getenv("LLM_USAGE_FLUSH_INTERVAL", "5"))
+# Buffered calls that trigger a write before the interval is up.
+USAGE_BATCH_SIZE = int(os.getenv("LLM_USAGE_BATCH_SIZE", "500"))
+# Calls kept in memory while the database is unavailable; older ones are dropped.
+USAGE_MAX_PENDING = 50000
+USAGE_GROUPS = ("day", "tenant_id", "source", "stage", "tier", "model", "outcome")
+
+TIER_COST_PER_1K = {
+    "local": 0.0,
+    "cheap": float(os.getenv("LLM_CHEAP_COST_PER_1K", "0.0003")),
+    "primary": float(os.getenv("LLM_COST_PER_1K", "0.005")),
+}
+
+_call_context: ContextVar[Dict[str, Any]] = ContextVar("llm_call_context", default={})
+
+
+@contextmanager
+def usage_context(**fields) -> Iterator[None]:
+    """Attach ``fields`` (feedback_id, source, tier, attempt) to the LLM calls made in this block."""
+    token = _call_context.set({**_call_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def tier_budget(tier: str) -> float:
+    """Daily spend in USD after which ``tier`` is skipped for cheaper ones; 0 means unlimited."""
+    return float(os.getenv(f"LLM_{tier.upper()}_DAILY_BUDGET", "0") or 0)
+
+
+def token_usage(prompt: str, completion: str, input_tokens: int = 0, output_tokens: int = 0,
+                total_tokens: int = 0) -> Dict[str, int]:
+    """Prompt and completion tokens as reported by the provider, estimated when it reports less."""
+    if input_tokens or output_tokens:
+        return {"prompt_tokens": int(input_tokens), "completion_tokens": int(output_tokens)}
+    # Rough estimate when the provider does not report usage: ~4 characters per token.
+    prompt_tokens, completion_tokens = len(prompt) // 4, len(completion) // 4
+    if total_tokens:
+        # Only a total: split it in proportion to the text on each side.
+        prompt_tokens = round(total_tokens * len(prompt) / max(1, len(prompt) + len(completion)))
+        completion_tokens = int(total_tokens) - prompt_tokens
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class UsageLedger:
+    """Records every LLM call (tokens, model, latency, outcome) in the llm_usage table.
+
+    ``record`` only appends to an in-memory buffer; a background thread writes
+    the buffer in one batch every ``flush_interval`` seconds, or sooner once
+    ``batch_size`` calls are waiting, so the pipeline never waits on the
+    ledger. The ledger also tracks today's spend per tier for the budgets:
+    what the database held at the last write (every process's calls) plus
+    this process's calls since.
+    """
+
+    def __init__(self, repository: "FeedbackRepository", flush_interval: Optional[float] = None,
+                 batch_size: Optional[int] = None):
+        self.repository = repository
+        self.flush_interval = USAGE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.batch_size = batch_size or USAGE_BATCH_SIZE
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending: List[Dict[str, Any]] = []
+        self.spend_day: Optional[str] = None
+        self.spend: Dict[str, float] = {}
+        self.wake = threading.Event()
+        self.stopped = False
+        self.thread: Optional[threading.Thread] = None
+
+    def record(self, stage: str, model: Optional[str], usage: Dict[str, int], latency: float,
+               outcome: str = "ok", **fields):
+        """Buffer one call; ``fields`` override the surrounding usage_context()."""
+        context = {**_call_context.get(), **fields}
+        tier = context.get("tier") or "primary"
+        tokens = usage["prompt_tokens"] + usage["completion_tokens"]
+        now = datetime.now(timezone.utc)
+        entry = {
+            "created_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "day": now.strftime("%Y-%m-%d"),
+            "tenant_id": write_tenant(),
+            "feedback_id": context.get("feedback_id"),
+            "source": context.get("source") or "manual",
+            "stage": stage,
+            "tier": tier,
+            "model": model,
+            "attempt": context.get("attempt", 1),
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            # Tokens prompt compaction removed before the call; see backend.prompt_budget.
+            "saved_tokens": context.get("saved_tokens", 0),
+            "cost": tokens / 1000 * TIER_COST_PER_1K.get(tier, 0.0),
+            "latency_ms": round(latency * 1000, 2),
+            "outcome": outcome,
+        }
+        with self.lock:
+            self.pending.append(entry)
+            if len(self.pending) > USAGE_MAX_PENDING:
+                del self.pending[:len(self.pending) - USAGE_MAX_PENDING]
+            if self.thread is None and not self.stopped:
+                self.thread = threading.Thread(target=self._run, name="llm-usage-ledger", daemon=True)
+                self.thread.start()
+            if len(self.pending) >= self.batch_size:
+                self.wake.set()
+
+    @contextmanager
+    def track(self, stage: str, llm, prompt: str, **fields) -> Iterator[Dict[str, Any]]:
+        """Time one LLM call and record it with its outcome.
+
+        The caller stores the call's token usage under ``"usage"`` in the
+        yielded dict; calls that fail before reporting usage are recorded with
+        the estimated prompt tokens. ``fields`` are passed to ``record``; use
+        them instead of usage_context() in generators, which may resume in a
+        different context.
+        """
+        from backend.llm_parsing import LLMOutputError
+
+        call: Dict[str, Any] = {"usage": None}
+        outcome = "ok"
+        start = time.perf_counter()
+        try:
+            yield call
+        except GeneratorExit:
+            # A streaming caller was closed early, e.g. the client disconnected.
+            outcome = "cancelled"
+            raise
+        except LLMOutputError:
+            outcome = "parse_error"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            model = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+            self.record(stage, model, call["usage"] or token_usage(prompt, ""), time.perf_counter() - start, outcome,
+                        **fields)
+
+    def flush(self) -> int:
+        """Write buffered calls in one batch and refresh today's spend; returns the number written."""
+        with self.flush_lock:
+            with self.lock:
+                batch, self.pending = self.pending, []
+            if batch:
+                try:
+                    self.repository.insert_llm_usage(batch)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(batch)} LLM usage records, keeping them for the next flush: {e}")
+                    with self.lock:
+                        self.pending[:0] = batch
+                    return 0
+            # Other processes' spend only matters when a budget is set; otherwise it is read when first needed.
+            if any(tier_budget(tier) > 0 for tier in TIER_COST_PER_1K):
+                self._load_spend()
+            elif batch:
+                self.spend_day = None
+            return len(batch)
+
+    def _load_spend(self):
+        day = _today()
+        try:
+            spend = self.repository.get_llm_spend(day)
+        except Exception as e:
+            logger.error(f"Failed to read today's LLM spend: {e}")
+            return
+        with self.lock:
+            self.spend_day, self.spend = day, spend
+
+    def spent_today(self, tier: str) -> float:
+        day = _today()
+        if self.spend_day != day:
+            self._load_spend()
+        with self.lock:
+            spent = self.spend.get(tier, 0.0) if self.spend_day == day else 0.0
+            return spent + sum(entry["cost"] for entry in self.pending if entry["tier"] == tier and entry["day"] == day)
+
+    def over_budget(self, tier: str) -> bool:
+        budget = tier_budget(tier)
+        return budget > 0 and self.spent_today(tier) >= budget
+
+    def budgets(self) -> Dict[str, Dict[str, Any]]:
+        statuses = {}
+        for tier in ("primary", "cheap"):
+            budget = tier_budget(tier)
+            if budget > 0:
+                spent = self.spent_today(tier)
+                statuses[tier] = {"daily_budget": budget, "spent_today": round(spent, 6), "exceeded": spent >= budget}
+        return statuses
+
+    def _run(self):
+        while not self.stopped:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the writer thread and write what is left."""
+        self.stopped = True
+        self.wake.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=10)
+        self.flush()
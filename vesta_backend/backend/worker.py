@@ -0,0 +1,204 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.db import (
+    claim_feedback,
+    complete_feedback,
+    fail_feedback,
+    flush_usage,
+    get_queue_stats,
+    init_db,
+    release_leases,
+    renew_lease,
+)
+from backend.tenancy import tenant_scope
+
+logger = logging.getLogger(__name__)
+
+ProcessFn = Callable[[int, str, str], Any]
+
+
+def _default_process_fn() -> ProcessFn:
+    from backend.crew_pipeline import process_single_feedback
+    return process_single_feedback
+
+
+class Worker:
+    """Pulls leased feedback from the shared queue table and processes it.
+
+    Leases expire after ``lease_seconds``, so items held by a crashed worker are
+    picked up again by the others. A batch is claimed under one lease, so each
+    item's lease is renewed just before it is started, and items another
+    worker has reclaimed in the meantime are skipped. Items that fail ``max_attempts`` times, or
+    whose lease expires on the last attempt, are parked with status 'failed'.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        batch_size: int = 5,
+        lease_seconds: float = 300,
+        poll_interval: float = 1.0,
+        max_attempts: int = 3,
+        process_fn: Optional[ProcessFn] = None,
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.process_fn = process_fn or _default_process_fn()
+        self.stop_event = threading.Event()
+        self.processed = 0
+        self.failed = 0
+
+    def stop(self, *_):
+        if not self.stop_event.is_set():
+            logger.info(f"Worker {self.worker_id} stopping after the current item")
+        self.stop_event.set()
+
+    def run_once(self) -> int:
+        """Claim one batch and process it; returns the number of items claimed."""
+        items = claim_feedback(self.worker_id, self.batch_size, self.lease_seconds, self.max_attempts)
+        for position, item in enumerate(items):
+            if self.stop_event.is_set():
+                # Graceful shutdown: hand back what we have not started.
+                remaining = [i["feedback_id"] for i in items[position:]]
+                release_leases(self.worker_id, remaining)
+                break
+            if not renew_lease(item["feedback_id"], self.worker_id, self.lease_seconds):
+                logger.warning(f"Lease on feedback {item['feedback_id']} expired while earlier items in the "
+                               f"batch were processed; leaving it to the worker that reclaimed it")
+                continue
+            self._process(item)
+        return len(items)
+
+    def _process(self, item: Dict[str, Any]):
+        feedback_id = item["feedback_id"]
+        try:
+            # The queue is shared; each item is processed (and rate limited) as its own tenant.
+            with tenant_scope(item["tenant_id"]):
+                self.process_fn(feedback_id, item["text"], item["source"] or "manual")
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Worker {self.worker_id} failed feedback {feedback_id} (attempt {item['attempts']}): {e}")
+            fail_feedback(feedback_id, self.worker_id, str(e), self.max_attempts)
+            return
+        if not complete_feedback(feedback_id, self.worker_id):
+            logger.warning(f"Lease on feedback {feedback_id} was lost before completion")
+        self.processed += 1
+
+    def run(self, drain: bool = False):
+        """Poll until stopped; with ``drain`` exit as soon as the queue is empty."""
+        logger.info(f"Worker {self.worker_id} started")
+        try:
+            while not self.stop_event.is_set():
+                claimed = self.run_once()
+                if claimed == 0:
+                    if drain:
+                        break
+                    self.stop_event.wait(self.poll_interval)
+        finally:
+            release_leases(self.worker_id)
+            logger.info(f"Worker {self.worker_id} stopped: {self.processed} processed, {self.failed} failed")
+
+
+def _run_worker_process(options: Dict[str, Any], stop_event, process_fn: Optional[ProcessFn]):
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    if options.get("db_path"):
+        import backend.db as db_module
+        db_module.DB_PATH = options["db_path"]
+    from backend.prompt_budget import load_tokenizer
+    load_tokenizer()
+
+    worker = Worker(
+        batch_size=options["batch_size"],
+        lease_seconds=options["lease_seconds"],
+        poll_interval=options["poll_interval"],
+        max_attempts=options["max_attempts"],
+        process_fn=process_fn,
+    )
+    # The parent owns shutdown; children ignore Ctrl+C and watch the shared event instead.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, worker.stop)
+    threading.Thread(target=lambda: (stop_event.wait(), worker.stop()), daemon=True).start()
+    try:
+        worker.run(drain=options["drain"])
+    finally:
+        # Child processes exit without running atexit hooks, so write the buffered LLM usage now.
+        flush_usage()
+
+
+def run_fleet(processes: int, options: Dict[str, Any], process_fn: Optional[ProcessFn] = None) -> int:
+    """Run ``processes`` workers and wait for them; SIGINT/SIGTERM stop them gracefully."""
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    children: List[multiprocessing.Process] = [
+        context.Process(target=_run_worker_process, args=(options, stop_event, process_fn), name=f"vesta-worker-{i}")
+        for i in range(processes)
+    ]
+
+    def shutdown(signum, _frame):
+        logger.info(f"Received signal {signum}, stopping {processes} workers")
+        stop_event.set()
+
+    previous = {sig: signal.signal(sig, shutdown) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        for child in children:
+            child.start()
+        for child in children:
+            child.join()
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    return max((child.exitcode or 0 for child in children), default=0)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Process queued feedback with a pool of worker processes")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("WORKER_PROCESSES", "1")))
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("WORKER_BATCH_SIZE", "5")))
+    parser.add_argument("--lease-seconds", type=float, default=float(os.getenv("WORKER_LEASE_SECONDS", "300")))
+    parser.add_argument("--poll-interval", type=float, default=float(os.getenv("WORKER_POLL_INTERVAL", "1.0")))
+    parser.add_argument("--max-attempts", type=int, default=int(os.getenv("WORKER_MAX_ATTEMPTS", "3")))
+    parser.add_argument("--db-path", help="SQLite file to use when DATABASE_URL is not set")
+    parser.add_argument("--drain", action="store_true", help="Exit once the queue is empty")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    if args.db_path:
+        import backend.db as db_module
+        db_module.DB_PATH = args.db_path
+    init_db()
+
+    options = {
+        "batch_size": args.batch_size,
+        "lease_seconds": args.lease_seconds,
+        "poll_interval": args.poll_interval,
+        "max_attempts": args.max_attempts,
+        "db_path": args.db_path,
+        "drain": args.drain,
+    }
+    start = time.perf_counter()
+    exit_code = run_fleet(args.processes, options)
+    logger.info(f"Fleet finished in {time.perf_counter() - start:.1f}s, queue: {get_queue_stats()}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())